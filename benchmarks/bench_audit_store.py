@@ -0,0 +1,186 @@
+"""
+入侵审计存储基准测试（可在任意平台运行）
+
+1. 用多年的合成入侵记录填充数据库，统计检测线程上 append() 的耗时和后台批量写入吞吐
+2. 查询“本月”的记录，确认走时间索引且耗时与总记录数无关
+3. 以一年后的时钟重新打开，确认保留策略删除过期记录，且记录不可修改
+4. 在模拟平台上跑完整的守护循环，确认每次入侵都被记录了进程、标题、空闲时长和锁定结果
+
+用法: python benchmarks/bench_audit_store.py [--years 5] [--per-day 100]
+"""
+import os
+import sys
+import time
+import random
+import logging
+import sqlite3
+import argparse
+import tempfile
+import statistics
+
+root_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, root_dir)
+
+from src.audit_store import AuditStore, IntrusionEvent, month_range
+from src.config_store import ConfigStore
+from src.scheduler import IdleScheduler
+from src.simulation import SimPlatform
+from src.wechat_guardian import WeChatGuardian, INTRUSION
+
+DAY = 86400.0
+NOW = 1_760_000_000.0
+
+
+def synthetic_events(years, per_day):
+    rng = random.Random(17)
+    start = NOW - years * 365 * DAY
+    count = int(years * 365 * per_day)
+    for i in range(count):
+        ts = start + (i + rng.random()) * DAY / per_day
+        yield IntrusionEvent(ts, 60 + rng.random() * 3600, 'WeChat.exe', '微信', 'WeChat', True, 1,
+                             0.02 + rng.random() * 0.02, rng.random() * 0.01)
+
+
+def fill(path, years, per_day):
+    """
+    :return: (记录数, append 平均耗时 µs, 写入吞吐 条/秒, 批次数)
+    """
+    events = list(synthetic_events(years, per_day))
+    store = AuditStore(path, retention_days=0, max_pending=len(events) + 1, clock=lambda: NOW)
+    store.start()
+    started = time.perf_counter()
+    for event in events:
+        store.append(event)
+    append_us = (time.perf_counter() - started) / len(events) * 1e6
+    store.flush()
+    elapsed = time.perf_counter() - started
+    store.close()
+    return len(events), append_us, store.written / elapsed, store.batches
+
+
+def query_month(store):
+    start, end = month_range(NOW)
+    samples = []
+    for _ in range(30):
+        t0 = time.perf_counter()
+        rows = store.query(start, end)
+        samples.append((time.perf_counter() - t0) * 1000)
+    conn = sqlite3.connect(store.path)
+    plan = ' '.join(str(row[-1]) for row in conn.execute(
+        "EXPLAIN QUERY PLAN SELECT * FROM intrusions WHERE ts >= ? AND ts < ? ORDER BY ts DESC", (start, end)))
+    conn.close()
+    return len(rows), statistics.median(samples), plan
+
+
+def append_only(path):
+    conn = sqlite3.connect(path)
+    try:
+        conn.execute("UPDATE intrusions SET locked = 0")
+        return False
+    except sqlite3.DatabaseError:
+        return True
+    finally:
+        conn.close()
+
+
+def simulate(path, intrusions):
+    """
+    在模拟平台上每隔一段空闲时间打开一次微信
+    :return: (守护循环返回的入侵记录, 从数据库读出的记录)
+    """
+    platform = SimPlatform()
+    clock = platform.clock
+    explorer_pid = platform.add_process("explorer.exe")
+    explorer = (platform.add_window(explorer_pid, "CabinetWClass", "文件资源管理器"), explorer_pid)
+    wechat_pid = platform.add_process("WeChat.exe")
+    wechat = platform.add_window(wechat_pid, "WeChatMainWndForPC", "微信")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        store = ConfigStore(os.path.join(tmp, "config.json"), debounce=0)
+        store.update({"idle_time": 60}, immediate=True)
+        audit = AuditStore(path, clock=platform.wall_time)
+        audit.start()
+        guardian = WeChatGuardian(config_store=store, platform=platform, audit_store=audit)
+        scheduler = IdleScheduler(clock=clock)
+        guardian.on_wechat_activated = lambda info: scheduler.wake()
+        if guardian.start_foreground_events():
+            scheduler.guard_check_interval = None
+
+        seen = []
+
+        def intrude():
+            platform.idle.record_input()
+            platform.foreground.switch_at(clock.now(), wechat, wechat_pid)
+            clock.call_later(5, leave)
+
+        def leave():
+            platform.idle.record_input()
+            platform.lock_backend.unlock(wechat)
+            platform.foreground.switch_at(clock.now(), *explorer)
+            clock.call_later(120 + len(seen) * 10, intrude)
+
+        def on_cycle(result):
+            if result.event == INTRUSION:
+                seen.append(result.intrusion)
+                if len(seen) >= intrusions:
+                    scheduler.stop()
+
+        platform.foreground.switch_at(0.0, *explorer)
+        clock.call_at(1.0, intrude)
+        guardian.run_loop(scheduler, on_cycle)
+        guardian.stop_foreground_events()
+        audit.close()
+        return seen, audit.query(newest_first=False)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--years', type=float, default=5, help='合成记录覆盖的年数')
+    parser.add_argument('--per-day', type=float, default=100, help='每天的入侵次数')
+    args = parser.parse_args()
+    logging.disable(logging.WARNING)
+    ok = True
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'audit.db')
+        total, append_us, throughput, batches = fill(path, args.years, args.per_day)
+        size_mb = os.path.getsize(path) / 1024 / 1024
+        print(f"写入 {total} 条记录（{args.years:g} 年，每天 {args.per_day:g} 次）："
+              f"append() 平均 {append_us:.2f} µs，后台写入 {throughput:,.0f} 条/秒，共 {batches} 个事务，数据库 {size_mb:.1f} MB")
+        ok = ok and append_us < 50
+
+        store = AuditStore(path, retention_days=0, clock=lambda: NOW)
+        rows, month_ms, plan = query_month(store)
+        print(f"查询本月记录 {rows} 条：中位数 {month_ms:.2f} ms，查询计划：{plan}")
+        ok = ok and rows > 0 and 'intrusions_ts' in plan and month_ms < 100
+
+        # 一年后重新打开：启动时按保留天数清理
+        later = AuditStore(path, retention_days=365, clock=lambda: NOW)
+        later.start()
+        later.flush()
+        later.close()
+        remaining = later.count()
+        oldest = later.query(limit=1, newest_first=False)[0].timestamp
+        print(f"保留 365 天：删除 {later.purged} 条，剩余 {remaining} 条，最早一条距今 {(NOW - oldest) / DAY:.1f} 天")
+        ok = ok and later.purged > 0 and remaining == total - later.purged and NOW - oldest <= 365 * DAY
+
+        protected = append_only(path)
+        print(f"修改已有记录：{'被拒绝' if protected else '未被拒绝'}")
+        ok = ok and protected
+
+        seen, recorded = simulate(os.path.join(tmp, 'sim.db'), 20)
+        complete = all(e.process == 'WeChat.exe' and e.window_title == '微信' and e.rule and e.locked
+                       and e.idle_seconds > 60 and e.detection_latency is not None for e in recorded)
+        print(f"模拟守护循环：入侵 {len(seen)} 次，写入 {len(recorded)} 条，字段完整：{complete}")
+        if recorded:
+            e = recorded[-1]
+            print(f"  最后一条：{time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(e.timestamp))} "
+                  f"空闲 {e.idle_seconds:.0f} 秒，{e.process}（{e.window_title}），规则 {e.rule}，"
+                  f"锁定耗时 {e.lock_latency * 1000:.0f} ms，检测耗时 {e.detection_latency * 1000:.0f} ms")
+        ok = ok and len(recorded) == len(seen) == 20 and complete
+
+    return 0 if ok else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
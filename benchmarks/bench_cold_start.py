@@ -0,0 +1,91 @@
+"""
+冷启动基准测试
+
+- Windows：以 --startup-probe 模式多次启动程序，取托盘图标出现耗时的中位数，超过预算时返回非零
+- 其他平台：无法创建托盘图标，只检查启动路径上可导入的模块没有提前加载重量级依赖，并统计导入耗时
+
+用法: python benchmarks/bench_cold_start.py [--budget 毫秒] [--runs 次数]
+"""
+import os
+import re
+import sys
+import argparse
+import statistics
+import subprocess
+
+root_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# 托盘图标出现之前不应导入的模块
+HEAVY_MODULES = ['PIL', 'requests', 'packaging', 'PyQt5', 'tkinter.ttk', 'tkinter.messagebox']
+
+# 启动路径上与平台无关的模块
+STARTUP_MODULES = [
+    'src.logging_setup',
+    'src.scheduler',
+    'src.foreground',
+    'src.process_cache',
+    'src.tray_icons',
+    'src.settings',
+]
+
+
+def probe_startup():
+    """
+    启动一次程序，返回托盘图标出现的耗时（毫秒）
+    """
+    output = subprocess.run(
+        [sys.executable, '-m', 'src.main', '--startup-probe'],
+        cwd=root_dir, capture_output=True, text=True, timeout=60
+    ).stdout
+    match = re.search(r'startup_ms=([\d.]+)', output)
+    if not match:
+        raise RuntimeError(f"未能获取启动耗时: {output!r}")
+    return float(match.group(1))
+
+
+def probe_imports():
+    """
+    在新进程中导入启动路径上的模块
+    :return: (导入耗时毫秒, 提前加载的重量级模块列表)
+    """
+    code = (
+        "import sys, time\n"
+        "t0 = time.perf_counter()\n"
+        f"for name in {STARTUP_MODULES!r}: __import__(name)\n"
+        "print((time.perf_counter() - t0) * 1000)\n"
+        f"print(','.join(m for m in {HEAVY_MODULES!r} if m in sys.modules))\n"
+    )
+    lines = subprocess.run(
+        [sys.executable, '-c', code], cwd=root_dir, capture_output=True, text=True, timeout=60, check=True
+    ).stdout.splitlines()
+    loaded = [m for m in lines[1].split(',') if m] if len(lines) > 1 else []
+    return float(lines[0]), loaded
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--budget', type=float, default=1500.0, help='托盘图标出现的耗时预算（毫秒）')
+    parser.add_argument('--runs', type=int, default=5)
+    args = parser.parse_args()
+
+    if sys.platform == 'win32':
+        samples = [probe_startup() for _ in range(args.runs)]
+        median = statistics.median(samples)
+        print(f"托盘图标出现耗时: 中位数 {median:.0f} 毫秒，最慢 {max(samples):.0f} 毫秒，预算 {args.budget:.0f} 毫秒")
+        return 0 if median <= args.budget else 1
+
+    samples = []
+    loaded = []
+    for _ in range(args.runs):
+        elapsed, loaded = probe_imports()
+        samples.append(elapsed)
+    median = statistics.median(samples)
+    print(f"非 Windows 平台，只测量启动模块导入: 中位数 {median:.1f} 毫秒，预算 {args.budget:.0f} 毫秒")
+    if loaded:
+        print(f"启动路径提前加载了重量级模块: {', '.join(loaded)}")
+        return 1
+    return 0 if median <= args.budget else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
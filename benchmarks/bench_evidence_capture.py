@@ -0,0 +1,152 @@
+"""
+入侵截图基准测试（使用假屏幕和模拟平台，可在任意平台运行）
+
+1. 在虚拟时钟上连续触发入侵，对比开启截图前后检测线程上单次入侵循环（检测 + 锁定 + 请求截图）的真实耗时，
+   确认截图不会推迟锁定，突发入侵超过队列上限时丢弃请求而不是阻塞
+2. 统计 1 个和 2 个工作线程缩小、压缩 1920x1080 截图的吞吐和压缩后大小
+   （缩小和编码大部分时间持有 GIL，2 个工作线程没有稳定的提升，默认使用 1 个）
+3. 确认截图目录总大小不超过配额、从最早的截图开始删除，重启后能接上已有截图
+
+用法: python benchmarks/bench_evidence_capture.py [--intrusions 200] [--grab-ms 50]
+"""
+import os
+import sys
+import time
+import logging
+import argparse
+import tempfile
+import statistics
+
+root_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, root_dir)
+
+from src.config_store import ConfigStore
+from src.evidence import EvidenceCapture
+from src.scheduler import IdleScheduler
+from src.simulation import SimPlatform, SimScreen
+from src.wechat_guardian import WeChatGuardian, INTRUSION
+
+
+def run_intrusions(tmp, intrusions, capture):
+    """
+    :return: 每次入侵循环的真实耗时（毫秒）列表
+    """
+    platform = SimPlatform()
+    clock = platform.clock
+    explorer_pid = platform.add_process("explorer.exe")
+    explorer = (platform.add_window(explorer_pid, "CabinetWClass", "文件资源管理器"), explorer_pid)
+    wechat_pid = platform.add_process("WeChat.exe")
+    wechat = (platform.add_window(wechat_pid, "WeChatMainWndForPC", "微信"), wechat_pid)
+
+    store = ConfigStore(os.path.join(tmp, "config.json"), debounce=0)
+    store.update({"idle_time": 60}, immediate=True)
+    guardian = WeChatGuardian(config_store=store, platform=platform, evidence_capture=capture)
+    scheduler = IdleScheduler(clock=clock)
+    guardian.on_wechat_activated = lambda info: scheduler.wake()
+    if guardian.start_foreground_events():
+        scheduler.guard_check_interval = None
+
+    timings = []
+    step = guardian.step
+
+    def timed_step(scheduler):
+        started = time.perf_counter()
+        result = step(scheduler)
+        if result.event == INTRUSION:
+            timings.append((time.perf_counter() - started) * 1000)
+            if len(timings) >= intrusions:
+                scheduler.stop()
+        return result
+
+    guardian.step = timed_step
+
+    def intrude():
+        platform.idle.record_input()
+        platform.foreground.switch_at(clock.now(), *wechat)
+        clock.call_later(5, leave)
+
+    def leave():
+        platform.idle.record_input()
+        platform.lock_backend.unlock(wechat[0])
+        platform.foreground.switch_at(clock.now(), *explorer)
+        clock.call_later(90, intrude)
+
+    platform.foreground.switch_at(0.0, *explorer)
+    clock.call_at(1.0, intrude)
+    guardian.run_loop(scheduler)
+    guardian.stop_foreground_events()
+    return timings
+
+
+def percentile(values, p):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * p))]
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--intrusions', type=int, default=200, help='连续入侵次数')
+    parser.add_argument('--grab-ms', type=float, default=50, help='假屏幕单次截图的真实耗时（毫秒）')
+    args = parser.parse_args()
+    logging.disable(logging.WARNING)
+    ok = True
+
+    with tempfile.TemporaryDirectory() as tmp:
+        # 1. 检测线程上的开销
+        baseline = run_intrusions(tmp, args.intrusions, None)
+        screen = SimScreen(grab_cost=args.grab_ms / 1000)
+        capture = EvidenceCapture(screen, os.path.join(tmp, 'burst'), max_pending=4)
+        capture.start()
+        with_capture = run_intrusions(tmp, args.intrusions, capture)
+        capture.wait_idle(30)
+        capture.stop()
+        print(f"{'入侵循环耗时(ms)':<16}{'中位数':>10}{'p99':>10}{'最大':>10}")
+        for label, timings in (("不截图", baseline), ("截图", with_capture)):
+            print(f"{label:<16}{statistics.median(timings):>10.3f}{percentile(timings, 0.99):>10.3f}{max(timings):>10.3f}")
+        print(f"突发 {args.intrusions} 次入侵：请求截图 {capture.requested} 次，保存 {capture.captured} 张，"
+              f"队列满丢弃 {capture.dropped} 次")
+        overhead = statistics.median(with_capture) - statistics.median(baseline)
+        ok = ok and overhead < 0.5 and capture.captured + capture.dropped == capture.requested == args.intrusions
+        ok = ok and capture.captured >= 4 and capture.failed == 0
+
+        # 2. 工作线程数与吞吐
+        for workers in (1, 2):
+            screen = SimScreen()
+            pool = EvidenceCapture(screen, os.path.join(tmp, f'pool{workers}'), workers=workers, max_pending=64)
+            pool.start()
+            started = time.perf_counter()
+            for i in range(40):
+                pool.capture(1_700_000_000 + i)
+            pool.wait_idle(60)
+            elapsed = time.perf_counter() - started
+            pool.stop()
+            raw = len(screen.frame.data)
+            print(f"{workers} 个工作线程：{pool.captured / elapsed:.1f} 张/秒，"
+                  f"平均 {pool.total_bytes / max(pool.captured, 1) / 1024:.0f} KB（原始 {raw / 1024 / 1024:.1f} MB）")
+            ok = ok and pool.captured == 40
+
+        # 3. 配额和最早优先删除
+        directory = os.path.join(tmp, 'quota')
+        size = pool.total_bytes // pool.captured
+        quota = size * 5 + size // 2
+        store = EvidenceCapture(SimScreen(), directory, quota_bytes=quota, workers=1)
+        store.start()
+        timestamps = [1_700_000_000 + i * 3600 for i in range(30)]
+        for t in timestamps:
+            store.capture(t)
+            store.wait_idle(10)
+        store.stop()
+        kept = sorted(os.listdir(directory))
+        expected = [time.strftime('%Y%m%d-%H%M%S', time.localtime(t)) + '-000.png' for t in timestamps[-len(kept):]]
+        reopened = EvidenceCapture(SimScreen(), directory, quota_bytes=quota)
+        print(f"配额 {quota / 1024:.0f} KB：保存 {store.captured} 张，删除 {store.evicted} 张，保留 {len(kept)} 张共 "
+              f"{store.total_bytes / 1024:.0f} KB，保留的是最新的截图：{kept == expected}，"
+              f"重启后读取 {reopened.file_count} 张 {reopened.total_bytes / 1024:.0f} KB")
+        ok = ok and store.total_bytes <= quota and kept == expected and store.evicted == 30 - len(kept)
+        ok = ok and reopened.total_bytes == store.total_bytes
+
+    return 0 if ok else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,166 @@
+"""
+状态汇总基准测试（上报端和汇总服务都在本机运行，可在任意平台运行）
+
+1. 数千个上报端并发向本机汇总服务发送 gzip 批次，统计吞吐、请求延迟和压缩率，确认每台电脑的状态和入侵次数正确
+2. 汇总服务停止期间上报失败的批次写入暂存目录并按退避时间重试，服务恢复后全部补发，
+   重发的批次被去重，补发的旧批次不覆盖更新的状态
+
+用法: python benchmarks/bench_fleet.py [--agents 2000] [--concurrency 64]
+"""
+import os
+import sys
+import json
+import time
+import gzip
+import logging
+import argparse
+import tempfile
+import statistics
+from concurrent.futures import ThreadPoolExecutor
+
+root_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, root_dir)
+
+from src.audit_store import IntrusionEvent
+from src.fleet import FleetReporter, http_post, MAX_BACKOFF
+from src.fleet_collector import FleetCollector, CollectorServer
+
+TOKEN = 'bench-token'
+
+
+class FakeClock:
+    def __init__(self):
+        self.t = 1_700_000_000.0
+
+    def __call__(self):
+        return self.t
+
+
+class TimedPost:
+    """
+    记录每次请求的耗时和状态
+    """
+
+    def __init__(self):
+        self.latencies = []
+        self.statuses = []
+
+    def __call__(self, url, body, headers, timeout):
+        started = time.perf_counter()
+        try:
+            status = http_post(url, body, headers, timeout)
+        except OSError:
+            status = None
+        self.latencies.append((time.perf_counter() - started) * 1000)
+        self.statuses.append(status)
+        return status
+
+
+def make_agent(tmp, i, url, post, clock):
+    return FleetReporter(url, host=f'PC-{i:05d}', token=TOKEN, spool_dir=os.path.join(tmp, 'spool', str(i)),
+                         post=post, clock=clock)
+
+
+def intrusion(clock, i):
+    return IntrusionEvent(clock(), 300 + i, 'WeChat.exe', '微信', '微信', True, 1, 0.03, 0.0)
+
+
+def drive(agent, clock, i):
+    """
+    一台电脑的一段时间：进入守护、被入侵、再次进入守护（偶数编号的电脑保持守护）
+    """
+    agent.report_state('guarding')
+    agent.report_intrusion(intrusion(clock, i))
+    agent.report_state('idle')
+    if i % 2 == 0:
+        agent.report_state('guarding')
+    return agent.flush()
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--agents', type=int, default=2000, help='上报端数量')
+    parser.add_argument('--concurrency', type=int, default=64, help='同时发送的上报端数量')
+    args = parser.parse_args()
+    logging.disable(logging.CRITICAL)
+    ok = True
+
+    collector = FleetCollector()
+    server = CollectorServer(collector, port=0, token=TOKEN)
+    server.start()
+    url = f"http://127.0.0.1:{server.port}/report"
+    clock = FakeClock()
+    post = TimedPost()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        # 1. 并发上报
+        agents = [make_agent(tmp, i, url, post, clock) for i in range(args.agents)]
+        started = time.perf_counter()
+        with ThreadPoolExecutor(args.concurrency) as pool:
+            results = list(pool.map(lambda i: drive(agents[i], clock, i), range(args.agents)))
+        elapsed = time.perf_counter() - started
+        summary = collector.summary()
+        sample = agents[0]._make_batch()
+        sample['events'] = [dict(intrusion(clock, 0)._asdict(), type='intrusion', ts=clock())] + \
+                           [{'type': 'state', 'ts': clock(), 'state': 'guarding'}] * 3
+        raw = len(json.dumps(sample, ensure_ascii=False).encode('utf-8'))
+        compressed = len(gzip.compress(json.dumps(sample, ensure_ascii=False).encode('utf-8')))
+        print(f"{args.agents} 个上报端（并发 {args.concurrency}）：{len(post.latencies) / elapsed:,.0f} 请求/秒，"
+              f"延迟中位数 {statistics.median(post.latencies):.1f} ms，p99 "
+              f"{sorted(post.latencies)[int(len(post.latencies) * 0.99)]:.1f} ms")
+        print(f"  单个批次 {raw} 字节，gzip 后 {compressed} 字节；汇总：{summary}")
+        ok = ok and all(results) and summary['hosts'] == args.agents and summary['intrusions'] == args.agents
+        ok = ok and summary['guarding'] == (args.agents + 1) // 2
+
+        # 2. 汇总服务停止期间暂存，恢复后补发
+        port = server.port
+        server.stop()
+        offline = agents[:50]
+        failed = [not drive(agent, clock, i) for i, agent in enumerate(offline)]
+        # 退避期间继续产生事件
+        clock.t += 1
+        for i, agent in enumerate(offline):
+            agent.report_intrusion(intrusion(clock, i))
+            agent.tick()
+        spooled = sum(agent.pending_spool() for agent in offline)
+        print(f"汇总服务停止：{sum(failed)} 个上报端发送失败，暂存 {spooled} 个批次")
+        ok = ok and all(failed) and spooled >= len(offline)
+
+        server = CollectorServer(collector, port=port, token=TOKEN)
+        server.start()
+        before = collector.summary()
+        clock.t += MAX_BACKOFF
+        for agent in offline:
+            agent.tick()
+        after = collector.summary()
+        remaining = sum(agent.pending_spool() for agent in offline)
+        print(f"汇总服务恢复：补发 {after['batches'] - before['batches']} 个批次，剩余暂存 {remaining} 个，"
+              f"入侵总数 {before['intrusions']} -> {after['intrusions']}")
+        ok = ok and remaining == 0 and after['intrusions'] == args.agents + len(offline) * 2
+
+        # 重发同一批次被去重；补发的旧批次不覆盖更新的状态
+        agent = offline[1]
+        agent.report_state('guarding')
+        old = agent._make_batch()
+        agent.report_state('idle')
+        agent.flush()
+        body = agent._encode(old)
+        statuses = [agent._send(body), agent._send(body)]
+        state = next(h for h in collector.hosts() if h['host'] == agent.host)['state']
+        print(f"重复批次：去重 {collector.duplicates} 次；补发旧批次后状态仍为 {state}")
+        ok = ok and all(statuses) and collector.duplicates == 1 and state == 'idle'
+
+        # 错误的令牌被拒绝
+        intruder = FleetReporter(url, host='INTRUDER', token='wrong', spool_dir=os.path.join(tmp, 'intruder'),
+                                 post=http_post, clock=clock)
+        intruder.report_state('guarding')
+        intruder.flush()
+        ok = ok and server.rejected == 1 and all(h['host'] != 'INTRUDER' for h in collector.hosts())
+        print(f"错误令牌的上报被拒绝：{server.rejected == 1}")
+        server.stop()
+
+    return 0 if ok else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,104 @@
+"""
+前台窗口入侵检测基准测试（使用脚本化事件源和假时钟，可在任意平台运行）
+
+对比守护模式下每 0.1 秒轮询前台窗口与订阅前台窗口事件两种方式的检查次数和检测延迟。
+
+用法: python benchmarks/bench_foreground_detection.py
+"""
+import os
+import sys
+import random
+
+root_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, root_dir)
+
+from src.foreground import ForegroundInfo, ForegroundTracker, ScriptedForegroundSource
+from src.scheduler import IdleScheduler
+
+HOUR = 3600.0
+
+
+class FakeClock:
+    """
+    假时钟：等待时直接推进时间，途中按时间顺序推送脚本事件
+    """
+    def __init__(self, source):
+        self.t = 0.0
+        self.source = source
+
+    def now(self):
+        return self.t
+
+    def wait(self, event, timeout):
+        deadline = float('inf') if timeout is None else self.t + timeout
+        while not event.is_set():
+            next_time = self.source.next_time()
+            if next_time is None or next_time > deadline:
+                self.t = deadline
+                return False
+            self.t = max(self.t, next_time)
+            self.source.run_until(self.t)
+        return True
+
+
+def build_script(seed=1):
+    """
+    生成一小时的前台窗口切换脚本，平均每 30 秒切换一次，约五分之一切到微信
+    """
+    rng = random.Random(seed)
+    apps = ["explorer.exe", "chrome.exe", "code.exe", "WeChat.exe", "outlook.exe"]
+    script = []
+    t = 0.0
+    hwnd = 0x1000
+    while True:
+        t += rng.expovariate(1 / 30.0)
+        if t >= HOUR:
+            break
+        hwnd += 1
+        name = rng.choice(apps)
+        script.append((t, ForegroundInfo(hwnd, hwnd, name)))
+    return script
+
+
+def run(event_driven):
+    script = build_script()
+    activations = [t for t, info in script if info.name == "WeChat.exe"]
+    source = ScriptedForegroundSource(script)
+    clock = FakeClock(source)
+    scheduler = IdleScheduler(clock=clock, guard_check_interval=None if event_driven else 0.1)
+
+    tracker = ForegroundTracker(source)
+    if event_driven:
+        tracker.on_protected_activated = lambda info: scheduler.wake()
+    tracker.start()
+
+    latencies = []
+    detected = 0
+    checks = 0
+    while clock.now() < HOUR:
+        checks += 1
+        if tracker.is_protected_active():
+            # 只统计每次激活后的第一次检测
+            pending = [t for t in activations[detected:] if t <= clock.now()]
+            if pending:
+                latencies.append(clock.now() - pending[-1])
+                detected += len(pending)
+        if not scheduler.sleep(scheduler.next_timeout(True, 0, 0)):
+            break
+    return checks, latencies, len(activations)
+
+
+def main():
+    print(f"{'方式':<10}{'检查次数/小时':>14}{'检测到':>8}{'平均延迟(ms)':>14}{'最大延迟(ms)':>14}")
+    results = {}
+    for name, event_driven in (("轮询0.1秒", False), ("前台事件", True)):
+        checks, latencies, activations = run(event_driven)
+        results[name] = len(latencies)
+        avg = sum(latencies) / len(latencies) * 1000 if latencies else 0
+        worst = max(latencies) * 1000 if latencies else 0
+        print(f"{name:<10}{checks:>14}{len(latencies):>5}/{activations:<3}{avg:>13.1f}{worst:>14.1f}")
+    return 0 if results["前台事件"] >= results["轮询0.1秒"] else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
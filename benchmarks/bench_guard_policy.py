@@ -0,0 +1,263 @@
+"""
+守护时段与按程序的阈值基准测试（使用模拟平台和虚拟时钟，可在任意平台运行）
+
+1. 编译包含大量时段的时段表，与每次都重新解析规则的做法比较查找耗时，并在随机时刻核对结果一致；
+   统计守护循环一天内的缓存未命中次数
+2. 模拟工作日：离开后按当前时段的阈值进入守护，阈值在时段边界变小时在边界处立即进入守护
+3. 单独配置阈值的程序和始终守护的程序：空闲不够长时不锁定企业微信，密码管理器每次切换到前台都锁定、
+   解锁后继续使用不被反复锁定、留在前台离开后重新锁定；前台事件和轮询两种方式结果一致
+
+用法: python benchmarks/bench_guard_policy.py [--periods 200]
+"""
+import os
+import sys
+import time
+import random
+import logging
+import argparse
+import tempfile
+
+root_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, root_dir)
+
+from src.config_store import ConfigStore
+from src.scheduler import IdleScheduler
+from src.simulation import SimPlatform
+from src.metrics import MetricsRegistry
+from src.guard_policy import GuardSchedule, DAY, WEEK, DAY_NAMES, _parse_period
+from src.wechat_guardian import WeChatGuardian, START_GUARDIAN, INTRUSION
+
+# 2023-11-13 00:00 UTC，周一
+MONDAY = 1_699_833_600.0
+
+OFFICE_SCHEDULE = [
+    {"name": "办公", "days": "mon-fri", "start": "09:00", "end": "18:00", "idle_time": 120},
+    {"name": "午休", "days": "mon-fri", "start": "12:00", "end": "13:30", "idle_time": 30},
+    {"name": "下班后", "start": "18:00", "end": "09:00", "idle_time": 15},
+    {"name": "周末", "days": "sat,sun", "always": True, "idle_time": 15},
+]
+PROTECTED_APPS = [
+    {"name": "微信", "exe": "WeChat.exe"},
+    {"name": "企业微信", "exe": "WXWork.exe", "idle_time": 600},
+    {"name": "密码管理器", "exe": "KeePass.exe", "always": True},
+]
+
+
+def at(clock_time, day=0):
+    """
+    :param clock_time: 'HH:MM' 或 'HH:MM:SS'
+    :return: 虚拟时钟上的时刻（周一 0 点为 0）
+    """
+    parts = [float(part) for part in clock_time.split(':')] + [0]
+    return day * DAY + parts[0] * 3600 + parts[1] * 60 + parts[2]
+
+
+def random_periods(count, rng):
+    periods = []
+    for i in range(count):
+        start = rng.randrange(0, 24 * 60)
+        length = rng.randrange(15, 12 * 60)
+        first = rng.randrange(7)
+        period = {
+            "name": f"P{i}",
+            "days": f"{DAY_NAMES[first]}-{DAY_NAMES[(first + rng.randrange(7)) % 7]}",
+            "start": f"{start // 60:02d}:{start % 60:02d}",
+            "end": f"{(start + length) // 60 % 24:02d}:{(start + length) % 60:02d}",
+        }
+        if rng.random() < 0.1:
+            period["always"] = True
+        else:
+            period["idle_time"] = rng.choice([15, 30, 60, 120, 300, 600])
+        if rng.random() < 0.3:
+            period["apps"] = {"企业微信": rng.choice([60, 600, 1800])}
+        periods.append(period)
+    return periods
+
+
+def naive_policy(periods, idle_time, apps, now):
+    """
+    不编译、每次都重新解析所有时段的参考实现
+    :return: (默认阈值, 企业微信的阈值)
+    """
+    local = time.gmtime(now)
+    offset = local.tm_wday * DAY + local.tm_hour * 3600 + local.tm_min * 60 + local.tm_sec
+    result = (idle_time, apps.get("企业微信", idle_time))
+    for period in periods:
+        ranges, period_idle, period_apps, always = _parse_period(period)
+        if any(start <= offset < end or start <= offset + WEEK < end for start, end in ranges):
+            if always:
+                result = (0, 0)
+            else:
+                base = idle_time if period_idle is None else period_idle
+                merged = {**apps, **period_apps}
+                result = (base, merged.get("企业微信", base))
+    return result
+
+
+def bench_lookup(count):
+    ok = True
+    rng = random.Random(3)
+    periods = OFFICE_SCHEDULE + random_periods(count, rng)
+    apps = {"企业微信": 600}
+    started = time.perf_counter()
+    schedule = GuardSchedule(periods, 120, apps, localtime=time.gmtime)
+    compile_ms = (time.perf_counter() - started) * 1000
+
+    samples = [MONDAY + rng.uniform(0, 3 * WEEK) for _ in range(2000)]
+    mismatches = 0
+    for t in samples:
+        policy = schedule.current(t)
+        if (policy.idle_time, policy.idle_time_for("企业微信")) != naive_policy(periods, 120, apps, t):
+            mismatches += 1
+
+    started = time.perf_counter()
+    for t in samples[:200]:
+        naive_policy(periods, 120, apps, t)
+    naive_us = (time.perf_counter() - started) / 200 * 1e6
+    started = time.perf_counter()
+    for t in samples:
+        schedule._lookup(t)
+    lookup_us = (time.perf_counter() - started) / len(samples) * 1e6
+
+    # 守护循环中的调用：时间单调增长，绝大多数命中缓存
+    schedule.lookups = 0
+    day = [MONDAY + i * 0.1 for i in range(int(DAY / 0.1))]
+    started = time.perf_counter()
+    for t in day:
+        schedule.current(t)
+    cached_ns = (time.perf_counter() - started) / len(day) * 1e9
+    boundaries = sum(1 for start, _, _ in schedule.intervals if 0 < start < DAY)
+
+    print(f"{len(periods)} 个时段编译为 {len(schedule.intervals)} 个区间，耗时 {compile_ms:.1f} ms；"
+          f"随机 {len(samples)} 个时刻与逐条解析的结果不一致 {mismatches} 次")
+    print(f"  逐条解析 {naive_us:,.0f} µs/次，二分查找 {lookup_us:.2f} µs/次，缓存命中 {cached_ns:.0f} ns/次；"
+          f"一天 {len(day):,} 次调用中未命中 {schedule.lookups} 次（当天 {boundaries} 个边界）")
+    ok = ok and mismatches == 0 and schedule.lookups <= boundaries + 1 and lookup_us < naive_us
+    return ok
+
+
+class Scenario:
+    """
+    模拟平台上的一段脚本：输入、前台窗口切换，切换前视为主人已解锁该窗口
+    """
+
+    def __init__(self, event_driven):
+        self.platform = SimPlatform(event_driven=event_driven, epoch=MONDAY)
+        self.pids = {}
+        self.hwnds = {}
+        for name, window_class in (("explorer.exe", "CabinetWClass"), ("WeChat.exe", "WeChatMainWndForPC"),
+                                   ("WXWork.exe", "WeWorkWindow"), ("KeePass.exe", "KeePass")):
+            self.pids[name] = self.platform.add_process(name)
+            self.hwnds[name] = self.platform.add_window(self.pids[name], window_class, name)
+        self.platform.foreground.switch_at(0.0, self.hwnds["explorer.exe"], self.pids["explorer.exe"])
+
+    def work(self, start, end):
+        self.platform.idle.add_activity(start, end)
+        self.platform.idle.add_inputs([end])
+
+    def open(self, t, name):
+        hwnd = self.hwnds[name]
+        self.platform.idle.add_inputs([t])
+        self.platform.clock.call_at(t, lambda: self.platform.lock_backend.unlock(hwnd))
+        self.platform.foreground.switch_at(t, hwnd, self.pids[name])
+
+    def run(self, end, config):
+        platform = self.platform
+        clock = platform.clock
+        events = []
+        with tempfile.TemporaryDirectory() as tmp:
+            store = ConfigStore(os.path.join(tmp, 'config.json'), debounce=0)
+            store.update(config, immediate=True)
+            guardian = WeChatGuardian(config_store=store, platform=platform, metrics=MetricsRegistry())
+            scheduler = IdleScheduler(clock=clock)
+            guardian.on_wechat_activated = lambda info: scheduler.wake()
+            if guardian.start_foreground_events():
+                scheduler.guard_check_interval = None
+            clock.call_at(end, scheduler.stop)
+
+            def on_cycle(result):
+                if result.event == START_GUARDIAN:
+                    events.append(('guard', clock.now(), None))
+                elif result.event == INTRUSION:
+                    events.append(('lock', result.detected_at, result.intrusion.rule))
+
+            guardian.run_loop(scheduler, on_cycle)
+            guardian.stop_foreground_events()
+        return events, scheduler.wakeups, guardian.schedule.lookups, guardian.metrics
+
+
+def fmt(t):
+    t %= DAY
+    return f"{int(t // 3600):02d}:{int(t % 3600 // 60):02d}:{t % 60:05.2f}"
+
+
+def bench_boundaries():
+    """
+    离开时按当前时段的阈值进入守护；阈值在边界变小时，在边界处立即进入守护
+    """
+    scenario = Scenario(event_driven=True)
+    # 每段：回来后先看一眼微信（解除夜间的守护），工作到离开
+    for back, leave in (("08:50", "11:59"), ("12:10", "12:30"), ("13:00", "13:40"), ("14:00", "17:59:50")):
+        scenario.work(at(back), at(leave))
+        scenario.open(at(back) + 1, "WeChat.exe")
+        scenario.open(at(back) + 5, "explorer.exe")
+    expected = [at("00:00:15"), at("12:00"), at("12:30:30"), at("13:42"), at("18:00:05")]
+    config = {"idle_time": 120, "guard_schedule": OFFICE_SCHEDULE[:3]}
+    events, wakeups, lookups, _ = scenario.run(at("20:00"), config)
+    entries = [t for kind, t, _ in events if kind == 'guard']
+    late = [entry - want for entry, want in zip(entries, expected)]
+    print(f"工作日：进入守护 {', '.join(fmt(t) for t in entries)}")
+    print(f"  与按时段阈值算出的时刻相比最多晚 {max(late) * 1000:.0f} ms；唤醒 {wakeups} 次，时段表查找 {lookups} 次")
+    return len(entries) == len(expected) and all(0 <= d <= 0.1 for d in late) and lookups <= 10
+
+
+def bench_apps(event_driven):
+    """
+    :return: [(规则, 锁定时刻)], 未达到阈值而未锁定的次数, 唤醒次数
+    """
+    s = Scenario(event_driven)
+    s.work(at("14:00"), at("14:30"))
+    s.open(at("14:05"), "KeePass.exe")        # 始终守护：锁定
+    s.open(at("14:08"), "explorer.exe")
+    s.open(at("14:10"), "KeePass.exe")        # 再次切换到前台：锁定
+    s.open(at("14:12"), "WeChat.exe")         # 主人正在使用：不锁定
+    s.open(at("14:15"), "explorer.exe")
+    # 14:32 进入守护；入侵者打开企业微信（只空闲了 5 分钟，低于 600 秒）和微信
+    s.open(at("14:35"), "WXWork.exe")
+    s.open(at("14:35:30"), "WeChat.exe")
+    s.open(at("14:36"), "explorer.exe")
+    # 主人回来打开密码管理器，解锁后使用到 15:05 离开，窗口留在前台
+    s.open(at("15:00"), "KeePass.exe")
+    s.work(at("15:00:05"), at("15:05"))
+    # 空闲近一小时后有人打开企业微信
+    s.open(at("16:00"), "WXWork.exe")
+    config = {"idle_time": 120, "protected_apps": PROTECTED_APPS, "guard_schedule": OFFICE_SCHEDULE}
+    events, wakeups, _, metrics = s.run(at("16:30"), config)
+    locks = [(rule, t) for kind, t, rule in events if kind == 'lock']
+    skips = metrics.get('policy_skips_total').value
+    return locks, skips, wakeups
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--periods', type=int, default=200, help='随机生成的时段数量')
+    args = parser.parse_args()
+    logging.disable(logging.CRITICAL)
+
+    ok = bench_lookup(args.periods)
+    ok = bench_boundaries() and ok
+
+    expected = [("密码管理器", at("14:05")), ("密码管理器", at("14:10")), ("微信", at("14:35:30")),
+                ("密码管理器", at("15:00")), ("密码管理器", at("15:07")), ("企业微信", at("16:00"))]
+    for name, event_driven in (("前台事件", True), ("轮询", False)):
+        locks, skips, wakeups = bench_apps(event_driven)
+        print(f"按程序的阈值（{name}）：锁定 {', '.join(f'{rule} {fmt(t)}' for rule, t in locks)}；"
+              f"未达到阈值放过 {skips} 次，唤醒 {wakeups} 次")
+        matched = len(locks) == len(expected) and all(
+            rule == want_rule and 0 <= t - want <= 0.2 for (rule, t), (want_rule, want) in zip(locks, expected))
+        ok = ok and matched and skips == 1
+    return 0 if ok else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,152 @@
+"""
+守护循环基准测试（使用模拟平台和虚拟时钟，可在任意平台运行）
+
+用脚本化的用户活动驱动真实的 WeChatGuardian.run_loop()：工作时段持续有输入，
+休息时段超过空闲阈值后进入守护模式，期间有人切到微信。分别在轮询和前台事件
+两种模式下统计每次循环的 CPU 时间、内存分配、唤醒次数和检测延迟。
+
+用法: python benchmarks/bench_guardian_loop.py [--hours 8]
+"""
+import os
+import sys
+import random
+import tempfile
+import time
+import tracemalloc
+import argparse
+
+root_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, root_dir)
+
+from src.config_store import ConfigStore
+from src.scheduler import IdleScheduler
+from src.simulation import SimPlatform
+from src.wechat_guardian import WeChatGuardian, INTRUSION
+
+HOUR = 3600.0
+IDLE_THRESHOLD = 60
+
+
+def build_platform(hours, event_driven, seed=1):
+    """
+    生成模拟平台和用户活动脚本
+    :return: (platform, 入侵时刻列表)
+    """
+    rng = random.Random(seed)
+    platform = SimPlatform(event_driven=event_driven)
+    explorer = platform.add_process("explorer.exe")
+    chrome = platform.add_process("chrome.exe")
+    wechat = platform.add_process("WeChat.exe")
+    explorer_hwnd = platform.add_window(explorer, "CabinetWClass", "文件资源管理器")
+    chrome_hwnd = platform.add_window(chrome, "Chrome_WidgetWin_1", "Google Chrome")
+    wechat_hwnd = platform.add_window(wechat, "WeChatMainWndForPC", "微信")
+
+    idle = platform.idle
+    foreground = platform.foreground
+    foreground.switch_at(0.0, explorer_hwnd, explorer)
+
+    intrusions = []
+    end = hours * HOUR
+    t = 0.0
+    while t < end:
+        # 工作时段：每 2 秒一次输入，偶尔切换窗口
+        work = rng.uniform(300, 1800)
+        idle.add_activity(t, min(t + work, end))
+        for _ in range(int(work / 120)):
+            hwnd, pid = rng.choice([(explorer_hwnd, explorer), (chrome_hwnd, chrome)])
+            foreground.switch_at(t + rng.uniform(0, work), hwnd, pid)
+        t += work
+
+        # 休息时段：一半的休息中有人在离开后切到微信，5 秒后离开
+        rest = rng.uniform(30, 900)
+        if rest > IDLE_THRESHOLD + 30 and t + rest < end and rng.random() < 0.5:
+            at = t + rng.uniform(IDLE_THRESHOLD + 5, rest - 20)
+            idle.add_inputs([at, at + 5])
+            # 上一次的锁定已由用户解除
+            platform.clock.call_at(at - 1, lambda: platform.lock_backend.unlock(wechat_hwnd))
+            foreground.switch_at(at, wechat_hwnd, wechat)
+            foreground.switch_at(at + 5, explorer_hwnd, explorer)
+            intrusions.append(at)
+        t += rest
+    return platform, intrusions
+
+
+def run(hours, event_driven, trace_memory=False):
+    platform, intrusions = build_platform(hours, event_driven)
+    clock = platform.clock
+
+    with tempfile.TemporaryDirectory() as tmp:
+        store = ConfigStore(os.path.join(tmp, "config.json"))
+        store.update({"idle_time": IDLE_THRESHOLD}, immediate=True)
+        guardian = WeChatGuardian(config_store=store, platform=platform)
+
+        # 与主程序相同的接线方式
+        scheduler = IdleScheduler(clock=clock)
+        guardian.on_wechat_activated = lambda info: scheduler.wake()
+        if guardian.start_foreground_events():
+            scheduler.guard_check_interval = None
+        clock.call_at(hours * HOUR, scheduler.stop)
+
+        stats = {'cycles': 0, 'latencies': [], 'locks': []}
+        pending = list(intrusions)
+
+        def on_cycle(result):
+            stats['cycles'] += 1
+            if result.event == INTRUSION:
+                stats['locks'].append(result.lock_result.latency)
+                # 只统计每次入侵后的第一次检测
+                while pending and pending[0] <= result.detected_at:
+                    stats['latencies'].append(result.detected_at - pending.pop(0))
+
+        if trace_memory:
+            tracemalloc.start()
+            before = tracemalloc.get_traced_memory()[0]
+        cpu0 = time.process_time()
+        guardian.run_loop(scheduler, on_cycle)
+        stats['cpu'] = time.process_time() - cpu0
+        if trace_memory:
+            current, peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+            stats['retained_kb'] = (current - before) / 1024
+            stats['peak_kb'] = (peak - before) / 1024
+
+        guardian.stop_foreground_events()
+        stats['wakeups'] = scheduler.wakeups
+        stats['intrusions'] = len(intrusions)
+    return stats
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--hours', type=float, default=8)
+    args = parser.parse_args()
+
+    print(f"模拟 {args.hours:g} 小时，空闲阈值 {IDLE_THRESHOLD} 秒")
+    print(f"{'方式':<8}{'唤醒/小时':>10}{'循环数':>9}{'CPU/循环(µs)':>14}"
+          f"{'检测到':>9}{'平均延迟(ms)':>13}{'最大延迟(ms)':>13}{'锁定(ms)':>10}{'峰值内存(KB)':>13}{'残留(KB)':>10}")
+    results = {}
+    for name, event_driven in (("轮询", False), ("前台事件", True)):
+        stats = run(args.hours, event_driven)
+        memory = run(args.hours, event_driven, trace_memory=True)
+        results[name] = stats
+        latencies = stats['latencies']
+        avg = sum(latencies) / len(latencies) * 1000 if latencies else 0
+        worst = max(latencies) * 1000 if latencies else 0
+        lock = sum(stats['locks']) / len(stats['locks']) * 1000 if stats['locks'] else 0
+        per_cycle = stats['cpu'] / stats['cycles'] * 1e6 if stats['cycles'] else 0
+        print(f"{name:<8}{stats['wakeups'] / args.hours:>10.0f}{stats['cycles']:>9}{per_cycle:>14.1f}"
+              f"{len(latencies):>5}/{stats['intrusions']:<3}{avg:>13.1f}{worst:>13.1f}{lock:>10.1f}"
+              f"{memory['peak_kb']:>13.1f}{memory['retained_kb']:>10.1f}")
+
+    polling, events = results["轮询"], results["前台事件"]
+    ok = (
+        len(polling['latencies']) == polling['intrusions']
+        and len(events['latencies']) == events['intrusions']
+        and events['wakeups'] < polling['wakeups']
+        and max(events['latencies'], default=0) <= max(polling['latencies'], default=0)
+    )
+    return 0 if ok else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
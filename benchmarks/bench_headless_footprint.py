@@ -0,0 +1,154 @@
+"""
+无界面守护进程内存占用基准测试（使用模拟平台，可在任意平台运行）
+
+分别在子进程中运行无界面守护进程和加载主程序全部模块（从 src/main.py 的导入语句中读取）、
+创建 tkinter 解释器和设置窗口后的守护器，两者模拟同样一小时的空闲和入侵。
+扣除解释器本身的占用后对比峰值常驻内存，要求无界面模式低于界面模式的 MAX_RATIO，
+加载的模块更少，并确认无界面模式没有加载 tkinter。
+
+用法: python benchmarks/bench_headless_footprint.py
+"""
+import os
+import sys
+import ast
+import json
+import tempfile
+import subprocess
+
+root_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, root_dir)
+
+HOUR = 3600.0
+# 扣除解释器后无界面模式内存占界面模式的上限
+MAX_RATIO = 0.85
+
+
+def peak_rss_kb():
+    try:
+        import resource
+        # Linux 下单位为 KB，macOS 下为字节
+        rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return rss / 1024 if sys.platform == 'darwin' else rss
+    except ImportError:
+        import psutil
+        return psutil.Process().memory_info().peak_wset / 1024
+
+
+def build_guardian_parts(tmp):
+    from src.config_store import ConfigStore
+    from src.simulation import SimPlatform
+    platform = SimPlatform()
+    explorer = platform.add_process("explorer.exe")
+    wechat = platform.add_process("WeChat.exe")
+    explorer_hwnd = platform.add_window(explorer)
+    # 工作 10 分钟后离开，半小时时有人切到微信，被锁定后 5 秒离开
+    platform.foreground.switch_at(0.0, explorer_hwnd, explorer)
+    platform.foreground.switch_at(HOUR / 2, platform.add_window(wechat), wechat)
+    platform.foreground.switch_at(HOUR / 2 + 5, explorer_hwnd, explorer)
+    platform.idle.add_activity(0, 600)
+    platform.idle.add_inputs([HOUR / 2, HOUR / 2 + 5])
+    store = ConfigStore(os.path.join(tmp, "config.json"), debounce=0)
+    return store, platform
+
+
+def child_headless():
+    from src.daemon import GuardianDaemon
+    with tempfile.TemporaryDirectory() as tmp:
+        store, platform = build_guardian_parts(tmp)
+        daemon = GuardianDaemon(config_store=store, platform=platform)
+        platform.clock.call_at(HOUR, daemon.stop)
+        daemon.run()
+        intrusions = daemon.guardian.metrics.get('intrusions_total').value
+    return {'intrusions': intrusions}
+
+
+def main_imports():
+    """
+    :return: 主程序（src/main.py）导入的全部模块名，包括启动后和显示窗口时才导入的
+    """
+    with open(os.path.join(root_dir, 'src', 'main.py'), encoding='utf-8') as f:
+        tree = ast.parse(f.read())
+    names = []
+    for node in ast.walk(tree):
+        if isinstance(node, ast.Import):
+            names.extend(alias.name for alias in node.names)
+        elif isinstance(node, ast.ImportFrom) and node.module:
+            names.append(node.module)
+    return sorted(set(names))
+
+
+def child_gui():
+    import importlib
+    # 加载主程序的全部模块；只有 Windows 上才有的模块（win32gui 等）在其他平台跳过，结果偏低
+    missing = []
+    for name in main_imports():
+        try:
+            importlib.import_module(name)
+        except ImportError:
+            missing.append(name)
+    import tkinter as tk
+    from src.wechat_guardian import WeChatGuardian
+    from src.settings import GuardianSettings
+    from src.ui_dispatch import UiDispatcher
+    from src.scheduler import IdleScheduler
+    from src.supervisor import DetectionSupervisor
+    try:
+        root = tk.Tk()
+        interpreter = 'Tk'
+    except tk.TclError:
+        # 没有图形环境时只创建 Tcl 解释器，结果偏低
+        root = tk.Tcl()
+        interpreter = 'Tcl'
+    with tempfile.TemporaryDirectory() as tmp:
+        store, platform = build_guardian_parts(tmp)
+        # 与无界面模式运行同样的一小时，差别只在界面部分
+        guardian = WeChatGuardian(root, config_store=store, platform=platform)
+        GuardianSettings(store)
+        UiDispatcher(root)
+        scheduler = IdleScheduler(clock=platform.clock)
+        supervisor = DetectionSupervisor(guardian, scheduler)
+        platform.clock.call_at(HOUR, supervisor.stop)
+        supervisor.run()
+        intrusions = guardian.metrics.get('intrusions_total').value
+    return {'interpreter': interpreter, 'missing': missing, 'intrusions': intrusions}
+
+
+def run_child(mode):
+    output = subprocess.run(
+        [sys.executable, os.path.abspath(__file__), '--child', mode],
+        capture_output=True, text=True, cwd=root_dir, check=True
+    ).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def main():
+    if len(sys.argv) == 3 and sys.argv[1] == '--child':
+        children = {'base': dict, 'headless': child_headless, 'gui': child_gui}
+        info = children[sys.argv[2]]()
+        info.update({
+            'rss_kb': peak_rss_kb(),
+            'modules': len(sys.modules),
+            'tkinter': any(name.split('.')[0] in ('tkinter', '_tkinter') for name in sys.modules),
+        })
+        print(json.dumps(info))
+        return 0
+
+    base = run_child('base')
+    headless = run_child('headless')
+    gui = run_child('gui')
+    print(f"{'模式':<10}{'峰值内存(MB)':>14}{'模块数':>8}{'tkinter':>10}")
+    for name, info in (("解释器", base), ("无界面", headless), (f"界面({gui['interpreter']})", gui)):
+        print(f"{name:<10}{info['rss_kb'] / 1024:>14.1f}{info['modules']:>8}{str(info['tkinter']):>10}")
+    if gui['missing']:
+        print(f"界面模式未能加载 {', '.join(gui['missing'])}，界面模式的结果偏低")
+    # 扣除解释器本身的占用后比较守护器部分
+    ratio = (headless['rss_kb'] - base['rss_kb']) / (gui['rss_kb'] - base['rss_kb'])
+    print(f"扣除解释器后，无界面模式内存为界面模式的 {ratio:.0%}，"
+          f"少加载 {gui['modules'] - headless['modules']} 个模块；"
+          f"模拟一小时锁定 {headless['intrusions']}/{gui['intrusions']} 次")
+    ok = (not headless['tkinter'] and ratio < MAX_RATIO and headless['modules'] < gui['modules']
+          and headless['intrusions'] == gui['intrusions'] == 1)
+    return 0 if ok else 1
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,120 @@
+"""
+守护线程唤醒次数基准测试（使用假时钟，可在任意平台运行）
+
+对比旧版固定 0.1 秒轮询与 IdleScheduler 截止时间调度在一小时模拟使用场景下的唤醒次数。
+
+用法: python benchmarks/bench_idle_wakeups.py
+"""
+import os
+import sys
+import bisect
+
+root_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, root_dir)
+
+from src.scheduler import IdleScheduler
+
+HOUR = 3600.0
+IDLE_THRESHOLD = 60
+
+
+class FakeClock:
+    """
+    假时钟：wait() 直接把时间推进到超时时刻，不真正休眠
+    """
+    def __init__(self):
+        self.t = 0.0
+
+    def now(self):
+        return self.t
+
+    def wait(self, event, timeout):
+        if event.is_set():
+            return True
+        self.t += timeout
+        return False
+
+
+class SimulatedSession:
+    """
+    模拟的一小时使用场景：
+    - 0~1200 秒：工作，每 2 秒有一次输入
+    - 1200~1800 秒：离开
+    - 1800 秒：回来，1805 秒打开微信
+    - 1805~3000 秒：工作
+    - 3000~3600 秒：离开
+    """
+    def __init__(self, clock):
+        self.clock = clock
+        self.inputs = []
+        for start, end in ((0, 1200), (1800, 3000)):
+            self.inputs.extend(float(t) for t in range(start, end, 2))
+        self.wechat_focus = [(1805.0, 1810.0)]
+        self.is_guarding = False
+        self.idle_time_threshold = IDLE_THRESHOLD
+        self.locks = 0
+
+    def get_idle_duration(self):
+        now = self.clock.now()
+        i = bisect.bisect_right(self.inputs, now)
+        last_input = self.inputs[i - 1] if i else 0.0
+        return now - last_input
+
+    def is_wechat_active(self):
+        now = self.clock.now()
+        return any(start <= now < end for start, end in self.wechat_focus)
+
+    def lock_wechat(self):
+        self.locks += 1
+
+
+def run_cycle(guardian, scheduler):
+    """
+    与旧版守护线程相同的单轮判断逻辑
+    :return: 下一次休眠时长
+    """
+    timeout = scheduler.guard_check_interval
+    if not guardian.is_guarding:
+        idle_time = guardian.get_idle_duration()
+        if idle_time > guardian.idle_time_threshold:
+            guardian.is_guarding = True
+        else:
+            timeout = scheduler.next_timeout(False, idle_time, guardian.idle_time_threshold)
+    elif guardian.is_wechat_active():
+        guardian.lock_wechat()
+        guardian.is_guarding = False
+    return timeout
+
+
+def run(scheduled):
+    clock = FakeClock()
+    guardian = SimulatedSession(clock)
+    scheduler = IdleScheduler(clock=clock)
+    wakeups = {'idle': 0, 'guarding': 0}
+    while clock.now() < HOUR:
+        timeout = run_cycle(guardian, scheduler)
+        if not scheduled:
+            timeout = 0.1  # 旧版固定轮询间隔
+        wakeups['guarding' if guardian.is_guarding else 'idle'] += 1
+        scheduler.sleep(timeout)
+    return wakeups, guardian.locks
+
+
+def main():
+    legacy, legacy_locks = run(scheduled=False)
+    new, new_locks = run(scheduled=True)
+
+    print(f"{'模式':<12}{'空闲检测':>10}{'守护检测':>10}{'合计/小时':>12}{'锁定次数':>10}")
+    for name, wakeups, locks in (("固定0.1秒", legacy, legacy_locks), ("截止时间", new, new_locks)):
+        total = wakeups['idle'] + wakeups['guarding']
+        print(f"{name:<12}{wakeups['idle']:>10}{wakeups['guarding']:>10}{total:>12}{locks:>10}")
+
+    # 调度方式不应改变行为，只减少唤醒
+    if legacy_locks != new_locks:
+        print("锁定次数不一致！")
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,86 @@
+"""
+锁定延迟基准测试（使用假时钟和假锁定后端，可在任意平台运行）
+
+对比旧版 pyautogui.hotkey + 固定 sleep(0.5) 与 LockAction 注入后观察确认的检测到锁定确认耗时。
+部分试验中第一次注入被丢弃，或目标窗口第一次没能切到前台（快捷键送不到微信），LockAction 应重新注入。
+
+用法: python benchmarks/bench_lock_latency.py
+"""
+import os
+import sys
+import random
+import logging
+import statistics
+
+root_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, root_dir)
+
+from src.lock_action import LockAction, FakeLockBackend
+
+RUNS = 1000
+
+
+class FakeClock:
+    def __init__(self):
+        self.t = 0.0
+
+    def now(self):
+        return self.t
+
+    def sleep(self, seconds):
+        self.t += seconds
+
+
+def legacy_lock(backend, clock, hwnd):
+    """
+    旧版 lock_wechat：发送快捷键后固定等待 0.5 秒，不确认是否生效
+    """
+    start = clock.now()
+    try:
+        backend.inject(hwnd)
+    except OSError:
+        # 旧版不检查窗口是否切到前台，快捷键发给了其他窗口
+        pass
+    clock.sleep(0.5)
+    return backend.is_locked(hwnd), clock.now() - start
+
+
+def main():
+    logging.disable(logging.CRITICAL)
+    rng = random.Random(1)
+    legacy, confirmed = [], []
+    legacy_ok = confirmed_ok = 0
+    attempts = []
+    for i in range(RUNS):
+        # 生效延迟 10~80 毫秒，5% 的情况下第一次注入被丢弃，另有 5% 第一次未能切到前台
+        delay = rng.uniform(0.01, 0.08)
+        roll = rng.random()
+        fail_first = 1 if roll < 0.05 else 0
+        refuse_first = 1 if 0.05 <= roll < 0.10 else 0
+
+        clock = FakeClock()
+        ok, elapsed = legacy_lock(FakeLockBackend(clock.now, delay, fail_first, refuse_first), clock, i)
+        legacy.append(elapsed)
+        legacy_ok += ok
+
+        clock = FakeClock()
+        action = LockAction(FakeLockBackend(clock.now, delay, fail_first, refuse_first), clock=clock.now, sleep=clock.sleep)
+        result = action.lock(i)
+        confirmed.append(result.latency)
+        confirmed_ok += result.ok
+        attempts.append(result.attempts)
+
+    def report(name, samples, ok):
+        samples = sorted(samples)
+        p95 = samples[int(len(samples) * 0.95)]
+        print(f"{name:<14}{statistics.mean(samples) * 1000:>10.1f}{p95 * 1000:>10.1f}{samples[-1] * 1000:>10.1f}{ok:>8}/{RUNS}")
+
+    print(f"{'方式':<12}{'平均(ms)':>10}{'P95(ms)':>10}{'最大(ms)':>10}{'确认锁定':>12}")
+    report("固定sleep0.5", legacy, legacy_ok)
+    report("注入并确认", confirmed, confirmed_ok)
+    print(f"重新注入次数: {sum(a - 1 for a in attempts)}")
+    return 0 if confirmed_ok == RUNS and confirmed_ok >= legacy_ok else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
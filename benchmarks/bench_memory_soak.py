@@ -0,0 +1,162 @@
+"""
+长时间运行内存浸泡测试（使用模拟平台和虚拟时钟，可在任意平台运行）
+
+在虚拟时钟上反复执行“空闲 → 进入守护 → 有人打开微信 → 锁定并警告 → 离开”，
+守护循环、界面事件分发和托盘状态都走真实代码；有图形环境时同时反复显示和隐藏
+警告窗口、帮助窗口和设置窗口。预热后以常驻内存为基线，若数千次循环后增长
+超过预算则返回非零，并输出 tracemalloc 统计的增长最多的分配位置。
+
+用法: python benchmarks/bench_memory_soak.py [--cycles 5000] [--budget-kb 1024]
+"""
+import os
+import sys
+import logging
+import tempfile
+import argparse
+
+root_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, root_dir)
+
+from src.config_store import ConfigStore
+from src.memory_report import MemoryReporter, current_rss
+from src.scheduler import IdleScheduler
+from src.simulation import SimPlatform, SimTray
+from src.ui_dispatch import UiDispatcher, ShowWarning, SetTrayState
+from src.wechat_guardian import WeChatGuardian, START_GUARDIAN, INTRUSION
+
+IDLE_THRESHOLD = 10
+
+
+def create_gui():
+    """
+    :return: Tk 根窗口，没有图形环境时返回 None
+    """
+    try:
+        import tkinter as tk
+        root = tk.Tk()
+        root.withdraw()
+    except Exception:
+        return None
+    return root
+
+
+class Soak:
+    def __init__(self, tmp, warmup, cycles, gui):
+        self.platform = platform = SimPlatform()
+        self.clock = platform.clock
+        explorer = platform.add_process("explorer.exe")
+        wechat = platform.add_process("WeChat.exe")
+        self.explorer = (platform.add_window(explorer, "CabinetWClass", "文件资源管理器"), explorer)
+        self.wechat = (platform.add_window(wechat, "WeChatMainWndForPC", "微信"), wechat)
+
+        self.store = ConfigStore(os.path.join(tmp, "config.json"), debounce=0)
+        self.store.update({"idle_time": IDLE_THRESHOLD}, immediate=True)
+        self.guardian = WeChatGuardian(config_store=self.store, platform=platform)
+        self.scheduler = IdleScheduler(clock=self.clock)
+        self.guardian.on_wechat_activated = lambda info: self.scheduler.wake()
+        if self.guardian.start_foreground_events():
+            self.scheduler.guard_check_interval = None
+
+        self.root = gui
+        self.windows = None
+        self.tray = SimTray(self.clock)
+        self.dispatcher = UiDispatcher(gui)
+        self.dispatcher.register(ShowWarning, self.show_warning)
+        self.dispatcher.register(SetTrayState, lambda event: self.tray.set_state(event.state))
+
+        self.warmup = warmup
+        self.total = warmup + cycles
+        self.intrusions = 0
+        self.locks = 0
+        self.baseline = None
+        self.reporter = MemoryReporter(top=10)
+
+        platform.foreground.switch_at(0.0, *self.explorer)
+        self.clock.call_at(1.0, self.intrude)
+
+    def intrude(self):
+        """
+        有人在空闲后打开微信，5 秒后离开；下一次在再次空闲超过阈值后发生
+        """
+        self.platform.idle.record_input()
+        self.platform.foreground.switch_at(self.clock.now(), *self.wechat)
+        self.clock.call_later(5, self.leave)
+
+    def leave(self):
+        self.platform.idle.record_input()
+        self.platform.lock_backend.unlock(self.wechat[0])
+        self.platform.foreground.switch_at(self.clock.now(), *self.explorer)
+        self.clock.call_later(IDLE_THRESHOLD + 5, self.intrude)
+
+    def show_warning(self, event):
+        if self.root is None:
+            return
+        if self.windows is None:
+            from src.warning_window import WarningWindow
+            from src.help_window import HelpWindow
+            from src.settings import GuardianSettings
+            self.windows = (WarningWindow(self.root), HelpWindow, GuardianSettings(self.store, self.guardian.verifier))
+        warning, help_window, settings = self.windows
+        warning.show()
+        self.dispatcher.record_latency('detection_to_warning', event.detected_at)
+        warning.hide()
+        if self.intrusions % 10 == 0:
+            help_window.show_help().hide()
+            settings.show_settings_dialog()
+            settings.hide_settings_dialog()
+        self.root.update()
+
+    def on_cycle(self, result):
+        if result.event == START_GUARDIAN:
+            self.dispatcher.post(SetTrayState('green', self.clock.now()))
+        elif result.event == INTRUSION:
+            self.intrusions += 1
+            self.locks += result.lock_result.ok
+            self.dispatcher.post(ShowWarning(result.detected_at))
+            self.dispatcher.post(SetTrayState('gray', self.clock.now()))
+            if self.intrusions == self.warmup:
+                self.reporter.start(background=False)
+                self.baseline = current_rss()
+            elif self.intrusions >= self.total:
+                self.scheduler.stop()
+        self.dispatcher.drain()
+
+    def run(self):
+        self.guardian.run_loop(self.scheduler, self.on_cycle)
+        self.guardian.stop_foreground_events()
+        growth = current_rss() - self.baseline
+        sample = self.reporter.sample(log=False)
+        self.reporter.stop()
+        return growth, sample
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--cycles', type=int, default=5000, help='基线之后的守护/警告循环次数')
+    parser.add_argument('--warmup', type=int, default=500, help='预热循环次数')
+    parser.add_argument('--budget-kb', type=float, default=1024, help='允许的常驻内存增长（KB）')
+    args = parser.parse_args()
+    logging.disable(logging.WARNING)
+
+    root = create_gui()
+    with tempfile.TemporaryDirectory() as tmp:
+        soak = Soak(tmp, args.warmup, args.cycles, root)
+        growth, sample = soak.run()
+        days = soak.clock.now() / 86400
+
+    print(f"模拟 {days:.1f} 天，守护/警告循环 {soak.intrusions} 次（预热 {args.warmup} 次），确认锁定 {soak.locks} 次")
+    print(f"界面窗口：{'已反复显示和隐藏' if root is not None else '无图形环境，已跳过'}")
+    print(f"基线后常驻内存增长 {growth / 1024:+.0f} KB（预算 {args.budget_kb:.0f} KB），"
+          f"Python 分配增长 {(sample.traced - soak.reporter.first.traced) / 1024:+.1f} KB")
+    if sample.top_growth:
+        print("增长最多的分配位置：")
+        for location, size_diff, count_diff in sample.top_growth[:5]:
+            print(f"  {location}: {size_diff / 1024:+.1f} KB，{count_diff:+d} 个对象")
+    if root is not None:
+        root.destroy()
+    ok = soak.intrusions == args.warmup + args.cycles and soak.locks == soak.intrusions and growth <= args.budget_kb * 1024
+    return 0 if ok else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,162 @@
+"""
+指标采集开销基准测试（可在任意平台运行）
+
+测量计数器、仪表和直方图单次操作的耗时，以及开启指标后守护循环每次循环
+增加的开销；同时通过本机 HTTP 端点和 JSON 导出各采集一次，确认格式正确；
+并由多个线程同时更新同一个计数器和直方图，确认没有丢失的更新。
+
+用法: python benchmarks/bench_metrics_overhead.py [--max-overhead-us 2]
+"""
+import os
+import sys
+import json
+import time
+import tempfile
+import argparse
+import threading
+import urllib.request
+
+root_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, root_dir)
+
+from src.config_store import ConfigStore
+from src.metrics import MetricsRegistry, MetricsServer, MetricsJsonDumper
+from src.scheduler import IdleScheduler
+from src.simulation import SimPlatform
+from src.wechat_guardian import WeChatGuardian
+
+N = 200000
+
+
+def per_op(fn, n=N):
+    """
+    :return: 单次调用耗时（纳秒）
+    """
+    start = time.perf_counter()
+    for _ in range(n):
+        fn()
+    return (time.perf_counter() - start) / n * 1e9
+
+
+def bench_primitives(registry):
+    counter = registry.counter('bench_total')
+    gauge = registry.gauge('bench_value')
+    histogram = registry.histogram('bench_seconds')
+    clock = time.perf_counter
+    results = {
+        'Counter.inc': per_op(counter.inc),
+        'Gauge.set': per_op(lambda: gauge.set(1.0)),
+        'Histogram.observe': per_op(lambda: histogram.observe(0.0003)),
+        'perf_counter x2 + observe': per_op(lambda: histogram.observe(clock() - clock())),
+        '空函数调用（基线）': per_op(lambda: None),
+    }
+    return results
+
+
+def bench_guardian_cycle(registry, cycles=N):
+    """
+    守护模式下（轮询前台窗口）连续执行 step()，每次循环都经过计时和计数
+    :return: 每次循环的耗时（微秒）
+    """
+    platform = SimPlatform(event_driven=False)
+    explorer = platform.add_process("explorer.exe")
+    platform.foreground.switch_at(0.0, platform.add_window(explorer), explorer)
+    platform.clock.advance_to(0.0)
+    with tempfile.TemporaryDirectory() as tmp:
+        store = ConfigStore(os.path.join(tmp, "config.json"))
+        guardian = WeChatGuardian(config_store=store, platform=platform, metrics=registry)
+        guardian.is_guarding = True
+        scheduler = IdleScheduler(clock=platform.clock)
+        start = time.perf_counter()
+        for _ in range(cycles):
+            guardian.step(scheduler)
+        return (time.perf_counter() - start) / cycles * 1e6
+
+
+def check_concurrent_updates(threads=4, n=100000):
+    """
+    多个线程同时更新同一个计数器和直方图（与检测线程、界面线程、事件线程同时记录指标相同）
+    :return: 是否没有丢失或只更新一半的记录
+    """
+    registry = MetricsRegistry()
+    counter = registry.counter('concurrent_total')
+    histogram = registry.histogram('concurrent_seconds')
+    # 让线程频繁切换，放大竞争
+    interval = sys.getswitchinterval()
+    sys.setswitchinterval(1e-6)
+
+    def work():
+        for _ in range(n):
+            counter.inc()
+            histogram.observe(0.001)
+
+    try:
+        workers = [threading.Thread(target=work) for _ in range(threads)]
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join()
+    finally:
+        sys.setswitchinterval(interval)
+    expected = threads * n
+    data = histogram.to_dict()
+    ok = counter.value == expected and histogram.count == expected and data['count'] == expected
+    print(f"{threads} 个线程各更新 {n} 次：计数器 {counter.value}/{expected}，直方图 {histogram.count}/{expected}")
+    return ok
+
+
+def check_exporters(registry):
+    """
+    :return: 是否两种导出方式都能读到守护循环计数
+    """
+    server = MetricsServer(registry, port=0)
+    if not server.start():
+        return False
+    try:
+        with urllib.request.urlopen(f"http://127.0.0.1:{server.port}/metrics", timeout=5) as response:
+            text = response.read().decode('utf-8')
+    finally:
+        server.stop()
+    scrape_ok = '# TYPE wechat_guardian_cycles_total counter' in text and 'wechat_guardian_foreground_check_seconds_bucket{le="+Inf"}' in text
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'metrics.json')
+        MetricsJsonDumper(registry, path).dump()
+        with open(path, encoding='utf-8') as f:
+            data = json.load(f)
+    json_ok = data['metrics'].get('wechat_guardian_cycles_total', 0) > 0
+    print(f"HTTP 采集端点: {'正常' if scrape_ok else '异常'}（{len(text.splitlines())} 行）, JSON 导出: {'正常' if json_ok else '异常'}")
+    return scrape_ok and json_ok
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--max-overhead-us', type=float, default=2.0,
+                        help='开启指标后每次守护循环允许增加的开销（微秒）')
+    args = parser.parse_args()
+
+    registry = MetricsRegistry()
+    print(f"{'操作':<28}{'耗时(ns)':>10}")
+    for name, ns in bench_primitives(registry).items():
+        print(f"{name:<28}{ns:>10.0f}")
+
+    cycle_us = bench_guardian_cycle(registry)
+    # 守护模式下每次循环：一次计数、两次 perf_counter 和一次直方图记录
+    start = time.perf_counter()
+    counter = registry.counter('cycles_total')
+    histogram = registry.histogram('foreground_check_seconds')
+    clock = time.perf_counter
+    for _ in range(N):
+        counter.inc()
+        t0 = clock()
+        histogram.observe(clock() - t0)
+    overhead_us = (time.perf_counter() - start) / N * 1e6
+    print(f"守护循环每次耗时 {cycle_us:.2f} µs，其中指标开销约 {overhead_us:.2f} µs")
+
+    ok = check_exporters(registry)
+    ok = check_concurrent_updates() and ok
+    return 0 if ok and overhead_us <= args.max_overhead_us else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
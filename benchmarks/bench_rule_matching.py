@@ -0,0 +1,85 @@
+"""
+受保护程序规则匹配基准测试（纯 Python，可在任意平台运行）
+
+测量规则数从几条增长到上千条时，单次前台窗口检查的匹配耗时（新窗口的耗时随正则规则数线性增长），
+并确认不断出现新窗口时常用窗口不会被挤出缓存。
+
+用法: python benchmarks/bench_rule_matching.py
+"""
+import os
+import sys
+import time
+
+root_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, root_dir)
+
+from src.app_rules import ProtectedAppRules, DEFAULT_PROTECTED_APPS
+
+ROUNDS = 20000
+
+
+def build_rules(count):
+    """
+    生成 count 条规则：大部分为精确进程名，其余为路径、窗口类名、标题正则和多条件规则
+    """
+    rules = list(DEFAULT_PROTECTED_APPS)
+    for i in range(count - len(rules)):
+        kind = i % 10
+        if kind < 6:
+            rules.append({"name": f"app{i}", "exe": f"internal_app_{i}.exe"})
+        elif kind == 6:
+            rules.append({"name": f"path{i}", "path": f"C:\\Program Files\\Corp\\tool{i}\\tool.exe"})
+        elif kind == 7:
+            rules.append({"name": f"class{i}", "window_class": f"CorpWndClass{i}"})
+        elif kind == 8:
+            rules.append({"name": f"title{i}", "title_regex": rf"^机密项目{i}\b"})
+        else:
+            rules.append({"name": f"combo{i}", "exe": f"portal{i}.exe", "title_regex": "财务"})
+    return rules
+
+
+def measure(rules, windows):
+    start = time.perf_counter()
+    for i in range(ROUNDS):
+        rules.match(*windows[i % len(windows)])
+    return (time.perf_counter() - start) / ROUNDS * 1e9
+
+
+def main():
+    # 常见情况：少量窗口反复切换
+    common = [
+        ("chrome.exe", "C:\\chrome.exe", "Chrome_WidgetWin_1", "新标签页"),
+        ("WeChat.exe", "C:\\WeChat\\WeChat.exe", "WeChatMainWndForPC", "微信"),
+        ("code.exe", "C:\\code.exe", "Chrome_WidgetWin_1", "main.py - wechatguard"),
+    ]
+    # 最坏情况：每次都是没见过的窗口，缓存不命中
+    unseen = [(f"proc{i}.exe", f"C:\\proc{i}.exe", f"Cls{i}", f"标题{i}") for i in range(ROUNDS)]
+
+    print(f"{'规则数':>8}{'常见窗口(ns)':>16}{'新窗口(ns)':>14}")
+    for count in (3, 10, 100, 300, 1000):
+        common_ns = measure(ProtectedAppRules(build_rules(count)), common)
+        unseen_ns = measure(ProtectedAppRules(build_rules(count)), unseen)
+        print(f"{count:>8}{common_ns:>16.0f}{unseen_ns:>14.0f}")
+
+    # 新窗口不断出现时，反复切回的窗口一直留在缓存中（最近最少使用淘汰）
+    rules = ProtectedAppRules(build_rules(1000), cache_size=8)
+    hot = common[1]
+    rules.match(*hot)
+    evicted = 0
+    for window in unseen[:1000]:
+        rules.match(*window)
+        evicted += hot not in rules._cache
+        rules.match(*hot)
+    print(f"缓存 8 条、穿插 1000 个新窗口时，常用窗口被淘汰 {evicted} 次")
+    assert evicted == 0
+
+    rules = ProtectedAppRules(build_rules(1000))
+    assert rules.match("weixin.EXE") == "微信 4.x"
+    assert rules.match("portal9.exe", title="财务报表") == "combo9"
+    assert rules.match("portal9.exe", title="首页") is None
+    assert rules.match("x.exe", title="机密项目18 周报") == "title18"
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,204 @@
+"""
+会话暂停基准测试（使用模拟平台、虚拟时钟和模拟的会话通知，可在任意平台运行）
+
+模拟几个工作日：午休和下班时锁定工作站、随后显示器关闭，第二天解锁；下午合上笔记本睡眠半小时、
+唤醒后 20 秒解锁；另有两次离开时没有锁定，期间有人打开微信：一次空闲够阈值后进入守护模式，
+另一次没到阈值显示器就关闭了（隔天还会接着睡眠），入侵者按键唤醒显示器后打开微信。
+显示器关闭和睡眠不需要验证身份，不活动期间必须计入空闲时间，否则第二次入侵不会被锁定。
+分别在轮询和前台事件两种模式下，对比订阅会话通知前后：
+- 会话锁定或显示器关闭期间守护线程的唤醒次数（睡眠期间进程被冻结，不计）
+- 解锁后主人打开微信被误锁的次数、唤醒后立即误入守护模式的次数
+- 没有锁定的离开期间入侵是否仍被锁定
+前台事件模式下解锁后退出了守护模式、重新按空闲时间计时，总唤醒次数会略多于不订阅时
+（不订阅时守护模式一直保持到主人打开微信被误锁为止，期间不唤醒）。
+
+用法: python benchmarks/bench_session_parking.py [--days 3]
+"""
+import os
+import sys
+import logging
+import argparse
+import tempfile
+
+root_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, root_dir)
+
+from src.config_store import ConfigStore
+from src.metrics import MetricsRegistry
+from src.scheduler import IdleScheduler
+from src.session_watch import SESSION_LOCKED, DISPLAY_OFF, SYSTEM_SUSPENDED
+from src.simulation import SimPlatform
+from src.wechat_guardian import WeChatGuardian, START_GUARDIAN, INTRUSION
+
+HOUR = 3600.0
+DAY = 24 * HOUR
+IDLE_THRESHOLD = 60
+
+
+class RecordingScheduler(IdleScheduler):
+    """
+    记录每次唤醒的时刻
+    """
+
+    def __init__(self, clock):
+        super().__init__(clock=clock)
+        self.times = []
+
+    def sleep(self, timeout):
+        running = super().sleep(timeout)
+        self.times.append(self.clock.now())
+        return running
+
+
+def build(platform, days):
+    """
+    生成用户活动和会话通知脚本
+    :return: (不活动区间, 睡眠区间, 主人打开微信的时刻, 入侵时刻, 恢复时刻)
+    """
+    clock = platform.clock
+    idle, foreground, session = platform.idle, platform.foreground, platform.session
+    chrome = platform.add_process("chrome.exe")
+    wechat = platform.add_process("WeChat.exe")
+    lockapp = platform.add_process("LockApp.exe")
+    browser = platform.add_window(chrome, "Chrome_WidgetWin_1", "工作")
+    chat = platform.add_window(wechat, "WeChatMainWndForPC", "微信")
+    lock_screen = platform.add_window(lockapp, "Windows.UI.Core.CoreWindow", "Windows 默认锁屏界面")
+
+    inactive, suspended, owner_opens, intrusions, resumes = [], [], [], [], []
+
+    def lock(start, end):
+        # 锁定后切到锁屏界面，10 分钟后显示器关闭；解锁前先打开显示器，输入密码 5 秒
+        session.change_at(start, SESSION_LOCKED, True)
+        foreground.switch_at(start, lock_screen, lockapp)
+        session.change_at(start + 600, DISPLAY_OFF, True)
+        session.change_at(end - 5, DISPLAY_OFF, False)
+        idle.add_inputs([end - 4, end - 2, end])
+        session.change_at(end, SESSION_LOCKED, False)
+        foreground.switch_at(end, browser, chrome)
+        inactive.append((start, end))
+        resumes.append(end)
+
+    def open_wechat(t, hold, owner):
+        clock.call_at(t - 1, lambda: platform.lock_backend.unlock(chat))
+        foreground.switch_at(t, chat, wechat)
+        foreground.switch_at(t + hold, browser, chrome)
+        (owner_opens if owner else intrusions).append(t)
+
+    foreground.switch_at(9 * HOUR, browser, chrome)
+    for d in range(days):
+        base = d * DAY
+        idle.add_activity(base + 9 * HOUR, base + 12 * HOUR, 5.0)
+        open_wechat(base + 10 * HOUR, 30, owner=True)
+        lock(base + 12 * HOUR, base + 13 * HOUR)
+        idle.add_activity(base + 13 * HOUR, base + 14 * HOUR + 50 * 60, 5.0)
+        open_wechat(base + 13 * HOUR + 300, 30, owner=True)
+        # 离开时没有锁定：进入守护模式后有人打开微信
+        open_wechat(base + 15 * HOUR, 5, owner=False)
+        idle.add_inputs([base + 15 * HOUR, base + 15 * HOUR + 5])
+        # 入侵者离开后主人马上回来，守护模式不会在此之后再次进入
+        idle.add_activity(base + 15 * HOUR + 30, base + 16 * HOUR, 5.0)
+        # 合上笔记本睡眠（唤醒时需要登录，睡眠时同时锁定），唤醒 20 秒后解锁
+        wake = base + 16.5 * HOUR
+        session.change_at(base + 16 * HOUR, SESSION_LOCKED, True)
+        session.change_at(base + 16 * HOUR, SYSTEM_SUSPENDED, True)
+        session.change_at(wake, SYSTEM_SUSPENDED, False)
+        idle.add_inputs([wake + 20])
+        session.change_at(wake + 20, SESSION_LOCKED, False)
+        inactive.append((base + 16 * HOUR, wake + 20))
+        suspended.append((base + 16 * HOUR, wake))
+        resumes.append(wake + 20)
+        idle.add_activity(wake + 20, base + 17 * HOUR + 20 * 60, 5.0)
+        open_wechat(base + 17 * HOUR, 30, owner=True)
+        # 离开时没有锁定，空闲 30 秒（不到阈值）显示器就关闭了，隔天还会接着睡眠；
+        # 入侵者按键唤醒显示器后打开微信
+        away = base + 17 * HOUR + 20 * 60
+        dark, back = away + 30, base + 17 * HOUR + 40 * 60
+        session.change_at(dark, DISPLAY_OFF, True)
+        if d % 2:
+            session.change_at(away + 10 * 60, SYSTEM_SUSPENDED, True)
+            session.change_at(back, SYSTEM_SUSPENDED, False)
+            suspended.append((away + 10 * 60, back))
+        idle.add_inputs([back])
+        session.change_at(back, DISPLAY_OFF, False)
+        inactive.append((dark, back))
+        open_wechat(back + 5, 5, owner=False)
+        idle.add_activity(back + 30, base + 18 * HOUR, 5.0)
+        if d + 1 < days:
+            lock(base + 18 * HOUR, base + DAY + 9 * HOUR)
+            open_wechat(base + DAY + 9 * HOUR + 300, 30, owner=True)
+    return inactive, suspended, owner_opens, intrusions, resumes
+
+
+def run(days, event_driven, session_events):
+    platform = SimPlatform(event_driven=event_driven)
+    clock = platform.clock
+    inactive, suspended, owner_opens, intrusions, resumes = build(platform, days)
+    clock.advance_to(9 * HOUR)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        store = ConfigStore(os.path.join(tmp, 'config.json'), debounce=0)
+        store.update({"idle_time": IDLE_THRESHOLD}, immediate=True)
+        guardian = WeChatGuardian(config_store=store, platform=platform, metrics=MetricsRegistry())
+        scheduler = RecordingScheduler(clock)
+        guardian.on_wechat_activated = lambda info: scheduler.wake()
+        guardian.on_session_changed = lambda active: scheduler.wake()
+        if guardian.start_foreground_events():
+            scheduler.guard_check_interval = None
+        if session_events:
+            guardian.start_session_events()
+        clock.call_at((days - 1) * DAY + 18 * HOUR, scheduler.stop)
+
+        entries, locks = [], []
+
+        def on_cycle(result):
+            if result.event == START_GUARDIAN:
+                entries.append(clock.now())
+            elif result.event == INTRUSION:
+                locks.append(result.detected_at)
+
+        guardian.run_loop(scheduler, on_cycle)
+        guardian.stop_session_events()
+        guardian.stop_foreground_events()
+
+    def within(t, spans):
+        return any(start < t < end for start, end in spans)
+
+    def near(t, times, before=0.0, after=1.0):
+        return any(at - before <= t <= at + after for at in times)
+
+    return {
+        'wakeups': scheduler.wakeups,
+        'parked_wakeups': sum(within(t, inactive) and not within(t, suspended) for t in scheduler.times),
+        'false_locks': sum(near(t, owner_opens) for t in locks),
+        'caught': sum(any(near(t, [at]) for t in locks) for at in intrusions),
+        'intrusions': len(intrusions),
+        'false_entries': sum(near(t, resumes, after=IDLE_THRESHOLD) for t in entries),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--days', type=int, default=3)
+    args = parser.parse_args()
+    logging.disable(logging.CRITICAL)
+
+    print(f"模拟 {args.days} 个工作日，空闲阈值 {IDLE_THRESHOLD} 秒")
+    print(f"{'方式':<10}{'会话通知':<8}{'总唤醒':>8}{'锁定/熄屏期间唤醒':>18}{'误锁主人':>10}{'恢复后误入守护':>14}{'入侵锁定':>10}")
+    ok = True
+    for name, event_driven in (("轮询", False), ("前台事件", True)):
+        results = {}
+        for session_events in (False, True):
+            stats = run(args.days, event_driven, session_events)
+            results[session_events] = stats
+            print(f"{name:<10}{'订阅' if session_events else '无':<8}{stats['wakeups']:>8}{stats['parked_wakeups']:>18}"
+                  f"{stats['false_locks']:>10}{stats['false_entries']:>14}{stats['caught']:>6}/{stats['intrusions']}")
+        parked = results[True]
+        ok = (ok and parked['parked_wakeups'] == 0 and parked['false_locks'] == 0 and parked['false_entries'] == 0
+              and parked['caught'] == parked['intrusions'])
+        if not event_driven:
+            ok = ok and parked['wakeups'] < results[False]['wakeups']
+    return 0 if ok else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
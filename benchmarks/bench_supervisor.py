@@ -0,0 +1,193 @@
+"""
+检测线程监督基准测试（使用模拟平台和真实时钟、真实线程，可在任意平台运行）
+
+用户多次点击"开始守护"，对比：
+- 旧做法：启动时起一个守护线程，每次点击再起一个，每个线程都按守护模式的节奏永久循环
+- DetectionSupervisor：始终只有一个检测线程，重复开始只唤醒它
+并验证：暂停期间不执行任何循环、恢复后继续；前台事件模式下检测线程无限期休眠时 stop() 立即唤醒并结束它；
+读取空闲时间期间被手动开始守护时，自动进入不会覆盖手动守护的状态。
+
+用法: python benchmarks/bench_supervisor.py [--clicks 5] [--seconds 1.0]
+"""
+import os
+import sys
+import time
+import logging
+import argparse
+import tempfile
+import threading
+
+root_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, root_dir)
+
+from src.config_store import ConfigStore
+from src.metrics import MetricsRegistry
+from src.scheduler import IdleScheduler, SystemClock
+from src.simulation import SimPlatform
+from src.supervisor import DetectionSupervisor, RATE_WINDOW
+from src.wechat_guardian import WeChatGuardian, START_GUARDIAN
+
+# 守护模式下的检查间隔（秒），比默认的 0.1 秒更短以便在一秒内看出差别
+GUARD_INTERVAL = 0.01
+IDLE_THRESHOLD = 60
+
+
+def build(tmp, event_driven=False):
+    """
+    没有任何输入的模拟平台：空闲时间远超阈值，第一次循环就进入守护模式
+    :return: (guardian, scheduler, registry)
+    """
+    platform = SimPlatform(clock=SystemClock(), event_driven=event_driven)
+    store = ConfigStore(os.path.join(tmp, f'config_{time.perf_counter_ns()}.json'), debounce=0)
+    store.update({"idle_time": IDLE_THRESHOLD}, immediate=True)
+    registry = MetricsRegistry()
+    guardian = WeChatGuardian(config_store=store, platform=platform, metrics=registry)
+    scheduler = IdleScheduler(clock=platform.clock, guard_check_interval=GUARD_INTERVAL)
+    if event_driven:
+        scheduler.guard_check_interval = None
+    return guardian, scheduler, registry
+
+
+def measure(registry, seconds):
+    """
+    :return: seconds 秒内平均每秒的守护循环次数
+    """
+    cycles = registry.get('cycles_total')
+    before = cycles.value
+    time.sleep(seconds)
+    return (cycles.value - before) / seconds
+
+
+def legacy(tmp, clicks, seconds):
+    """
+    旧做法：每次开始守护都新起一个守护线程
+    :return: (存活的守护线程数, 每秒循环次数)
+    """
+    guardian, scheduler, registry = build(tmp)
+    threads = []
+
+    def spawn():
+        thread = threading.Thread(target=guardian.run_loop, args=(scheduler,), daemon=True)
+        thread.start()
+        threads.append(thread)
+
+    spawn()
+    for _ in range(clicks):
+        guardian.stop_guardian()
+        if guardian.start_guardian():
+            spawn()
+            scheduler.wake()
+    rate = measure(registry, seconds)
+    alive = sum(thread.is_alive() for thread in threads)
+    scheduler.stop()
+    for thread in threads:
+        thread.join(1.0)
+    return alive, rate
+
+
+def supervised(tmp, clicks, seconds):
+    """
+    :return: 统计信息
+    """
+    guardian, scheduler, registry = build(tmp)
+    supervisor = DetectionSupervisor(guardian, scheduler, metrics=registry)
+    threads_before = threading.active_count()
+    supervisor.start()
+    for _ in range(clicks):
+        guardian.stop_guardian()
+        if guardian.start_guardian():
+            supervisor.start()
+            scheduler.wake()
+    rate = measure(registry, seconds)
+    stats = {
+        'workers': registry.get('detection_workers').get(),
+        'extra_threads': registry.get('threads').get() - threads_before,
+        'rate': rate,
+        'gauge_rate': registry.get('cycles_per_second').get() * RATE_WINDOW / seconds,
+    }
+    # 暂停：等正在进行的一次循环结束后不应再有循环
+    supervisor.pause()
+    time.sleep(GUARD_INTERVAL * 5)
+    stats['paused_rate'] = measure(registry, seconds / 2)
+    supervisor.resume()
+    stats['resumed_rate'] = measure(registry, seconds / 2)
+    started = time.perf_counter()
+    stats['stopped'] = supervisor.stop()
+    stats['stop_ms'] = (time.perf_counter() - started) * 1000
+    return stats
+
+
+def cancel_sleeping(tmp):
+    """
+    前台事件模式下守护线程没有超时、一直休眠，stop() 必须唤醒它
+    :return: (是否已退出, stop() 耗时毫秒)
+    """
+    guardian, scheduler, registry = build(tmp, event_driven=True)
+    supervisor = DetectionSupervisor(guardian, scheduler, metrics=registry)
+    supervisor.start()
+    time.sleep(0.1)
+    cycles = registry.get('cycles_total').value
+    started = time.perf_counter()
+    stopped = supervisor.stop()
+    elapsed = (time.perf_counter() - started) * 1000
+    # 休眠中的检测线程只执行过进入守护模式和立即检查的两次循环
+    return stopped and not supervisor.running and cycles <= 2, elapsed
+
+
+def manual_during_entry(tmp):
+    """
+    检测线程读取空闲时间、准备自动进入守护模式时，用户手动开始守护
+    :return: 手动守护的状态是否保留
+    """
+    guardian, scheduler, registry = build(tmp)
+    read = guardian.get_idle_duration
+    clicked = []
+
+    def racing_read():
+        idle = read()
+        if not clicked:
+            # start_guardian() 自身也读取空闲时间，先记下已点击
+            clicked.append(None)
+            clicked[0] = guardian.start_guardian()
+        return idle
+
+    guardian.get_idle_duration = racing_read
+    result = guardian.step(scheduler)
+    # 手动开始的守护不看各程序的空闲阈值，也不应被算作一次自动进入
+    return (clicked == [True] and guardian.is_guarding and guardian._manual_guard
+            and result.event != START_GUARDIAN and registry.get('guard_entries_total').value == 0)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--clicks', type=int, default=5, help='启动后点击"开始守护"的次数')
+    parser.add_argument('--seconds', type=float, default=1.0)
+    args = parser.parse_args()
+    logging.disable(logging.CRITICAL)
+    expected = 1 / GUARD_INTERVAL
+
+    with tempfile.TemporaryDirectory() as tmp:
+        alive, legacy_rate = legacy(tmp, args.clicks, args.seconds)
+        stats = supervised(tmp, args.clicks, args.seconds)
+        cancelled, cancel_ms = cancel_sleeping(tmp)
+        kept_manual = manual_during_entry(tmp)
+
+    print(f"启动后点击 {args.clicks} 次开始守护，守护模式检查间隔 {GUARD_INTERVAL * 1000:.0f} 毫秒（期望约 {expected:.0f} 次/秒）")
+    print(f"{'方式':<14}{'守护线程':>10}{'每秒循环':>12}")
+    print(f"{'每次点击新线程':<14}{alive:>10}{legacy_rate:>12.0f}")
+    print(f"{'supervisor':<14}{stats['workers']:>10}{stats['rate']:>12.0f}")
+    print(f"supervisor 新增线程 {stats['extra_threads']}，cycles_per_second 指标折算 {stats['gauge_rate']:.0f} 次/秒")
+    print(f"暂停期间每秒循环 {stats['paused_rate']:.0f}，恢复后 {stats['resumed_rate']:.0f}；"
+          f"stop() {stats['stop_ms']:.1f} 毫秒")
+    print(f"前台事件模式下唤醒休眠中的检测线程并退出：{'是' if cancelled else '否'}，stop() {cancel_ms:.1f} 毫秒")
+    print(f"读取空闲时间期间手动开始守护，手动守护状态保留：{'是' if kept_manual else '否'}")
+
+    ok = (alive == args.clicks + 1 and stats['workers'] == 1 and stats['extra_threads'] == 1
+          and stats['rate'] < expected * 1.2 and legacy_rate > stats['rate'] * 2
+          and stats['paused_rate'] == 0 and stats['resumed_rate'] > 0 and stats['stopped']
+          and cancelled and cancel_ms < 100 and kept_manual)
+    return 0 if ok else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
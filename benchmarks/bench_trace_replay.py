@@ -0,0 +1,139 @@
+"""
+会话轨迹录制与回放基准测试（使用模拟平台和虚拟时钟，可在任意平台运行）
+
+1. 在模拟平台上生成一周的办公会话（工作、阅读停顿、短暂离开、开会、午休，回来后常先看微信），
+   用 TraceRecorder 按 1 秒采样录制，统计轨迹大小
+2. 在较长的空闲时段中插入模拟入侵，按不同的空闲阈值回放，输出锁定到的入侵、漏掉的入侵、误锁次数和锁定耗时，
+   确认回放结果可复现、阈值越大误锁越少，且回放速度远快于真实时间
+
+用法: python benchmarks/bench_trace_replay.py [--days 5] [--thresholds 30 60 120 300 600]
+"""
+import os
+import sys
+import random
+import logging
+import argparse
+import tempfile
+
+root_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, root_dir)
+
+from src.simulation import SimPlatform
+from src.session_trace import TraceRecorder, load_trace, save_trace, inject_intrusions, replay, format_reports
+
+HOUR = 3600.0
+DAY = 24 * HOUR
+
+
+def build_session(days, seed=7):
+    """
+    生成模拟的办公会话：每天 9:00 到 18:00
+    :return: (platform, 结束时刻)
+    """
+    rng = random.Random(seed)
+    platform = SimPlatform()
+    pids = {name: platform.add_process(name) for name in ("explorer.exe", "chrome.exe", "WINWORD.EXE", "WeChat.exe")}
+    windows = {
+        "explorer.exe": platform.add_window(pids["explorer.exe"], "CabinetWClass", "文件资源管理器"),
+        "chrome.exe": platform.add_window(pids["chrome.exe"], "Chrome_WidgetWin_1", "Google Chrome"),
+        "WINWORD.EXE": platform.add_window(pids["WINWORD.EXE"], "OpusApp", "文档1 - Word"),
+        "WeChat.exe": platform.add_window(pids["WeChat.exe"], "WeChatMainWndForPC", "微信"),
+    }
+    work_apps = ["explorer.exe", "chrome.exe", "WINWORD.EXE"]
+    idle, foreground = platform.idle, platform.foreground
+
+    def switch(t, name):
+        foreground.switch_at(t, windows[name], pids[name])
+
+    inputs = []
+    switch(0.0, "explorer.exe")
+    for day in range(days):
+        t = day * DAY + 9 * HOUR
+        end_of_day = day * DAY + 18 * HOUR
+        lunch_done = False
+        while t < end_of_day:
+            # 工作：持续输入，偶尔停下来阅读，偶尔切换窗口或看一眼微信
+            work_end = min(t + rng.uniform(15, 90) * 60, end_of_day)
+            while t < work_end:
+                burst = rng.uniform(20, 300)
+                inputs.extend(t + i * 2.0 for i in range(int(burst / 2)))
+                if rng.random() < 0.3:
+                    switch(t + rng.uniform(0, burst), rng.choice(work_apps + ["WeChat.exe"]))
+                t += burst + (rng.uniform(20, 150) if rng.random() < 0.3 else rng.uniform(0, 10))
+            if t >= end_of_day:
+                break
+            # 离开：短暂离开、开会或午休
+            if not lunch_done and t >= day * DAY + 12 * HOUR:
+                away, lunch_done = rng.uniform(45, 75) * 60, True
+            elif rng.random() < 0.2:
+                away = rng.uniform(30, 60) * 60
+            else:
+                away = rng.uniform(1, 15) * 60
+            switch(t, rng.choice(work_apps))
+            t += away
+            # 回来后常常先看微信
+            if rng.random() < 0.4:
+                switch(t + rng.uniform(3, 20), "WeChat.exe")
+    idle.add_inputs(inputs)
+    return platform, days * DAY
+
+
+def record(platform, end, path):
+    recorder = TraceRecorder(path, platform=platform, sample_interval=1.0)
+    recorder.open()
+    clock = platform.clock
+
+    def tick():
+        recorder.sample()
+        if clock.now() + 1.0 <= end:
+            clock.call_later(1.0, tick)
+
+    clock.call_at(0.0, tick)
+    clock.advance_to(end)
+    recorder.stop()
+    return recorder.records
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--days', type=int, default=5, help='模拟的工作日数量')
+    parser.add_argument('--thresholds', type=int, nargs='+', default=[30, 60, 120, 300, 600], help='回放的空闲阈值（秒）')
+    args = parser.parse_args()
+    logging.disable(logging.WARNING)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'session.trace.gz')
+        platform, end = build_session(args.days)
+        records = record(platform, end, path)
+        size = os.path.getsize(path)
+        trace = load_trace(path)
+        copy = os.path.join(tmp, 'copy.trace')
+        save_trace(trace, copy)
+        roundtrip = load_trace(copy) == trace
+
+    print(f"录制 {args.days} 天（{end / HOUR:.0f} 小时虚拟时间）：{records} 条记录，压缩后 {size / 1024:.1f} KB，"
+          f"{len(trace.activity)} 段活动，{len(trace.foreground)} 次窗口切换；保存后重新读取一致：{roundtrip}")
+
+    trace = inject_intrusions(trace, min_gap=120, duration=30)
+    print(f"在不短于 120 秒的空闲时段中插入 {len(trace.intrusions)} 次模拟入侵")
+    reports = [replay(trace, idle_time) for idle_time in args.thresholds]
+    print(format_reports(reports))
+
+    again = replay(trace, args.thresholds[0])
+    first, last = reports[0], reports[-1]
+    speed = min(r.duration / r.elapsed for r in reports)
+    print(f"最慢一次回放为真实时间的 {speed:,.0f} 倍")
+    ok = (
+        roundtrip
+        and (again.caught, again.false_locks) == (first.caught, first.false_locks)
+        and first.false_locks >= last.false_locks
+        and first.caught >= last.caught
+        and all(r.caught + r.missed == r.intrusions for r in reports)
+        and first.caught > 0
+        and speed > 1000
+    )
+    return 0 if ok else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
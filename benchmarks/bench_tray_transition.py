@@ -0,0 +1,84 @@
+"""
+托盘图标状态切换微基准（使用假的图标加载函数，可在任意平台运行）
+
+对比旧版每次切换都写临时 ICO 文件再读回加载，与启动时缓存图标句柄后只交换句柄的耗时。
+
+用法: python benchmarks/bench_tray_transition.py
+"""
+import os
+import sys
+import time
+import struct
+import tempfile
+
+root_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, root_dir)
+
+from src.tray_icons import TrayIconCache, TrayIconState, ico_image_data, image_to_ico_bytes
+
+ROUNDS = 2000
+
+
+def build_ico(color):
+    """
+    生成 16x16 的 32 位 BMP 格式 ICO 数据；安装了 PIL 时使用 IconGenerator 渲染
+    """
+    try:
+        from src.icon_generator import IconGenerator
+        return image_to_ico_bytes(IconGenerator.create_icon(color), 16)
+    except ImportError:
+        pixel = b'\x80\x80\x80\xc8' if color == 'gray' else b'\x00\xff\x00\xc8'
+        header = struct.pack('<IiiHHIIiiII', 40, 16, 32, 1, 32, 0, 0, 0, 0, 0, 0)
+        image = header + pixel * 256 + b'\x00' * 64
+        return struct.pack('<HHH', 0, 1, 1) + struct.pack('<BBBBHHII', 16, 16, 0, 0, 1, 32, len(image), 22) + image
+
+
+def fake_loader(ico_bytes, size):
+    """
+    模拟 CreateIconFromResourceEx：解析图像数据并返回一个句柄
+    """
+    return hash(ico_image_data(ico_bytes, size))
+
+
+def legacy_update(ico_bytes, directory):
+    """
+    旧版 update_icon：写临时文件 -> 从文件加载 -> 删除临时文件
+    """
+    path = os.path.join(directory, 'temp_icon.ico')
+    with open(path, 'wb') as f:
+        f.write(ico_bytes)
+    with open(path, 'rb') as f:
+        hicon = fake_loader(f.read(), 16)
+    os.remove(path)
+    return hicon
+
+
+def main():
+    icons = {state: build_ico(state) for state in ('gray', 'green')}
+    sequence = ['green', 'gray'] * (ROUNDS // 2)
+
+    with tempfile.TemporaryDirectory() as directory:
+        start = time.perf_counter()
+        for state in sequence:
+            legacy_update(icons[state], directory)
+        legacy = (time.perf_counter() - start) / len(sequence)
+
+    notified = []
+    tray = TrayIconState(TrayIconCache(sources=icons, loader=fake_loader).render(), notified.append)
+    start = time.perf_counter()
+    for state in sequence:
+        tray.set_state(state)
+    cached = (time.perf_counter() - start) / len(sequence)
+
+    # 同一状态的重复更新会被合并
+    for _ in range(ROUNDS):
+        tray.set_state('gray')
+
+    print(f"临时文件方式: {legacy * 1e6:10.1f} 微秒/次")
+    print(f"缓存句柄方式: {cached * 1e6:10.1f} 微秒/次")
+    print(f"实际更新 {tray.updates} 次，合并重复更新 {tray.coalesced} 次")
+    return 0 if cached < legacy else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,144 @@
+"""
+更新检查基准测试（使用本机 HTTP 服务模拟 GitHub releases API，可在任意平台运行）
+
+模拟多次重启和发布新版本，统计每种情况下的网络请求数、传输字节数和耗时，
+并确认启动路径上的 check_update_async() 不会阻塞。
+
+用法: python benchmarks/bench_update_check.py
+"""
+import os
+import sys
+import json
+import time
+import tempfile
+import threading
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+root_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, root_dir)
+
+from src.updater import Updater, check_update_async
+
+DAY = 24 * 3600.0
+
+
+class ReleaseServer:
+    """
+    本机模拟的最新发布接口：支持 ETag / If-Modified-Since，记录请求次数
+    """
+
+    def __init__(self, tag):
+        self.requests = []
+        self.bytes_sent = 0
+        self.delay = 0.0
+        self.set_release(tag)
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                time.sleep(server.delay)
+                conditional = self.headers.get('If-None-Match') == server.etag
+                server.requests.append(304 if conditional else 200)
+                if conditional:
+                    self.send_response(304)
+                    self.send_header('ETag', server.etag)
+                    self.end_headers()
+                    return
+                self.send_response(200)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('ETag', server.etag)
+                self.send_header('Last-Modified', server.last_modified)
+                self.send_header('Content-Length', str(len(server.body)))
+                self.end_headers()
+                self.wfile.write(server.body)
+                server.bytes_sent += len(server.body)
+
+            def log_message(self, format, *args):
+                pass
+
+        self.httpd = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        self.url = f"http://127.0.0.1:{self.httpd.server_address[1]}/repos/flyhunterl/wechatguard/releases/latest"
+        threading.Thread(target=self.httpd.serve_forever, daemon=True).start()
+
+    def set_release(self, tag):
+        # 真实接口的响应包含资源列表等，约数 KB
+        release = {'tag_name': tag, 'body': f"{tag} 更新说明\n" + "- 修复若干问题\n" * 20,
+                   'html_url': f"https://github.com/flyhunterl/wechatguard/releases/tag/{tag}",
+                   'assets': [{'name': f'WeChatGuard_{tag}.zip', 'size': 30000000}] * 10}
+        self.body = json.dumps(release).encode('utf-8')
+        self.etag = f'"{tag}-{len(self.body)}"'
+        self.last_modified = time.strftime('%a, %d %b %Y %H:%M:%S GMT', time.gmtime())
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+
+class FakeClock:
+    def __init__(self):
+        self.t = 1_700_000_000.0
+
+    def __call__(self):
+        return self.t
+
+
+def main():
+    server = ReleaseServer('v0.3.4')
+    clock = FakeClock()
+    ok = True
+    rows = []
+    with tempfile.TemporaryDirectory() as tmp:
+        cache_path = os.path.join(tmp, 'update_cache.json')
+
+        def restart(label, expect_requests, expect_update):
+            nonlocal ok
+            # 每次“重启”都新建 Updater，只通过磁盘缓存共享状态
+            updater = Updater(current_version='0.3.4', url=server.url, cache_path=cache_path, clock=clock)
+            before, bytes_before = len(server.requests), server.bytes_sent
+            start = time.perf_counter()
+            info = updater.check_update()
+            elapsed = (time.perf_counter() - start) * 1000
+            statuses = server.requests[before:]
+            rows.append((label, statuses, server.bytes_sent - bytes_before, elapsed, info))
+            ok = ok and len(statuses) == expect_requests and info.has_update == expect_update
+
+        restart("首次启动", 1, False)
+        clock.t += 3600
+        restart("1 小时后重启", 0, False)
+        clock.t += DAY
+        restart("1 天后重启", 1, False)
+        server.set_release('v0.3.5')
+        clock.t += DAY
+        restart("发布新版本后", 1, True)
+        clock.t += 60
+        restart("再次重启", 0, True)
+
+        # 服务器不可用：保留上一次的结果，一小时后再试
+        server.stop()
+        clock.t += DAY
+        restart("服务器不可用", 0, True)
+        clock.t += 60
+        restart("一分钟后重启", 0, True)
+
+        # 启动路径上只启动后台线程
+        slow = ReleaseServer('v0.3.5')
+        slow.delay = 0.5
+        updater = Updater(current_version='0.3.4', url=slow.url, cache_path=os.path.join(tmp, 'slow.json'))
+        found = []
+        start = time.perf_counter()
+        thread = check_update_async(found.append, {}, updater)
+        startup_ms = (time.perf_counter() - start) * 1000
+        thread.join(5)
+        slow.stop()
+        ok = ok and startup_ms < 50 and len(found) == 1
+
+    print(f"{'场景':<14}{'请求':>12}{'传输(字节)':>12}{'耗时(ms)':>10}  结果")
+    for label, statuses, sent, elapsed, info in rows:
+        result = f"新版本 v{info.latest_version}" if info.has_update else "已是最新"
+        print(f"{label:<14}{','.join(map(str, statuses)) or '-':>12}{sent:>12}{elapsed:>10.1f}  {result}")
+    print(f"check_update_async 在启动路径上耗时 {startup_ms:.2f} ms（服务器响应 500 ms）")
+    return 0 if ok else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,202 @@
+"""
+顶层窗口索引基准测试（使用模拟平台和模拟的窗口事件，可在任意平台运行）
+
+1. 在数千个顶层窗口（含大量隐藏的工具窗口、浏览器窗口和微信的聊天、朋友圈、小程序窗口）上建立索引
+2. 随机创建、销毁、显示、隐藏和改名窗口，统计每个事件的处理耗时；结束后与完整枚举的结果核对，
+   包括按标题匹配的规则在改名后是否正确加入或移出受保护窗口
+3. 比较"当前可见的受保护窗口"从索引读取和每次完整枚举的耗时
+4. 枚举期间到达的事件不会被枚举结果覆盖
+
+用法: python benchmarks/bench_window_index.py [--windows 5000] [--events 100000]
+"""
+import os
+import sys
+import time
+import random
+import logging
+import argparse
+import tempfile
+
+root_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, root_dir)
+
+from src.config_store import ConfigStore
+from src.metrics import MetricsRegistry
+from src.simulation import SimPlatform, SimWindowSource
+from src.wechat_guardian import WeChatGuardian
+
+PROTECTED_APPS = [
+    {"name": "微信", "exe": "WeChat.exe"},
+    {"name": "企业微信", "exe": "WXWork.exe"},
+    {"name": "财务门户", "exe": "chrome.exe", "title_regex": "财务"},
+]
+WECHAT_WINDOWS = [("WeChatMainWndForPC", "微信"), ("ChatWnd", "张三"), ("SnsWnd", "朋友圈"),
+                  ("Chrome_WidgetWin_0", "小程序"), ("ImagePreviewWnd", "图片查看")]
+
+
+def populate(platform, count, rng):
+    """
+    :return: {进程名: pid}
+    """
+    pids = {name: platform.add_process(name) for name in
+            ("explorer.exe", "chrome.exe", "WINWORD.EXE", "svchost.exe", "WeChat.exe", "WXWork.exe")}
+    for i in range(count):
+        roll = rng.random()
+        if roll < 0.6:
+            # 系统中大部分顶层窗口是隐藏的消息窗口和工具窗口
+            platform.add_window(pids["svchost.exe"], f"HiddenWnd{i % 50}", "", visible=False)
+        elif roll < 0.85:
+            platform.add_window(pids["chrome.exe"], "Chrome_WidgetWin_1", rng.choice(["新闻", "财务报表", "邮件", "文档"]))
+        elif roll < 0.95:
+            platform.add_window(pids[rng.choice(["explorer.exe", "WINWORD.EXE"])], "OpusApp", f"文档{i}")
+        else:
+            window_class, title = rng.choice(WECHAT_WINDOWS)
+            platform.add_window(pids[rng.choice(["WeChat.exe", "WXWork.exe"])], window_class, title,
+                                visible=rng.random() < 0.7)
+    return pids
+
+
+def churn(platform, pids, events, rng):
+    """
+    随机产生窗口事件
+    """
+    names = list(pids)
+    hwnds = list(platform.windows)
+    for _ in range(events):
+        roll = rng.random()
+        if roll < 0.2 or not hwnds:
+            name = rng.choice(names)
+            window_class, title = rng.choice(WECHAT_WINDOWS) if name in ("WeChat.exe", "WXWork.exe") \
+                else ("Chrome_WidgetWin_1", rng.choice(["新闻", "财务报表"]))
+            hwnds.append(platform.add_window(pids[name], window_class, title, visible=rng.random() < 0.5))
+        elif roll < 0.4:
+            # 与末尾交换后删除，避免 O(n) 的列表删除
+            i = rng.randrange(len(hwnds))
+            hwnds[i], hwnds[-1] = hwnds[-1], hwnds[i]
+            platform.destroy_window(hwnds.pop())
+        elif roll < 0.7:
+            platform.show_window(rng.choice(hwnds), rng.random() < 0.5)
+        else:
+            hwnd = rng.choice(hwnds)
+            platform.set_window_title(hwnd, rng.choice(["新闻", "财务报表", "张三", "李四", "小程序", ""]))
+
+
+def full_scan(guardian, source):
+    """
+    不使用索引：完整枚举后逐个判断
+    """
+    result = []
+    for window in source.enumerate():
+        window = window._replace(name=guardian.process_cache.get_name(window.pid))
+        if window.visible and guardian.match_window(window):
+            result.append(window)
+    return result
+
+
+class RacingSource(SimWindowSource):
+    """
+    枚举进行到一半时窗口发生变化的来源
+    """
+
+    def __init__(self, platform, during):
+        super().__init__(platform)
+        self.during = during
+
+    def enumerate(self):
+        hwnds = list(self.platform.windows)
+        half = len(hwnds) // 2
+        result = [self._info(hwnd) for hwnd in hwnds[:half] if hwnd in self.platform.windows]
+        if self.during:
+            self.during, during = None, self.during
+            during()
+        result += [self._info(hwnd) for hwnd in hwnds[half:] if hwnd in self.platform.windows]
+        self.enumerations += 1
+        return result
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--windows', type=int, default=5000, help='初始顶层窗口数量')
+    parser.add_argument('--events', type=int, default=100000, help='随机窗口事件数量')
+    args = parser.parse_args()
+    logging.disable(logging.CRITICAL)
+    rng = random.Random(5)
+    ok = True
+
+    with tempfile.TemporaryDirectory() as tmp:
+        store = ConfigStore(os.path.join(tmp, 'config.json'), debounce=0)
+        store.update({"protected_apps": PROTECTED_APPS}, immediate=True)
+        platform = SimPlatform()
+        pids = populate(platform, args.windows, rng)
+        guardian = WeChatGuardian(config_store=store, platform=platform, metrics=MetricsRegistry())
+        source = platform.window_events
+
+        started = time.perf_counter()
+        guardian.start_window_index()
+        build_ms = (time.perf_counter() - started) * 1000
+        index = guardian.window_index
+        print(f"建立索引：{len(index)} 个顶层窗口，{len(guardian.visible_protected_windows())} 个可见的受保护窗口，"
+              f"耗时 {build_ms:.1f} ms")
+
+        # 随机窗口事件
+        before = index.events
+        started = time.perf_counter()
+        churn(platform, pids, args.events, rng)
+        elapsed = time.perf_counter() - started
+        handled = index.events - before
+        expected = sorted(full_scan(guardian, source))
+        actual = sorted(guardian.visible_protected_windows())
+        consistent = sorted(index.windows()) == sorted(
+            w._replace(name=guardian.process_cache.get_name(w.pid)) for w in source.enumerate())
+        print(f"{handled:,} 个窗口事件：每个 {elapsed / handled * 1e6:.1f} µs（含模拟平台本身的开销）；"
+              f"之后 {len(index)} 个窗口与完整枚举一致：{consistent}，可见的受保护窗口一致：{expected == actual}")
+        ok = ok and consistent and expected == actual and handled >= args.events
+
+        # 查询：索引与完整枚举
+        rounds = 200
+        started = time.perf_counter()
+        for _ in range(rounds):
+            guardian.visible_protected_windows()
+        index_us = (time.perf_counter() - started) / rounds * 1e6
+        enumerations = source.enumerations
+        started = time.perf_counter()
+        for _ in range(20):
+            full_scan(guardian, source)
+        scan_us = (time.perf_counter() - started) / 20 * 1e6
+        print(f"查询可见的受保护窗口（{len(actual)} 个）：索引 {index_us:,.1f} µs，完整枚举 {scan_us:,.0f} µs "
+              f"（模拟平台不含 EnumWindows 和读取标题的系统调用，真实环境差距更大）")
+        ok = ok and index_us * 10 < scan_us and source.enumerations == enumerations + 20
+        guardian.stop_window_index()
+
+        # 枚举期间窗口变化
+        racing_platform = SimPlatform()
+        racing_pids = populate(racing_platform, 1000, random.Random(9))
+        hwnds = list(racing_platform.windows)
+
+        def during():
+            racing_platform.add_window(racing_pids["WeChat.exe"], "ChatWnd", "李四")
+            racing_platform.set_window_title(hwnds[0], "财务报表")
+            racing_platform.destroy_window(hwnds[-1])
+            racing_platform.show_window(hwnds[-2], False)
+
+        racing_guardian = WeChatGuardian(config_store=store, platform=racing_platform, metrics=MetricsRegistry())
+        racing_platform.window_events = RacingSource(racing_platform, during)
+        racing_guardian.start_window_index()
+        racing_index = racing_guardian.window_index
+        expected = sorted(full_scan(racing_guardian, SimWindowSource(racing_platform)))
+        consistent = sorted(racing_index.visible_protected()) == expected and len(racing_index) == len(racing_platform.windows)
+        print(f"枚举期间发生 {racing_index.events} 个窗口事件，枚举完成后与当前状态一致：{consistent}")
+        ok = ok and consistent and racing_index.events == 5
+
+        # 规则变化后重新判断
+        store.update({"protected_apps": [{"name": "微信", "exe": "WeChat.exe"}]}, immediate=True)
+        remaining = racing_guardian.visible_protected_windows()
+        print(f"规则改为只保护微信后：{len(remaining)} 个可见的受保护窗口")
+        ok = ok and remaining and all(window.name == "WeChat.exe" for window in remaining)
+        racing_guardian.stop_window_index()
+
+    return 0 if ok else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
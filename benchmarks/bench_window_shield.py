@@ -0,0 +1,248 @@
+"""
+进入守护模式时遮挡受保护窗口的基准测试（使用模拟平台和虚拟时钟，可在任意平台运行）
+
+主人在浏览器中工作，背后开着微信主窗口、几个单独的聊天窗口、朋友圈和小程序，然后离开。
+每次试验随机决定入侵者何时到来、是否点开微信，比较：
+- 被动锁定（默认）：内容一直可见，直到有人把微信切到前台才锁定，"进入守护到内容不可见"取决于入侵者
+- 进入守护时遮挡（guard_hide_windows 为 minimize / hide）：进入守护模式时一次性遮挡，耗时有上限
+并验证：遮挡只提交一批；入侵者从任务栏恢复窗口时仍会锁定；验证身份后按原来的层叠顺序、位置和
+最小化状态恢复，期间关闭的窗口跳过、期间新打开的窗口不受影响；
+企业微信单独设置了更长的空闲时间阈值时，进入守护模式时只遮挡微信，企业微信到达自己的阈值后才遮挡。
+
+用法: python benchmarks/bench_window_shield.py [--trials 200]
+"""
+import os
+import sys
+import random
+import logging
+import argparse
+import statistics
+import tempfile
+
+root_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, root_dir)
+
+from src.config_store import ConfigStore
+from src.metrics import MetricsRegistry
+from src.scheduler import IdleScheduler
+from src.simulation import SimPlatform
+from src.wechat_guardian import WeChatGuardian, START_GUARDIAN, INTRUSION
+
+IDLE_THRESHOLD = 60
+
+
+def layout(platform, rng, chats):
+    """
+    :return: (浏览器 (hwnd, pid), 微信 pid, [受保护窗口], 预先最小化的聊天窗口)
+    """
+    chrome = platform.add_process("chrome.exe")
+    wechat = platform.add_process("WeChat.exe")
+    platform.add_window(wechat, "TrayIconMessageWindow", "", visible=False)
+    protected = [platform.add_window(wechat, "WeChatMainWndForPC", "微信", rect=(100, 100, 900, 700))]
+    for i in range(chats):
+        rect = (rng.randrange(0, 1000), rng.randrange(0, 600), 500, 600)
+        protected.append(platform.add_window(wechat, "ChatWnd", f"联系人{i}", rect=rect))
+    protected.append(platform.add_window(wechat, "SnsWnd", "朋友圈", rect=(300, 50, 450, 800)))
+    protected.append(platform.add_window(wechat, "Chrome_WidgetWin_0", "小程序", rect=(600, 80, 400, 700)))
+    minimized = protected[1]
+    platform.minimized.add(minimized)
+    # 打乱微信窗口之间的层叠顺序
+    for hwnd in rng.sample(protected, len(protected)):
+        platform.raise_window(hwnd)
+    browser = platform.add_window(chrome, "Chrome_WidgetWin_1", "新闻", rect=(0, 0, 1920, 1040))
+    return (browser, chrome), wechat, protected, minimized
+
+
+def snapshot(platform, hwnds):
+    """
+    受保护窗口之间的层叠顺序和各自的位置、最小化、隐藏状态
+    """
+    alive = set(hwnds) & set(platform.windows)
+    order = [hwnd for hwnd in platform.zorder if hwnd in alive]
+    return order, {hwnd: (platform.rects[hwnd], hwnd in platform.minimized, hwnd in platform.hidden) for hwnd in alive}
+
+
+def trial(mode, seed, chats):
+    """
+    :return: 统计信息
+    """
+    rng = random.Random(seed)
+    platform = SimPlatform()
+    clock = platform.clock
+    (browser, chrome), wechat, protected, minimized = layout(platform, rng, chats)
+    platform.foreground.switch_at(0.0, browser, chrome)
+
+    work = rng.uniform(60, 600)
+    platform.idle.add_activity(0, work)
+    entry_due = work + IDLE_THRESHOLD
+    arrive = entry_due + rng.uniform(10, 900)
+    # 一半的入侵者只看屏幕，另一半在 3 秒后点开一个聊天窗口
+    clicks = rng.random() < 0.5
+    target = protected[2]
+    owner_back = arrive + 120
+    platform.idle.add_inputs([arrive, owner_back])
+
+    with tempfile.TemporaryDirectory() as tmp:
+        store = ConfigStore(os.path.join(tmp, 'config.json'), debounce=0)
+        store.update({"idle_time": IDLE_THRESHOLD, "guard_hide_windows": mode}, immediate=True)
+        guardian = WeChatGuardian(config_store=store, platform=platform, metrics=MetricsRegistry())
+        scheduler = IdleScheduler(clock=clock)
+        guardian.on_wechat_activated = lambda info: scheduler.wake()
+        if guardian.start_foreground_events():
+            scheduler.guard_check_interval = None
+        guardian.start_window_index()
+        backend_batches = []
+        stats = {'entered': None, 'protected_at': None, 'locked_at': None}
+        before = snapshot(platform, protected)
+        conceal = guardian.conceal_protected_windows
+
+        def timed_conceal(policy=None):
+            # 从决定进入守护模式（开始遮挡）计时
+            stats['entered'] = clock.now()
+            result = conceal(policy)
+            if result is not None:
+                backend_batches.append(guardian.window_shield.backend.batches)
+                if all(guardian.window_shield.backend.is_concealed(hwnd, mode) for hwnd in protected):
+                    stats['protected_at'] = clock.now()
+            return result
+
+        guardian.conceal_protected_windows = timed_conceal
+
+        def on_cycle(result):
+            if result.event == INTRUSION and stats['locked_at'] is None:
+                stats['locked_at'] = clock.now()
+
+        def click():
+            # 最小化时从任务栏点开；隐藏时窗口不在任务栏上，入侵者无从点开
+            if mode == 'hide':
+                return
+            platform.minimized.discard(target)
+            platform.raise_window(target)
+            platform.foreground._switch(target, wechat)
+
+        if clicks:
+            clock.call_at(arrive + 3, click)
+        # 守护期间：一个聊天窗口被关闭，一条新消息弹出新的聊天窗口
+        closed = protected[-3]
+        clock.call_at(entry_due + 5, lambda: platform.destroy_window(closed))
+        popup = []
+        clock.call_at(entry_due + 6, lambda: popup.append(
+            platform.add_window(wechat, "ChatWnd", "新消息", rect=(1400, 700, 400, 300))))
+        clock.call_at(owner_back, scheduler.stop)
+        guardian.run_loop(scheduler, on_cycle)
+
+        # 主人回来，验证身份后停止守护
+        guardian.stop_guardian(manual=True)
+        after = snapshot(platform, protected)
+        guardian.stop_window_index()
+        guardian.stop_foreground_events()
+
+    entered = stats['entered']
+    if stats['protected_at'] is not None:
+        exposed = stats['protected_at'] - entered
+    elif stats['locked_at'] is not None:
+        # 被动锁定只锁定被点开的窗口，其余窗口仍然可见；这里只按第一次锁定计算，结果偏乐观
+        exposed = stats['locked_at'] - entered
+    else:
+        exposed = owner_back - entered
+    expected = ([hwnd for hwnd in before[0] if hwnd != closed],
+                {hwnd: state for hwnd, state in before[1].items() if hwnd != closed})
+    return {
+        'exposed': exposed,
+        'locked': stats['locked_at'] is not None,
+        'clicked': clicks and mode != 'hide',
+        'restored': after == expected,
+        'popup_untouched': bool(popup) and popup[0] not in platform.minimized and popup[0] not in platform.hidden,
+        'batches': backend_batches[0] if backend_batches else 0,
+    }
+
+
+def staged_trial(mode, app_idle_time=600):
+    """
+    企业微信的阈值为 app_idle_time，高于进入守护模式的阈值
+    :return: (进入守护模式时企业微信是否仍可见, 企业微信被遮挡时已空闲的秒数)
+    """
+    platform = SimPlatform()
+    clock = platform.clock
+    chrome = platform.add_process("chrome.exe")
+    wechat = platform.add_process("WeChat.exe")
+    wxwork = platform.add_process("WXWork.exe")
+    chat = platform.add_window(wechat, "WeChatMainWndForPC", "微信")
+    work = platform.add_window(wxwork, "WeWorkWindow", "企业微信")
+    browser = platform.add_window(chrome, "Chrome_WidgetWin_1", "新闻")
+    platform.foreground.switch_at(0.0, browser, chrome)
+    platform.idle.add_activity(0, 100)
+    last_input = platform.idle.inputs[-1]
+    platform.idle.add_inputs([last_input + 1800])
+
+    with tempfile.TemporaryDirectory() as tmp:
+        store = ConfigStore(os.path.join(tmp, 'config.json'), debounce=0)
+        store.update({
+            "idle_time": IDLE_THRESHOLD, "guard_hide_windows": mode,
+            "protected_apps": [{"name": "微信", "exe": "WeChat.exe"},
+                               {"name": "企业微信", "exe": "WXWork.exe", "idle_time": app_idle_time}],
+        }, immediate=True)
+        guardian = WeChatGuardian(config_store=store, platform=platform, metrics=MetricsRegistry())
+        scheduler = IdleScheduler(clock=clock)
+        if guardian.start_foreground_events():
+            scheduler.guard_check_interval = None
+        guardian.start_window_index()
+        backend = guardian.platform.create_shield_backend()
+        stats = {'work_visible_at_entry': None, 'work_concealed_after': None}
+
+        def on_cycle(result):
+            concealed = backend.is_concealed
+            if result.event == START_GUARDIAN:
+                stats['work_visible_at_entry'] = concealed(chat, mode) and not concealed(work, mode)
+            elif stats['work_concealed_after'] is None and concealed(work, mode):
+                stats['work_concealed_after'] = clock.now() - last_input
+
+        clock.call_at(last_input + 1800, scheduler.stop)
+        guardian.run_loop(scheduler, on_cycle)
+        guardian.stop_window_index()
+        guardian.stop_foreground_events()
+    return stats['work_visible_at_entry'], stats['work_concealed_after']
+
+
+def summarize(values):
+    values = sorted(values)
+    p95 = values[min(len(values) - 1, int(len(values) * 0.95))]
+    return statistics.mean(values), p95, values[-1]
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--trials', type=int, default=200)
+    parser.add_argument('--chats', type=int, default=6, help='单独打开的聊天窗口数量')
+    args = parser.parse_args()
+    logging.disable(logging.CRITICAL)
+    ok = True
+
+    print(f"{args.trials} 次离开，{args.chats + 3} 个受保护窗口，空闲阈值 {IDLE_THRESHOLD} 秒")
+    print(f"{'方式':<14}{'进入守护到内容不可见：平均':>26}{'p95':>12}{'最大':>12}{'锁定/点开':>12}{'恢复正确':>10}")
+    for label, mode in (("被动锁定", None), ("最小化", "minimize"), ("隐藏", "hide")):
+        results = [trial(mode, seed, args.chats) for seed in range(args.trials)]
+        mean, p95, worst = summarize([r['exposed'] for r in results])
+        clicked = sum(r['clicked'] for r in results)
+        locked = sum(r['locked'] for r in results if r['clicked'])
+        restored = sum(r['restored'] for r in results)
+        unit, scale = ("秒", 1) if mode is None else ("毫秒", 1000)
+        restored = f"{restored}/{len(results)}" if mode is not None else "-"
+        print(f"{label:<14}{mean * scale:>22.1f} {unit:<3}{p95 * scale:>9.1f} {unit:<3}{worst * scale:>8.1f} {unit:<3}"
+              f"{locked:>6}/{clicked:<5}{restored:>10}")
+        ok = ok and locked == clicked
+        if mode is not None:
+            ok = (ok and worst < 0.5 and all(r['restored'] for r in results)
+                  and all(r['popup_untouched'] and r['batches'] == 1 for r in results))
+
+    for label, mode in (("最小化", "minimize"), ("隐藏", "hide")):
+        staged, after = staged_trial(mode)
+        shown = f"{after:.1f}" if after is not None else "未遮挡"
+        print(f"企业微信阈值 600 秒（{label}）：进入守护时只遮挡微信 {'是' if staged else '否'}，"
+              f"企业微信在空闲 {shown} 秒时遮挡")
+        ok = ok and staged and after is not None and 600 <= after < 601
+    return 0 if ok else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
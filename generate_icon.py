@@ -21,5 +21,18 @@ def create_icon(color='gray'):
     # 保存为图标文件
     img.save('src/icon/app_icon.ico', format='ICO', sizes=[(16, 16), (32, 32)])
 
+def create_tray_icons():
+    """
+    预先生成托盘图标，程序启动时直接读取，不再导入 PIL 渲染
+    """
+    from src.icon_generator import IconGenerator
+    from src.tray_icons import ICON_STATES, image_to_ico_bytes
+    
+    os.makedirs('src/icon', exist_ok=True)
+    for state in ICON_STATES:
+        with open(f'src/icon/tray_{state}.ico', 'wb') as f:
+            f.write(image_to_ico_bytes(IconGenerator.create_icon(state), 16))
+
 if __name__ == '__main__':
-    create_icon() 
\ No newline at end of file
+    create_icon()
+    create_tray_icons()
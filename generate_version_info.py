@@ -1,9 +1,14 @@
 from PyInstaller.utils.win32.versioninfo import *
+from src.version import __version__
+
+# 版本号统一来自 src/version.py，补齐为四段
+numbers = tuple((list(int(part) for part in __version__.split('.')) + [0, 0, 0, 0])[:4])
+version_string = '.'.join(str(n) for n in numbers)
 
 version_info = VSVersionInfo(
     ffi=FixedFileInfo(
-        filevers=(0, 3, 0, 0),
-        prodvers=(0, 3, 0, 0),
+        filevers=numbers,
+        prodvers=numbers,
         mask=0x3f,
         flags=0x0,
         OS=0x40004,
@@ -19,12 +24,12 @@ version_info = VSVersionInfo(
                     [
                         StringStruct(u'CompanyName', u'个人开发'),
                         StringStruct(u'FileDescription', u'WeChat Guardian - 微信守护程序'),
-                        StringStruct(u'FileVersion', u'0.3.0.0'),
+                        StringStruct(u'FileVersion', version_string),
                         StringStruct(u'InternalName', u'WeChatGuard'),
                         StringStruct(u'LegalCopyright', u'(C) 2024 个人开发'),
                         StringStruct(u'OriginalFilename', u'WeChatGuard.exe'),
                         StringStruct(u'ProductName', u'WeChat Guardian'),
-                        StringStruct(u'ProductVersion', u'0.3.0.0')
+                        StringStruct(u'ProductVersion', version_string)
                     ]
                 )
             ]
@@ -35,4 +40,8 @@ version_info = VSVersionInfo(
 
 # 使用 UTF-8 编码写入文件
 with open('version_info.txt', 'w', encoding='utf-8') as f:
-    f.write(str(version_info)) 
\ No newline at end of file
+    f.write(str(version_info))
+
+# version.txt 供旧版本（0.3.4 及以前）检查更新，与当前版本保持一致
+with open('version.txt', 'w', encoding='utf-8') as f:
+    f.write(__version__) 
\ No newline at end of file
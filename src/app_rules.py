@@ -0,0 +1,222 @@
+import re
+import logging
+import threading
+from collections import OrderedDict
+
+# 默认受保护的程序
+DEFAULT_PROTECTED_APPS = [
+    {"name": "微信", "exe": "WeChat.exe"},
+    {"name": "微信 4.x", "exe": "Weixin.exe"},
+    {"name": "企业微信", "exe": "WXWork.exe"},
+]
+
+# 规则字段：字段名 -> (匹配对象, 是否为正则, 是否忽略大小写)
+RULE_FIELDS = {
+    'exe': ('exe', False, True),
+    'exe_regex': ('exe', True, True),
+    'path': ('path', False, True),
+    'path_regex': ('path', True, True),
+    'window_class': ('window_class', False, False),
+    'class_regex': ('window_class', True, False),
+    'title': ('title', False, False),
+    'title_regex': ('title', True, False),
+}
+TARGETS = ('exe', 'path', 'window_class', 'title')
+
+
+def _normalize(target, value):
+    if value is None:
+        return None
+    return value.lower() if target in ('exe', 'path') else value
+
+
+class _CompoundRule:
+    """
+    含多个条件的规则，所有条件都满足才匹配
+    """
+
+    def __init__(self, name, conditions):
+        self.name = name
+        # [(匹配对象, 精确值或编译后的正则, 是否为正则)]
+        self.conditions = conditions
+
+    def match(self, values):
+        for target, expected, is_regex in self.conditions:
+            value = values[target]
+            if value is None:
+                return False
+            if is_regex:
+                if not expected.search(value):
+                    return False
+            elif value != expected:
+                return False
+        return True
+
+
+class ProtectedAppRules:
+    """
+    编译后的受保护程序规则
+
+    每条规则由一个或多个条件组成（进程名、路径、窗口类名、标题，精确值或正则），条件全部满足时匹配。
+    编译时：
+    - 只有一个精确条件的规则放入对应字段的字典，匹配只需一次哈希查找
+    - 只有一个正则条件的规则按字段合并为一个预编译正则
+    - 多条件规则按其中的精确进程名建立索引，没有精确进程名的逐条检查
+    精确条件的查找与规则数无关；合并后的正则仍按分支逐个尝试，没有精确进程名的多条件规则逐条检查，
+    因此缓存未命中时的耗时随正则规则和这类多条件规则的数量线性增长（O(规则数)）。
+    匹配结果按窗口特征缓存（最近最少使用淘汰），常见情况下每次检查只需一次字典查找。
+    缓存键只包含规则实际用到的字段：没有按标题匹配的规则时不含标题，
+    微信聊天窗口的标题随联系人变化，不会让每个聊天窗口各占一个缓存条目。
+    """
+
+    def __init__(self, rules=None, cache_size=512):
+        """
+        :param rules: 规则列表，默认使用 DEFAULT_PROTECTED_APPS
+        :param cache_size: 匹配结果缓存条数，超出时淘汰最久未使用的条目
+        """
+        self.rules = list(DEFAULT_PROTECTED_APPS if rules is None else rules)
+        self.cache_size = cache_size
+        self._exact = {target: {} for target in TARGETS}
+        self._regex = {}
+        self._by_exe = {}
+        self._compound = []
+        self._cache = OrderedDict()
+        self._lock = threading.Lock()
+        self.needs_path = False
+        self.needs_window_info = False
+        self.needs_class = False
+        self.needs_title = False
+        # 单独配置了空闲时间阈值的规则：规则名称 -> 秒（always 为 0）
+        self.idle_times = {}
+        self._compile()
+
+    @classmethod
+    def from_config(cls, config):
+        """
+        从配置的 protected_apps 字段创建规则
+        """
+        return cls(config.get("protected_apps") or None)
+
+    def _compile(self):
+        regex_parts = {target: [] for target in TARGETS}
+        regex_names = {}
+        for index, rule in enumerate(self.rules):
+            name = rule.get('name') or f"规则{index + 1}"
+            if rule.get('always'):
+                self.idle_times[name] = 0
+            elif rule.get('idle_time') is not None:
+                try:
+                    idle_time = float(rule['idle_time'])
+                    if idle_time < 0:
+                        raise ValueError
+                    self.idle_times[name] = idle_time
+                except (TypeError, ValueError):
+                    logging.error(f"受保护程序规则 {name} 的空闲时间阈值无效: {rule['idle_time']}")
+            conditions = []
+            for field, value in rule.items():
+                if field not in RULE_FIELDS or not value:
+                    continue
+                target, is_regex, ignore_case = RULE_FIELDS[field]
+                if is_regex:
+                    try:
+                        compiled = re.compile(value, re.IGNORECASE if ignore_case else 0)
+                    except re.error as e:
+                        logging.error(f"受保护程序规则 {name} 的正则无效: {str(e)}")
+                        conditions = []
+                        break
+                    conditions.append((target, compiled, True, value, ignore_case))
+                else:
+                    conditions.append((target, _normalize(target, value), False, value, ignore_case))
+
+            if not conditions:
+                continue
+            for target, *_ in conditions:
+                if target == 'path':
+                    self.needs_path = True
+                elif target == 'window_class':
+                    self.needs_class = self.needs_window_info = True
+                elif target == 'title':
+                    self.needs_title = self.needs_window_info = True
+
+            if len(conditions) == 1:
+                target, expected, is_regex, source, ignore_case = conditions[0]
+                if is_regex:
+                    group = f"r{index}"
+                    flags = '(?i:' if ignore_case else '(?:'
+                    regex_parts[target].append(f"(?P<{group}>{flags}{source}))")
+                    regex_names[group] = name
+                else:
+                    self._exact[target].setdefault(expected, name)
+                continue
+
+            compound = _CompoundRule(name, [(t, e, r) for t, e, r, _, _ in conditions])
+            exe = next((e for t, e, r, _, _ in conditions if t == 'exe' and not r), None)
+            if exe is not None:
+                self._by_exe.setdefault(exe, []).append(compound)
+            else:
+                self._compound.append(compound)
+
+        for target, parts in regex_parts.items():
+            if parts:
+                self._regex[target] = re.compile('|'.join(parts))
+        self._regex_names = regex_names
+
+    def match(self, exe, path=None, window_class=None, title=None):
+        """
+        检查窗口是否属于受保护程序
+        :return: 匹配的规则名称，不匹配时返回 None
+        """
+        # 没有规则用到的字段不影响匹配结果，不放入缓存键
+        if not self.needs_path:
+            path = None
+        if not self.needs_class:
+            window_class = None
+        if not self.needs_title:
+            title = None
+        key = (exe, path, window_class, title)
+        cache = self._cache
+        try:
+            result = cache[key]
+            # 命中的条目移到末尾，淘汰时从最久未使用的开始；
+            # 两步之间条目可能被其他线程淘汰，此时按未命中处理
+            cache.move_to_end(key)
+        except KeyError:
+            pass
+        else:
+            return result
+
+        result = self._match(exe, path, window_class, title)
+        with self._lock:
+            cache[key] = result
+            if len(cache) > self.cache_size:
+                cache.popitem(last=False)
+        return result
+
+    def _match(self, exe, path, window_class, title):
+        values = {
+            'exe': _normalize('exe', exe),
+            'path': _normalize('path', path),
+            'window_class': window_class,
+            'title': title,
+        }
+        for target in TARGETS:
+            value = values[target]
+            if value is None:
+                continue
+            name = self._exact[target].get(value)
+            if name is not None:
+                return name
+        for compound in self._by_exe.get(values['exe'], ()):
+            if compound.match(values):
+                return compound.name
+        for target, pattern in self._regex.items():
+            value = values[target]
+            if value is None:
+                continue
+            m = pattern.search(value)
+            if m:
+                return self._regex_names[m.lastgroup]
+        for compound in self._compound:
+            if compound.match(values):
+                return compound.name
+        return None
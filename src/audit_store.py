@@ -0,0 +1,311 @@
+import os
+import time
+import queue
+import logging
+import threading
+from collections import namedtuple
+
+# 一次入侵记录：发生时间（Unix 时间戳）、入侵前已空闲的秒数、进程名、窗口标题、匹配的规则、
+# 是否确认锁定、锁定尝试次数、锁定耗时（秒）、从窗口激活到检测到的耗时（秒，未知时为 None）
+IntrusionEvent = namedtuple('IntrusionEvent', [
+    'timestamp', 'idle_seconds', 'process', 'window_title', 'rule',
+    'locked', 'lock_attempts', 'lock_latency', 'detection_latency'
+])
+
+DEFAULT_RETENTION_DAYS = 365
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS intrusions (
+    id INTEGER PRIMARY KEY,
+    ts REAL NOT NULL,
+    idle_seconds REAL,
+    process TEXT,
+    window_title TEXT,
+    rule TEXT,
+    locked INTEGER NOT NULL,
+    lock_attempts INTEGER,
+    lock_latency REAL,
+    detection_latency REAL
+);
+CREATE INDEX IF NOT EXISTS intrusions_ts ON intrusions (ts);
+CREATE TRIGGER IF NOT EXISTS intrusions_append_only BEFORE UPDATE ON intrusions
+BEGIN
+    SELECT RAISE(ABORT, 'intrusions is append-only');
+END;
+"""
+
+_COLUMNS = ', '.join(IntrusionEvent._fields).replace('timestamp', 'ts')
+_INSERT = f"INSERT INTO intrusions ({_COLUMNS}) VALUES ({', '.join('?' * len(IntrusionEvent._fields))})"
+
+
+def default_audit_path():
+    """
+    审计数据库与配置文件位于同一目录
+    """
+    from src.config_store import default_config_path
+    return os.path.join(os.path.dirname(default_config_path()), 'audit.db')
+
+
+class AuditStore:
+    """
+    只追加的入侵审计存储（SQLite，WAL 模式）
+
+    - append() 只把事件放入队列，检测线程不接触磁盘
+    - 后台写入线程把队列中的事件合并为一个事务批量写入
+    - 按时间建索引，任意时间范围的查询只扫描命中的行
+    - 超过保留天数的记录在启动时和之后每天清理一次；其余记录不可修改
+    数据库触发器只禁止 UPDATE，不禁止 DELETE：程序中唯一的删除是保留策略的清理，
+    能直接打开数据库文件的人仍然可以删除记录。
+    """
+
+    def __init__(self, path=None, retention_days=DEFAULT_RETENTION_DAYS, batch_size=256,
+                 flush_interval=1.0, max_pending=10000, clock=time.time):
+        """
+        :param path: 数据库文件路径，默认与配置文件同目录
+        :param retention_days: 保留天数，None 或 0 表示永久保留
+        :param batch_size: 单个事务最多写入的事件数
+        :param flush_interval: 有待写入事件时最长等待多久写入（秒）
+        :param max_pending: 队列上限，写入跟不上时丢弃新事件而不是阻塞检测线程
+        :param clock: 当前时间函数（用于保留策略）
+        """
+        self.path = path or default_audit_path()
+        self.retention_days = retention_days
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.clock = clock
+        self.written = 0
+        self.dropped = 0
+        self.batches = 0
+        self.purged = 0
+        self._queue = queue.Queue(maxsize=max_pending)
+        self._next_retention = 0
+        self._writer = None
+
+        with self._connect() as conn:
+            conn.executescript(_SCHEMA)
+
+    def _connect(self):
+        # 守护器导入本模块时不加载 sqlite3，打开存储时才加载
+        import sqlite3
+        conn = sqlite3.connect(self.path, timeout=10, check_same_thread=False)
+        conn.execute("PRAGMA journal_mode=WAL")
+        # WAL 模式下 NORMAL 只在检查点时同步，断电最多丢失最后几次提交
+        conn.execute("PRAGMA synchronous=NORMAL")
+        return conn
+
+    def start(self):
+        """
+        启动后台写入线程
+        """
+        if self._writer:
+            return
+        self._writer = threading.Thread(target=self._run, daemon=True)
+        self._writer.start()
+
+    def append(self, event):
+        """
+        记录一次入侵，可在任意线程调用，不会阻塞
+        :param event: IntrusionEvent
+        :return: 是否已放入队列
+        """
+        try:
+            self._queue.put_nowait(event)
+            return True
+        except queue.Full:
+            self.dropped += 1
+            logging.warning("审计写入队列已满，丢弃入侵记录")
+            return False
+
+    def flush(self, timeout=None):
+        """
+        等待已提交的事件全部写入
+        :return: 是否在超时前写完
+        """
+        if self._writer is None:
+            # 未启动写入线程时在当前线程写入
+            conn = self._connect()
+            try:
+                self._write_pending(conn)
+            finally:
+                conn.close()
+            return True
+        done = threading.Event()
+        try:
+            self._queue.put(done, timeout=timeout)
+        except queue.Full:
+            return False
+        return done.wait(timeout)
+
+    def close(self):
+        """
+        写完剩余事件后停止写入线程
+        """
+        if self._writer is None:
+            return
+        self._queue.put(None)
+        self._writer.join(10)
+        self._writer = None
+
+    def _run(self):
+        conn = self._connect()
+        try:
+            self._apply_retention(conn)
+            while True:
+                try:
+                    # 长时间没有入侵时也要按时清理过期记录
+                    item = self._queue.get(timeout=max(self._next_retention - self.clock(), 1))
+                except queue.Empty:
+                    self._apply_retention(conn)
+                    continue
+                batch, waiters, stop = [], [], False
+                deadline = time.monotonic() + self.flush_interval
+                while True:
+                    if item is None:
+                        stop = True
+                    elif isinstance(item, threading.Event):
+                        waiters.append(item)
+                    else:
+                        batch.append(item)
+                    if stop or waiters or len(batch) >= self.batch_size:
+                        break
+                    # 等待更多事件一起写入，但不超过 flush_interval
+                    remaining = deadline - time.monotonic()
+                    try:
+                        item = self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait()
+                    except queue.Empty:
+                        break
+                if batch:
+                    self._write_batch(conn, batch)
+                for waiter in waiters:
+                    # 信号之前可能还有事件在队列中排在后面，一并写入；其中可能有 close() 的停止信号
+                    if self._write_pending(conn):
+                        stop = True
+                    waiter.set()
+                if self.clock() >= self._next_retention:
+                    self._apply_retention(conn)
+                if stop:
+                    self._write_pending(conn)
+                    return
+        except Exception as e:
+            logging.error(f"审计写入线程异常退出: {str(e)}")
+        finally:
+            conn.close()
+
+    def _write_pending(self, conn):
+        """
+        写入队列中剩余的事件
+        :return: 是否取到了 close() 的停止信号
+        """
+        batch, stop = [], False
+        while True:
+            try:
+                item = self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if item is None:
+                stop = True
+            elif isinstance(item, threading.Event):
+                item.set()
+            else:
+                batch.append(item)
+        for i in range(0, len(batch), self.batch_size):
+            self._write_batch(conn, batch[i:i + self.batch_size])
+        return stop
+
+    def _write_batch(self, conn, batch):
+        try:
+            with conn:
+                conn.executemany(_INSERT, batch)
+            self.written += len(batch)
+            self.batches += 1
+        except Exception as e:
+            logging.error(f"写入审计记录失败: {str(e)}")
+
+    def _apply_retention(self, conn):
+        """
+        删除超过保留天数的记录（程序中唯一删除记录的地方）
+        """
+        now = self.clock()
+        self._next_retention = now + 24 * 3600
+        if not self.retention_days:
+            return 0
+        try:
+            with conn:
+                cursor = conn.execute("DELETE FROM intrusions WHERE ts < ?", (now - self.retention_days * 86400,))
+            if cursor.rowcount:
+                self.purged += cursor.rowcount
+                logging.info(f"已清理 {cursor.rowcount} 条超过 {self.retention_days} 天的入侵记录")
+            return cursor.rowcount
+        except Exception as e:
+            logging.error(f"清理审计记录失败: {str(e)}")
+            return 0
+
+    def query(self, start=None, end=None, limit=None, newest_first=True):
+        """
+        按时间范围查询入侵记录（只查询已写入的记录，需要最新结果时先调用 flush()）
+        :param start: 起始时间戳（含），None 表示不限
+        :param end: 结束时间戳（不含），None 表示不限
+        :param limit: 最多返回的条数
+        :return: IntrusionEvent 列表
+        """
+        sql, params = self._range_sql(f"SELECT {_COLUMNS} FROM intrusions", start, end)
+        sql += " ORDER BY ts DESC" if newest_first else " ORDER BY ts"
+        if limit:
+            sql += " LIMIT ?"
+            params.append(int(limit))
+        conn = self._connect()
+        try:
+            return [IntrusionEvent(*row[:5], bool(row[5]), *row[6:]) for row in conn.execute(sql, params)]
+        finally:
+            conn.close()
+
+    def count(self, start=None, end=None):
+        sql, params = self._range_sql("SELECT COUNT(*) FROM intrusions", start, end)
+        conn = self._connect()
+        try:
+            return conn.execute(sql, params).fetchone()[0]
+        finally:
+            conn.close()
+
+    def _range_sql(self, sql, start, end):
+        conditions, params = [], []
+        if start is not None:
+            conditions.append("ts >= ?")
+            params.append(start)
+        if end is not None:
+            conditions.append("ts < ?")
+            params.append(end)
+        if conditions:
+            sql += " WHERE " + " AND ".join(conditions)
+        return sql, params
+
+
+def month_range(timestamp=None):
+    """
+    :return: 本地时间所在月份的 (起始时间戳, 下月起始时间戳)
+    """
+    t = time.localtime(timestamp)
+    start = time.mktime((t.tm_year, t.tm_mon, 1, 0, 0, 0, 0, 0, -1))
+    year, month = (t.tm_year + 1, 1) if t.tm_mon == 12 else (t.tm_year, t.tm_mon + 1)
+    return start, time.mktime((year, month, 1, 0, 0, 0, 0, 0, -1))
+
+
+def open_audit_store(config):
+    """
+    按配置打开并启动审计存储（audit 为 true 时启用，默认关闭：记录中的窗口标题可能含有聊天对象和联系人名称）
+    - audit_db：数据库路径，默认与配置文件同目录的 audit.db
+    - audit_retention_days：保留天数，默认 365，0 表示永久保留
+    :return: AuditStore 实例，不记录或打开失败时返回 None
+    """
+    if not config.get("audit", False):
+        return None
+    try:
+        store = AuditStore(
+            config.get("audit_db") or None,
+            retention_days=config.get("audit_retention_days", DEFAULT_RETENTION_DAYS)
+        )
+    except Exception as e:
+        logging.error(f"打开审计数据库失败: {str(e)}")
+        return None
+    store.start()
+    return store
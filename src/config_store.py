@@ -0,0 +1,254 @@
+import os
+import sys
+import json
+import logging
+import tempfile
+import threading
+from types import MappingProxyType
+from collections import namedtuple
+
+DEFAULT_CONFIG = {"idle_time": 10, "password": ""}
+
+# 不可变的配置快照：版本号、常用字段和只读的完整配置
+ConfigSnapshot = namedtuple('ConfigSnapshot', ['version', 'idle_time', 'data'])
+
+
+def default_config_path():
+    """
+    配置文件路径：打包后位于 exe 所在目录，源码运行时位于项目根目录，不再依赖当前工作目录
+    """
+    if getattr(sys, 'frozen', False):
+        base_dir = os.path.dirname(sys.executable)
+    else:
+        base_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    return os.path.join(base_dir, 'config.json')
+
+
+class ConfigStore:
+    """
+    进程内唯一的配置存储
+
+    - snapshot 为不可变快照，热循环直接读取其字段，无需加锁
+    - update() 立即更新快照，写文件和通知订阅者经过防抖合并
+    - 写文件先写临时文件再重命名，不会留下写了一半的配置
+    - 通过文件修改时间感知外部对配置文件的编辑
+    """
+
+    def __init__(self, path=None, debounce=0.5, timer=threading.Timer):
+        """
+        :param path: 配置文件路径，默认使用 default_config_path()
+        :param debounce: 写入防抖时间（秒）
+        :param timer: 防抖定时器工厂，参数为 (秒, 回调)，返回提供 start()/cancel() 的对象，默认使用 threading.Timer
+        """
+        self.path = path or default_config_path()
+        self.debounce = debounce
+        self.timer = timer
+        self._lock = threading.RLock()
+        self._listeners = []
+        self._timer = None
+        self._dirty = False
+        self._file_stamp = None
+        self._watcher = None
+        self._stop_watching = threading.Event()
+        self._snapshot = self._make_snapshot(self._read_file(), 0)
+
+    @property
+    def snapshot(self):
+        return self._snapshot
+
+    @property
+    def config(self):
+        """
+        当前配置的只读视图
+        """
+        return self._snapshot.data
+
+    def get(self, key, default=None):
+        return self._snapshot.data.get(key, default)
+
+    def subscribe(self, listener):
+        """
+        订阅配置变化
+        :param listener: 回调函数，参数为 ConfigSnapshot
+        """
+        with self._lock:
+            self._listeners.append(listener)
+
+    def unsubscribe(self, listener):
+        with self._lock:
+            if listener in self._listeners:
+                self._listeners.remove(listener)
+
+    def update(self, changes, immediate=False):
+        """
+        修改配置
+        :param changes: 要修改的键值
+        :param immediate: 是否立即写入文件并通知，否则在 debounce 秒内合并多次修改
+        :return: 立即写入时返回是否写入成功，否则返回 True
+        """
+        with self._lock:
+            data = dict(self._snapshot.data)
+            data.update(changes)
+            self._snapshot = self._make_snapshot(data, self._snapshot.version + 1)
+            self._dirty = True
+            if self._timer:
+                self._timer.cancel()
+                self._timer = None
+            flush_now = immediate or not self.debounce
+            if not flush_now:
+                self._timer = self.timer(self.debounce, self.flush)
+                self._timer.daemon = True
+                self._timer.start()
+        if flush_now:
+            return self.flush()
+        return True
+
+    def flush(self):
+        """
+        立即写入未保存的修改并通知订阅者
+        :return: 是否写入成功
+        """
+        with self._lock:
+            if self._timer:
+                self._timer.cancel()
+                self._timer = None
+            if not self._dirty:
+                return True
+            try:
+                self._write_file(dict(self._snapshot.data))
+            except Exception as e:
+                logging.error(f"保存配置失败: {str(e)}")
+                return False
+            self._dirty = False
+            snapshot = self._snapshot
+        self._notify(snapshot)
+        return True
+
+    def reload_if_changed(self):
+        """
+        配置文件被外部修改时重新加载
+        :return: 是否重新加载
+        """
+        with self._lock:
+            stamp = self._stat()
+            if stamp == self._file_stamp or self._dirty:
+                return False
+            data = self._read_file()
+            if data == dict(self._snapshot.data):
+                return False
+            self._snapshot = self._make_snapshot(data, self._snapshot.version + 1)
+            snapshot = self._snapshot
+        logging.info("检测到配置文件被修改，已重新加载")
+        self._notify(snapshot)
+        return True
+
+    def start_watching(self, interval=5.0):
+        """
+        在后台线程中监视配置文件的外部修改
+        Windows 上等待目录变化通知，其他平台每 interval 秒检查一次修改时间
+        """
+        if self._watcher:
+            return
+        self._stop_watching.clear()
+        self._watcher = threading.Thread(target=self._watch, args=(interval,), daemon=True)
+        self._watcher.start()
+
+    def stop_watching(self):
+        self._stop_watching.set()
+        self._watcher = None
+
+    def _watch(self, interval):
+        wait = self._change_waiter(interval)
+        while not self._stop_watching.is_set():
+            wait()
+            try:
+                self.reload_if_changed()
+            except Exception as e:
+                logging.error(f"重新加载配置失败: {str(e)}")
+
+    def _change_waiter(self, interval):
+        """
+        :return: 阻塞到配置目录可能发生变化的等待函数
+        """
+        try:
+            import win32file
+            import win32event
+            import win32con
+            handle = win32file.FindFirstChangeNotification(
+                os.path.dirname(os.path.abspath(self.path)), False,
+                win32con.FILE_NOTIFY_CHANGE_LAST_WRITE | win32con.FILE_NOTIFY_CHANGE_FILE_NAME
+            )
+
+            def wait():
+                win32event.WaitForSingleObject(handle, int(interval * 1000))
+                win32file.FindNextChangeNotification(handle)
+            return wait
+        except Exception:
+            return lambda: self._stop_watching.wait(interval)
+
+    def _notify(self, snapshot):
+        for listener in list(self._listeners):
+            try:
+                listener(snapshot)
+            except Exception as e:
+                logging.error(f"配置更新回调失败: {str(e)}")
+
+    def _make_snapshot(self, data, version):
+        try:
+            idle_time = int(data.get("idle_time", DEFAULT_CONFIG["idle_time"]))
+        except (TypeError, ValueError):
+            idle_time = DEFAULT_CONFIG["idle_time"]
+        return ConfigSnapshot(version, idle_time, MappingProxyType(dict(data)))
+
+    def _stat(self):
+        try:
+            st = os.stat(self.path)
+            return (st.st_mtime_ns, st.st_size)
+        except OSError:
+            return None
+
+    def _read_file(self):
+        """
+        读取配置文件，缺失或损坏时返回默认配置
+        """
+        self._file_stamp = self._stat()
+        try:
+            if os.path.exists(self.path):
+                with open(self.path, 'r', encoding='utf-8') as f:
+                    return {**DEFAULT_CONFIG, **json.load(f)}
+        except Exception as e:
+            logging.error(f"加载配置失败: {str(e)}")
+        return dict(DEFAULT_CONFIG)
+
+    def _write_file(self, data):
+        """
+        原子写入：先写同目录下的临时文件，再重命名覆盖
+        """
+        directory = os.path.dirname(os.path.abspath(self.path))
+        fd, temp_path = tempfile.mkstemp(prefix='.config.', suffix='.tmp', dir=directory)
+        try:
+            with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                json.dump(data, f, indent=4, ensure_ascii=False)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(temp_path, self.path)
+        except Exception:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+            raise
+        self._file_stamp = self._stat()
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_config_store():
+    """
+    获取进程内唯一的配置存储
+    """
+    global _store
+    with _store_lock:
+        if _store is None:
+            _store = ConfigStore()
+        return _store
@@ -0,0 +1,235 @@
+import os
+import sys
+import signal
+import logging
+import argparse
+
+# 以脚本方式运行（或打包为独立程序）时也能导入 src 包
+root_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if root_dir not in sys.path:
+    sys.path.insert(0, root_dir)
+
+from src.logging_setup import setup_logging, apply_logger_levels, stop_logging
+from src.config_store import ConfigStore, get_config_store
+from src.scheduler import IdleScheduler
+from src.supervisor import DetectionSupervisor
+from src.metrics import start_exporters
+from src.memory_report import register_memory_metrics, start_memory_report
+from src.wechat_guardian import WeChatGuardian, START_GUARDIAN, INTRUSION
+
+
+class GuardianDaemon:
+    """
+    无界面守护进程
+
+    只运行空闲检测、前台窗口检测和锁定，不加载 tkinter、不创建托盘图标和警告窗口，
+    适用于只需要强制锁定的共享电脑。通过配置和信号控制：
+    - 配置 guard_paused 为 true 时暂停守护，改回 false 后恢复（配置文件修改会被自动感知）
+    - Ctrl+C / SIGTERM / 关闭控制台 / 注销 / 关机：退出
+    - SIGHUP（Windows 下为 Ctrl+Break）：立即重新加载配置并在日志中输出当前状态
+    - SIGUSR1：在日志中输出当前状态
+
+    停止守护进程需要能向它发送信号（同一用户或管理员），因此不再询问密码。
+    """
+
+    def __init__(self, config_store=None, platform=None, metrics=None):
+        """
+        :param config_store: 配置存储，默认使用进程内唯一的 ConfigStore
+        :param platform: 平台实现，默认使用当前操作系统的实现
+        :param metrics: 指标注册表，默认使用进程内唯一的注册表
+        """
+        self.store = config_store or get_config_store()
+        self.guardian = WeChatGuardian(config_store=self.store, platform=platform, metrics=metrics)
+        self.scheduler = IdleScheduler(clock=self.guardian.platform.clock)
+        self.guardian.on_wechat_activated = lambda info: self.scheduler.wake()
+        self.guardian.on_session_changed = self._on_session_changed
+        self.supervisor = DetectionSupervisor(self.guardian, self.scheduler, self._on_cycle)
+        self.paused = False
+        self.exporters = []
+        self.memory_reporter = None
+        self.fleet_reporter = None
+        self._apply_config(self.store.snapshot)
+        self.store.subscribe(self._on_config_changed)
+
+    def _apply_config(self, snapshot):
+        paused = bool(snapshot.data.get("guard_paused", False))
+        if paused != self.paused:
+            logging.info("守护已暂停" if paused else "守护已恢复")
+            self.report_state('paused' if paused else 'idle')
+        self.paused = paused
+        if paused:
+            # 暂停时不检测，检测循环一直休眠到配置变化或退出
+            self.supervisor.pause()
+            self.guardian.is_guarding = False
+            # 能修改配置文件即视为已验证身份，恢复遮挡的窗口
+            self.guardian.restore_protected_windows()
+        else:
+            self.supervisor.resume()
+        apply_logger_levels(snapshot.data.get("log_levels"))
+
+    def _on_config_changed(self, snapshot):
+        """
+        配置变化（可能在配置监视线程中调用）
+        """
+        self._apply_config(snapshot)
+        # 阈值或暂停状态变化会改变下一次唤醒时刻
+        self.scheduler.wake()
+
+    def _on_session_changed(self, active):
+        """
+        会话暂停或恢复（通知线程）
+        """
+        if active and not self.guardian.is_guarding and not self.paused:
+            self.report_state('idle')
+        self.scheduler.wake()
+
+    def install_signal_handlers(self):
+        """
+        安装退出和重新加载配置的信号处理（必须在主线程中调用）
+        """
+        if sys.platform == 'win32':
+            # 主线程阻塞在等待中时 Python 信号处理函数不会执行，
+            # 控制台控制事件由系统在单独的线程中回调，可以直接唤醒守护循环
+            try:
+                import win32api
+                win32api.SetConsoleCtrlHandler(self._on_console_ctrl, True)
+            except Exception as e:
+                logging.warning(f"注册控制台事件处理失败: {str(e)}")
+        else:
+            signal.signal(signal.SIGHUP, lambda signum, frame: self.reload())
+            signal.signal(signal.SIGUSR1, lambda signum, frame: self.log_status())
+        signal.signal(signal.SIGINT, lambda signum, frame: self.stop())
+        signal.signal(signal.SIGTERM, lambda signum, frame: self.stop())
+
+    def _on_console_ctrl(self, event):
+        # CTRL_BREAK_EVENT 为 1，其余（Ctrl+C、关闭控制台、注销、关机）均退出
+        if event == 1:
+            self.reload()
+        else:
+            self.stop()
+        return True
+
+    def reload(self):
+        """
+        立即重新加载配置文件
+        """
+        if not self.store.reload_if_changed():
+            logging.info("配置文件未变化")
+        self.log_status()
+
+    def log_status(self):
+        logging.info(
+            f"守护进程状态：{'暂停' if self.paused else '运行'}，"
+            f"守护模式：{self.guardian.is_guarding}，空闲阈值：{self.guardian.current_idle_threshold()}秒（{self.guardian.current_policy().name}），"
+            f"唤醒次数：{self.scheduler.wakeups}"
+        )
+
+    def stop(self):
+        """
+        退出守护进程，可在任意线程调用
+        """
+        self.supervisor.stop()
+
+    def run(self):
+        """
+        运行守护循环，直到 stop() 被调用
+        """
+        if not self.guardian.is_admin():
+            logging.warning("未以管理员权限运行，可能无法锁定以管理员权限运行的微信")
+        if self.guardian.start_foreground_events():
+            self.scheduler.guard_check_interval = None
+        self.guardian.start_window_index()
+        self.guardian.start_session_events()
+        self.store.start_watching()
+        register_memory_metrics(self.guardian.metrics)
+        self.exporters = start_exporters(self.guardian.metrics, self.store.config)
+        self.memory_reporter = start_memory_report(self.store.config)
+        # 审计记录、截图和汇总上报与主程序一样推迟到启动时才导入
+        from src.audit_store import open_audit_store
+        from src.evidence import start_evidence_capture
+        from src.fleet import start_fleet_reporter
+        self.guardian.audit_store = open_audit_store(self.store.config)
+        self.guardian.evidence_capture = start_evidence_capture(self.store.config)
+        self.fleet_reporter = start_fleet_reporter(self.store.config)
+        self.report_state('paused' if self.paused else 'idle')
+        logging.info(f"无界面守护进程已启动，空闲时间阈值：{self.guardian.current_idle_threshold()}秒")
+        try:
+            # 检测循环在主线程中运行，信号处理和控制台事件通过 stop() 唤醒它
+            self.supervisor.run()
+        finally:
+            self.cleanup()
+
+    def report_state(self, state):
+        """
+        向汇总服务上报守护状态变化，未配置时忽略
+        """
+        if self.fleet_reporter:
+            self.fleet_reporter.report_state(state)
+
+    def _on_cycle(self, result):
+        if result.event == START_GUARDIAN:
+            logging.info(f"系统已空闲 {result.idle_time:.1f} 秒，进入守护模式")
+            self.report_state('guarding')
+        elif result.event == INTRUSION:
+            intrusion = result.intrusion
+            if self.fleet_reporter and intrusion:
+                self.fleet_reporter.report_intrusion(intrusion)
+            self.report_state('idle')
+            if intrusion:
+                logging.warning(f"守护模式下检测到 {intrusion.process}（{intrusion.window_title}）被打开，"
+                                f"{'已锁定' if intrusion.locked else '未能确认锁定'}")
+            else:
+                logging.warning("守护模式下检测到微信被打开，已锁定")
+
+    def cleanup(self):
+        # 退出后无人恢复，隐藏的窗口不能留在隐藏状态
+        self.guardian.restore_protected_windows()
+        self.guardian.stop_foreground_events()
+        self.guardian.stop_window_index()
+        self.guardian.stop_session_events()
+        self.store.unsubscribe(self._on_config_changed)
+        self.store.stop_watching()
+        self.store.flush()
+        for exporter in self.exporters:
+            exporter.stop()
+        self.exporters = []
+        if self.memory_reporter:
+            self.memory_reporter.stop()
+            self.memory_reporter = None
+        if self.guardian.audit_store:
+            self.guardian.audit_store.close()
+            self.guardian.audit_store = None
+        if self.guardian.evidence_capture:
+            self.guardian.evidence_capture.stop()
+            self.guardian.evidence_capture = None
+        if self.fleet_reporter:
+            self.fleet_reporter.stop()
+            self.fleet_reporter = None
+        logging.info(f"进程缓存统计: {self.guardian.process_cache.stats()}")
+        logging.info("无界面守护进程已退出")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="微信守护无界面模式")
+    parser.add_argument('--config', help="配置文件路径，默认与主程序相同")
+    parser.add_argument('--log', default='wechat_guardian.log', help="日志文件路径")
+    parser.add_argument('--console', action='store_true', help="同时把日志输出到控制台")
+    args = parser.parse_args(argv)
+
+    listener = setup_logging(args.log, console=args.console)
+    try:
+        store = ConfigStore(args.config) if args.config else get_config_store()
+        daemon = GuardianDaemon(config_store=store)
+        daemon.install_signal_handlers()
+        daemon.run()
+    except Exception as e:
+        logging.critical(f"无界面守护进程启动失败: {e}")
+        print(f"无界面守护进程启动失败: {e}", file=sys.stderr)
+        return 1
+    finally:
+        stop_logging(listener)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,325 @@
+import io
+import os
+import time
+import zlib
+import queue
+import struct
+import logging
+import tempfile
+import threading
+from collections import deque, namedtuple
+
+# 原始屏幕图像：宽、高、按行排列的 RGB 字节（每像素 3 字节）
+Frame = namedtuple('Frame', ['width', 'height', 'data'])
+
+DEFAULT_QUOTA_MB = 100
+DEFAULT_MAX_WIDTH = 1280
+SCREENSHOT_EXTENSIONS = ('.jpg', '.png')
+
+
+class ScreenSource:
+    """
+    屏幕截图来源
+    """
+
+    def grab(self):
+        """
+        :return: PIL.Image 或 Frame
+        """
+        raise NotImplementedError
+
+
+class ImageGrabSource(ScreenSource):
+    """
+    通过 PIL.ImageGrab 截取整个屏幕
+    """
+
+    def grab(self):
+        from PIL import ImageGrab
+        return ImageGrab.grab()
+
+
+def downscale_frame(frame, max_width):
+    """
+    按整数步长最近邻缩小，宽度不超过 max_width
+    :return: Frame
+    """
+    step = -(-frame.width // max_width)
+    if step <= 1:
+        return frame
+    stride = frame.width * 3
+    width = len(range(0, frame.width, step))
+    rows = []
+    for y in range(0, frame.height, step):
+        row = frame.data[y * stride:(y + 1) * stride]
+        out = bytearray(width * 3)
+        # 逐通道按步长取样后交错写回，避免逐像素的 Python 循环
+        out[0::3] = row[0::3 * step]
+        out[1::3] = row[1::3 * step]
+        out[2::3] = row[2::3 * step]
+        rows.append(bytes(out))
+    return Frame(width, len(rows), b''.join(rows))
+
+
+def encode_png(frame, level=6):
+    """
+    把 Frame 编码为 PNG（纯 Python 实现，未安装 Pillow 时使用）
+    """
+    def chunk(kind, body):
+        return struct.pack('>I', len(body)) + kind + body + struct.pack('>I', zlib.crc32(kind + body))
+
+    stride = frame.width * 3
+    # 每行前加过滤类型 0（不过滤）
+    raw = b''.join(b'\x00' + frame.data[y * stride:(y + 1) * stride] for y in range(frame.height))
+    header = struct.pack('>IIBBBBB', frame.width, frame.height, 8, 2, 0, 0, 0)
+    return (b'\x89PNG\r\n\x1a\n' + chunk(b'IHDR', header)
+            + chunk(b'IDAT', zlib.compress(raw, level)) + chunk(b'IEND', b''))
+
+
+def encode_screenshot(image, max_width=DEFAULT_MAX_WIDTH, quality=70):
+    """
+    缩小并压缩截图，优先使用 Pillow 输出 JPEG，未安装时输出 PNG
+    :param image: PIL.Image 或 Frame
+    :return: (文件内容, 扩展名)
+    """
+    try:
+        from PIL import Image
+    except ImportError:
+        Image = None
+    if Image is None:
+        if not isinstance(image, Frame):
+            raise RuntimeError("未安装 Pillow，无法处理截图")
+        return encode_png(downscale_frame(image, max_width)), '.png'
+
+    if isinstance(image, Frame):
+        image = Image.frombytes('RGB', (image.width, image.height), image.data)
+    if image.width > max_width:
+        image = image.resize((max_width, max(1, round(image.height * max_width / image.width))), Image.BILINEAR)
+    buffer = io.BytesIO()
+    image.convert('RGB').save(buffer, 'JPEG', quality=quality, optimize=True)
+    return buffer.getvalue(), '.jpg'
+
+
+def default_evidence_dir():
+    """
+    截图目录与配置文件位于同一目录
+    """
+    from src.config_store import default_config_path
+    return os.path.join(os.path.dirname(default_config_path()), 'evidence')
+
+
+class EvidenceCapture:
+    """
+    入侵截图取证
+
+    - capture() 只把请求放入有界队列，检测线程不截图、不编码、不写盘；队列满时丢弃请求
+    - 工作线程依次截图，缩小、压缩后原子写入截图目录；缩小和编码大部分时间持有 GIL，
+      多个工作线程没有稳定的吞吐提升（见 bench_evidence_capture），默认只用一个
+    - 截图目录总大小超过配额时从最早的截图开始删除
+    """
+
+    def __init__(self, source=None, directory=None, quota_bytes=DEFAULT_QUOTA_MB * 1024 * 1024,
+                 max_width=DEFAULT_MAX_WIDTH, workers=1, max_pending=4, encoder=encode_screenshot):
+        """
+        :param source: ScreenSource，默认通过 PIL.ImageGrab 截图
+        :param directory: 截图目录，默认与配置文件同目录的 evidence
+        :param quota_bytes: 截图总大小上限（字节）
+        :param max_width: 保存的截图最大宽度（像素）
+        :param workers: 工作线程数；多于一个时只有截图本身串行，缩小和编码可以并行
+        :param max_pending: 等待截图的请求上限
+        :param encoder: 编码函数 (image, max_width) -> (文件内容, 扩展名)
+        """
+        self.source = source or ImageGrabSource()
+        self.directory = directory or default_evidence_dir()
+        self.quota_bytes = quota_bytes
+        self.max_width = max_width
+        self.encoder = encoder
+        self.workers = workers
+        self.requested = 0
+        self.captured = 0
+        self.dropped = 0
+        self.failed = 0
+        self.evicted = 0
+        self._queue = queue.Queue(maxsize=max_pending)
+        self._threads = []
+        self._grab_lock = threading.Lock()
+        self._store_lock = threading.Lock()
+        self._files = deque()
+        self._total = 0
+        self._idle = threading.Condition()
+        self._busy = 0
+
+        os.makedirs(self.directory, exist_ok=True)
+        self._scan()
+
+    def _scan(self):
+        """
+        读取已有截图，按时间从旧到新排列
+        """
+        files = []
+        for name in os.listdir(self.directory):
+            if not name.endswith(SCREENSHOT_EXTENSIONS):
+                continue
+            path = os.path.join(self.directory, name)
+            try:
+                stat = os.stat(path)
+            except OSError:
+                continue
+            files.append((stat.st_mtime, name, path, stat.st_size))
+        files.sort()
+        self._files = deque((path, size) for _, _, path, size in files)
+        self._total = sum(size for _, size in self._files)
+
+    @property
+    def total_bytes(self):
+        return self._total
+
+    @property
+    def file_count(self):
+        return len(self._files)
+
+    def start(self):
+        """
+        启动工作线程
+        """
+        if self._threads:
+            return
+        for i in range(self.workers):
+            thread = threading.Thread(target=self._run, name=f'evidence-{i}', daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+    def stop(self, timeout=5):
+        """
+        处理完已排队的请求后停止工作线程
+        """
+        for _ in self._threads:
+            self._queue.put(None)
+        for thread in self._threads:
+            thread.join(timeout)
+        self._threads = []
+
+    def capture(self, timestamp=None):
+        """
+        请求截图，可在任意线程调用，不会阻塞
+        :param timestamp: 入侵时间（Unix 时间戳），用作文件名，便于与入侵记录对应
+        :return: 是否已放入队列
+        """
+        self.requested += 1
+        try:
+            with self._idle:
+                self._busy += 1
+            self._queue.put_nowait(time.time() if timestamp is None else timestamp)
+            return True
+        except queue.Full:
+            self._done()
+            self.dropped += 1
+            logging.warning("截图队列已满，丢弃本次截图")
+            return False
+
+    def wait_idle(self, timeout=None):
+        """
+        等待所有已排队的截图处理完成
+        :return: 是否在超时前完成
+        """
+        with self._idle:
+            return self._idle.wait_for(lambda: self._busy == 0, timeout)
+
+    def _done(self):
+        with self._idle:
+            self._busy -= 1
+            if self._busy == 0:
+                self._idle.notify_all()
+
+    def _run(self):
+        while True:
+            timestamp = self._queue.get()
+            if timestamp is None:
+                return
+            try:
+                self._process(timestamp)
+            except Exception as e:
+                self.failed += 1
+                logging.error(f"保存入侵截图失败: {str(e)}")
+            finally:
+                self._done()
+
+    def _process(self, timestamp):
+        with self._grab_lock:
+            image = self.source.grab()
+        data, extension = self.encoder(image, self.max_width)
+        del image
+        name = time.strftime('%Y%m%d-%H%M%S', time.localtime(timestamp)) + f'-{int(timestamp * 1000) % 1000:03d}'
+        path = os.path.join(self.directory, name + extension)
+        suffix = 1
+        while os.path.exists(path):
+            path = os.path.join(self.directory, f'{name}-{suffix}{extension}')
+            suffix += 1
+        self._write(path, data)
+        with self._store_lock:
+            self._files.append((path, len(data)))
+            self._total += len(data)
+            self._evict()
+        self.captured += 1
+
+    def _write(self, path, data):
+        """
+        原子写入截图文件
+        """
+        fd, temp_path = tempfile.mkstemp(prefix='.evidence.', suffix='.tmp', dir=self.directory)
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                f.write(data)
+            os.replace(temp_path, path)
+        except Exception:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+            raise
+
+    def _evict(self):
+        """
+        超出配额时从最早的截图开始删除（调用方持有 _store_lock）
+        """
+        while self._total > self.quota_bytes and len(self._files) > 1:
+            path, size = self._files.popleft()
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            except OSError as e:
+                logging.error(f"删除旧截图失败: {str(e)}")
+                self._files.appendleft((path, size))
+                return
+            self._total -= size
+            self.evicted += 1
+
+
+def start_evidence_capture(config, source=None):
+    """
+    按配置启动入侵截图（evidence 为 true 时启用，默认关闭）
+    - evidence_dir：截图目录，默认与配置文件同目录的 evidence
+    - evidence_quota_mb：截图总大小上限（MB），默认 100
+    - evidence_max_width：保存的截图最大宽度，默认 1280
+    :return: EvidenceCapture 实例，未启用、没有 PIL 或启动失败时返回 None
+    """
+    if not config.get("evidence", False):
+        return None
+    if source is None:
+        try:
+            from PIL import ImageGrab
+        except ImportError:
+            # 无界面版本不打包 PIL，启动时明确说明，而不是每次入侵都截图失败
+            logging.error("入侵截图需要 Pillow（PIL.ImageGrab），当前程序未包含，已禁用入侵截图")
+            return None
+    try:
+        capture = EvidenceCapture(
+            source,
+            directory=config.get("evidence_dir") or None,
+            quota_bytes=int(float(config.get("evidence_quota_mb", DEFAULT_QUOTA_MB)) * 1024 * 1024),
+            max_width=int(config.get("evidence_max_width", DEFAULT_MAX_WIDTH))
+        )
+    except Exception as e:
+        logging.error(f"启动入侵截图失败: {str(e)}")
+        return None
+    capture.start()
+    return capture
@@ -0,0 +1,374 @@
+import os
+import json
+import gzip
+import time
+import uuid
+import socket
+import random
+import logging
+import tempfile
+import threading
+from collections import deque
+from src.version import __version__
+
+DEFAULT_FLUSH_INTERVAL = 30
+DEFAULT_HEARTBEAT_INTERVAL = 300
+DEFAULT_SPOOL_MB = 10
+# 发送失败后的重试间隔：从 MIN_BACKOFF 开始翻倍，最多 MAX_BACKOFF，并加随机抖动，
+# 避免汇总服务重启后所有电脑同时重发
+MIN_BACKOFF = 5
+MAX_BACKOFF = 600
+
+
+def http_post(url, body, headers, timeout):
+    """
+    发送 POST 请求
+    :return: 状态码
+    """
+    import urllib.request
+    import urllib.error
+    request = urllib.request.Request(url, data=body, headers=headers, method='POST')
+    try:
+        with urllib.request.urlopen(request, timeout=timeout) as response:
+            response.read()
+            return response.status
+    except urllib.error.HTTPError as e:
+        return e.code
+
+
+def default_spool_dir():
+    """
+    待发送批次目录与配置文件位于同一目录
+    """
+    from src.config_store import default_config_path
+    return os.path.join(os.path.dirname(default_config_path()), 'fleet_spool')
+
+
+class FleetReporter:
+    """
+    向汇总服务上报状态变化和入侵记录
+
+    - report_*() 只把事件追加到内存缓冲区，不访问网络
+    - 后台线程在攒够 batch_size 个事件或距第一个未发送事件超过 flush_interval 时，把事件打包成一个批次，
+      gzip 压缩后 POST 到汇总服务；没有事件时每 heartbeat_interval 发送一次只含当前状态的心跳
+    - 发送失败时批次写入磁盘暂存目录，按指数退避重试，恢复后按从旧到新的顺序补发完再发送新的批次；
+      暂存目录超过上限时删除最早的批次
+    - 每个批次带有进程实例 ID 和序号，重发的批次由汇总服务去重
+    """
+
+    def __init__(self, url, host=None, token=None, spool_dir=None, batch_size=200,
+                 flush_interval=DEFAULT_FLUSH_INTERVAL, heartbeat_interval=DEFAULT_HEARTBEAT_INTERVAL,
+                 max_spool_bytes=DEFAULT_SPOOL_MB * 1024 * 1024, timeout=10, post=http_post, clock=time.time):
+        """
+        :param url: 汇总服务地址，例如 http://10.0.0.5:9465/report
+        :param host: 本机名称，默认为计算机名
+        :param token: 与汇总服务约定的令牌，通过 X-Fleet-Token 请求头发送
+        :param spool_dir: 发送失败的批次暂存目录，默认与配置文件同目录的 fleet_spool
+        :param batch_size: 单个批次最多包含的事件数
+        :param flush_interval: 事件最长在内存中停留的时间（秒）
+        :param heartbeat_interval: 没有事件时发送心跳的间隔（秒）
+        :param max_spool_bytes: 暂存目录大小上限（字节）
+        :param post: 请求函数 (url, body, headers, timeout) -> 状态码
+        :param clock: 当前时间函数
+        """
+        self.url = url
+        self.host = host or socket.gethostname()
+        self.token = token
+        self.spool_dir = spool_dir or default_spool_dir()
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.heartbeat_interval = heartbeat_interval
+        self.max_spool_bytes = max_spool_bytes
+        self.timeout = timeout
+        self.post = post
+        self.clock = clock
+        self.agent_id = uuid.uuid4().hex
+        self.sent = 0
+        self.sent_bytes = 0
+        self.failures = 0
+        self.spooled = 0
+        self.discarded = 0
+
+        self.state = 'idle'
+        self.state_since = clock()
+        self.intrusions = 0
+        self._events = deque()
+        self._first_event_at = None
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread = None
+        self._seq = 0
+        self._backoff = 0
+        self._retry_at = 0
+        # 首次心跳随机错开，避免所有电脑同时上报
+        self._next_heartbeat = clock() + random.uniform(0, heartbeat_interval)
+        os.makedirs(self.spool_dir, exist_ok=True)
+
+    def report_state(self, state):
+        """
+        记录守护状态变化（guarding / idle / paused），可在任意线程调用
+        """
+        now = self.clock()
+        with self._lock:
+            if state == self.state:
+                return
+            self.state = state
+            self.state_since = now
+        self._append({'type': 'state', 'ts': now, 'state': state})
+
+    def report_intrusion(self, event):
+        """
+        记录一次入侵，可在任意线程调用
+        :param event: IntrusionEvent
+        """
+        with self._lock:
+            self.intrusions += 1
+        self._append(dict(event._asdict(), type='intrusion', ts=event.timestamp))
+
+    def _append(self, event):
+        with self._lock:
+            if not self._events:
+                self._first_event_at = self.clock()
+            self._events.append(event)
+            full = len(self._events) >= self.batch_size
+        if full:
+            self._wake.set()
+
+    def status(self):
+        """
+        :return: 本机当前状态，随每个批次发送
+        """
+        with self._lock:
+            return {'state': self.state, 'since': self.state_since, 'intrusions': self.intrusions}
+
+    def start(self):
+        if self._thread:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name='fleet-reporter', daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout=None):
+        """
+        停止后台线程，剩余事件写入暂存目录，下次启动后补发
+
+        退出时不访问网络：汇总服务不可达时逐个批次等待超时会拖住程序退出（主程序在界面线程中调用）
+        """
+        if self._thread:
+            self._stop.set()
+            self._wake.set()
+            self._thread.join(timeout if timeout is not None else self.timeout + 1)
+            self._thread = None
+        self.flush(spool_only=True)
+
+    def _run(self):
+        while not self._stop.is_set():
+            self._wake.wait(self._next_wakeup())
+            self._wake.clear()
+            if self._stop.is_set():
+                return
+            try:
+                self.tick()
+            except Exception as e:
+                logging.error(f"上报状态失败: {str(e)}")
+
+    def _next_wakeup(self):
+        now = self.clock()
+        due = self._next_heartbeat
+        if self._first_event_at is not None:
+            due = min(due, self._first_event_at + self.flush_interval)
+        if self._backoff:
+            due = max(due, self._retry_at)
+        return max(due - now, 0.05)
+
+    def tick(self):
+        """
+        按时间决定是否发送：有到期的事件或心跳时先补发暂存的批次，再发送新的批次
+        """
+        now = self.clock()
+        with self._lock:
+            pending = len(self._events)
+            first = self._first_event_at
+        due = pending >= self.batch_size or (pending and now - first >= self.flush_interval)
+        if not due and now < self._next_heartbeat:
+            return
+        if self._backoff and now < self._retry_at:
+            # 等待重试期间事件攒够一个批次就写入暂存目录，内存中不会无限增长
+            while pending >= self.batch_size:
+                self._spool(self._make_batch())
+                pending -= self.batch_size
+            return
+        self.flush()
+
+    def flush(self, spool_only=False):
+        """
+        先按从旧到新的顺序补发暂存的批次，再立即发送内存中的事件（没有事件时发送心跳）
+        :param spool_only: 不发送，直接写入暂存目录
+        :return: 是否全部发送成功
+        """
+        batches = [self._make_batch()]
+        while len(self._events):
+            batches.append(self._make_batch())
+        if spool_only:
+            for batch in batches:
+                if batch['events']:
+                    self._spool(batch)
+            return False
+        # 暂存的批次更早，先补发完再发送新的批次，汇总服务按发生顺序收到事件
+        if not self._drain_spool():
+            for batch in batches:
+                if batch['events']:
+                    self._spool(batch)
+            return False
+        for i, batch in enumerate(batches):
+            if not self._send(self._encode(batch)):
+                # 剩余批次全部暂存，按退避时间重试；心跳不暂存
+                for rest in batches[i:]:
+                    if rest['events']:
+                        self._spool(rest)
+                return False
+        return True
+
+    def _make_batch(self):
+        now = self.clock()
+        with self._lock:
+            events = [self._events.popleft() for _ in range(min(self.batch_size, len(self._events)))]
+            self._first_event_at = now if self._events else None
+            self._seq += 1
+            seq = self._seq
+        self._next_heartbeat = now + self.heartbeat_interval
+        return {
+            'host': self.host, 'agent': self.agent_id, 'seq': seq, 'version': __version__,
+            'created_at': now, 'status': self.status(), 'events': events,
+        }
+
+    def _encode(self, batch):
+        return gzip.compress(json.dumps(batch, ensure_ascii=False, separators=(',', ':')).encode('utf-8'))
+
+    def _send(self, body):
+        """
+        :return: 是否发送成功（被汇总服务拒绝的批次也视为已处理，不再重试）
+        """
+        headers = {
+            'Content-Type': 'application/json',
+            'Content-Encoding': 'gzip',
+            'User-Agent': f'WeChatGuard/{__version__}',
+        }
+        if self.token:
+            headers['X-Fleet-Token'] = self.token
+        try:
+            status = self.post(self.url, body, headers, self.timeout)
+        except Exception as e:
+            status = None
+            logging.debug(f"上报失败: {str(e)}")
+        if status is not None and 200 <= status < 300:
+            self.sent += 1
+            self.sent_bytes += len(body)
+            self._backoff = 0
+            return True
+        if status is not None and 400 <= status < 500 and status not in (408, 429):
+            self.discarded += 1
+            logging.error(f"汇总服务拒绝了上报批次: HTTP {status}")
+            return True
+        self.failures += 1
+        self._backoff = min(MAX_BACKOFF, max(MIN_BACKOFF, self._backoff * 2))
+        self._retry_at = self.clock() + self._backoff * random.uniform(0.5, 1.0)
+        if self._backoff == MIN_BACKOFF:
+            logging.warning(f"无法连接汇总服务，{self._backoff} 秒后重试: HTTP {status}")
+        return False
+
+    def _spool(self, batch):
+        """
+        原子写入暂存目录，超过上限时删除最早的批次
+        """
+        name = f"{batch['created_at']:017.6f}-{batch['agent']}-{batch['seq']:08d}.json.gz"
+        try:
+            fd, temp_path = tempfile.mkstemp(prefix='.batch.', suffix='.tmp', dir=self.spool_dir)
+            try:
+                with os.fdopen(fd, 'wb') as f:
+                    f.write(self._encode(batch))
+                os.replace(temp_path, os.path.join(self.spool_dir, name))
+            except Exception:
+                if os.path.exists(temp_path):
+                    os.remove(temp_path)
+                raise
+            self.spooled += 1
+        except Exception as e:
+            logging.error(f"写入上报暂存文件失败: {str(e)}")
+            return
+        files = self._spooled_files()
+        total = sum(size for _, size in files)
+        for path, size in files:
+            if total <= self.max_spool_bytes:
+                break
+            try:
+                os.remove(path)
+                total -= size
+                self.discarded += 1
+            except OSError:
+                pass
+
+    def _spooled_files(self):
+        """
+        :return: 暂存的批次 [(路径, 大小)]，从旧到新
+        """
+        files = []
+        for name in sorted(os.listdir(self.spool_dir)):
+            if name.endswith('.json.gz'):
+                path = os.path.join(self.spool_dir, name)
+                try:
+                    files.append((path, os.path.getsize(path)))
+                except OSError:
+                    pass
+        return files
+
+    def pending_spool(self):
+        return len(self._spooled_files())
+
+    def _drain_spool(self):
+        """
+        按从旧到新的顺序补发暂存的批次，遇到失败即停止
+        """
+        for path, _ in self._spooled_files():
+            try:
+                with open(path, 'rb') as f:
+                    body = f.read()
+            except OSError:
+                continue
+            if not self._send(body):
+                return False
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+        return True
+
+
+def start_fleet_reporter(config):
+    """
+    按配置启动状态上报（配置了 fleet_url 时启用）
+    - fleet_token：与汇总服务约定的令牌
+    - fleet_host：上报使用的本机名称，默认为计算机名
+    - fleet_flush_interval / fleet_heartbeat_interval：事件最长停留时间和心跳间隔（秒）
+    - fleet_spool_dir / fleet_spool_mb：发送失败的批次暂存目录和大小上限
+    :return: FleetReporter 实例，未启用时返回 None
+    """
+    url = config.get("fleet_url")
+    if not url:
+        return None
+    try:
+        reporter = FleetReporter(
+            url,
+            host=config.get("fleet_host") or None,
+            token=config.get("fleet_token") or None,
+            spool_dir=config.get("fleet_spool_dir") or None,
+            flush_interval=float(config.get("fleet_flush_interval", DEFAULT_FLUSH_INTERVAL)),
+            heartbeat_interval=float(config.get("fleet_heartbeat_interval", DEFAULT_HEARTBEAT_INTERVAL)),
+            max_spool_bytes=int(float(config.get("fleet_spool_mb", DEFAULT_SPOOL_MB)) * 1024 * 1024)
+        )
+    except Exception as e:
+        logging.error(f"启动状态上报失败: {str(e)}")
+        return None
+    reporter.start()
+    return reporter
@@ -0,0 +1,301 @@
+import os
+import sys
+import json
+import gzip
+import hmac
+import time
+import logging
+import argparse
+import threading
+from collections import deque
+
+# 以脚本方式运行时也能导入 src 包
+root_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if root_dir not in sys.path:
+    sys.path.insert(0, root_dir)
+
+DEFAULT_COLLECTOR_PORT = 9465
+# 单个请求压缩后和解压后的大小上限，防止异常或恶意的请求占满内存
+MAX_BODY_BYTES = 1024 * 1024
+MAX_DECOMPRESSED_BYTES = 16 * 1024 * 1024
+
+
+class FleetCollector:
+    """
+    汇总各电脑上报的批次，维护每台电脑的最新状态
+
+    - 每台电脑只保存一份状态（dict），批次按实例 ID 和序号去重，重发不会重复计数
+    - 暂存后补发的旧批次只累加入侵次数，不会覆盖更新的状态
+    - 超过 offline_after 秒没有收到任何批次的电脑视为离线
+    """
+
+    def __init__(self, offline_after=900, recent_intrusions=1000, dedup_window=64, clock=time.time):
+        """
+        :param offline_after: 多久没有上报视为离线（秒），应大于上报端心跳间隔的两倍
+        :param recent_intrusions: 保留最近多少条入侵记录
+        :param dedup_window: 每台电脑记住最近多少个批次用于去重
+        """
+        self.offline_after = offline_after
+        self.dedup_window = dedup_window
+        self.clock = clock
+        self.batches = 0
+        self.duplicates = 0
+        self.events = 0
+        self._hosts = {}
+        self._seen = {}
+        self._recent = deque(maxlen=recent_intrusions)
+        self._lock = threading.Lock()
+
+    def ingest(self, batch, address=None):
+        """
+        处理一个上报批次，可在多个线程中同时调用
+        :param batch: 上报端发送的批次（dict）
+        :param address: 上报端地址
+        :return: 是否为新批次（重复的批次返回 False）
+        """
+        host = str(batch['host'])
+        key = (batch['agent'], int(batch['seq']))
+        created_at = float(batch['created_at'])
+        events = batch.get('events') or []
+        status = batch.get('status') or {}
+        now = self.clock()
+        intrusions = [event for event in events if event.get('type') == 'intrusion']
+
+        with self._lock:
+            seen = self._seen.get(host)
+            if seen is None:
+                seen = self._seen[host] = (set(), deque())
+            keys, order = seen
+            if key in keys:
+                self.duplicates += 1
+                return False
+            keys.add(key)
+            order.append(key)
+            if len(order) > self.dedup_window:
+                keys.discard(order.popleft())
+
+            record = self._hosts.get(host)
+            if record is None:
+                record = self._hosts[host] = {
+                    'host': host, 'state': None, 'state_since': None, 'version': None, 'address': None,
+                    'first_seen': now, 'last_seen': now, 'status_at': (0, 0), 'batches': 0, 'events': 0,
+                    'intrusions': 0, 'last_intrusion': None,
+                }
+            record['last_seen'] = now
+            record['batches'] += 1
+            record['events'] += len(events)
+            record['intrusions'] += len(intrusions)
+            if address:
+                record['address'] = address
+            # 补发的旧批次不覆盖更新的状态（同一时刻生成的批次按序号比较）
+            if (created_at, key[1]) > record['status_at']:
+                record['status_at'] = (created_at, key[1])
+                record['state'] = status.get('state', record['state'])
+                record['state_since'] = status.get('since', record['state_since'])
+                record['version'] = batch.get('version', record['version'])
+            for event in intrusions:
+                if record['last_intrusion'] is None or event.get('ts', 0) >= record['last_intrusion'].get('ts', 0):
+                    record['last_intrusion'] = event
+                self._recent.append(dict(event, host=host))
+            self.batches += 1
+            self.events += len(events)
+        return True
+
+    def hosts(self):
+        """
+        :return: 所有电脑的状态列表（副本），按名称排序
+        """
+        now = self.clock()
+        with self._lock:
+            records = [dict(record) for record in self._hosts.values()]
+        for record in records:
+            record['online'] = now - record['last_seen'] <= self.offline_after
+        return sorted(records, key=lambda record: record['host'])
+
+    def summary(self):
+        """
+        :return: 在线、离线、守护中的电脑数量和入侵总数
+        """
+        hosts = self.hosts()
+        online = [record for record in hosts if record['online']]
+        return {
+            'hosts': len(hosts),
+            'online': len(online),
+            'offline': len(hosts) - len(online),
+            'guarding': sum(1 for record in online if record['state'] == 'guarding'),
+            'intrusions': sum(record['intrusions'] for record in hosts),
+            'batches': self.batches,
+            'duplicates': self.duplicates,
+            'events': self.events,
+        }
+
+    def recent_intrusions(self, limit=100):
+        with self._lock:
+            return list(self._recent)[-limit:][::-1]
+
+
+class CollectorServer:
+    """
+    汇总服务的 HTTP 端点
+
+    - POST /report：接收 gzip 压缩的 JSON 批次
+    - GET /summary、/hosts、/intrusions：以 JSON 返回汇总结果
+    """
+
+    def __init__(self, collector, host='127.0.0.1', port=DEFAULT_COLLECTOR_PORT, token=None):
+        """
+        :param host: 监听地址，默认只监听本机；供局域网内的电脑上报时设为 0.0.0.0 并配置 token
+        :param port: 端口，0 表示由系统分配
+        :param token: 令牌，配置后只接受 X-Fleet-Token 请求头一致的上报和查询
+        """
+        self.collector = collector
+        self.host = host
+        self.port = port
+        self.token = token
+        self.requests = 0
+        self.rejected = 0
+        self._server = None
+        self._thread = None
+
+    def start(self):
+        """
+        :return: 是否启动成功
+        """
+        if self._server:
+            return True
+        from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def _authorized(self):
+                # 常量时间比较，避免通过响应时间逐字节猜出令牌
+                token = (self.headers.get('X-Fleet-Token') or '').encode('utf-8')
+                if server.token and not hmac.compare_digest(token, server.token.encode('utf-8')):
+                    server.rejected += 1
+                    self._reply(401, {'error': 'unauthorized'})
+                    return False
+                return True
+
+            def _reply(self, status, data=None):
+                body = json.dumps(data, ensure_ascii=False).encode('utf-8') if data is not None else b''
+                self.send_response(status)
+                self.send_header('Content-Type', 'application/json; charset=utf-8')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def do_POST(self):
+                server.requests += 1
+                length = int(self.headers.get('Content-Length') or 0)
+                if self.path != '/report':
+                    self.send_error(404)
+                    return
+                if length <= 0 or length > MAX_BODY_BYTES:
+                    server.rejected += 1
+                    self.send_error(413 if length else 411)
+                    return
+                body = self.rfile.read(length)
+                if not self._authorized():
+                    return
+                try:
+                    if self.headers.get('Content-Encoding') == 'gzip':
+                        body = _gunzip(body, MAX_DECOMPRESSED_BYTES)
+                    batch = json.loads(body.decode('utf-8'))
+                    accepted = server.collector.ingest(batch, self.client_address[0])
+                except Exception as e:
+                    server.rejected += 1
+                    logging.warning(f"无法解析来自 {self.client_address[0]} 的上报: {str(e)}")
+                    self._reply(400, {'error': 'bad batch'})
+                    return
+                self._reply(200, {'accepted': accepted})
+
+            def do_GET(self):
+                server.requests += 1
+                path, _, query = self.path.partition('?')
+                if not self._authorized():
+                    return
+                if path == '/summary':
+                    self._reply(200, server.collector.summary())
+                elif path == '/hosts':
+                    self._reply(200, server.collector.hosts())
+                elif path == '/intrusions':
+                    limit = 100
+                    for part in query.split('&'):
+                        name, _, value = part.partition('=')
+                        if name == 'limit' and value.isdigit():
+                            limit = int(value)
+                    self._reply(200, server.collector.recent_intrusions(limit))
+                else:
+                    self.send_error(404)
+
+            def log_message(self, format, *args):
+                pass
+
+        class Server(ThreadingHTTPServer):
+            daemon_threads = True
+            # 大量电脑同时上报时加大监听队列（必须在创建监听套接字之前设置）
+            request_queue_size = 1024
+
+        try:
+            self._server = Server((self.host, self.port), Handler)
+        except OSError as e:
+            logging.error(f"汇总服务启动失败: {str(e)}")
+            return False
+        self.port = self._server.server_address[1]
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        if self.host not in ('127.0.0.1', 'localhost') and not self.token:
+            logging.warning("汇总服务监听非本机地址但未设置令牌，任何人都可以上报和查询")
+        logging.info(f"汇总服务已启动: http://{self.host}:{self.port}/report")
+        return True
+
+    def stop(self):
+        if self._server:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+            self._thread = None
+
+
+def _gunzip(body, limit):
+    """
+    解压 gzip 数据，超过 limit 字节时抛出异常
+    """
+    import io
+    with gzip.GzipFile(fileobj=io.BytesIO(body)) as f:
+        data = f.read(limit + 1)
+    if len(data) > limit:
+        raise ValueError("解压后数据过大")
+    return data
+
+
+def main(argv=None):
+    from src.logging_setup import setup_logging, stop_logging
+
+    parser = argparse.ArgumentParser(description="微信守护状态汇总服务")
+    parser.add_argument('--host', default='127.0.0.1', help="监听地址，供局域网内的电脑上报时设为 0.0.0.0")
+    parser.add_argument('--port', type=int, default=DEFAULT_COLLECTOR_PORT, help="监听端口")
+    parser.add_argument('--token', help="令牌，与各电脑配置的 fleet_token 一致")
+    parser.add_argument('--offline-after', type=float, default=900, help="多久没有上报视为离线（秒）")
+    parser.add_argument('--log', default='fleet_collector.log', help="日志文件路径")
+    args = parser.parse_args(argv)
+
+    listener = setup_logging(args.log, console=True)
+    server = CollectorServer(FleetCollector(offline_after=args.offline_after), args.host, args.port, args.token)
+    try:
+        if not server.start():
+            return 1
+        stop = threading.Event()
+        try:
+            while not stop.wait(60):
+                logging.info(f"汇总: {server.collector.summary()}")
+        except KeyboardInterrupt:
+            pass
+    finally:
+        server.stop()
+        stop_logging(listener)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
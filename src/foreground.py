@@ -0,0 +1,248 @@
+import logging
+import threading
+import bisect
+from collections import namedtuple
+
+# 前台窗口信息：窗口句柄、进程 ID、进程名
+ForegroundInfo = namedtuple('ForegroundInfo', ['hwnd', 'pid', 'name'])
+
+EVENT_SYSTEM_FOREGROUND = 0x0003
+WINEVENT_OUTOFCONTEXT = 0x0000
+WINEVENT_SKIPOWNPROCESS = 0x0002
+WM_QUIT = 0x0012
+
+
+def resolve_process_name(pid):
+    """
+    根据进程 ID 获取进程名
+    :param pid: 进程 ID
+    :return: 进程名，失败时返回 None
+    """
+    try:
+        import psutil
+        return psutil.Process(pid).name()
+    except Exception:
+        return None
+
+
+class ForegroundEventSource:
+    """
+    前台窗口变化事件源接口
+
+    start() 之后，每当前台窗口切换时调用 callback(ForegroundInfo)。
+    """
+
+    def start(self, callback):
+        """
+        开始推送前台窗口变化事件
+        :param callback: 回调函数，参数为 ForegroundInfo
+        :return: 是否启动成功
+        """
+        raise NotImplementedError
+
+    def stop(self):
+        """
+        停止推送事件
+        """
+        raise NotImplementedError
+
+
+class WinEventForegroundSource(ForegroundEventSource):
+    """
+    基于 SetWinEventHook(EVENT_SYSTEM_FOREGROUND) 的前台窗口事件源
+
+    在独立线程中安装钩子并运行消息循环，窗口切换之间不消耗任何 CPU。
+    """
+
+    def __init__(self, name_resolver=resolve_process_name):
+        """
+        :param name_resolver: 根据 pid 获取进程名的函数
+        """
+        self.name_resolver = name_resolver
+        self._callback = None
+        self._thread = None
+        self._thread_id = None
+        self._started = threading.Event()
+        self._ok = False
+
+    def start(self, callback):
+        self._callback = callback
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+        self._started.wait(2)
+        return self._ok
+
+    def stop(self):
+        if self._thread_id:
+            import ctypes
+            ctypes.windll.user32.PostThreadMessageW(self._thread_id, WM_QUIT, 0, 0)
+        self._thread_id = None
+
+    def _emit(self, hwnd):
+        import ctypes
+        from ctypes import wintypes
+        pid = wintypes.DWORD()
+        ctypes.windll.user32.GetWindowThreadProcessId(hwnd, ctypes.byref(pid))
+        self._callback(ForegroundInfo(hwnd, pid.value, self.name_resolver(pid.value)))
+
+    def _run(self):
+        try:
+            import ctypes
+            from ctypes import wintypes
+            user32 = ctypes.windll.user32
+
+            WinEventProc = ctypes.WINFUNCTYPE(
+                None,
+                wintypes.HANDLE, wintypes.DWORD, wintypes.HWND,
+                wintypes.LONG, wintypes.LONG, wintypes.DWORD, wintypes.DWORD
+            )
+
+            def on_event(hook, event, hwnd, id_object, id_child, thread_id, event_time):
+                try:
+                    if hwnd:
+                        self._emit(hwnd)
+                except Exception as e:
+                    logging.error(f"处理前台窗口事件失败: {str(e)}")
+
+            # 保存回调引用，防止被垃圾回收
+            self._proc = WinEventProc(on_event)
+            user32.SetWinEventHook.restype = wintypes.HANDLE
+            hook = user32.SetWinEventHook(
+                EVENT_SYSTEM_FOREGROUND, EVENT_SYSTEM_FOREGROUND,
+                0, self._proc, 0, 0,
+                WINEVENT_OUTOFCONTEXT | WINEVENT_SKIPOWNPROCESS
+            )
+            if not hook:
+                raise OSError("SetWinEventHook 失败")
+
+            self._thread_id = ctypes.windll.kernel32.GetCurrentThreadId()
+            self._ok = True
+            self._started.set()
+
+            # 启动时推送一次当前前台窗口，作为初始状态
+            current = user32.GetForegroundWindow()
+            if current:
+                self._emit(current)
+
+            msg = wintypes.MSG()
+            while user32.GetMessageW(ctypes.byref(msg), 0, 0, 0) > 0:
+                user32.TranslateMessage(ctypes.byref(msg))
+                user32.DispatchMessageW(ctypes.byref(msg))
+
+            user32.UnhookWinEvent(hook)
+        except Exception as e:
+            logging.error(f"前台窗口事件钩子启动失败: {str(e)}")
+        finally:
+            self._started.set()
+
+
+class ScriptedForegroundSource(ForegroundEventSource):
+    """
+    按脚本推送前台窗口事件的假事件源，用于在非 Windows 平台测试和基准测试
+
+    script 为 (时间, ForegroundInfo) 列表，run_until(t) 推送所有时间不晚于 t 的事件。
+    """
+
+    def __init__(self, script=()):
+        self.script = sorted(script, key=lambda item: item[0])
+        self._times = [t for t, _ in self.script]
+        self._next = 0
+        self._callback = None
+
+    def start(self, callback):
+        self._callback = callback
+        return True
+
+    def stop(self):
+        self._callback = None
+
+    def next_time(self):
+        """
+        :return: 下一个待推送事件的时间，没有时返回 None
+        """
+        if self._next < len(self.script):
+            return self._times[self._next]
+        return None
+
+    def run_until(self, t):
+        """
+        推送所有时间不晚于 t 的事件
+        :return: 推送的事件数量
+        """
+        end = bisect.bisect_right(self._times, t)
+        count = 0
+        while self._next < end:
+            _, info = self.script[self._next]
+            self._next += 1
+            if self._callback:
+                self._callback(info)
+                count += 1
+        return count
+
+    def emit(self, info):
+        """
+        立即推送一个事件
+        """
+        if self._callback:
+            self._callback(info)
+
+
+class ForegroundTracker:
+    """
+    订阅前台窗口事件并缓存当前前台窗口
+
+    每次切换时判断一次新窗口是否受保护并缓存结果，is_protected_active() 只读取缓存；
+    受保护程序被激活时立即调用 on_protected_activated。
+    """
+
+    def __init__(self, source, matcher=None, on_protected_activated=None, clock=None):
+        """
+        :param source: ForegroundEventSource 实例
+        :param matcher: 判断 ForegroundInfo 是否属于受保护程序的函数，默认只匹配 WeChat.exe
+        :param on_protected_activated: 受保护程序成为前台窗口时的回调，参数为 ForegroundInfo
+        :param clock: 当前时间函数，提供时记录前台窗口切换的时刻（changed_at）
+        """
+        self.source = source
+        self.clock = clock
+        self.matcher = matcher or (lambda info: info.name == "WeChat.exe")
+        self.on_protected_activated = on_protected_activated
+        self.current = None
+        self.current_protected = False
+        self.changed_at = None
+        self.events = 0
+        self.running = False
+
+    def start(self):
+        """
+        :return: 是否启动成功
+        """
+        self.running = bool(self.source.start(self._on_event))
+        return self.running
+
+    def stop(self):
+        self.source.stop()
+        self.running = False
+
+    def _on_event(self, info):
+        try:
+            protected = bool(self.matcher(info))
+        except Exception as e:
+            logging.error(f"判断受保护程序失败: {str(e)}")
+            protected = False
+        if self.clock and info != self.current:
+            self.changed_at = self.clock()
+        self.current = info
+        self.current_protected = protected
+        self.events += 1
+        if protected and self.on_protected_activated:
+            self.on_protected_activated(info)
+
+    def refresh(self):
+        """
+        规则变化后重新判断当前前台窗口
+        """
+        if self.current is not None:
+            self._on_event(self.current)
+
+    def is_protected_active(self):
+        return self.current_protected
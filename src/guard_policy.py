@@ -0,0 +1,209 @@
+import time
+import bisect
+import logging
+from collections import namedtuple
+
+DAY = 24 * 3600
+WEEK = 7 * DAY
+DAY_NAMES = ('mon', 'tue', 'wed', 'thu', 'fri', 'sat', 'sun')
+
+
+class GuardPolicy(namedtuple('GuardPolicy', ['name', 'idle_time', 'app_idle_times', 'entry_idle_time', 'always'])):
+    """
+    某一时段生效的守护策略：时段名称、默认空闲时间阈值、各受保护程序的阈值（规则名称 -> 秒）、
+    进入守护模式的阈值（非零阈值中的最小值，任一程序达到阈值都需要开始守护）、是否有始终守护的程序
+    阈值为 0 表示始终守护：不等空闲，受保护程序每次切换到前台都会被锁定
+    """
+    __slots__ = ()
+
+    def idle_time_for(self, rule):
+        """
+        :param rule: 受保护程序规则名称
+        :return: 该程序的空闲时间阈值（秒）
+        """
+        return self.app_idle_times.get(rule, self.idle_time)
+
+
+def make_policy(name, idle_time, app_idle_times, fallback):
+    """
+    :param fallback: 所有阈值都为 0 时进入守护模式的阈值，用于重新锁定解锁后留在前台的窗口
+    """
+    app_idle_times = dict(app_idle_times)
+    thresholds = [idle_time, *app_idle_times.values()]
+    positive = [value for value in thresholds if value > 0]
+    return GuardPolicy(name, idle_time, app_idle_times, min(positive) if positive else fallback, 0 in thresholds)
+
+
+def _parse_days(days):
+    """
+    :param days: 'mon-fri'、'sat,sun'、['mon', 'wed'] 或 0-6 的数字，None 表示每天
+    :return: 星期几的列表（0 为周一）
+    """
+    if days is None:
+        return list(range(7))
+    if isinstance(days, str):
+        days = [part.strip() for part in days.split(',') if part.strip()]
+    result = set()
+    for day in days:
+        if isinstance(day, int):
+            if not 0 <= day < 7:
+                raise ValueError(f"星期 {day} 超出范围")
+            result.add(day)
+            continue
+        first, _, last = day.lower().partition('-')
+        start = DAY_NAMES.index(first[:3])
+        end = DAY_NAMES.index(last[:3]) if last else start
+        # mon-fri 或跨周的 fri-mon
+        result.update((start + i) % 7 for i in range((end - start) % 7 + 1))
+    return sorted(result)
+
+
+def _parse_time(value):
+    """
+    :param value: 'HH:MM' 或 'HH:MM:SS'，允许 '24:00'
+    :return: 一天中的秒数
+    """
+    parts = [int(part) for part in str(value).split(':')]
+    if not 2 <= len(parts) <= 3:
+        raise ValueError(f"时间格式应为 HH:MM: {value}")
+    hours, minutes, seconds = (parts + [0])[:3]
+    total = hours * 3600 + minutes * 60 + seconds
+    if not (0 <= minutes < 60 and 0 <= seconds < 60 and 0 <= total <= DAY):
+        raise ValueError(f"时间超出范围: {value}")
+    return total
+
+
+def _parse_threshold(value):
+    if value == 'always':
+        return 0
+    value = float(value)
+    if value < 0:
+        raise ValueError(f"阈值不能为负数: {value}")
+    return int(value) if value == int(value) else value
+
+
+def _parse_period(period):
+    """
+    :return: ([(开始, 结束)] 以周一 0 点起的秒数表示，可能超过 WEEK), 阈值, 各程序阈值, 是否始终守护)
+    """
+    start = _parse_time(period.get('start', '00:00'))
+    end = _parse_time(period.get('end', '24:00'))
+    if end <= start:
+        # 跨过午夜，例如 18:00-09:00
+        end += DAY
+    ranges = [(day * DAY + start, day * DAY + end) for day in _parse_days(period.get('days'))]
+    idle_time = _parse_threshold(period['idle_time']) if period.get('idle_time') is not None else None
+    apps = {str(name): _parse_threshold(value) for name, value in (period.get('apps') or {}).items()}
+    return ranges, idle_time, apps, bool(period.get('always'))
+
+
+class GuardSchedule:
+    """
+    编译后的守护时段表
+
+    配置的时段按星期和时刻展开为一周内的区间，重叠时靠后的时段优先，每个区间预先算好生效的 GuardPolicy，
+    得到按开始时刻排序的区间表。current() 用二分查找定位当前区间，并缓存到该区间结束，
+    之后的调用只比较两次时间，守护循环中不会重新解析或遍历时段规则。
+    时刻按本地时间计算；夏令时切换当天，切换前算出的边界可能偏差一小时。
+    """
+
+    def __init__(self, periods=None, idle_time=60, app_idle_times=None, localtime=time.localtime):
+        """
+        :param periods: 时段列表，每项可包含 name、days、start、end、idle_time、apps（规则名称 -> 阈值）、always
+        :param idle_time: 不在任何时段内时的空闲时间阈值（秒）
+        :param app_idle_times: 各受保护程序在所有时段的阈值（规则名称 -> 秒）
+        :param localtime: 把时间戳转换为本地时间（struct_time）的函数
+        """
+        self.periods = list(periods or [])
+        self.localtime = localtime
+        self.lookups = 0
+        self._starts = []
+        self._policies = []
+        # (生效开始时刻, 生效结束时刻, 策略)，按时间戳表示
+        self._cache = (0.0, 0.0, None)
+        self._compile(make_policy('默认', idle_time, app_idle_times or {}, idle_time or 60))
+
+    @classmethod
+    def from_config(cls, config, idle_time, rules=None, localtime=time.localtime):
+        """
+        从配置的 guard_schedule 字段创建时段表
+        :param rules: ProtectedAppRules，提供各程序单独配置的阈值
+        """
+        return cls(config.get("guard_schedule"), idle_time, rules.idle_times if rules else None, localtime)
+
+    def _compile(self, default):
+        spans = []
+        for index, period in enumerate(self.periods):
+            name = (period.get('name') if isinstance(period, dict) else None) or f"时段{index + 1}"
+            try:
+                ranges, idle_time, apps, always = _parse_period(period)
+            except (ValueError, TypeError, AttributeError, KeyError) as e:
+                logging.error(f"守护时段 {name} 无效: {str(e)}")
+                continue
+            if always:
+                # 所有程序每次切换到前台都锁定；idle_time 只决定何时重新锁定留在前台的窗口
+                policy = make_policy(name, 0, {}, idle_time or default.entry_idle_time)
+            else:
+                policy = make_policy(
+                    name,
+                    default.idle_time if idle_time is None else idle_time,
+                    {**default.app_idle_times, **apps},
+                    default.entry_idle_time
+                )
+            for start, end in ranges:
+                # 周日跨到下周一的部分折回到一周开头
+                spans.append((start, min(end, WEEK), policy))
+                if end > WEEK:
+                    spans.append((0, end - WEEK, policy))
+
+        bounds = sorted({0, *(s for s, _, _ in spans), *(e for _, e, _ in spans if e < WEEK)})
+        for bound in bounds:
+            policy = default
+            for start, end, candidate in spans:
+                if start <= bound < end:
+                    policy = candidate
+            if self._policies and self._policies[-1] == policy:
+                continue
+            self._starts.append(bound)
+            self._policies.append(policy)
+
+    @property
+    def intervals(self):
+        """
+        :return: [(开始, 结束, GuardPolicy)]，以周一 0 点起的秒数表示
+        """
+        ends = self._starts[1:] + [WEEK]
+        return list(zip(self._starts, ends, self._policies))
+
+    def current(self, now):
+        """
+        :param now: 当前时间戳（platform.wall_time()）
+        :return: 当前生效的 GuardPolicy
+        """
+        valid_from, valid_until, policy = self._cache
+        if valid_from <= now < valid_until:
+            return policy
+        return self._lookup(now)[2]
+
+    def seconds_until_change(self, now):
+        """
+        :return: 距离当前区间结束还有多少秒，整周只有一个策略时返回 None
+        """
+        valid_from, valid_until, _ = self._cache
+        if not valid_from <= now < valid_until:
+            _, valid_until, _ = self._lookup(now)
+        if valid_until == float('inf'):
+            return None
+        return valid_until - now
+
+    def _lookup(self, now):
+        self.lookups += 1
+        if len(self._policies) == 1:
+            self._cache = (float('-inf'), float('inf'), self._policies[0])
+            return self._cache
+        local = self.localtime(now)
+        offset = local.tm_wday * DAY + local.tm_hour * 3600 + local.tm_min * 60 + min(local.tm_sec, 59) + now % 1
+        i = bisect.bisect_right(self._starts, offset) - 1
+        end = self._starts[i + 1] if i + 1 < len(self._starts) else WEEK
+        self._cache = (now - (offset - self._starts[i]), now + (end - offset), self._policies[i])
+        return self._cache
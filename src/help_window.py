@@ -3,11 +3,20 @@ from tkinter import ttk
 import webbrowser
 
 class HelpWindow:
+    """
+    帮助窗口
+
+    整个进程只创建一次，关闭时隐藏，再次打开时直接显示，不会反复创建控件
+    """
+
+    _instance = None
+
     def __init__(self):
         self.window = tk.Toplevel()
         self.window.title("帮助")
         self.window.geometry("400x450")
         self.window.resizable(False, False)
+        self.window.protocol("WM_DELETE_WINDOW", self.hide)
         
         # 创建主框架
         main_frame = ttk.Frame(self.window, padding="10")
@@ -85,17 +94,36 @@ class HelpWindow:
         ttk.Button(
             button_frame, 
             text="关闭", 
-            command=self.window.destroy
+            command=self.hide
         ).pack(side=tk.RIGHT, padx=5)
         
-        # 设置模态窗口
+        self.show()
+
+    def show(self):
+        """
+        显示为模态窗口
+        """
+        self.window.deiconify()
         self.window.transient()
         self.window.grab_set()
         self.window.focus_set()
 
-    @staticmethod
-    def show_help():
-        HelpWindow()
+    def hide(self):
+        self.window.grab_release()
+        self.window.withdraw()
+
+    @classmethod
+    def show_help(cls):
+        """
+        显示帮助窗口，已创建过时直接复用
+        :return: HelpWindow 实例
+        """
+        instance = cls._instance
+        if instance is not None and instance.window.winfo_exists():
+            instance.show()
+        else:
+            instance = cls._instance = cls()
+        return instance
 
 if __name__ == '__main__':
     root = tk.Tk()
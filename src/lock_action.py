@@ -0,0 +1,228 @@
+import time
+import logging
+from collections import namedtuple
+
+# 锁定结果：是否确认锁定、注入次数、从开始到确认的耗时（秒）
+LockResult = namedtuple('LockResult', ['ok', 'attempts', 'latency'])
+
+VK_CONTROL = 0x11
+VK_L = 0x4C
+KEYEVENTF_KEYUP = 0x0002
+INPUT_KEYBOARD = 1
+# 微信锁定后显示的锁定窗口类名（锁定后主窗口被隐藏，显示登录窗口样式的解锁界面）
+LOCK_WINDOW_CLASSES = ('WeChatLoginWndForPC',)
+
+
+class LockBackend:
+    """
+    锁定动作后端接口
+    """
+
+    def inject(self, hwnd):
+        """
+        向目标窗口发送锁定快捷键
+        :param hwnd: 目标窗口句柄
+        :raises OSError: 快捷键未能送达目标窗口（例如目标窗口无法切到前台）
+        """
+        raise NotImplementedError
+
+    def is_locked(self, hwnd):
+        """
+        :return: 目标窗口的内容是否已不可见（已锁定、隐藏或最小化）
+        """
+        raise NotImplementedError
+
+
+class Win32LockBackend(LockBackend):
+    """
+    通过 SendInput 向目标窗口发送 Ctrl+L
+
+    SendInput 把按键送给当前的前台窗口，因此先把目标窗口切到前台并确认成功，
+    否则本次注入失败、由 LockAction 重试，不会把 Ctrl+L 发给其他程序（例如浏览器的地址栏）。
+    四个按键事件在一次 SendInput 调用中提交，不会与用户的输入交错；
+    微信锁定后主窗口被隐藏、显示锁定窗口，据此确认锁定生效，不能只看前台窗口是否已切换。
+    """
+
+    def __init__(self, lock_classes=LOCK_WINDOW_CLASSES):
+        """
+        :param lock_classes: 目标程序锁定后显示的锁定窗口类名
+        """
+        import ctypes
+        from ctypes import wintypes
+
+        class KEYBDINPUT(ctypes.Structure):
+            _fields_ = [
+                ('wVk', wintypes.WORD),
+                ('wScan', wintypes.WORD),
+                ('dwFlags', wintypes.DWORD),
+                ('time', wintypes.DWORD),
+                ('dwExtraInfo', ctypes.c_size_t),
+            ]
+
+        class _INPUTUNION(ctypes.Union):
+            # 与 MOUSEINPUT 等大小保持一致
+            _fields_ = [('ki', KEYBDINPUT), ('padding', ctypes.c_byte * 32)]
+
+        class INPUT(ctypes.Structure):
+            _fields_ = [('type', wintypes.DWORD), ('union', _INPUTUNION)]
+
+        def key(vk, flags=0):
+            item = INPUT()
+            item.type = INPUT_KEYBOARD
+            item.union.ki = KEYBDINPUT(vk, 0, flags, 0, 0)
+            return item
+
+        self._ctypes = ctypes
+        self._user32 = ctypes.windll.user32
+        self._user32.GetForegroundWindow.restype = wintypes.HWND
+        self._lock_classes = frozenset(lock_classes)
+        self._inputs = (INPUT * 4)(
+            key(VK_CONTROL), key(VK_L),
+            key(VK_L, KEYEVENTF_KEYUP), key(VK_CONTROL, KEYEVENTF_KEYUP)
+        )
+        self._input_size = ctypes.sizeof(INPUT)
+
+    def inject(self, hwnd):
+        if not hwnd:
+            raise OSError("没有目标窗口")
+        if self._user32.GetForegroundWindow() != hwnd:
+            self._bring_to_foreground(hwnd)
+        if self._user32.GetForegroundWindow() != hwnd:
+            # 前台锁定（foreground lock）拒绝了切换，此时发送按键会落到其他窗口上
+            raise OSError("目标窗口未能切到前台")
+        sent = self._user32.SendInput(len(self._inputs), self._inputs, self._input_size)
+        if sent != len(self._inputs):
+            raise OSError("SendInput 被拦截")
+
+    def _bring_to_foreground(self, hwnd):
+        """
+        把目标窗口切到前台：临时共享当前前台窗口线程的输入状态，使 SetForegroundWindow 不受前台锁定限制
+        """
+        user32 = self._user32
+        kernel32 = self._ctypes.windll.kernel32
+        current = kernel32.GetCurrentThreadId()
+        foreground = user32.GetForegroundWindow()
+        other = user32.GetWindowThreadProcessId(foreground, None) if foreground else 0
+        attached = bool(other) and other != current and bool(user32.AttachThreadInput(current, other, True))
+        try:
+            user32.SetForegroundWindow(hwnd)
+        finally:
+            if attached:
+                user32.AttachThreadInput(current, other, False)
+
+    def is_locked(self, hwnd):
+        if not hwnd:
+            return False
+        user32 = self._user32
+        if not user32.IsWindow(hwnd) or not user32.IsWindowVisible(hwnd) or user32.IsIconic(hwnd):
+            return True
+        return self._lock_window_shown(hwnd)
+
+    def _lock_window_shown(self, hwnd):
+        """
+        :return: 目标窗口所属进程是否已显示锁定窗口
+        """
+        ctypes = self._ctypes
+        user32 = self._user32
+        foreground = user32.GetForegroundWindow()
+        if not foreground or foreground == hwnd:
+            return False
+        pid, target_pid = ctypes.c_ulong(), ctypes.c_ulong()
+        user32.GetWindowThreadProcessId(foreground, ctypes.byref(pid))
+        user32.GetWindowThreadProcessId(hwnd, ctypes.byref(target_pid))
+        if pid.value != target_pid.value:
+            return False
+        class_name = ctypes.create_unicode_buffer(256)
+        user32.GetClassNameW(foreground, class_name, 256)
+        return class_name.value in self._lock_classes
+
+
+class FakeLockBackend(LockBackend):
+    """
+    假的锁定后端，用于测试和基准测试
+
+    前 refuse_first 次注入因目标窗口无法切到前台而失败，接下来 fail_first 次注入无效（按键没有效果），
+    之后的注入在 effect_delay 秒后生效。
+    """
+
+    def __init__(self, clock=time.perf_counter, effect_delay=0.03, fail_first=0, refuse_first=0):
+        self.clock = clock
+        self.effect_delay = effect_delay
+        self.fail_first = fail_first
+        self.refuse_first = refuse_first
+        self.refusals = 0
+        self.injections = 0
+        self._locked_at = {}
+
+    def inject(self, hwnd):
+        if self.refusals < self.refuse_first:
+            self.refusals += 1
+            raise OSError("目标窗口未能切到前台")
+        self.injections += 1
+        if self.injections > self.fail_first and hwnd not in self._locked_at:
+            self._locked_at[hwnd] = self.clock() + self.effect_delay
+
+    def is_locked(self, hwnd):
+        locked_at = self._locked_at.get(hwnd)
+        return locked_at is not None and self.clock() >= locked_at
+
+    def unlock(self, hwnd):
+        self._locked_at.pop(hwnd, None)
+
+
+class LockAction:
+    """
+    发送锁定快捷键并确认锁定生效
+
+    注入后以指数退避的短间隔观察窗口状态，确认锁定后立即返回；
+    在 verify_timeout 内未生效则重新注入，最多 max_attempts 次。
+    """
+
+    def __init__(self, backend, clock=time.perf_counter, sleep=time.sleep,
+                 max_attempts=3, verify_timeout=0.3, initial_backoff=0.005, max_backoff=0.05):
+        """
+        :param backend: LockBackend 实例
+        :param clock: 计时函数
+        :param sleep: 休眠函数
+        :param max_attempts: 最多注入次数
+        :param verify_timeout: 每次注入后等待生效的最长时间（秒）
+        :param initial_backoff: 首次观察间隔（秒），之后逐次翻倍
+        :param max_backoff: 最大观察间隔（秒）
+        """
+        self.backend = backend
+        self.clock = clock
+        self.sleep = sleep
+        self.max_attempts = max_attempts
+        self.verify_timeout = verify_timeout
+        self.initial_backoff = initial_backoff
+        self.max_backoff = max_backoff
+
+    def lock(self, hwnd):
+        """
+        锁定目标窗口
+        :param hwnd: 目标窗口句柄
+        :return: LockResult
+        """
+        start = self.clock()
+        for attempt in range(1, self.max_attempts + 1):
+            try:
+                self.backend.inject(hwnd)
+            except Exception as e:
+                # 快捷键没有送达，不必等待生效，稍后重新注入
+                logging.error(f"发送锁定快捷键失败（第 {attempt} 次）: {str(e)}")
+                if self.backend.is_locked(hwnd):
+                    return LockResult(True, attempt, self.clock() - start)
+                if attempt < self.max_attempts:
+                    self.sleep(self.max_backoff)
+                continue
+            deadline = self.clock() + self.verify_timeout
+            delay = self.initial_backoff
+            while True:
+                if self.backend.is_locked(hwnd):
+                    return LockResult(True, attempt, self.clock() - start)
+                remaining = deadline - self.clock()
+                if remaining <= 0:
+                    break
+                self.sleep(min(delay, remaining))
+                delay = min(delay * 2, self.max_backoff)
+        return LockResult(False, self.max_attempts, self.clock() - start)
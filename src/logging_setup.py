@@ -0,0 +1,155 @@
+import os
+import sys
+import time
+import queue
+import atexit
+import logging
+import threading
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
+
+LOG_FORMAT = '%(asctime)s - %(levelname)s [%(name)s]: %(message)s'
+
+# 第三方库默认只记录警告以上的日志（PIL 导入插件时会输出大量 DEBUG 日志）
+DEFAULT_LOGGER_LEVELS = {
+    'PIL': 'WARNING',
+    'urllib3': 'WARNING',
+    'requests': 'WARNING',
+}
+
+
+class SizedTimedRotatingFileHandler(RotatingFileHandler):
+    """
+    按大小和时间轮转的日志文件处理器
+
+    文件超过 max_bytes 或距上次轮转超过 interval 秒时轮转，最多保留 backup_count 个旧文件。
+    """
+
+    def __init__(self, filename, max_bytes=1024 * 1024, backup_count=5, interval=24 * 3600, encoding='utf-8'):
+        super().__init__(filename, maxBytes=max_bytes, backupCount=backup_count, encoding=encoding)
+        self.interval = interval
+        try:
+            start = os.path.getmtime(filename)
+        except OSError:
+            start = time.time()
+        self.rollover_at = start + interval
+
+    def shouldRollover(self, record):
+        if self.interval and time.time() >= self.rollover_at and os.path.exists(self.baseFilename):
+            return True
+        return super().shouldRollover(record)
+
+    def doRollover(self):
+        super().doRollover()
+        self.rollover_at = time.time() + self.interval
+
+
+class RateLimitFilter(logging.Filter):
+    """
+    重复日志限流
+
+    同一处代码（文件和行号）以相同级别记录的日志在 interval 秒内最多记录 burst 条，
+    其余的被丢弃，并在下一条放行的日志中注明省略的数量。
+    按调用位置而不是消息限流：消息多由 f-string 生成，每条都带着不同的数值或异常文字。
+    最多跟踪 max_keys 个调用位置，超出时丢弃最早的窗口。
+    """
+
+    def __init__(self, interval=60.0, burst=3, min_level=logging.WARNING, clock=time.monotonic, max_keys=1024):
+        super().__init__()
+        self.interval = interval
+        self.burst = burst
+        self.min_level = min_level
+        self.clock = clock
+        self.max_keys = max_keys
+        self._windows = {}  # key -> [窗口开始时间, 已记录条数, 已省略条数]
+        self._lock = threading.Lock()
+
+    def filter(self, record):
+        if record.levelno < self.min_level:
+            return True
+
+        key = (record.pathname, record.lineno, record.levelno)
+        now = self.clock()
+
+        with self._lock:
+            window = self._windows.get(key)
+            if window is None or now - window[0] >= self.interval:
+                suppressed = window[2] if window else 0
+                self._windows.pop(key, None)
+                self._windows[key] = [now, 1, 0]
+                if len(self._windows) > self.max_keys:
+                    self._prune(now)
+            elif window[1] < self.burst:
+                window[1] += 1
+                suppressed = 0
+            else:
+                window[2] += 1
+                return False
+
+        if suppressed:
+            record.msg = f"{record.msg}（已省略 {suppressed} 条重复日志）"
+        return True
+
+    def _prune(self, now):
+        for key in [k for k, w in self._windows.items() if now - w[0] >= self.interval]:
+            del self._windows[key]
+        # 仍然超出时丢弃最早开始的窗口（字典按窗口开始的先后排列）
+        while len(self._windows) > self.max_keys:
+            del self._windows[next(iter(self._windows))]
+
+
+def apply_logger_levels(logger_levels):
+    """
+    设置各个 logger 的日志级别
+    :param logger_levels: {logger 名称: 级别名称或数值}
+    """
+    for name, level in (logger_levels or {}).items():
+        if isinstance(level, str):
+            level = logging.getLevelName(level.upper())
+        if isinstance(level, int):
+            logging.getLogger(name).setLevel(level)
+
+
+def setup_logging(log_path='wechat_guardian.log', level=logging.INFO, logger_levels=None,
+                  max_bytes=1024 * 1024, backup_count=5, interval=24 * 3600, console=False):
+    """
+    配置异步日志：业务线程只把日志放入队列，由后台线程写入轮转的日志文件
+    :param log_path: 日志文件路径
+    :param level: 根 logger 级别
+    :param logger_levels: 额外的 {logger 名称: 级别}，覆盖 DEFAULT_LOGGER_LEVELS
+    :param max_bytes: 单个日志文件的最大字节数
+    :param backup_count: 保留的旧日志文件数量
+    :param interval: 按时间轮转的间隔（秒）
+    :param console: 是否同时输出到控制台
+    :return: QueueListener 实例
+    """
+    formatter = logging.Formatter(LOG_FORMAT)
+    handlers = [SizedTimedRotatingFileHandler(log_path, max_bytes, backup_count, interval)]
+    if console:
+        handlers.append(logging.StreamHandler(sys.stderr))
+    for handler in handlers:
+        handler.setFormatter(formatter)
+
+    log_queue = queue.SimpleQueue()
+    queue_handler = QueueHandler(log_queue)
+    queue_handler.addFilter(RateLimitFilter())
+
+    root = logging.getLogger()
+    for handler in list(root.handlers):
+        root.removeHandler(handler)
+    root.addHandler(queue_handler)
+    root.setLevel(level)
+    apply_logger_levels({**DEFAULT_LOGGER_LEVELS, **(logger_levels or {})})
+
+    listener = QueueListener(log_queue, *handlers, respect_handler_level=True)
+    listener.start()
+    # 退出时把队列中剩余的日志写完
+    atexit.register(stop_logging, listener)
+    return listener
+
+
+def stop_logging(listener):
+    """
+    停止后台日志线程，可重复调用
+    """
+    if getattr(listener, '_thread', None) is not None:
+        listener.stop()
@@ -1,25 +1,19 @@
+import time
+
+# 记录启动时刻，用于统计到托盘图标出现的耗时
+STARTUP_T0 = time.perf_counter()
+
 import os
 import sys
-import threading
-import time
 import logging
 import win32gui
 import win32con
 import win32api
-from PIL import Image
 import tkinter as tk
-from tkinter import messagebox, ttk, simpledialog
-from src.updater import check_update_async
-
-# 配置日志
-logging.basicConfig(
-    level=logging.INFO,  # 改为 INFO 级别，减少调试信息
-    format='%(asctime)s - %(levelname)s: %(message)s',
-    handlers=[
-        logging.FileHandler('wechat_guardian.log', encoding='utf-8'),  # 文件处理器
-        # 移除控制台处理器，避免干扰计时显示
-    ]
-)
+from src.logging_setup import setup_logging, apply_logger_levels
+
+# 配置日志：后台线程写入按大小和时间轮转的日志文件，不阻塞检测线程
+setup_logging('wechat_guardian.log')
 
 # 添加一个测试日志
 logging.info("程序启动")
@@ -29,15 +23,23 @@ current_dir = os.path.dirname(os.path.abspath(__file__))
 root_dir = os.path.dirname(current_dir)
 sys.path.insert(0, root_dir)
 
-from src.icon_generator import IconGenerator
-from src.wechat_guardian import WeChatGuardian
+from src.tray_icons import TrayIconCache, TrayIconState, load_prebuilt_icons
+from src.wechat_guardian import WeChatGuardian, START_GUARDIAN, INTRUSION
 from src.settings import GuardianSettings
-from src.help_window import HelpWindow
+from src.scheduler import IdleScheduler
+from src.supervisor import DetectionSupervisor
+from src.ui_dispatch import UiDispatcher, ShowWarning, SetTrayState, ShowUpdate
+from src.metrics import get_registry, start_exporters
+from src.memory_report import register_memory_metrics, start_memory_report
 
 class WeChatGuardianApp:
     WM_TRAYICON = win32con.WM_USER + 20
+    WM_UI_DISPATCH = win32con.WM_USER + 21
     
-    def __init__(self):
+    def __init__(self, startup_probe=False):
+        """
+        :param startup_probe: 启动耗时探测模式，托盘图标出现后立即退出
+        """
         logging.info("初始化微信守护程序")
         
         # 定义窗口类名
@@ -49,16 +51,74 @@ class WeChatGuardianApp:
         
         # 初始化组件
         self.guardian = WeChatGuardian(self.root)
-        self.settings = GuardianSettings()
+        # 设置与守护器共用配置存储和密码验证器
+        self.settings = GuardianSettings(self.guardian.config_store, verifier=self.guardian.verifier)
+        self.settings.store.start_watching()
+        apply_logger_levels(self.settings.config.get("log_levels"))
+        self.scheduler = IdleScheduler(clock=self.guardian.platform.clock)
+        # 唯一的检测线程由 supervisor 持有，重复开始守护只唤醒它，不再另起线程
+        self.supervisor = DetectionSupervisor(self.guardian, self.scheduler, self._on_guardian_cycle)
+        self.metrics_exporters = []
+        self.memory_reporter = None
+        self.fleet_reporter = None
+        self.warning_window = None
+        
+        # 订阅前台窗口事件：守护模式下不再轮询，微信被激活时立即唤醒守护线程
+        self.guardian.on_wechat_activated = lambda info: self.scheduler.wake()
+        self.guardian.on_session_changed = self._on_session_changed
+        if self.guardian.start_foreground_events():
+            self.scheduler.guard_check_interval = None
         
         # 注册窗口类
         self.register_window_class()
         
+        # 界面事件分发：其他线程投递事件，通过隐藏窗口消息唤醒主线程处理
+        self.dispatcher = UiDispatcher(
+            self.root,
+            waker=lambda: win32gui.PostMessage(self.hwnd, self.WM_UI_DISPATCH, 0, 0),
+            clock=self.guardian.platform.clock.now
+        )
+        self.dispatcher.register(ShowWarning, self.show_warning)
+        self.dispatcher.register(SetTrayState, self._apply_tray_state)
+        self.dispatcher.register(ShowUpdate, self.show_update)
+        self.dispatcher.start()
+        self.register_metrics()
+        
         # 创建系统托盘图标
         self.create_tray_icon()
+        self.startup_ms = (time.perf_counter() - STARTUP_T0) * 1000
+        logging.info(f"启动耗时：{self.startup_ms:.0f} 毫秒后显示托盘图标")
+        
+        if startup_probe:
+            print(f"startup_ms={self.startup_ms:.1f}")
+            self.cleanup()
+            self.root.destroy()
+            return
+        
+        # 按配置启动本机指标端点和 JSON 导出
+        self.metrics_exporters = start_exporters(self.metrics, self.settings.config)
+        self.memory_reporter = start_memory_report(self.settings.config)
+        
+        # 入侵审计记录和截图，在托盘图标出现后才打开数据库、启动截图线程
+        from src.audit_store import open_audit_store
+        from src.evidence import start_evidence_capture
+        self.guardian.audit_store = open_audit_store(self.settings.config)
+        self.guardian.evidence_capture = start_evidence_capture(self.settings.config)
+        
+        # 配置了汇总服务时上报状态变化和入侵记录，发送在后台线程中进行
+        from src.fleet import start_fleet_reporter
+        self.fleet_reporter = start_fleet_reporter(self.settings.config)
         
-        # 检查更新
-        check_update_async(self.root)
+        # 顶层窗口索引：完整枚举一次后由窗口事件增量维护，同样放在托盘图标出现之后
+        self.guardian.start_window_index()
+        
+        # 会话锁定、断开、显示器关闭或睡眠时暂停检测，守护线程不再被唤醒
+        self.guardian.start_session_events()
+        
+        # 在后台线程中检查更新，不影响托盘图标出现的时间；
+        # 结果缓存在磁盘上，检查间隔内重启不会再次访问网络
+        from src.updater import check_update_async
+        check_update_async(lambda info: self.dispatcher.post(ShowUpdate(info)), self.settings.config)
         
         # 启动守护线程
         self.start_guardian_thread()
@@ -66,6 +126,21 @@ class WeChatGuardianApp:
         # 进入消息循环
         self.root.mainloop()
 
+    def register_metrics(self):
+        """
+        注册界面相关的指标
+        """
+        self.metrics = get_registry()
+        register_memory_metrics(self.metrics)
+        self._m_warning_latency = self.metrics.histogram(
+            'warning_latency_seconds', '从检测到微信到警告窗口可见的耗时'
+        )
+        self.metrics.gauge('scheduler_wakeups', '守护线程被唤醒的次数').set_function(lambda: self.scheduler.wakeups)
+        self.metrics.gauge('tray_updates', '托盘图标实际更新次数').set_function(lambda: self.tray_state.updates)
+        self.metrics.gauge('tray_updates_coalesced', '状态未变化而跳过的托盘图标更新次数').set_function(
+            lambda: self.tray_state.coalesced
+        )
+
     def register_window_class(self):
         """
         注册窗口类
@@ -88,34 +163,21 @@ class WeChatGuardianApp:
         # 添加配置更新回调
         self.settings.on_config_changed = self.on_config_changed
         
-        # 加载图标
-        self.gray_icon = IconGenerator.create_icon('gray')
-        self.green_icon = IconGenerator.create_icon('green')
+        # 加载图标：每种状态只渲染一次，缓存为图标句柄
+        self.tray_icons = TrayIconCache(sources=load_prebuilt_icons()).render()
+        self.tray_state = TrayIconState(self.tray_icons, self._set_tray_hicon)
 
     def create_tray_icon(self):
         """
         创建系统托盘图标
         """
-        # 创建临时图标文件
-        temp_icon_path = os.path.join(os.path.dirname(__file__), 'temp_gray_icon.ico')
-        self.gray_icon.save(temp_icon_path, format='ICO', sizes=[(16, 16)])
-        
-        # 加载图标
-        hicon = win32gui.LoadImage(
-            0, 
-            temp_icon_path, 
-            win32con.IMAGE_ICON, 
-            16, 16, 
-            win32con.LR_LOADFROMFILE | win32con.LR_DEFAULTCOLOR
-        )
-        
-        # 删除临时文件
-        os.remove(temp_icon_path)
+        hicon = self.tray_icons.get('gray')
         
         # 创建托盘图标
         flags = win32gui.NIF_ICON | win32gui.NIF_MESSAGE | win32gui.NIF_TIP
         nid = (self.hwnd, 0, flags, self.WM_TRAYICON, hicon, "微信守护程序")
         win32gui.Shell_NotifyIcon(win32gui.NIM_ADD, nid)
+        self.tray_state.state = 'gray'
         
         return nid  # 返回图标句柄
 
@@ -125,6 +187,9 @@ class WeChatGuardianApp:
         """
         if msg == win32con.WM_DESTROY:
             win32gui.PostQuitMessage(0)
+        elif msg == self.WM_UI_DISPATCH:
+            self.dispatcher.drain()
+            return 0
         elif msg == self.WM_TRAYICON:
             if lparam == win32con.WM_LBUTTONDBLCLK:
                 logging.info("系统托盘图标双击，尝试启动守护模式")
@@ -164,7 +229,8 @@ class WeChatGuardianApp:
                 elif id == 3:  # 设置
                     self.settings.show_settings_dialog()
                 elif id == 4:  # 帮助
-                    HelpWindow()
+                    from src.help_window import HelpWindow
+                    HelpWindow.show_help()
                 elif id == 5:  # 退出
                     if self.verify_exit():  # 添加退出验证
                         self.cleanup()
@@ -178,6 +244,8 @@ class WeChatGuardianApp:
         """
         验证退出操作
         """
+        from tkinter import messagebox, simpledialog
+        
         # 如果启用了密码保护，需要验证密码
         if self.settings.config.get('password'):
             password = simpledialog.askstring(
@@ -186,7 +254,7 @@ class WeChatGuardianApp:
                 parent=self.root,
                 show='*'
             )
-            if not password or not self.settings.verify_password(password):
+            if not password or not self.settings.verifier.verify_in_background(self.root, password):
                 messagebox.showerror("错误", "密码验证失败")
                 return False
         
@@ -205,14 +273,31 @@ class WeChatGuardianApp:
             nid = (self.hwnd, 0)
             win32gui.Shell_NotifyIcon(win32gui.NIM_DELETE, nid)
             
-            # 停止所有线程
+            # 停止所有线程：唤醒正在休眠的检测线程并等待它退出
             self.guardian.is_guarding = False
+            self.supervisor.stop()
+            self.guardian.restore_protected_windows()
+            self.guardian.stop_foreground_events()
+            self.guardian.stop_window_index()
+            self.guardian.stop_session_events()
+            self.settings.store.stop_watching()
+            self.settings.save_config()
+            self.dispatcher.stop()
+            for exporter in self.metrics_exporters:
+                exporter.stop()
+            if self.memory_reporter:
+                self.memory_reporter.stop()
+            if self.guardian.audit_store:
+                self.guardian.audit_store.close()
+            if self.guardian.evidence_capture:
+                self.guardian.evidence_capture.stop()
+            if self.fleet_reporter:
+                self.fleet_reporter.stop()
+            logging.info(f"界面延迟统计: { {name: r.stats() for name, r in self.dispatcher.latency.items()} }")
+            logging.info(f"进程缓存统计: {self.guardian.process_cache.stats()}")
             
-            # 删除临时文件
-            if os.path.exists('temp_gray_icon.ico'):
-                os.remove('temp_gray_icon.ico')
-            if os.path.exists('temp_green_icon.ico'):
-                os.remove('temp_green_icon.ico')
+            # 释放图标句柄
+            self.tray_icons.destroy()
             
             logging.info("程序正常退出")
         except Exception as e:
@@ -232,7 +317,9 @@ class WeChatGuardianApp:
         if self.guardian.start_guardian():
             # 更新图标为绿色
             self.update_icon('green')
-            threading.Thread(target=self.guardian_thread, daemon=True).start()
+            self.report_state('guarding')
+            # 唤醒休眠中的守护线程，切换到守护模式的检查节奏
+            self.scheduler.wake()
             logging.info("守护模式已启动")
             return True
         
@@ -246,6 +333,7 @@ class WeChatGuardianApp:
         if self.guardian.stop_guardian(manual=True):
             logging.info("守护已停止，更新图标")
             self.update_icon('gray')
+            self.report_state('idle')
             return True
         logging.info("停止守护失败")
         return False
@@ -255,145 +343,122 @@ class WeChatGuardianApp:
         打开设置界面
         """
         logging.info("打开设置界面")
-        self.settings.open_settings_window()
+        self.settings.show_settings_dialog()
 
     def show_help(self):
         """
         显示帮助窗口
         """
         logging.info("显示帮助窗口")
+        from src.help_window import HelpWindow
         HelpWindow.show_help()
 
     def exit_app(self):
         """
         退出应用程序
         """
-        # 移除系统托盘图标
-        if hasattr(self, 'icon_handle'):
-            win32gui.Shell_NotifyIcon(win32gui.NIM_DELETE, self.icon_handle)
-        
-        # 退出程序
+        # 退出程序（托盘图标在 cleanup() 中移除）
         win32gui.PostQuitMessage(0)
 
-    def guardian_thread(self):
+    def _on_guardian_cycle(self, result):
         """
-        守护线程
+        处理一次守护循环的结果（守护线程）
         """
-        print("\n" * 2)
-        print("开始监控系统空闲时间...")
-        print("=" * 50)
-        
-        warning_shown = False  # 添加标志位，避免重复显示警告
-        
-        while True:
-            try:
-                # 只在非守护模式下检测空闲时间
-                if not self.guardian.is_guarding:
-                    warning_shown = False  # 重置标志位
-                    # 获取并显示空闲时间
-                    idle_time = self.guardian.get_idle_duration()
-                    print(f"\r当前空闲时间：{idle_time:.1f}秒，设定阈值：{self.guardian.idle_time_threshold}秒", end='', flush=True)
-                    
-                    # 检查是否需要进入守护模式
-                    if idle_time > self.guardian.idle_time_threshold:
-                        print(f"\n系统已空闲 {idle_time:.1f} 秒，进入守护模式！")
-                        print("=" * 50)
-                        self.guardian.is_guarding = True
-                        # 更新图标为绿色
-                        self.update_icon('green')
-                
-                # 在守护模式下只检查微信窗口
-                elif self.guardian.is_wechat_active() and not warning_shown:
-                    # 先锁定微信
-                    self.guardian.lock_wechat()
-                    
-                    # 立即显示警告窗口
-                    warning = tk.Toplevel()
-                    warning.title("警告")
-                    warning.geometry("1125x808")
-                    warning.resizable(False, False)
-                    
-                    # 使用 Segoe UI Emoji 字体显示彩色表情
-                    label = tk.Label(
-                        warning, 
-                        text="😈 喂～你坏蛋 😈\n不要看我微信", 
-                        font=("Segoe UI Emoji", 48),
-                        justify=tk.CENTER
-                    )
-                    label.pack(expand=True)
-                    
-                    # 创建一个大号按钮样式
-                    style = ttk.Style()
-                    style.configure(
-                        "Big.TButton",
-                        padding=(20, 10),
-                        font=("微软雅黑", 16)
-                    )
-                    
-                    # 添加放大的确定按钮
-                    ttk.Button(
-                        warning, 
-                        text="好的，我错了", 
-                        command=warning.destroy,
-                        style="Big.TButton"
-                    ).pack(pady=30)
-                    
-                    warning.transient()
-                    warning.grab_set()
-                    warning.focus_set()
-                    
-                    # 更新状态
-                    self.guardian.is_guarding = False
-                    self.update_icon('gray')
-                    warning_shown = True
-                
-                time.sleep(0.1)  # 缩短检测间隔，使显示更流畅
-                
-            except Exception as e:
-                logging.error(f"守护线程错误: {str(e)}")
-                logging.exception(e)
+        if result.event == START_GUARDIAN:
+            logging.info(f"系统已空闲 {result.idle_time:.1f} 秒，进入守护模式")
+            # 更新图标为绿色
+            self.update_icon('green')
+            self.report_state('guarding')
+        elif result.event == INTRUSION:
+            # 微信已锁定，交给界面线程显示警告窗口
+            self.dispatcher.post(ShowWarning(result.detected_at))
+            self.update_icon('gray')
+            if self.fleet_reporter and result.intrusion:
+                self.fleet_reporter.report_intrusion(result.intrusion)
+            self.report_state('idle')
+        elif result.idle_time is not None:
+            logging.debug(f"当前空闲时间：{result.idle_time:.1f}秒，设定阈值：{self.guardian.current_idle_threshold()}秒")
+
+    def _on_session_changed(self, active):
+        """
+        会话暂停或恢复（通知线程），唤醒守护线程进入或离开暂停状态
+        """
+        if active and not self.guardian.is_guarding:
+            # 解锁会话后可能已退出守护模式
+            self.update_icon('gray')
+            self.report_state('idle')
+        self.scheduler.wake()
 
     def on_config_changed(self, new_config):
         """
         处理配置更新
         """
-        if self.guardian:
-            self.guardian.config = new_config
-            self.guardian.idle_time_threshold = new_config.get("idle_time", 60)
+        # 守护器已直接订阅配置存储，这里只处理界面相关的更新
+        apply_logger_levels(new_config.get("log_levels"))
+        # 阈值变化会改变下一次唤醒时刻，立即唤醒守护线程重新计算
+        self.scheduler.wake()
 
     def start_guardian_thread(self):
         """
-        启动守护线程
+        启动守护线程（已在运行时不做任何事）
         """
-        threading.Thread(target=self.guardian_thread, daemon=True).start()
+        if self.supervisor.start():
+            logging.info("开始监控系统空闲时间")
+
+    def report_state(self, state):
+        """
+        向汇总服务上报守护状态变化（只追加到缓冲区），未配置时忽略
+        """
+        if self.fleet_reporter:
+            self.fleet_reporter.report_state(state)
 
     def update_icon(self, color):
         """
-        更新系统托盘图标
+        更新系统托盘图标，可在任意线程调用，由界面线程实际更新
+        """
+        self.dispatcher.post(SetTrayState(color, self.guardian.platform.clock.now()))
+
+    def _apply_tray_state(self, event):
+        """
+        更新系统托盘图标（界面线程），状态未变化时不会重复调用 Shell_NotifyIcon
         """
         try:
-            icon = self.green_icon if color == 'green' else self.gray_icon
-            temp_icon_path = os.path.join(os.path.dirname(__file__), f'temp_{color}_icon.ico')
-            icon.save(temp_icon_path, format='ICO', sizes=[(16, 16)])
-            hicon = win32gui.LoadImage(
-                0, 
-                temp_icon_path, 
-                win32con.IMAGE_ICON, 
-                16, 16, 
-                win32con.LR_LOADFROMFILE | win32con.LR_DEFAULTCOLOR
-            )
-            os.remove(temp_icon_path)
-            
-            flags = win32gui.NIF_ICON
-            nid = (self.hwnd, 0, flags, self.WM_TRAYICON, hicon)
-            win32gui.Shell_NotifyIcon(win32gui.NIM_MODIFY, nid)
+            self.tray_state.set_state(event.state)
         except Exception as e:
             logging.error(f"更新图标失败: {str(e)}")
 
+    def show_update(self, event):
+        """
+        显示更新提示（界面线程）
+        """
+        from src.updater import show_update_dialog
+        show_update_dialog(event.info, parent=self.root)
+
+    def show_warning(self, event):
+        """
+        显示警告窗口（界面线程），窗口只创建一次，之后复用
+        """
+        if self.warning_window is None:
+            from src.warning_window import WarningWindow
+            self.warning_window = WarningWindow(self.root)
+        self.warning_window.show()
+        
+        # 窗口绘制完成后记录从检测到可见的延迟
+        latency = self.dispatcher.record_latency('detection_to_warning', event.detected_at)
+        self._m_warning_latency.observe(latency)
+        logging.info(f"警告窗口已显示，检测到显示耗时 {latency * 1000:.0f} 毫秒")
+
+    def _set_tray_hicon(self, hicon):
+        """
+        替换托盘图标句柄
+        """
+        flags = win32gui.NIF_ICON
+        nid = (self.hwnd, 0, flags, self.WM_TRAYICON, hicon)
+        win32gui.Shell_NotifyIcon(win32gui.NIM_MODIFY, nid)
+
 def main():
     try:
-        app = WeChatGuardianApp()
-        app.run()
+        WeChatGuardianApp(startup_probe='--startup-probe' in sys.argv)
     except Exception as e:
         logging.critical(f"程序启动失败: {e}")
         print(f"程序启动失败: {e}")
@@ -0,0 +1,176 @@
+import os
+import sys
+import time
+import logging
+import threading
+import tracemalloc
+from collections import deque, namedtuple
+
+# 一次内存采样：时间、常驻内存、tracemalloc 当前/峰值（字节）、相对基线增长最多的分配位置
+MemorySample = namedtuple('MemorySample', ['timestamp', 'rss', 'traced', 'traced_peak', 'top_growth'])
+
+
+def current_rss():
+    """
+    获取当前进程的常驻内存（字节），获取失败时返回 0
+    """
+    try:
+        if sys.platform == 'win32':
+            import ctypes
+            from ctypes import wintypes
+
+            class PROCESS_MEMORY_COUNTERS(ctypes.Structure):
+                _fields_ = [
+                    ('cb', wintypes.DWORD),
+                    ('PageFaultCount', wintypes.DWORD),
+                    ('PeakWorkingSetSize', ctypes.c_size_t),
+                    ('WorkingSetSize', ctypes.c_size_t),
+                    ('QuotaPeakPagedPoolUsage', ctypes.c_size_t),
+                    ('QuotaPagedPoolUsage', ctypes.c_size_t),
+                    ('QuotaPeakNonPagedPoolUsage', ctypes.c_size_t),
+                    ('QuotaNonPagedPoolUsage', ctypes.c_size_t),
+                    ('PagefileUsage', ctypes.c_size_t),
+                    ('PeakPagefileUsage', ctypes.c_size_t),
+                ]
+
+            counters = PROCESS_MEMORY_COUNTERS()
+            counters.cb = ctypes.sizeof(counters)
+            handle = ctypes.windll.kernel32.GetCurrentProcess()
+            if ctypes.windll.psapi.GetProcessMemoryInfo(handle, ctypes.byref(counters), counters.cb):
+                return counters.WorkingSetSize
+            return 0
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except Exception:
+        return 0
+
+
+class MemoryReporter:
+    """
+    内存统计模式
+
+    基于 tracemalloc 和进程常驻内存定期采样，在日志中输出内存增长和增长最多的分配位置。
+    tracemalloc 会明显拖慢内存分配，只在排查内存问题时开启。
+    """
+
+    def __init__(self, interval=600.0, top=10, frames=1, history=144):
+        """
+        :param interval: 采样间隔（秒）
+        :param top: 每次输出增长最多的分配位置数量
+        :param frames: tracemalloc 记录的调用栈深度
+        :param history: 保留的采样数量
+        """
+        self.interval = interval
+        self.top = top
+        self.frames = frames
+        self.samples = deque(maxlen=history)
+        self.first = None
+        self._baseline = None
+        self._started_tracing = False
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self, background=True):
+        """
+        开始统计，以当前内存为基线
+        :param background: 是否在后台线程中按 interval 定期采样
+        """
+        if not tracemalloc.is_tracing():
+            tracemalloc.start(self.frames)
+            self._started_tracing = True
+        self._baseline = tracemalloc.take_snapshot()
+        self.first = self.sample(log=False)
+        if background and not self._thread:
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        """
+        停止统计并输出最后一次采样
+        """
+        self._stop.set()
+        self._thread = None
+        if self._baseline is not None:
+            self.sample()
+            self._baseline = None
+        if self._started_tracing:
+            tracemalloc.stop()
+            self._started_tracing = False
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            try:
+                self.sample()
+            except Exception as e:
+                logging.error(f"内存采样失败: {str(e)}")
+
+    def sample(self, log=True):
+        """
+        采样一次
+        :param log: 是否在日志中输出
+        :return: MemorySample
+        """
+        traced, traced_peak = tracemalloc.get_traced_memory()
+        top_growth = []
+        if self._baseline is not None:
+            # 只比较本模块以外的分配，排除 tracemalloc 自身
+            snapshot = tracemalloc.take_snapshot().filter_traces((
+                tracemalloc.Filter(False, tracemalloc.__file__),
+                tracemalloc.Filter(False, __file__),
+            ))
+            top_growth = [
+                (str(stat.traceback[0]), stat.size_diff, stat.count_diff)
+                for stat in snapshot.compare_to(self._baseline, 'lineno')[:self.top]
+                if stat.size_diff > 0
+            ]
+        sample = MemorySample(time.time(), current_rss(), traced, traced_peak, top_growth)
+        self.samples.append(sample)
+        if log:
+            self.log_sample(sample)
+        return sample
+
+    def log_sample(self, sample):
+        first = self.first or sample
+        logging.info(
+            f"内存统计：常驻 {sample.rss / 1048576:.1f} MB（增长 {(sample.rss - first.rss) / 1048576:+.1f} MB），"
+            f"Python 分配 {sample.traced / 1048576:.1f} MB（峰值 {sample.traced_peak / 1048576:.1f} MB）"
+        )
+        for location, size_diff, count_diff in sample.top_growth:
+            logging.info(f"  {location}: {size_diff / 1024:+.1f} KB，{count_diff:+d} 个对象")
+
+    def report(self):
+        """
+        :return: 最近一次采样及相对开始时的增长
+        """
+        if not self.samples:
+            return {}
+        first, last = self.first or self.samples[0], self.samples[-1]
+        return {
+            'rss': last.rss,
+            'rss_growth': last.rss - first.rss,
+            'traced': last.traced,
+            'traced_growth': last.traced - first.traced,
+            'traced_peak': last.traced_peak,
+            'top_growth': last.top_growth,
+        }
+
+
+def register_memory_metrics(registry):
+    """
+    注册常驻内存指标，只在采集时读取
+    """
+    registry.gauge('rss_bytes', '进程常驻内存（字节）').set_function(current_rss)
+
+
+def start_memory_report(config):
+    """
+    按配置开启内存统计模式（memory_report 为 true，间隔为 memory_report_interval 秒，默认 600）
+    :return: MemoryReporter 实例，未开启时返回 None
+    """
+    if not config.get("memory_report"):
+        return None
+    reporter = MemoryReporter(interval=float(config.get("memory_report_interval", 600)))
+    reporter.start()
+    logging.info("已开启内存统计模式")
+    return reporter
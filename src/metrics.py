@@ -0,0 +1,381 @@
+import os
+import json
+import time
+import bisect
+import logging
+import tempfile
+import threading
+
+# 默认延迟直方图分桶（秒）：覆盖从几微秒的缓存读取到秒级的锁定确认
+DEFAULT_BUCKETS = (0.00001, 0.00005, 0.0001, 0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0)
+
+DEFAULT_METRICS_PORT = 9464
+
+
+# 同一个指标会被多个线程更新：检测线程、界面线程（手动开始守护时的遮挡）、前台窗口事件线程和会话通知线程。
+# 读-改-写的更新（计数器加一、直方图的分桶/总和/次数）在每个指标自己的锁内完成，不会丢失或只更新一半；
+# Gauge.set() 只是一次赋值，不需要加锁
+
+class Counter:
+    """
+    只增不减的计数器
+    """
+
+    type = 'counter'
+
+    def __init__(self, name, help=''):
+        self.name = name
+        self.help = help
+        self.value = 0
+        self._lock = threading.Lock()
+
+    def inc(self, amount=1):
+        with self._lock:
+            self.value += amount
+
+    def samples(self):
+        return [(self.name, self.value)]
+
+
+class Gauge:
+    """
+    可增可减的瞬时值；set_function() 后在采集时才计算
+    """
+
+    type = 'gauge'
+
+    def __init__(self, name, help=''):
+        self.name = name
+        self.help = help
+        self.value = 0
+        self._function = None
+        self._lock = threading.Lock()
+
+    def set(self, value):
+        self.value = value
+
+    def inc(self, amount=1):
+        with self._lock:
+            self.value += amount
+
+    def dec(self, amount=1):
+        self.inc(-amount)
+
+    def set_function(self, function):
+        """
+        :param function: 无参函数，每次采集时调用并作为当前值
+        """
+        self._function = function
+
+    def get(self):
+        if self._function is not None:
+            try:
+                return self._function()
+            except Exception:
+                return float('nan')
+        return self.value
+
+    def samples(self):
+        return [(self.name, self.get())]
+
+
+class Histogram:
+    """
+    固定分桶的直方图，observe() 只做一次二分查找和三次加法
+    """
+
+    type = 'histogram'
+
+    def __init__(self, name, help='', buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.help = help
+        self.buckets = tuple(sorted(buckets))
+        self.counts = [0] * (len(self.buckets) + 1)  # 最后一个为 +Inf
+        self.sum = 0.0
+        self.count = 0
+        self._lock = threading.Lock()
+
+    def observe(self, value):
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            self.counts[index] += 1
+            self.sum += value
+            self.count += 1
+
+    def time(self):
+        """
+        计时上下文管理器：with histogram.time(): ...
+        """
+        return _Timer(self)
+
+    def samples(self):
+        # 在锁内复制，分桶与总和来自同一时刻
+        with self._lock:
+            counts = list(self.counts)
+            total = self.sum
+        # 各分桶累加后即为总数，保证与 +Inf 分桶一致
+        count = sum(counts)
+        result = []
+        cumulative = 0
+        for bound, n in zip(self.buckets, counts):
+            cumulative += n
+            result.append((f'{self.name}_bucket{{le="{_format_value(bound)}"}}', cumulative))
+        result.append((f'{self.name}_bucket{{le="+Inf"}}', count))
+        result.append((f'{self.name}_sum', total))
+        result.append((f'{self.name}_count', count))
+        return result
+
+    def to_dict(self):
+        with self._lock:
+            counts = list(self.counts)
+            total = self.sum
+        return {
+            'count': sum(counts),
+            'sum': total,
+            'buckets': dict(zip([_format_value(b) for b in self.buckets] + ['+Inf'], counts)),
+        }
+
+
+class _Timer:
+    def __init__(self, histogram):
+        self.histogram = histogram
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.histogram.observe(time.perf_counter() - self.start)
+        return False
+
+
+def _format_value(value):
+    if isinstance(value, bool):
+        return str(int(value))
+    if isinstance(value, float):
+        if value != value:
+            return 'NaN'
+        if value in (float('inf'), float('-inf')):
+            return '+Inf' if value > 0 else '-Inf'
+        return repr(value)
+    return str(value)
+
+
+class MetricsRegistry:
+    """
+    进程内指标注册表
+
+    counter()/gauge()/histogram() 按名称获取或创建指标，同名指标只创建一次，
+    各模块可以在初始化时各自注册需要的指标。
+    """
+
+    def __init__(self, prefix='wechat_guardian_'):
+        self.prefix = prefix
+        self._metrics = {}
+        self._lock = threading.Lock()
+
+    def _get_or_create(self, cls, name, help, **kwargs):
+        name = self.prefix + name
+        with self._lock:
+            metric = self._metrics.get(name)
+            if metric is None:
+                metric = cls(name, help, **kwargs)
+                self._metrics[name] = metric
+            elif not isinstance(metric, cls):
+                raise ValueError(f"指标 {name} 已注册为 {metric.type}")
+            return metric
+
+    def counter(self, name, help=''):
+        return self._get_or_create(Counter, name, help)
+
+    def gauge(self, name, help=''):
+        return self._get_or_create(Gauge, name, help)
+
+    def histogram(self, name, help='', buckets=DEFAULT_BUCKETS):
+        return self._get_or_create(Histogram, name, help, buckets=buckets)
+
+    def get(self, name):
+        return self._metrics.get(self.prefix + name)
+
+    def metrics(self):
+        with self._lock:
+            return list(self._metrics.values())
+
+    def render_prometheus(self):
+        """
+        :return: Prometheus 文本格式
+        """
+        lines = []
+        for metric in self.metrics():
+            if metric.help:
+                lines.append(f"# HELP {metric.name} {metric.help}")
+            lines.append(f"# TYPE {metric.name} {metric.type}")
+            for name, value in metric.samples():
+                lines.append(f"{name} {_format_value(value)}")
+        return "\n".join(lines) + "\n"
+
+    def to_dict(self):
+        """
+        :return: 可序列化为 JSON 的指标快照
+        """
+        result = {}
+        for metric in self.metrics():
+            if isinstance(metric, Histogram):
+                result[metric.name] = metric.to_dict()
+            elif isinstance(metric, Gauge):
+                result[metric.name] = metric.get()
+            else:
+                result[metric.name] = metric.value
+        return result
+
+
+class MetricsServer:
+    """
+    只监听本机回环地址的 HTTP 采集端点，GET /metrics 返回 Prometheus 文本格式
+    """
+
+    def __init__(self, registry, port=DEFAULT_METRICS_PORT, host='127.0.0.1'):
+        """
+        :param port: 端口，0 表示由系统分配
+        :param host: 只允许回环地址
+        """
+        if host not in ('127.0.0.1', 'localhost'):
+            raise ValueError("指标端点只允许监听本机回环地址")
+        self.registry = registry
+        self.host = host
+        self.port = port
+        self._server = None
+        self._thread = None
+
+    def start(self):
+        """
+        :return: 是否启动成功
+        """
+        if self._server:
+            return True
+        from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+        registry = self.registry
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.split('?')[0] not in ('/metrics', '/'):
+                    self.send_error(404)
+                    return
+                body = registry.render_prometheus().encode('utf-8')
+                self.send_response(200)
+                self.send_header('Content-Type', 'text/plain; version=0.0.4; charset=utf-8')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        try:
+            self._server = ThreadingHTTPServer((self.host, self.port), Handler)
+        except OSError as e:
+            logging.error(f"指标端点启动失败: {str(e)}")
+            return False
+        self._server.daemon_threads = True
+        self.port = self._server.server_address[1]
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        logging.info(f"指标端点已启动: http://{self.host}:{self.port}/metrics")
+        return True
+
+    def stop(self):
+        if self._server:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+            self._thread = None
+
+
+class MetricsJsonDumper:
+    """
+    定期把指标快照原子写入 JSON 文件
+    """
+
+    def __init__(self, registry, path, interval=60.0):
+        self.registry = registry
+        self.path = path
+        self.interval = interval
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        if self._thread:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """
+        停止并写入最后一次快照
+        """
+        if self._thread:
+            self._stop.set()
+            self._thread = None
+            self.dump()
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            self.dump()
+
+    def dump(self):
+        """
+        :return: 是否写入成功
+        """
+        data = {'timestamp': time.time(), 'metrics': self.registry.to_dict()}
+        directory = os.path.dirname(os.path.abspath(self.path))
+        try:
+            fd, temp_path = tempfile.mkstemp(prefix='.metrics.', suffix='.tmp', dir=directory)
+            try:
+                with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                    json.dump(data, f, indent=2, ensure_ascii=False)
+                os.replace(temp_path, self.path)
+            except Exception:
+                if os.path.exists(temp_path):
+                    os.remove(temp_path)
+                raise
+        except Exception as e:
+            logging.error(f"写入指标文件失败: {str(e)}")
+            return False
+        return True
+
+
+def start_exporters(registry, config):
+    """
+    按配置启动指标端点和 JSON 导出
+    - metrics_port：本机 HTTP 端点端口，未配置或为 0 时不启动
+    - metrics_json：JSON 文件路径，metrics_json_interval 为写入间隔（秒，默认 60）
+    :return: 已启动的导出器列表，退出时逐个调用 stop()
+    """
+    exporters = []
+    port = config.get("metrics_port")
+    if port:
+        server = MetricsServer(registry, port=int(port))
+        if server.start():
+            exporters.append(server)
+    path = config.get("metrics_json")
+    if path:
+        dumper = MetricsJsonDumper(registry, path, float(config.get("metrics_json_interval", 60)))
+        dumper.start()
+        exporters.append(dumper)
+    return exporters
+
+
+_registry = None
+_registry_lock = threading.Lock()
+
+
+def get_registry():
+    """
+    获取进程内唯一的指标注册表
+    """
+    global _registry
+    with _registry_lock:
+        if _registry is None:
+            _registry = MetricsRegistry()
+        return _registry
@@ -0,0 +1,194 @@
+import os
+import hmac
+import time
+import queue
+import base64
+import hashlib
+import logging
+import threading
+
+# 旧版本固定使用的迭代次数；没有保存迭代次数的密码按此验证
+LEGACY_ITERATIONS = 100000
+# 校准时的目标验证耗时（秒）
+TARGET_SECONDS = 0.25
+MIN_ITERATIONS = LEGACY_ITERATIONS
+MAX_ITERATIONS = 5000000
+
+
+def hash_password(password, salt, iterations):
+    """
+    使用 PBKDF2 和 SHA256 哈希密码
+    """
+    return hashlib.pbkdf2_hmac('sha256', password.encode('utf-8'), salt, iterations)
+
+
+def calibrate_iterations(target_seconds=TARGET_SECONDS, probe_iterations=20000):
+    """
+    测量本机 PBKDF2 速度，计算使一次验证耗时约为 target_seconds 的迭代次数
+    :return: 迭代次数，不低于 MIN_ITERATIONS
+    """
+    start = time.perf_counter()
+    hash_password('calibration', b'\0' * 16, probe_iterations)
+    elapsed = max(time.perf_counter() - start, 1e-6)
+    iterations = int(probe_iterations * target_seconds / elapsed)
+    # 取整到千位，便于在配置文件中阅读
+    iterations = iterations // 1000 * 1000
+    return max(MIN_ITERATIONS, min(MAX_ITERATIONS, iterations))
+
+
+_calibrated = {}
+_calibrate_lock = threading.Lock()
+
+
+def calibrated_iterations(target_seconds=TARGET_SECONDS):
+    """
+    :return: 本进程内缓存的校准结果，首次调用时校准
+    """
+    with _calibrate_lock:
+        if target_seconds not in _calibrated:
+            _calibrated[target_seconds] = calibrate_iterations(target_seconds)
+            logging.info(f"密码哈希迭代次数校准为 {_calibrated[target_seconds]}")
+        return _calibrated[target_seconds]
+
+
+def run_in_background(widget, func, *args, poll_ms=15):
+    """
+    在工作线程中执行 func，期间 Tk 继续处理事件，完成后返回结果
+
+    工作线程不接触 Tk；界面线程通过 after 轮询结果，并用 wait_variable 等待，界面不会卡住。
+    :param widget: 任意 Tk 控件
+    :return: func 的返回值，func 抛出的异常会在调用线程重新抛出
+    """
+    import tkinter as tk
+
+    results = queue.Queue()
+    done = tk.BooleanVar(widget, value=False)
+
+    def worker():
+        try:
+            results.put((True, func(*args)))
+        except Exception as e:
+            results.put((False, e))
+
+    def poll():
+        if results.empty():
+            widget.after(poll_ms, poll)
+        else:
+            done.set(True)
+
+    threading.Thread(target=worker, daemon=True).start()
+    widget.after(poll_ms, poll)
+    widget.wait_variable(done)
+    ok, value = results.get()
+    if not ok:
+        raise value
+    return value
+
+
+class PasswordVerifier:
+    """
+    密码验证器
+
+    密码记录为配置中的 password（哈希）、salt 和 iterations（迭代次数）。
+    迭代次数按本机速度校准并与哈希一起保存；验证成功时若迭代次数明显低于当前校准值（needs_rehash），
+    会用新的盐值和迭代次数重新哈希，逐步升级旧密码。
+    """
+
+    def __init__(self, store, target_seconds=TARGET_SECONDS):
+        """
+        :param store: 配置存储
+        :param target_seconds: 校准的目标验证耗时（秒）
+        """
+        self.store = store
+        self.target_seconds = target_seconds
+
+    @property
+    def enabled(self):
+        return bool(self.store.get('password'))
+
+    def target_iterations(self):
+        """
+        :return: 校准后的迭代次数（每个进程只校准一次）
+        """
+        return calibrated_iterations(self.target_seconds)
+
+    def make_record(self, password):
+        """
+        生成要写入配置的密码记录
+        :param password: 新密码，为空表示禁用密码保护
+        """
+        if not password:
+            return {'password': '', 'salt': '', 'iterations': 0}
+        salt = os.urandom(16)
+        iterations = self.target_iterations()
+        hashed = hash_password(password, salt, iterations)
+        return {
+            'password': base64.b64encode(hashed).decode('utf-8'),
+            'salt': base64.b64encode(salt).decode('utf-8'),
+            'iterations': iterations,
+        }
+
+    def set_password(self, password):
+        """
+        设置（或清除）密码
+        :return: 是否保存成功
+        """
+        return self.store.update(self.make_record(password), immediate=True)
+
+    def verify(self, password):
+        """
+        验证密码（阻塞，耗时约为一次 KDF 计算，不要在界面线程直接调用）
+        :return: 布尔值，未设置密码时返回 True
+        """
+        config = self.store.config
+        if not config.get('password'):
+            return True
+        if not password:
+            return False
+        try:
+            stored_hash = base64.b64decode(config['password'].encode('utf-8'))
+            stored_salt = base64.b64decode(config['salt'].encode('utf-8'))
+            iterations = int(config.get('iterations') or LEGACY_ITERATIONS)
+
+            input_hash = hash_password(password, stored_salt, iterations)
+            # 常量时间比较，避免时序攻击
+            if not hmac.compare_digest(stored_hash, input_hash):
+                return False
+        except Exception as e:
+            logging.error(f"密码验证失败: {str(e)}")
+            return False
+
+        if self.needs_rehash(config.get('iterations')):
+            logging.info(f"升级密码哈希迭代次数: {iterations} -> {self.target_iterations()}")
+            self.set_password(password)
+        return True
+
+    def needs_rehash(self, iterations):
+        """
+        判断验证成功后是否需要重新哈希
+
+        校准结果每个进程测量一次，会在一定范围内波动；只有旧格式（没有保存迭代次数）、
+        低于 MIN_ITERATIONS 或明显低于校准值（不到一半）时才升级，正常登录不会反复重写配置。
+        :param iterations: 配置中保存的迭代次数
+        """
+        if not iterations:
+            return True
+        iterations = int(iterations)
+        return iterations < MIN_ITERATIONS or iterations < self.target_iterations() // 2
+
+    def verify_in_background(self, widget, password):
+        """
+        在工作线程中验证密码，验证期间界面保持响应
+        :param widget: 任意 Tk 控件
+        :return: 布尔值
+        """
+        if not self.enabled:
+            return True
+        return run_in_background(widget, self.verify, password)
+
+    def set_password_in_background(self, widget, password):
+        """
+        在工作线程中计算哈希并保存新密码
+        :return: 是否保存成功
+        """
+        return run_in_background(widget, self.set_password, password)
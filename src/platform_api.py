@@ -0,0 +1,110 @@
+import sys
+import time
+
+
+class IdleSource:
+    """
+    系统空闲时间来源
+    """
+
+    def get_idle_duration(self):
+        """
+        :return: 距离最后一次用户输入的时间（秒）
+        """
+        raise NotImplementedError
+
+
+class Platform:
+    """
+    平台抽象层
+
+    守护逻辑只通过这里访问操作系统：
+    - clock：时钟（now() 与 wait(event, timeout)），供调度器和锁定确认使用
+    - idle：IdleSource，系统空闲时间
+    - create_foreground_source()：前台窗口事件源（ForegroundEventSource）
+    - get_foreground() / get_window_info()：轮询前台窗口和窗口信息
+    - create_window_source()：顶层窗口的枚举和创建、销毁、显示、改名事件（WindowEventSource）
+    - create_shield_backend()：批量最小化或隐藏窗口并恢复（ShieldBackend）
+    - create_session_source()：会话锁定、断开、显示器关闭和睡眠通知（SessionEventSource）
+    - lock_backend：LockBackend，锁定动作
+    - wall_time()：当前日历时间（Unix 时间戳），用于审计记录
+    托盘图标属于界面线程，由主程序通过 TrayIconState 管理，不在这里。
+    """
+
+    name = 'base'
+
+    def __init__(self, clock, idle, lock_backend):
+        self.clock = clock
+        self.idle = idle
+        self.lock_backend = lock_backend
+
+    def create_foreground_source(self, name_resolver):
+        """
+        :param name_resolver: 根据 pid 获取进程名的函数
+        :return: ForegroundEventSource 实例，不支持时返回 None
+        """
+        return None
+
+    def create_window_source(self):
+        """
+        :return: WindowEventSource 实例，不支持时返回 None
+        """
+        return None
+
+    def create_shield_backend(self):
+        """
+        :return: ShieldBackend 实例，不支持时返回 None
+        """
+        return None
+
+    def create_session_source(self):
+        """
+        :return: SessionEventSource 实例，不支持时返回 None
+        """
+        return None
+
+    def get_foreground(self):
+        """
+        :return: 当前前台窗口的 (hwnd, pid)，失败时返回 (0, 0)
+        """
+        raise NotImplementedError
+
+    def get_window_info(self, hwnd):
+        """
+        :return: 窗口的 (类名, 标题)
+        """
+        raise NotImplementedError
+
+    def process_create_time(self, pid):
+        """
+        :return: 进程创建时间，进程不存在时抛出异常
+        """
+        raise NotImplementedError
+
+    def resolve_process(self, pid, create_time):
+        """
+        :return: ProcessIdentity
+        """
+        raise NotImplementedError
+
+    def is_admin(self):
+        return False
+
+    def wall_time(self):
+        return time.time()
+
+    def localtime(self, t):
+        """
+        把时间戳转换为本地时间（struct_time），用于按时段生效的守护策略
+        """
+        return time.localtime(t)
+
+
+def get_default_platform():
+    """
+    获取当前操作系统的平台实现
+    """
+    if sys.platform == 'win32':
+        from src.platform_win32 import Win32Platform
+        return Win32Platform()
+    raise RuntimeError("仅支持 Windows 系统，其他平台请传入 src.simulation.SimPlatform")
@@ -0,0 +1,84 @@
+import ctypes
+import logging
+import win32gui
+import win32process
+from src.platform_api import Platform, IdleSource
+from src.scheduler import SystemClock
+from src.foreground import WinEventForegroundSource
+from src.window_index import Win32WindowEventSource
+from src.lock_action import Win32LockBackend
+from src.window_shield import Win32ShieldBackend
+from src.session_watch import Win32SessionEventSource
+from src.process_cache import process_create_time, resolve_identity
+
+
+class LASTINPUTINFO(ctypes.Structure):
+    _fields_ = [
+        ('cbSize', ctypes.c_uint),
+        ('dwTime', ctypes.c_uint),
+    ]
+
+
+class Win32IdleSource(IdleSource):
+    """
+    通过 GetLastInputInfo 获取系统空闲时间
+    """
+
+    def __init__(self):
+        self._info = LASTINPUTINFO()
+        self._info.cbSize = ctypes.sizeof(self._info)
+
+    def get_idle_duration(self):
+        try:
+            ctypes.windll.user32.GetLastInputInfo(ctypes.byref(self._info))
+            # GetTickCount 约 49.7 天回绕一次，按 32 位无符号数相减
+            millis = (ctypes.windll.kernel32.GetTickCount() - self._info.dwTime) & 0xFFFFFFFF
+            return millis / 1000.0
+        except Exception as e:
+            logging.error(f"获取空闲时间失败: {str(e)}")
+            return 0
+
+
+class Win32Platform(Platform):
+    """
+    Windows 平台实现
+    """
+
+    name = 'win32'
+
+    def __init__(self):
+        super().__init__(SystemClock(), Win32IdleSource(), Win32LockBackend())
+
+    def create_foreground_source(self, name_resolver):
+        return WinEventForegroundSource(name_resolver=name_resolver)
+
+    def create_window_source(self):
+        return Win32WindowEventSource()
+
+    def create_shield_backend(self):
+        return Win32ShieldBackend()
+
+    def create_session_source(self):
+        return Win32SessionEventSource()
+
+    def get_foreground(self):
+        hwnd = win32gui.GetForegroundWindow()
+        if not hwnd:
+            return 0, 0
+        _, pid = win32process.GetWindowThreadProcessId(hwnd)
+        return hwnd, pid
+
+    def get_window_info(self, hwnd):
+        return win32gui.GetClassName(hwnd), win32gui.GetWindowText(hwnd)
+
+    def process_create_time(self, pid):
+        return process_create_time(pid)
+
+    def resolve_process(self, pid, create_time):
+        return resolve_identity(pid, create_time)
+
+    def is_admin(self):
+        try:
+            return ctypes.windll.shell32.IsUserAnAdmin() != 0
+        except Exception:
+            return False
@@ -0,0 +1,113 @@
+import threading
+from collections import OrderedDict, namedtuple
+
+# 进程标识：进程 ID、创建时间、进程名、可执行文件路径
+ProcessIdentity = namedtuple('ProcessIdentity', ['pid', 'create_time', 'name', 'exe'])
+
+
+def process_create_time(pid):
+    import psutil
+    return psutil.Process(pid).create_time()
+
+
+def resolve_identity(pid, create_time):
+    import psutil
+    process = psutil.Process(pid)
+    try:
+        exe = process.exe()
+    except Exception:
+        exe = None
+    return ProcessIdentity(pid, create_time, process.name(), exe)
+
+
+class ProcessIdentityCache:
+    """
+    进程标识缓存（LRU）
+
+    以 (pid, 创建时间) 为键缓存进程名和路径。前台窗口的 pid 很少变化，
+    命中时只需查询一次进程创建时间，不再重复读取进程名和路径；
+    pid 被新进程复用时创建时间不同，旧条目会被替换。
+    """
+
+    def __init__(self, maxsize=64, create_time_fn=process_create_time, resolve_fn=resolve_identity):
+        """
+        :param maxsize: 最多缓存的进程数
+        :param create_time_fn: 根据 pid 获取进程创建时间的函数
+        :param resolve_fn: 根据 (pid, 创建时间) 解析 ProcessIdentity 的函数
+        """
+        self.maxsize = maxsize
+        self.create_time_fn = create_time_fn
+        self.resolve_fn = resolve_fn
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entries = OrderedDict()  # pid -> ProcessIdentity
+        self._lock = threading.Lock()
+
+    def get(self, pid):
+        """
+        获取进程标识
+        :param pid: 进程 ID
+        :return: ProcessIdentity，进程不存在时返回 None
+        """
+        try:
+            create_time = self.create_time_fn(pid)
+        except Exception:
+            self.invalidate(pid)
+            return None
+
+        with self._lock:
+            entry = self._entries.get(pid)
+            if entry is not None and entry.create_time == create_time:
+                self._entries.move_to_end(pid)
+                self.hits += 1
+                return entry
+            self.misses += 1
+
+        try:
+            identity = self.resolve_fn(pid, create_time)
+        except Exception:
+            self.invalidate(pid)
+            return None
+
+        with self._lock:
+            # pid 被复用时直接覆盖旧进程的条目
+            self._entries[pid] = identity
+            self._entries.move_to_end(pid)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+        return identity
+
+    def get_name(self, pid):
+        """
+        获取进程名
+        :return: 进程名，进程不存在时返回 None
+        """
+        identity = self.get(pid)
+        return identity.name if identity else None
+
+    def invalidate(self, pid):
+        """
+        移除指定 pid 的缓存条目
+        """
+        with self._lock:
+            self._entries.pop(pid, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        """
+        :return: 命中/未命中等统计信息
+        """
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'size': len(self._entries),
+                'hit_rate': self.hits / total if total else 0.0,
+            }
@@ -0,0 +1,104 @@
+import time
+import itertools
+import threading
+
+
+class SystemClock:
+    """
+    真实时钟：单调时间、可提前唤醒的等待和休眠
+    """
+    def now(self):
+        return time.monotonic()
+
+    def wait(self, event, timeout):
+        """
+        等待事件或超时
+        :param event: threading.Event，被 set 时提前返回
+        :param timeout: 超时时间（秒），None 表示一直等待
+        :return: 是否被提前唤醒
+        """
+        return event.wait(timeout)
+
+    def sleep(self, seconds):
+        time.sleep(seconds)
+
+
+class IdleScheduler:
+    """
+    基于截止时间的守护调度器
+
+    不再固定每 0.1 秒轮询，而是计算下一次可能发生状态变化的时刻并休眠到该时刻：
+    - 非守护模式：空闲时间只会单调增长，最早在 (阈值 - 当前空闲时间) 之后越过阈值
+    - 守护模式：按前台窗口检查间隔唤醒；订阅了前台窗口事件时只在事件到来时唤醒
+    - 配置了守护时段时，最晚在下一个时段边界唤醒，按新的阈值重新计算
+    配置变化、手动开始守护或退出时可通过 wake()/stop() 提前唤醒。
+    """
+
+    def __init__(self, clock=None, guard_check_interval=0.1, margin=0.05):
+        """
+        :param clock: 时钟对象，需提供 now() 和 wait(event, timeout)，默认使用 SystemClock
+        :param guard_check_interval: 守护模式下检查前台窗口的间隔（秒），
+            为 None 时表示由前台窗口事件唤醒，不再定时检查
+        :param margin: 越过阈值的余量（秒），保证唤醒时空闲时间严格大于阈值
+        """
+        self.clock = clock or SystemClock()
+        self.guard_check_interval = guard_check_interval
+        self.margin = margin
+        self.wakeups = 0
+        self._wake_event = threading.Event()
+        # 唤醒序号：wake() 先递增再 set，sleep() 据此发现两次休眠之间到来的唤醒
+        self._wake_seq = itertools.count()
+        self._woken = self._seen = 0
+        self._stopped = False
+
+    @property
+    def stopped(self):
+        return self._stopped
+
+    def next_timeout(self, is_guarding, idle_time, threshold, until_change=None):
+        """
+        计算距离下一次可能的状态变化还需等待多久
+        :param is_guarding: 是否处于守护模式
+        :param idle_time: 当前空闲时间（秒）
+        :param threshold: 空闲时间阈值（秒）
+        :param until_change: 距离下一个守护时段边界的时间（秒），阈值可能在边界处变化，最晚在边界唤醒
+        :return: 等待时间（秒）
+        """
+        if is_guarding:
+            timeout = self.guard_check_interval
+        else:
+            timeout = max(threshold - idle_time, 0) + self.margin
+        if until_change is not None and (timeout is None or until_change < timeout):
+            return max(until_change, 0)
+        return timeout
+
+    def sleep(self, timeout):
+        """
+        休眠直到超时或被唤醒
+        :param timeout: 超时时间（秒），None 表示直到被唤醒
+        :return: 调度器是否仍在运行
+        """
+        if self._stopped:
+            return False
+        # 先清除再等待，等待返回后不再清除：唤醒发生在接下来的检测之前，检测能看到唤醒前的修改；
+        # 上一次休眠返回之后（执行检测期间）到来的唤醒由序号发现，立即返回
+        self._wake_event.clear()
+        if self._woken == self._seen:
+            self.clock.wait(self._wake_event, timeout)
+        self._seen = self._woken
+        self.wakeups += 1
+        return not self._stopped
+
+    def wake(self):
+        """
+        提前唤醒休眠中的守护线程（例如配置发生变化）
+        """
+        self._woken = next(self._wake_seq) + 1
+        self._wake_event.set()
+
+    def stop(self):
+        """
+        停止调度，唤醒并让守护线程退出
+        """
+        self._stopped = True
+        self.wake()
@@ -0,0 +1,408 @@
+import os
+import sys
+import gzip
+import json
+import time
+import bisect
+import random
+import logging
+import argparse
+import tempfile
+import threading
+from collections import namedtuple
+
+# 以脚本方式运行时也能导入 src 包
+root_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if root_dir not in sys.path:
+    sys.path.insert(0, root_dir)
+
+from src.foreground import ForegroundInfo
+
+TRACE_VERSION = 1
+
+# 一段会话的轨迹（时间均为相对录制开始的秒数）：
+# - activity：[(开始, 结束)]，期间持续有用户输入
+# - foreground：[(时刻, 进程名, 窗口类名, 窗口标题)]，前台窗口切换
+# - intrusions：[(开始, 结束)]，标注为他人使用的时段
+Trace = namedtuple('Trace', ['start', 'duration', 'sample_interval', 'activity', 'foreground', 'intrusions'])
+
+# 一次回放的结果：阈值、回放时长、标注的入侵次数、锁定到的入侵、漏掉的入侵、
+# 误锁次数（主人正在使用电脑时锁定）、离开期间锁定的次数（主人离开时微信留在前台）、
+# 进入守护次数、从打开受保护程序到确认锁定的耗时列表、锁定动作耗时列表、唤醒次数、回放耗时（秒）
+ReplayReport = namedtuple('ReplayReport', [
+    'idle_time', 'duration', 'intrusions', 'caught', 'missed', 'false_locks', 'unattended_locks',
+    'guard_entries', 'exposures', 'lock_latencies', 'wakeups', 'elapsed'
+])
+
+
+def _open(path, mode):
+    if path.endswith('.gz'):
+        return gzip.open(path, mode + 't', encoding='utf-8')
+    return open(path, mode, encoding='utf-8')
+
+
+class TraceRecorder:
+    """
+    录制真实会话的空闲时间和前台窗口变化
+
+    每 sample_interval 秒读取一次空闲时间，由此推算最后一次输入的时刻；间隔不超过 merge_gap 的输入
+    合并为一段连续活动，只记录每段的起止时间。前台窗口优先订阅平台的切换事件，不支持时随采样轮询。
+    默认不记录窗口标题（可能包含聊天对象等隐私），只记录进程名和窗口类名。
+    """
+
+    def __init__(self, path, platform=None, sample_interval=1.0, record_titles=False, merge_gap=None):
+        """
+        :param path: 轨迹文件路径，以 .gz 结尾时压缩保存
+        :param platform: 平台实现，默认使用当前操作系统的实现
+        :param sample_interval: 空闲时间采样间隔（秒）
+        :param record_titles: 是否记录窗口标题
+        :param merge_gap: 合并为同一段活动的最大输入间隔（秒），默认为采样间隔的两倍
+        """
+        if platform is None:
+            from src.platform_api import get_default_platform
+            platform = get_default_platform()
+        from src.process_cache import ProcessIdentityCache
+        self.path = path
+        self.platform = platform
+        self.clock = platform.clock
+        self.sample_interval = sample_interval
+        self.record_titles = record_titles
+        self.merge_gap = merge_gap if merge_gap is not None else sample_interval * 2 + 0.5
+        self.process_cache = ProcessIdentityCache(
+            create_time_fn=platform.process_create_time,
+            resolve_fn=platform.resolve_process
+        )
+        self.records = 0
+        self._file = None
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+        self._source = None
+        self._t0 = None
+        self._span = None
+        self._last_input = None
+        self._foreground = None
+
+    def _now(self):
+        return self.clock.now() - self._t0
+
+    def _write(self, record):
+        with self._lock:
+            self._file.write(json.dumps(record, ensure_ascii=False, separators=(',', ':')) + '\n')
+            self.records += 1
+
+    def open(self):
+        """
+        创建轨迹文件并订阅前台窗口事件
+        """
+        self._t0 = self.clock.now()
+        self._file = _open(self.path, 'w')
+        self._write({'trace': TRACE_VERSION, 'start': self.platform.wall_time(), 'sample_interval': self.sample_interval})
+        self._source = self.platform.create_foreground_source(self.process_cache.get_name)
+        if self._source is not None and not self._source.start(self.on_foreground):
+            self._source = None
+        if self._source is None:
+            self._poll_foreground()
+
+    def start(self):
+        """
+        在后台线程中按采样间隔录制，直到 stop()
+        """
+        self.open()
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name='trace-recorder', daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                self.sample()
+            except Exception as e:
+                logging.error(f"录制轨迹失败: {str(e)}")
+            self.clock.wait(self._stop, self.sample_interval)
+
+    def sample(self):
+        """
+        采样一次空闲时间（无前台窗口事件时同时轮询前台窗口）
+        """
+        now = self._now()
+        last_input = round(now - self.platform.idle.get_idle_duration(), 2)
+        if last_input >= 0 and (self._last_input is None or last_input > self._last_input):
+            self._last_input = last_input
+            if self._span and last_input - self._span[1] <= self.merge_gap:
+                self._span[1] = last_input
+            else:
+                self._flush_span()
+                self._span = [last_input, last_input]
+        if self._source is None:
+            self._poll_foreground()
+
+    def _poll_foreground(self):
+        hwnd, pid = self.platform.get_foreground()
+        if (hwnd, pid) != self._foreground:
+            self.on_foreground(ForegroundInfo(hwnd, pid, self.process_cache.get_name(pid)))
+
+    def on_foreground(self, info):
+        """
+        前台窗口切换（可能在事件线程中调用）
+        """
+        self._foreground = (info.hwnd, info.pid)
+        window_class, title = self.platform.get_window_info(info.hwnd) if info.hwnd else ('', '')
+        self._write(['f', round(self._now(), 2), info.name, window_class, title if self.record_titles else None])
+
+    def mark_intrusion(self, start, end):
+        """
+        标注一段他人使用的时段（相对录制开始的秒数），用于评估
+        """
+        self._write(['x', round(start, 2), round(end, 2)])
+
+    def _flush_span(self):
+        if self._span:
+            self._write(['a', self._span[0], self._span[1]])
+            self._span = None
+
+    def stop(self):
+        """
+        停止录制，写入最后一段活动和结束时刻
+        """
+        if self._thread:
+            self._stop.set()
+            self._thread.join(self.sample_interval + 1)
+            self._thread = None
+        if self._source is not None:
+            self._source.stop()
+            self._source = None
+        if self._file:
+            self._flush_span()
+            self._write(['end', round(self._now(), 2)])
+            with self._lock:
+                self._file.close()
+                self._file = None
+
+
+def load_trace(path):
+    """
+    :return: Trace
+    """
+    activity, foreground, intrusions = [], [], []
+    header, duration = None, 0.0
+    with _open(path, 'r') as f:
+        for line in f:
+            if not line.strip():
+                continue
+            record = json.loads(line)
+            if header is None:
+                if not isinstance(record, dict) or record.get('trace') != TRACE_VERSION:
+                    raise ValueError(f"不支持的轨迹文件: {path}")
+                header = record
+                continue
+            kind = record[0]
+            if kind == 'a':
+                activity.append((record[1], record[2]))
+            elif kind == 'f':
+                foreground.append(tuple(record[1:5]))
+            elif kind == 'x':
+                intrusions.append((record[1], record[2]))
+            duration = max(duration, record[2] if kind in ('a', 'x') else record[1])
+    if header is None:
+        raise ValueError(f"空的轨迹文件: {path}")
+    return Trace(header['start'], duration, header.get('sample_interval', 1.0),
+                 sorted(activity), sorted(foreground, key=lambda item: item[0]), sorted(intrusions))
+
+
+def save_trace(trace, path):
+    with _open(path, 'w') as f:
+        f.write(json.dumps({'trace': TRACE_VERSION, 'start': trace.start, 'sample_interval': trace.sample_interval}) + '\n')
+        records = [['a', s, e] for s, e in trace.activity] + [['f', *item] for item in trace.foreground] + \
+                  [['x', s, e] for s, e in trace.intrusions]
+        for record in sorted(records, key=lambda record: record[1]):
+            f.write(json.dumps(record, ensure_ascii=False, separators=(',', ':')) + '\n')
+        f.write(json.dumps(['end', trace.duration]) + '\n')
+
+
+def inject_intrusions(trace, min_gap=120, duration=30, window=('WeChat.exe', 'WeChatMainWndForPC', None), seed=0):
+    """
+    在长时间无输入的时段中随机插入他人使用受保护程序的片段，并标注为入侵
+    :param min_gap: 只在不短于该时长（秒）的空闲时段中插入
+    :param duration: 每次入侵持续时间（秒）：开始时有输入，2 秒后切到受保护程序，结束时切回原窗口
+    :param window: 受保护程序的 (进程名, 窗口类名, 窗口标题)
+    :return: 新的 Trace
+    """
+    rng = random.Random(seed)
+    activity, foreground, intrusions = list(trace.activity), list(trace.foreground), list(trace.intrusions)
+    times = [item[0] for item in trace.foreground]
+    for (_, gap_start), (gap_end, _) in zip(trace.activity, trace.activity[1:]):
+        if gap_end - gap_start < min_gap:
+            continue
+        arrival = round(gap_start + rng.uniform(10, gap_end - gap_start - duration - 10), 2)
+        i = bisect.bisect_right(times, arrival)
+        previous = trace.foreground[i - 1][1:] if i else ('explorer.exe', 'CabinetWClass', None)
+        activity.append((arrival, round(arrival + duration, 2)))
+        foreground.append((round(arrival + 2, 2), *window))
+        foreground.append((round(arrival + duration, 2), *previous))
+        intrusions.append((arrival, round(arrival + duration, 2)))
+    return trace._replace(activity=sorted(activity), foreground=sorted(foreground, key=lambda item: item[0]),
+                          intrusions=sorted(intrusions))
+
+
+def replay(trace, idle_time, event_driven=True, config=None, input_interval=1.0):
+    """
+    在虚拟时钟上用轨迹驱动真实的守护循环（直接调用主程序检测线程使用的 guardian.run_loop，不经过 DetectionSupervisor 的重启和暂停逻辑）
+    :param trace: Trace
+    :param idle_time: 空闲时间阈值（秒）
+    :param event_driven: 是否使用前台窗口事件；为 False 时按轮询方式检测
+    :param config: 其他配置（如 protected_apps）
+    :param input_interval: 活动期间模拟输入的间隔（秒）
+    :return: ReplayReport
+    """
+    from src.config_store import ConfigStore
+    from src.scheduler import IdleScheduler
+    from src.simulation import SimPlatform
+    from src.metrics import MetricsRegistry
+    from src.wechat_guardian import WeChatGuardian, START_GUARDIAN, INTRUSION
+
+    platform = SimPlatform(event_driven=event_driven, epoch=trace.start)
+    clock = platform.clock
+
+    inputs = []
+    for start, end in trace.activity:
+        count = max(int((end - start) / input_interval), 0) + 1
+        inputs.extend(start + i * input_interval for i in range(count))
+    platform.idle.add_inputs(inputs)
+
+    pids, hwnds = {}, {}
+    for t, name, window_class, title in trace.foreground:
+        if name not in pids:
+            pids[name] = platform.add_process(name)
+        key = (name, window_class, title)
+        if key not in hwnds:
+            hwnds[key] = platform.add_window(pids[name], window_class or '', title or '')
+        hwnd = hwnds[key]
+        # 每次切到窗口前视为已解锁（此前被锁定的微信由主人输入密码解锁）
+        clock.call_at(t, lambda hwnd=hwnd: platform.lock_backend.unlock(hwnd))
+        platform.foreground.switch_at(t, hwnd, pids[name])
+
+    # 每段入侵中第一次切换前台窗口的时刻，即打开受保护程序的时刻
+    activations = []
+    for start, end in trace.intrusions:
+        switches = [item[0] for item in trace.foreground if start <= item[0] <= end]
+        activations.append(switches[0] if switches else start)
+
+    # 主人的活动（去掉入侵者的输入），用于区分误锁和主人离开期间的锁定
+    owner = [span for span in trace.activity
+             if not any(start <= span[0] and span[1] <= end for start, end in trace.intrusions)]
+    owner_starts = [start for start, _ in owner]
+    tolerance = trace.sample_interval * 2 + input_interval
+    switch_times = [item[0] for item in trace.foreground]
+    # 已经锁定过的前台切换：同一次切换后窗口一直留在前台时守护会反复锁定，只统计第一次
+    locked_switches = set()
+
+    def owner_present(t):
+        i = bisect.bisect_right(owner_starts, t) - 1
+        return i >= 0 and t <= owner[i][1] + tolerance
+
+    caught, exposures, lock_latencies = set(), [], []
+    false_locks = unattended_locks = guard_entries = 0
+    with tempfile.TemporaryDirectory() as tmp:
+        store = ConfigStore(os.path.join(tmp, 'config.json'), debounce=0)
+        store.update({**(config or {}), 'idle_time': idle_time}, immediate=True)
+        guardian = WeChatGuardian(config_store=store, platform=platform, metrics=MetricsRegistry())
+        scheduler = IdleScheduler(clock=clock)
+        guardian.on_wechat_activated = lambda info: scheduler.wake()
+        if guardian.start_foreground_events():
+            scheduler.guard_check_interval = None
+        clock.call_at(trace.duration, scheduler.stop)
+
+        def on_cycle(result):
+            nonlocal false_locks, unattended_locks, guard_entries
+            if result.event == START_GUARDIAN:
+                guard_entries += 1
+            elif result.event == INTRUSION:
+                switch = bisect.bisect_right(switch_times, result.detected_at) - 1
+                if switch in locked_switches:
+                    return
+                locked_switches.add(switch)
+                lock_latencies.append(result.lock_result.latency)
+                for i, (start, end) in enumerate(trace.intrusions):
+                    if start <= result.detected_at <= end:
+                        if i not in caught:
+                            caught.add(i)
+                            exposures.append(result.detected_at + result.lock_result.latency - activations[i])
+                        break
+                else:
+                    if owner_present(result.detected_at):
+                        false_locks += 1
+                    else:
+                        unattended_locks += 1
+
+        started = time.perf_counter()
+        guardian.run_loop(scheduler, on_cycle)
+        elapsed = time.perf_counter() - started
+        guardian.stop_foreground_events()
+
+    return ReplayReport(idle_time, trace.duration, len(trace.intrusions), len(caught),
+                        len(trace.intrusions) - len(caught), false_locks, unattended_locks, guard_entries,
+                        exposures, lock_latencies, scheduler.wakeups, elapsed)
+
+
+def format_reports(reports):
+    """
+    :return: 多个阈值回放结果的对比表
+    """
+    def median(values):
+        values = sorted(values)
+        return values[len(values) // 2] * 1000 if values else 0.0
+
+    lines = [f"{'阈值(秒)':>8}{'锁定入侵':>10}{'漏掉':>6}{'误锁':>6}{'离开时锁定':>10}{'进入守护':>9}"
+             f"{'打开到锁定(ms)':>15}{'锁定动作(ms)':>13}{'回放倍速':>10}"]
+    for r in reports:
+        speed = r.duration / r.elapsed if r.elapsed else 0
+        lines.append(f"{r.idle_time:>8}{r.caught:>6}/{r.intrusions:<3}{r.missed:>6}{r.false_locks:>6}{r.unattended_locks:>10}{r.guard_entries:>9}"
+                     f"{median(r.exposures):>15.0f}{median(r.lock_latencies):>13.0f}{speed:>9.0f}x")
+    return '\n'.join(lines)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="录制会话轨迹并回放评估空闲阈值")
+    commands = parser.add_subparsers(dest='command', required=True)
+    record = commands.add_parser('record', help="录制当前会话（Windows）")
+    record.add_argument('--out', default='session.trace.gz', help="轨迹文件路径")
+    record.add_argument('--interval', type=float, default=1.0, help="采样间隔（秒）")
+    record.add_argument('--duration', type=float, help="录制时长（秒），默认直到 Ctrl+C")
+    record.add_argument('--titles', action='store_true', help="记录窗口标题")
+    play = commands.add_parser('replay', help="用轨迹评估不同的空闲阈值")
+    play.add_argument('trace', help="轨迹文件路径")
+    play.add_argument('--idle-time', type=int, nargs='+', default=[30, 60, 120, 300, 600], help="要评估的阈值（秒）")
+    play.add_argument('--inject', type=float, metavar='MIN_GAP',
+                      help="在不短于 MIN_GAP 秒的空闲时段中插入模拟入侵（轨迹中没有标注时使用）")
+    play.add_argument('--intruder-duration', type=float, default=30, help="模拟入侵的持续时间（秒）")
+    play.add_argument('--polling', action='store_true', help="按轮询方式检测前台窗口")
+    args = parser.parse_args(argv)
+
+    if args.command == 'record':
+        recorder = TraceRecorder(args.out, sample_interval=args.interval, record_titles=args.titles)
+        recorder.start()
+        print(f"正在录制到 {args.out}，按 Ctrl+C 结束")
+        deadline = time.monotonic() + args.duration if args.duration else None
+        try:
+            while deadline is None or time.monotonic() < deadline:
+                time.sleep(1)
+        except KeyboardInterrupt:
+            pass
+        recorder.stop()
+        print(f"已录制 {recorder.records} 条记录")
+        return 0
+
+    logging.disable(logging.WARNING)
+    trace = load_trace(args.trace)
+    if args.inject:
+        trace = inject_intrusions(trace, args.inject, args.intruder_duration)
+    print(f"轨迹时长 {trace.duration / 3600:.1f} 小时，{len(trace.activity)} 段活动，"
+          f"{len(trace.foreground)} 次窗口切换，{len(trace.intrusions)} 次标注的入侵")
+    reports = [replay(trace, idle_time, event_driven=not args.polling) for idle_time in args.idle_time]
+    print(format_reports(reports))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,251 @@
+import logging
+import threading
+
+# 暂停检测的原因：工作站锁定、会话断开（切换用户或远程桌面断开）、显示器关闭、系统睡眠
+SESSION_LOCKED = 'locked'
+SESSION_DISCONNECTED = 'disconnected'
+DISPLAY_OFF = 'display_off'
+SYSTEM_SUSPENDED = 'suspended'
+# 解除时需要验证身份的原因：恢复后可以确认是主人回来了
+AUTHENTICATED_REASONS = frozenset((SESSION_LOCKED, SESSION_DISCONNECTED))
+
+WM_QUIT = 0x0012
+WM_WTSSESSION_CHANGE = 0x02B1
+WM_POWERBROADCAST = 0x0218
+WTS_CONSOLE_CONNECT = 0x1
+WTS_CONSOLE_DISCONNECT = 0x2
+WTS_REMOTE_CONNECT = 0x3
+WTS_REMOTE_DISCONNECT = 0x4
+WTS_SESSION_LOCK = 0x7
+WTS_SESSION_UNLOCK = 0x8
+NOTIFY_FOR_THIS_SESSION = 0
+PBT_APMSUSPEND = 0x4
+PBT_APMRESUMESUSPEND = 0x7
+PBT_APMRESUMEAUTOMATIC = 0x12
+PBT_POWERSETTINGCHANGE = 0x8013
+DEVICE_NOTIFY_WINDOW_HANDLE = 0
+# GUID_CONSOLE_DISPLAY_STATE：0 关闭、1 打开、2 变暗
+GUID_CONSOLE_DISPLAY_STATE = '{6FE69556-704A-47A0-8F24-C28D936FDA47}'
+
+# 会话通知 -> (原因, 是否进入该状态)
+_WTS_EVENTS = {
+    WTS_SESSION_LOCK: (SESSION_LOCKED, True),
+    WTS_SESSION_UNLOCK: (SESSION_LOCKED, False),
+    WTS_CONSOLE_DISCONNECT: (SESSION_DISCONNECTED, True),
+    WTS_REMOTE_DISCONNECT: (SESSION_DISCONNECTED, True),
+    WTS_CONSOLE_CONNECT: (SESSION_DISCONNECTED, False),
+    WTS_REMOTE_CONNECT: (SESSION_DISCONNECTED, False),
+}
+
+
+class SessionEventSource:
+    """
+    会话和电源状态通知来源接口
+
+    start() 之后，每当会话锁定/解锁、断开/重新连接、显示器关闭/打开、系统睡眠/唤醒时
+    调用 callback(原因, 是否进入该状态)。
+    """
+
+    def start(self, callback):
+        """
+        :return: 是否启动成功
+        """
+        raise NotImplementedError
+
+    def stop(self):
+        raise NotImplementedError
+
+
+class Win32SessionEventSource(SessionEventSource):
+    """
+    基于 WTSRegisterSessionNotification 和 RegisterPowerSettingNotification 的通知来源
+
+    在独立线程中创建一个不显示的窗口接收 WM_WTSSESSION_CHANGE 和 WM_POWERBROADCAST，
+    两次通知之间线程阻塞在 GetMessage 中，不消耗任何 CPU。
+    """
+
+    def __init__(self):
+        self._callback = None
+        self._thread = None
+        self._thread_id = None
+        self._started = threading.Event()
+        self._ok = False
+
+    def start(self, callback):
+        self._callback = callback
+        self._thread = threading.Thread(target=self._run, name='session-events', daemon=True)
+        self._thread.start()
+        self._started.wait(2)
+        return self._ok
+
+    def stop(self):
+        if self._thread_id:
+            import ctypes
+            ctypes.windll.user32.PostThreadMessageW(self._thread_id, WM_QUIT, 0, 0)
+        self._thread_id = None
+
+    def _emit(self, reason, entered):
+        try:
+            self._callback(reason, entered)
+        except Exception as e:
+            logging.error(f"处理会话通知失败: {str(e)}")
+
+    def _on_power(self, wparam, lparam):
+        import ctypes
+        if wparam == PBT_APMSUSPEND:
+            self._emit(SYSTEM_SUSPENDED, True)
+        elif wparam in (PBT_APMRESUMESUSPEND, PBT_APMRESUMEAUTOMATIC):
+            # 两种恢复通知可能先后到来，重复的通知由 SessionMonitor 忽略
+            self._emit(SYSTEM_SUSPENDED, False)
+        elif wparam == PBT_POWERSETTINGCHANGE and lparam:
+            # POWERBROADCAST_SETTING：GUID（16 字节）、DataLength、Data；只订阅了显示器状态
+            state = ctypes.cast(lparam + 20, ctypes.POINTER(ctypes.c_ubyte))[0]
+            self._emit(DISPLAY_OFF, state == 0)
+
+    def _run(self):
+        hwnd = None
+        session_registered = False
+        power_handle = None
+        try:
+            import ctypes
+            from ctypes import wintypes
+            user32 = ctypes.windll.user32
+            wtsapi32 = ctypes.windll.wtsapi32
+            LRESULT = ctypes.c_ssize_t
+            WNDPROC = ctypes.WINFUNCTYPE(LRESULT, wintypes.HWND, wintypes.UINT, wintypes.WPARAM, wintypes.LPARAM)
+
+            class WNDCLASSW(ctypes.Structure):
+                _fields_ = [
+                    ('style', wintypes.UINT), ('lpfnWndProc', WNDPROC),
+                    ('cbClsExtra', ctypes.c_int), ('cbWndExtra', ctypes.c_int),
+                    ('hInstance', wintypes.HINSTANCE), ('hIcon', wintypes.HICON),
+                    ('hCursor', wintypes.HANDLE), ('hbrBackground', wintypes.HBRUSH),
+                    ('lpszMenuName', wintypes.LPCWSTR), ('lpszClassName', wintypes.LPCWSTR),
+                ]
+
+            class GUID(ctypes.Structure):
+                _fields_ = [('Data1', wintypes.DWORD), ('Data2', wintypes.WORD),
+                            ('Data3', wintypes.WORD), ('Data4', ctypes.c_ubyte * 8)]
+
+            user32.DefWindowProcW.restype = LRESULT
+            user32.DefWindowProcW.argtypes = [wintypes.HWND, wintypes.UINT, wintypes.WPARAM, wintypes.LPARAM]
+
+            def wnd_proc(hwnd, msg, wparam, lparam):
+                if msg == WM_WTSSESSION_CHANGE:
+                    event = _WTS_EVENTS.get(wparam)
+                    if event:
+                        self._emit(*event)
+                    return 0
+                if msg == WM_POWERBROADCAST:
+                    self._on_power(wparam, lparam)
+                    return 1
+                return user32.DefWindowProcW(hwnd, msg, wparam, lparam)
+
+            # 保存回调引用，防止被垃圾回收
+            self._proc = WNDPROC(wnd_proc)
+            wc = WNDCLASSW()
+            wc.lpfnWndProc = self._proc
+            wc.hInstance = ctypes.windll.kernel32.GetModuleHandleW(None)
+            wc.lpszClassName = 'WeChatGuardianSessionWatch'
+            user32.RegisterClassW(ctypes.byref(wc))
+            user32.CreateWindowExW.restype = wintypes.HWND
+            # 普通的隐藏顶层窗口（不是仅消息窗口），才能收到睡眠、唤醒等广播通知
+            hwnd = user32.CreateWindowExW(0, wc.lpszClassName, wc.lpszClassName, 0,
+                                          0, 0, 0, 0, None, None, wc.hInstance, None)
+            if not hwnd:
+                raise OSError("创建会话通知窗口失败")
+            session_registered = bool(wtsapi32.WTSRegisterSessionNotification(hwnd, NOTIFY_FOR_THIS_SESSION))
+            if not session_registered:
+                raise OSError("WTSRegisterSessionNotification 失败")
+            guid = GUID()
+            ctypes.windll.ole32.CLSIDFromString(GUID_CONSOLE_DISPLAY_STATE, ctypes.byref(guid))
+            user32.RegisterPowerSettingNotification.restype = wintypes.HANDLE
+            power_handle = user32.RegisterPowerSettingNotification(hwnd, ctypes.byref(guid), DEVICE_NOTIFY_WINDOW_HANDLE)
+            if not power_handle:
+                # 只影响显示器状态，锁定和断开仍然有效
+                logging.warning("订阅显示器状态通知失败")
+
+            self._thread_id = ctypes.windll.kernel32.GetCurrentThreadId()
+            self._ok = True
+            self._started.set()
+
+            msg = wintypes.MSG()
+            while user32.GetMessageW(ctypes.byref(msg), 0, 0, 0) > 0:
+                user32.TranslateMessage(ctypes.byref(msg))
+                user32.DispatchMessageW(ctypes.byref(msg))
+        except Exception as e:
+            logging.error(f"会话通知订阅失败: {str(e)}")
+        finally:
+            try:
+                import ctypes
+                if power_handle:
+                    ctypes.windll.user32.UnregisterPowerSettingNotification(power_handle)
+                if session_registered:
+                    ctypes.windll.wtsapi32.WTSUnRegisterSessionNotification(hwnd)
+                if hwnd:
+                    ctypes.windll.user32.DestroyWindow(hwnd)
+            except Exception:
+                pass
+            self._started.set()
+
+
+class SessionMonitor:
+    """
+    汇总会话和电源通知：锁定、断开、显示器关闭、睡眠中任何一个成立时会话视为不活动
+
+    状态真正变化时调用 on_change(是否活动, 原因集合)：变为不活动时为当前成立的原因，
+    恢复时为本次不活动期间解除过的原因；重复的通知被忽略。
+    """
+
+    def __init__(self, source, on_change=None, clock=None):
+        """
+        :param source: SessionEventSource 实例
+        :param on_change: 会话活动状态变化时的回调（在通知线程中调用）
+        :param clock: 当前时间函数，提供时记录状态变化的时刻（changed_at）
+        """
+        self.source = source
+        self.on_change = on_change
+        self.clock = clock
+        self.inactive = set()
+        self.changed_at = None
+        self.events = 0
+        self.running = False
+        self._ended = set()
+        self._lock = threading.Lock()
+
+    @property
+    def active(self):
+        return not self.inactive
+
+    def start(self):
+        """
+        :return: 是否启动成功
+        """
+        self.running = bool(self.source.start(self._on_event))
+        return self.running
+
+    def stop(self):
+        self.source.stop()
+        self.running = False
+
+    def _on_event(self, reason, entered):
+        with self._lock:
+            self.events += 1
+            was_active = not self.inactive
+            if entered:
+                self.inactive.add(reason)
+            elif reason in self.inactive:
+                self.inactive.discard(reason)
+                self._ended.add(reason)
+            else:
+                return
+            active = not self.inactive
+            if active == was_active:
+                return
+            # 记录本次不活动期间解除过的全部原因，用于判断恢复时是否验证过身份
+            ended, self._ended = self._ended, set()
+            reasons = ended if active else set(self.inactive)
+            if self.clock:
+                self.changed_at = self.clock()
+        if self.on_change:
+            self.on_change(active, reasons)
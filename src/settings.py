@@ -1,51 +1,61 @@
-import json
-import os
 import logging
-import tkinter as tk
-from tkinter import ttk, messagebox, simpledialog
-import hashlib
-import base64
+from src.config_store import get_config_store
+from src.password import PasswordVerifier
 
 class GuardianSettings:
-    def __init__(self):
-        self.config = self.load_config()
+    def __init__(self, store=None, verifier=None):
+        """
+        :param store: 配置存储，默认使用进程内唯一的 ConfigStore
+        :param verifier: 密码验证器，默认新建
+        """
+        self.store = store or get_config_store()
+        self.verifier = verifier or PasswordVerifier(self.store)
         self.on_config_changed = None
+        self._settings_window = None
+        self.store.subscribe(self._on_store_changed)
 
-    def load_config(self):
+    @property
+    def config(self):
         """
-        加载配置文件
+        当前配置（只读），修改请使用 update_config()
         """
-        try:
-            if os.path.exists('config.json'):
-                with open('config.json', 'r', encoding='utf-8') as f:
-                    return json.load(f)
-            return {"idle_time": 10, "password": ""}  # 默认配置
-        except Exception as e:
-            logging.error(f"加载配置失败: {str(e)}")
-            return {"idle_time": 10, "password": ""}
+        return self.store.config
+
+    def _on_store_changed(self, snapshot):
+        if self.on_config_changed:
+            self.on_config_changed(snapshot.data)
+
+    def update_config(self, changes, immediate=False):
+        """
+        修改配置，写文件和通知经过防抖合并
+        """
+        return self.store.update(changes, immediate=immediate)
 
     def save_config(self):
         """
         保存配置文件
         """
-        try:
-            with open('config.json', 'w', encoding='utf-8') as f:
-                json.dump(self.config, f, indent=4)
-            if self.on_config_changed:
-                self.on_config_changed(self.config)
-            return True
-        except Exception as e:
-            logging.error(f"保存配置失败: {str(e)}")
-            return False
+        return self.store.flush()
 
     def show_settings_dialog(self):
         """
-        显示设置对话框
+        显示设置对话框，窗口只创建一次，关闭时隐藏，再次打开时按当前配置刷新
         """
+        window = self._settings_window
+        if window is not None and window.winfo_exists():
+            self._idle_var.set(str(self.config.get("idle_time", 10)))
+            self._pwd_var.set(bool(self.config.get("password")))
+            self._show_window(window)
+            return window
+        
+        import tkinter as tk
+        from tkinter import ttk
+        
         window = tk.Toplevel()
         window.title("设置")
         window.geometry("300x250")  # 增加窗口高度
         window.resizable(False, False)
+        window.protocol("WM_DELETE_WINDOW", lambda: self._hide_window(window))
 
         # 空闲时间设置
         idle_frame = ttk.LabelFrame(window, text="空闲时间设置")
@@ -57,9 +67,10 @@ class GuardianSettings:
         def on_idle_time_change(*args):
             try:
                 idle_time = int(idle_var.get())
-                if idle_time > 0:
-                    self.config["idle_time"] = idle_time
-                    self.save_config()
+                # 重新打开窗口时刷新显示的值不算修改
+                if idle_time > 0 and idle_time != self.store.snapshot.idle_time:
+                    # 每次按键都会触发，由配置存储合并后再写入文件
+                    self.update_config({"idle_time": idle_time})
             except ValueError:
                 pass
 
@@ -94,16 +105,38 @@ class GuardianSettings:
             justify=tk.LEFT  # 左对齐
         ).pack(padx=5, pady=5, fill=tk.BOTH, expand=True)  # 让文本标签填充框架
 
+        self._settings_window = window
+        self._idle_var = idle_var
+        self._pwd_var = pwd_var
+        self._show_window(window)
+        return window
+
+    def hide_settings_dialog(self):
+        """
+        隐藏设置对话框
+        """
+        if self._settings_window is not None and self._settings_window.winfo_exists():
+            self._hide_window(self._settings_window)
+
+    def _show_window(self, window):
+        window.deiconify()
         window.transient()
         window.grab_set()
         window.focus_set()
 
+    def _hide_window(self, window):
+        window.grab_release()
+        window.withdraw()
+
     def toggle_password(self, enable, parent_window=None):
         """
         切换密码保护
         """
-        # 如果之前有密码，需要先验证
-        if self.config.get('password') and not self.verify_password(
+        from tkinter import messagebox, simpledialog
+        
+        # 如果之前有密码，需要先验证（在工作线程中计算哈希，界面不会卡住）
+        if self.config.get('password') and not self.verifier.verify_in_background(
+            parent_window,
             simpledialog.askstring(
                 "验证密码",
                 "请输入当前密码:",
@@ -130,7 +163,7 @@ class GuardianSettings:
                     show='*'
                 )
                 if password == confirm:
-                    self.set_password(password)
+                    self.verifier.set_password_in_background(parent_window, password)
                 else:
                     messagebox.showerror("错误", "两次输入的密码不一致")
                     return False
@@ -146,58 +179,13 @@ class GuardianSettings:
         设置密码
         """
         try:
-            if not password:  # 如果密码为空，则禁用密码保护
-                self.config['password'] = ''
-                self.config['salt'] = ''
-            else:
-                # 生成随机盐值
-                salt = os.urandom(16)
-                # 使用盐值和密码生成哈希
-                hashed = self._hash_password(password, salt)
-                
-                self.config['salt'] = base64.b64encode(salt).decode('utf-8')
-                self.config['password'] = base64.b64encode(hashed).decode('utf-8')
-            
-            self.save_config()
-            return True
+            return self.verifier.set_password(password)
         except Exception as e:
             logging.error(f"设置密码失败: {str(e)}")
             return False
 
     def verify_password(self, password):
         """
-        验证密码
-        """
-        try:
-            if not self.config.get('password'):
-                return True
-                
-            stored_hash = base64.b64decode(self.config['password'].encode('utf-8'))
-            stored_salt = base64.b64decode(self.config['salt'].encode('utf-8'))
-            
-            input_hash = self._hash_password(password, stored_salt)
-            
-            # 使用安全的比较方法
-            return self._secure_compare(stored_hash, input_hash)
-        except Exception as e:
-            logging.error(f"密码验证失败: {str(e)}")
-            return False
-            
-    def _hash_password(self, password, salt):
-        """
-        使用 PBKDF2 和 SHA256 哈希密码
-        """
-        return hashlib.pbkdf2_hmac(
-            'sha256',
-            password.encode('utf-8'),
-            salt,
-            100000  # 迭代次数
-        )
-        
-    def _secure_compare(self, a, b):
-        """
-        安全的字符串比较，避免时序攻击
+        验证密码（阻塞，界面中请使用 verifier.verify_in_background）
         """
-        return len(a) == len(b) and all(
-            x == y for x, y in zip(a, b)
-        )
+        return self.verifier.verify(password)
@@ -0,0 +1,423 @@
+import time
+import heapq
+import bisect
+import random
+import itertools
+from collections import deque
+from src.platform_api import Platform, IdleSource
+from src.foreground import ForegroundEventSource, ForegroundInfo
+from src.lock_action import FakeLockBackend
+from src.window_shield import ShieldBackend, SavedWindow, SHIELD_HIDE
+from src.session_watch import SessionEventSource
+from src.process_cache import ProcessIdentity
+from src.evidence import ScreenSource, Frame
+from src.window_index import (WindowEventSource, WindowInfo, WINDOW_CREATED, WINDOW_DESTROYED, WINDOW_SHOWN,
+                              WINDOW_HIDDEN, WINDOW_RENAMED)
+
+
+class SimClock:
+    """
+    可控的虚拟时钟（离散事件模拟）
+
+    通过 call_at() 预约在某个虚拟时刻执行的回调；wait()/sleep() 不真正休眠，
+    而是把时间推进到下一个回调或超时时刻，并按时间顺序执行途中的回调。
+    """
+
+    def __init__(self, start=0.0):
+        self.t = start
+        self._timers = []
+        self._seq = itertools.count()
+
+    def now(self):
+        return self.t
+
+    def call_at(self, t, callback):
+        """
+        预约在虚拟时刻 t 执行 callback()
+        """
+        heapq.heappush(self._timers, (t, next(self._seq), callback))
+
+    def call_later(self, delay, callback):
+        self.call_at(self.t + delay, callback)
+
+    def next_time(self):
+        """
+        :return: 下一个回调的时刻，没有时返回 None
+        """
+        return self._timers[0][0] if self._timers else None
+
+    def advance_to(self, t):
+        """
+        推进到时刻 t，执行期间到期的全部回调
+        """
+        while self._timers and self._timers[0][0] <= t:
+            when, _, callback = heapq.heappop(self._timers)
+            self.t = max(self.t, when)
+            callback()
+        self.t = max(self.t, t)
+
+    def wait(self, event, timeout):
+        """
+        等待事件或超时；回调中 set 了 event 时提前返回
+        :return: 是否被提前唤醒
+        """
+        deadline = float('inf') if timeout is None else self.t + timeout
+        while not event.is_set():
+            if not self._timers or self._timers[0][0] > deadline:
+                self.t = max(self.t, deadline)
+                return False
+            when, _, callback = heapq.heappop(self._timers)
+            self.t = max(self.t, when)
+            callback()
+        return True
+
+    def sleep(self, seconds):
+        self.advance_to(self.t + seconds)
+
+
+class SimIdleSource(IdleSource):
+    """
+    模拟的用户输入：空闲时间 = 当前时刻 - 最后一次输入时刻
+    """
+
+    def __init__(self, clock, inputs=()):
+        self.clock = clock
+        self.inputs = sorted(inputs)
+
+    def add_inputs(self, times):
+        self.inputs = sorted(list(self.inputs) + list(times))
+
+    def add_activity(self, start, end, interval=2.0):
+        """
+        在 [start, end) 期间每 interval 秒产生一次输入
+        """
+        count = int((end - start) / interval)
+        self.add_inputs(start + i * interval for i in range(count))
+
+    def record_input(self):
+        """
+        在当前时刻产生一次输入，并丢弃已不影响空闲时间的旧输入（长时间模拟时内存不增长）
+        """
+        now = self.clock.now()
+        i = bisect.bisect_right(self.inputs, now)
+        del self.inputs[:i]
+        self.inputs.insert(0, now)
+
+    def get_idle_duration(self):
+        now = self.clock.now()
+        i = bisect.bisect_right(self.inputs, now)
+        last_input = self.inputs[i - 1] if i else 0.0
+        return now - last_input
+
+
+class SimForegroundSource(ForegroundEventSource):
+    """
+    模拟的前台窗口：switch_at() 预约在某一时刻切换前台窗口并推送事件
+    """
+
+    def __init__(self, clock):
+        self.clock = clock
+        self.current = (0, 0)
+        self.name_resolver = None
+        self._callback = None
+
+    def start(self, callback):
+        self._callback = callback
+        return True
+
+    def stop(self):
+        self._callback = None
+
+    def switch_at(self, t, hwnd, pid):
+        self.clock.call_at(t, lambda: self._switch(hwnd, pid))
+
+    def _switch(self, hwnd, pid):
+        self.current = (hwnd, pid)
+        if self._callback:
+            name = self.name_resolver(pid) if self.name_resolver else None
+            self._callback(ForegroundInfo(hwnd, pid, name))
+
+
+class SimSessionSource(SessionEventSource):
+    """
+    模拟的会话和电源通知：change_at() 预约在某一时刻推送通知
+    """
+
+    def __init__(self, clock):
+        self.clock = clock
+        self.notifications = 0
+        self._callback = None
+
+    def start(self, callback):
+        self._callback = callback
+        return True
+
+    def stop(self):
+        self._callback = None
+
+    def change_at(self, t, reason, entered):
+        """
+        :param reason: SESSION_LOCKED / SESSION_DISCONNECTED / DISPLAY_OFF / SYSTEM_SUSPENDED
+        :param entered: 是否进入该状态（False 表示解除）
+        """
+        self.clock.call_at(t, lambda: self.emit(reason, entered))
+
+    def emit(self, reason, entered):
+        self.notifications += 1
+        if self._callback:
+            self._callback(reason, entered)
+
+
+class SimWindowSource(WindowEventSource):
+    """
+    模拟的顶层窗口来源：读取 SimPlatform 的窗口表，窗口变化时推送事件
+    """
+
+    def __init__(self, platform):
+        self.platform = platform
+        self.enumerations = 0
+        self.queries = 0
+        self._callback = None
+
+    def enumerate(self):
+        self.enumerations += 1
+        return [self._info(hwnd) for hwnd in list(self.platform.windows)]
+
+    def query(self, hwnd):
+        self.queries += 1
+        return self._info(hwnd) if hwnd in self.platform.windows else None
+
+    def _info(self, hwnd):
+        pid, window_class, title = self.platform.windows[hwnd]
+        return WindowInfo(hwnd, pid, None, window_class, title, hwnd not in self.platform.hidden)
+
+    def start(self, callback):
+        self._callback = callback
+        return True
+
+    def stop(self):
+        self._callback = None
+
+    def emit(self, kind, hwnd):
+        if self._callback:
+            self._callback(kind, hwnd)
+
+
+class SimShieldBackend(ShieldBackend):
+    """
+    模拟的窗口遮挡：最小化或隐藏在 effect_delay 秒（虚拟时间）后生效
+    """
+
+    def __init__(self, platform, effect_delay=0.016):
+        self.platform = platform
+        self.effect_delay = effect_delay
+        self.batches = 0
+
+    def save(self, hwnds):
+        platform = self.platform
+        wanted = set(hwnds)
+        return [SavedWindow(hwnd, z, (platform.rects[hwnd], hwnd in platform.minimized, hwnd in platform.hidden))
+                for z, hwnd in enumerate(h for h in platform.zorder if h in wanted)]
+
+    def conceal(self, hwnds, mode):
+        self.batches += 1
+        self.platform.clock.call_later(self.effect_delay, lambda: self._apply(list(hwnds), mode))
+
+    def _apply(self, hwnds, mode):
+        platform = self.platform
+        for hwnd in hwnds:
+            if hwnd not in platform.windows:
+                continue
+            if mode == SHIELD_HIDE:
+                platform.show_window(hwnd, False)
+            else:
+                platform.minimized.add(hwnd)
+            if platform.foreground.current[0] == hwnd:
+                # 前台窗口被最小化或隐藏后，前台切换到桌面
+                platform.foreground._switch(0, 0)
+
+    def is_concealed(self, hwnd, mode):
+        platform = self.platform
+        if hwnd not in platform.windows or hwnd in platform.hidden:
+            return True
+        return mode != SHIELD_HIDE and hwnd in platform.minimized
+
+    def restore(self, saved):
+        platform = self.platform
+        self.batches += 1
+        alive = [window for window in saved if window.hwnd in platform.windows]
+        for window in reversed(alive):
+            rect, minimized, hidden = window.placement
+            platform.rects[window.hwnd] = rect
+            if minimized:
+                platform.minimized.add(window.hwnd)
+            else:
+                platform.minimized.discard(window.hwnd)
+            platform.show_window(window.hwnd, not hidden)
+            platform.raise_window(window.hwnd)
+        return len(alive)
+
+
+class SimTray:
+    """
+    记录最近状态变化的托盘（与 TrayIconState 一样，状态未变化时不更新）
+    """
+
+    def __init__(self, clock):
+        self.clock = clock
+        self.state = None
+        self.changes = 0
+        self.history = deque(maxlen=256)
+
+    def set_state(self, state):
+        if state == self.state:
+            return False
+        self.state = state
+        self.changes += 1
+        self.history.append((self.clock.now(), state))
+        return True
+
+
+class SimScreen(ScreenSource):
+    """
+    假屏幕：返回固定的合成画面（渐变背景加一块随机内容），可设置每次截图的真实耗时
+    """
+
+    def __init__(self, width=1920, height=1080, grab_cost=0.0, seed=0):
+        rng = random.Random(seed)
+        background = bytes(x * 255 // width for x in range(width) for _ in range(3))
+        noisy = width // 4 * 3
+        # 与 Random.randbytes() 相同的结果（randbytes 需要 Python 3.9）
+        rows = [rng.getrandbits(noisy * 8).to_bytes(noisy, 'little') + background[noisy:]
+                if height // 3 <= y < height * 2 // 3 else background
+                for y in range(height)]
+        self.frame = Frame(width, height, b''.join(rows))
+        self.grab_cost = grab_cost
+        self.grabs = 0
+
+    def grab(self):
+        if self.grab_cost:
+            time.sleep(self.grab_cost)
+        self.grabs += 1
+        return self.frame
+
+
+class SimPlatform(Platform):
+    """
+    完整的进程内模拟平台，可在任意操作系统上运行守护逻辑
+
+    :param event_driven: 是否提供前台窗口事件源；为 False 时守护逻辑退回到轮询
+    :param epoch: 虚拟时刻 0 对应的日历时间（Unix 时间戳）
+    """
+
+    name = 'sim'
+
+    def __init__(self, clock=None, event_driven=True, lock_delay=0.03, epoch=1_700_000_000.0):
+        clock = clock or SimClock()
+        super().__init__(clock, SimIdleSource(clock), FakeLockBackend(clock.now, lock_delay))
+        self.event_driven = event_driven
+        self.epoch = epoch
+        self.foreground = SimForegroundSource(clock)
+        self.window_events = SimWindowSource(self)
+        self.session = SimSessionSource(clock)
+        self.processes = {}
+        self.windows = {}
+        self.hidden = set()
+        self.minimized = set()
+        # 窗口位置和层叠顺序（zorder[0] 为最上层）
+        self.rects = {}
+        self.zorder = []
+        self._next_pid = 1000
+        self._next_hwnd = 0x10000
+
+    def add_process(self, name, exe=None, pid=None, create_time=0.0):
+        """
+        :return: 新进程的 pid
+        """
+        if pid is None:
+            pid = self._next_pid
+            self._next_pid += 1
+        self.processes[pid] = ProcessIdentity(pid, create_time, name, exe or f"C:\\Program Files\\{name}")
+        return pid
+
+    def add_window(self, pid, window_class='', title='', visible=True, rect=(0, 0, 800, 600)):
+        """
+        新窗口位于最上层
+        :return: 新窗口的句柄
+        """
+        hwnd = self._next_hwnd
+        self._next_hwnd += 4
+        self.windows[hwnd] = (pid, window_class, title)
+        self.rects[hwnd] = rect
+        self.zorder.insert(0, hwnd)
+        if not visible:
+            self.hidden.add(hwnd)
+        self.window_events.emit(WINDOW_CREATED, hwnd)
+        if visible:
+            self.window_events.emit(WINDOW_SHOWN, hwnd)
+        return hwnd
+
+    def destroy_window(self, hwnd):
+        if self.windows.pop(hwnd, None) is not None:
+            self.zorder.remove(hwnd)
+        self.hidden.discard(hwnd)
+        self.minimized.discard(hwnd)
+        self.rects.pop(hwnd, None)
+        self.window_events.emit(WINDOW_DESTROYED, hwnd)
+
+    def show_window(self, hwnd, visible=True):
+        if visible:
+            self.hidden.discard(hwnd)
+        else:
+            self.hidden.add(hwnd)
+        self.window_events.emit(WINDOW_SHOWN if visible else WINDOW_HIDDEN, hwnd)
+
+    def raise_window(self, hwnd):
+        """
+        把窗口移到最上层
+        """
+        self.zorder.remove(hwnd)
+        self.zorder.insert(0, hwnd)
+
+    def set_window_title(self, hwnd, title):
+        pid, window_class, _ = self.windows[hwnd]
+        self.windows[hwnd] = (pid, window_class, title)
+        self.window_events.emit(WINDOW_RENAMED, hwnd)
+
+    def create_foreground_source(self, name_resolver):
+        if not self.event_driven:
+            return None
+        self.foreground.name_resolver = name_resolver
+        return self.foreground
+
+    def create_window_source(self):
+        return self.window_events
+
+    def create_shield_backend(self):
+        return SimShieldBackend(self)
+
+    def create_session_source(self):
+        return self.session
+
+    def get_foreground(self):
+        return self.foreground.current
+
+    def get_window_info(self, hwnd):
+        _, window_class, title = self.windows.get(hwnd, (0, '', ''))
+        return window_class, title
+
+    def process_create_time(self, pid):
+        return self.processes[pid].create_time
+
+    def resolve_process(self, pid, create_time):
+        return self.processes[pid]
+
+    def is_admin(self):
+        return True
+
+    def wall_time(self):
+        return self.epoch + self.clock.now()
+
+    def localtime(self, t):
+        # 按 UTC 计算，模拟结果与运行环境的时区无关
+        return time.gmtime(t)
@@ -0,0 +1,132 @@
+import logging
+import threading
+from collections import deque
+
+# 计算每秒循环次数的时间窗口（秒）
+RATE_WINDOW = 10.0
+
+
+class DetectionSupervisor:
+    """
+    检测线程的唯一所有者
+
+    同一时刻最多只有一个检测循环在运行：start() 在后台线程中运行，run() 在调用线程中运行，
+    重复调用不会启动第二个。pause() / resume() 让循环停在无限期休眠中或恢复检测，
+    stop() 通过调度器唤醒正在休眠的循环并等待线程退出。
+    循环意外退出时记录错误，稍后重新运行，不会静默地失去检测。
+    循环本身就是 WeChatGuardian.run_loop()，与模拟基准和轨迹回放运行的是同一段代码。
+    """
+
+    def __init__(self, guardian, scheduler, on_cycle=None, metrics=None, restart_delay=1.0):
+        """
+        :param guardian: WeChatGuardian 实例
+        :param scheduler: IdleScheduler，休眠、唤醒和停止都通过它进行
+        :param on_cycle: 每次循环后的回调，参数为 CycleResult
+        :param metrics: 指标注册表（MetricsRegistry），为 None 时使用守护器的注册表
+        :param restart_delay: 循环意外退出后重新运行前的等待时间（秒）
+        """
+        self.guardian = guardian
+        self.scheduler = scheduler
+        self.on_cycle = on_cycle
+        self.restart_delay = restart_delay
+        self.paused = False
+        self.restarts = 0
+        self._thread = None
+        self._running = False
+        self._lock = threading.Lock()
+        # 最近的循环时刻，用于计算每秒循环次数
+        self._cycle_times = deque(maxlen=1024)
+        self._init_metrics(metrics or guardian.metrics)
+
+    def _init_metrics(self, registry):
+        registry.gauge('detection_workers', '正在运行的检测循环数量（应始终不超过 1）').set_function(
+            lambda: int(self.running))
+        registry.gauge('threads', '进程中的线程总数').set_function(threading.active_count)
+        registry.gauge('cycles_per_second', f'最近 {RATE_WINDOW:g} 秒内平均每秒执行的守护循环次数').set_function(
+            self.cycles_per_second)
+        self._m_restarts = registry.counter('worker_restarts_total', '检测循环意外退出后重新运行的次数')
+
+    @property
+    def running(self):
+        return self._running
+
+    def start(self):
+        """
+        在后台线程中运行检测循环，已在运行时不做任何事
+        :return: 是否新启动了线程
+        """
+        with self._lock:
+            if self._running or self.scheduler.stopped:
+                return False
+            self._running = True
+            self._thread = threading.Thread(target=self._run, name='guardian-worker', daemon=True)
+        self._thread.start()
+        logging.info("检测线程已启动")
+        return True
+
+    def run(self):
+        """
+        在调用线程中运行检测循环，直到 stop() 被调用（无界面模式使用）
+        :return: 是否运行过；已有循环在运行时立即返回 False
+        """
+        with self._lock:
+            if self._running or self.scheduler.stopped:
+                return False
+            self._running = True
+        self._run()
+        return True
+
+    def pause(self):
+        """
+        暂停检测：循环不再执行 step()，一直休眠到 resume() 或 stop()
+        """
+        self.paused = True
+        self.scheduler.wake()
+
+    def resume(self):
+        if self.paused:
+            self.paused = False
+            self.scheduler.wake()
+
+    def stop(self, timeout=5.0):
+        """
+        停止检测循环，可在任意线程调用；唤醒正在休眠的循环并等待后台线程退出
+        :return: 检测循环是否已退出
+        """
+        self.scheduler.stop()
+        thread = self._thread
+        if thread is not None and thread is not threading.current_thread():
+            thread.join(timeout)
+            if thread.is_alive():
+                logging.warning("检测线程未能在超时内退出")
+                return False
+        return True
+
+    def cycles_per_second(self):
+        """
+        :return: 最近 RATE_WINDOW 秒内平均每秒的循环次数
+        """
+        since = self.scheduler.clock.now() - RATE_WINDOW
+        return sum(1 for t in list(self._cycle_times) if t > since) / RATE_WINDOW
+
+    def _run(self):
+        try:
+            while not self.scheduler.stopped:
+                try:
+                    self.guardian.run_loop(self.scheduler, self._on_cycle, paused=lambda: self.paused)
+                except Exception as e:
+                    # step() 自身会捕获检测中的异常，能到达这里的是循环本身的错误
+                    self.restarts += 1
+                    self._m_restarts.inc()
+                    logging.error(f"检测循环意外退出，{self.restart_delay:g} 秒后重新运行: {str(e)}")
+                    logging.exception(e)
+                    self.scheduler.sleep(self.restart_delay)
+        finally:
+            with self._lock:
+                self._running = False
+            logging.info("检测线程已退出")
+
+    def _on_cycle(self, result):
+        self._cycle_times.append(self.scheduler.clock.now())
+        if self.on_cycle:
+            self.on_cycle(result)
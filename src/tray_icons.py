@@ -0,0 +1,168 @@
+import io
+import os
+import struct
+import logging
+import threading
+
+ICON_STATES = ('gray', 'green')
+LR_DEFAULTCOLOR = 0x00000000
+
+
+def image_to_ico_bytes(image, size=16):
+    """
+    将 PIL 图像编码为内存中的 ICO 数据
+    :param image: PIL Image对象
+    :param size: 图标尺寸
+    :return: ICO 文件字节
+    """
+    buffer = io.BytesIO()
+    image.save(buffer, format='ICO', sizes=[(size, size)], bitmap_format='bmp')
+    return buffer.getvalue()
+
+
+def ico_image_data(ico_bytes, size=16):
+    """
+    从 ICO 文件中取出指定尺寸的图像数据（CreateIconFromResourceEx 需要的格式）
+    :param ico_bytes: ICO 文件字节
+    :param size: 图标尺寸
+    :return: 图像数据字节
+    :raises ValueError: 数据不是有效的 ICO 文件或其中没有图像
+    """
+    try:
+        _, _, count = struct.unpack_from('<HHH', ico_bytes, 0)
+        entries = []
+        for i in range(count):
+            width, _, _, _, _, _, length, offset = struct.unpack_from('<BBBBHHII', ico_bytes, 6 + i * 16)
+            entries.append((width or 256, length, offset))
+    except struct.error:
+        raise ValueError("ICO 文件头不完整")
+    if not entries:
+        raise ValueError("ICO 文件中没有图像")
+    # 优先取尺寸完全匹配的图像，否则取第一张
+    width, length, offset = next((e for e in entries if e[0] == size), entries[0])
+    if not length or offset + length > len(ico_bytes):
+        raise ValueError("ICO 图像数据超出文件范围")
+    return ico_bytes[offset:offset + length]
+
+
+def load_native_icon(ico_bytes, size=16):
+    """
+    在内存中把 ICO 数据转换为 Windows 图标句柄，不经过临时文件
+    :return: HICON
+    """
+    import ctypes
+    data = ico_image_data(ico_bytes, size)
+    buffer = ctypes.create_string_buffer(data, len(data))
+    user32 = ctypes.windll.user32
+    user32.CreateIconFromResourceEx.restype = ctypes.c_void_p
+    hicon = user32.CreateIconFromResourceEx(buffer, len(data), True, 0x00030000, size, size, LR_DEFAULTCOLOR)
+    if not hicon:
+        raise OSError("CreateIconFromResourceEx 失败")
+    return hicon
+
+
+def destroy_native_icon(hicon):
+    import ctypes
+    ctypes.windll.user32.DestroyIcon(ctypes.c_void_p(hicon))
+
+
+def load_prebuilt_icons(directory=None, states=ICON_STATES):
+    """
+    读取构建时生成的托盘图标（icon/tray_<状态>.ico），避免启动时导入 PIL 渲染
+    :param directory: 图标目录，默认为 src/icon
+    :return: {状态: ICO 字节}，缺失的状态不包含在内
+    """
+    directory = directory or os.path.join(os.path.dirname(os.path.abspath(__file__)), 'icon')
+    sources = {}
+    for state in states:
+        path = os.path.join(directory, f'tray_{state}.ico')
+        if os.path.exists(path):
+            with open(path, 'rb') as f:
+                sources[state] = f.read()
+    return sources
+
+
+class TrayIconCache:
+    """
+    托盘图标句柄缓存
+
+    启动时把每种状态的图标渲染一次（或直接使用预先生成的 ICO 数据），
+    转换为原生图标句柄后缓存，之后切换状态只需要交换句柄。
+    """
+
+    def __init__(self, size=16, sources=None, loader=load_native_icon, destroyer=destroy_native_icon):
+        """
+        :param size: 图标尺寸
+        :param sources: {状态: ICO 字节}，提供时不再调用 PIL 渲染
+        :param loader: 把 ICO 字节转换为图标句柄的函数
+        :param destroyer: 释放图标句柄的函数
+        """
+        self.size = size
+        self.sources = dict(sources or {})
+        self.loader = loader
+        self.destroyer = destroyer
+        self._handles = {}
+
+    def render(self, states=ICON_STATES):
+        """
+        渲染并缓存所有状态的图标句柄
+        """
+        for state in states:
+            ico_bytes = self.sources.get(state)
+            if ico_bytes is None:
+                from src.icon_generator import IconGenerator
+                ico_bytes = image_to_ico_bytes(IconGenerator.create_icon(state), self.size)
+                self.sources[state] = ico_bytes
+            self._handles[state] = self.loader(ico_bytes, self.size)
+        return self
+
+    def get(self, state):
+        """
+        :return: 指定状态的图标句柄
+        """
+        if state not in self._handles:
+            self.render((state,))
+        return self._handles[state]
+
+    def destroy(self):
+        """
+        释放所有图标句柄
+        """
+        for hicon in self._handles.values():
+            try:
+                self.destroyer(hicon)
+            except Exception as e:
+                logging.error(f"释放图标失败: {str(e)}")
+        self._handles.clear()
+
+
+class TrayIconState:
+    """
+    托盘图标状态，状态未变化时合并重复的更新请求
+    """
+
+    def __init__(self, cache, notify):
+        """
+        :param cache: TrayIconCache 实例
+        :param notify: 设置托盘图标的函数，参数为图标句柄
+        """
+        self.cache = cache
+        self.notify = notify
+        self.state = None
+        self.updates = 0
+        self.coalesced = 0
+        self._lock = threading.Lock()
+
+    def set_state(self, state):
+        """
+        切换托盘图标状态
+        :return: 是否真正更新了图标
+        """
+        with self._lock:
+            if state == self.state:
+                self.coalesced += 1
+                return False
+            self.notify(self.cache.get(state))
+            self.state = state
+            self.updates += 1
+            return True
@@ -0,0 +1,135 @@
+import time
+import queue
+import logging
+import threading
+from collections import deque, namedtuple
+
+# 界面事件：detected_at 为检测线程发现事件时的时钟读数，与 UiDispatcher 的 clock 一致
+ShowWarning = namedtuple('ShowWarning', ['detected_at'])
+SetTrayState = namedtuple('SetTrayState', ['state', 'detected_at'])
+# 发现新版本，info 为 updater.UpdateInfo
+ShowUpdate = namedtuple('ShowUpdate', ['info'])
+
+
+class LatencyRecorder:
+    """
+    记录最近若干次延迟样本
+    """
+
+    def __init__(self, maxlen=256):
+        self.samples = deque(maxlen=maxlen)
+        self.count = 0
+        self.max = 0.0
+
+    def add(self, seconds):
+        self.samples.append(seconds)
+        self.count += 1
+        self.max = max(self.max, seconds)
+
+    def stats(self):
+        """
+        :return: 次数、平均值、P95 和最大值（毫秒）
+        """
+        samples = sorted(self.samples)
+        if not samples:
+            return {'count': 0, 'avg_ms': 0.0, 'p95_ms': 0.0, 'max_ms': 0.0}
+        p95 = samples[min(len(samples) - 1, int(len(samples) * 0.95))]
+        return {
+            'count': self.count,
+            'avg_ms': sum(samples) / len(samples) * 1000,
+            'p95_ms': p95 * 1000,
+            'max_ms': self.max * 1000,
+        }
+
+
+class UiDispatcher:
+    """
+    线程安全的界面事件分发
+
+    Tk 不是线程安全的：检测线程只调用 post() 把事件放入队列，
+    由 Tk 主线程在 drain() 中按顺序交给注册的处理函数。
+    提供 waker 时，post() 会通过它通知主线程（例如向隐藏窗口 PostMessage），
+    否则主线程每 poll_ms 毫秒检查一次队列。
+    """
+
+    def __init__(self, root, waker=None, poll_ms=50, clock=time.perf_counter):
+        """
+        :param root: Tk 主窗口
+        :param waker: 可在任意线程调用、让主线程尽快调用 drain() 的函数
+        :param poll_ms: 没有 waker 时检查队列的间隔（毫秒）
+        :param clock: 计时函数，需与事件的 detected_at 一致
+        """
+        self.root = root
+        self.waker = waker
+        self.poll_ms = poll_ms
+        self.clock = clock
+        self.latency = {}
+        self._queue = queue.SimpleQueue()
+        self._handlers = {}
+        self._wake_pending = threading.Event()
+        self._running = False
+
+    def register(self, event_type, handler):
+        """
+        注册事件处理函数（在 Tk 主线程中调用）
+        """
+        self._handlers[event_type] = handler
+
+    def start(self):
+        self._running = True
+        if self.waker is None:
+            self.root.after(self.poll_ms, self._tick)
+
+    def stop(self):
+        self._running = False
+
+    def post(self, event):
+        """
+        投递事件，可在任意线程调用
+        """
+        self._queue.put(event)
+        if self.waker is not None and not self._wake_pending.is_set():
+            # 合并唤醒：主线程处理之前只通知一次
+            self._wake_pending.set()
+            try:
+                self.waker()
+            except Exception as e:
+                logging.error(f"唤醒界面线程失败: {str(e)}")
+
+    def drain(self):
+        """
+        处理队列中的全部事件（必须在 Tk 主线程中调用）
+        :return: 处理的事件数量
+        """
+        self._wake_pending.clear()
+        count = 0
+        while True:
+            try:
+                event = self._queue.get_nowait()
+            except queue.Empty:
+                return count
+            handler = self._handlers.get(type(event))
+            if handler is None:
+                logging.warning(f"未注册的界面事件: {type(event).__name__}")
+                continue
+            try:
+                handler(event)
+            except Exception as e:
+                logging.error(f"处理界面事件失败: {str(e)}")
+                logging.exception(e)
+            count += 1
+
+    def record_latency(self, name, detected_at):
+        """
+        记录从检测到界面可见的延迟
+        :return: 延迟（秒）
+        """
+        elapsed = self.clock() - detected_at
+        self.latency.setdefault(name, LatencyRecorder()).add(elapsed)
+        return elapsed
+
+    def _tick(self):
+        if not self._running:
+            return
+        self.drain()
+        self.root.after(self.poll_ms, self._tick)
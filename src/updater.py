@@ -1,84 +1,220 @@
-import requests
+import os
 import json
+import time
 import logging
-import webbrowser
-from tkinter import messagebox
-from packaging import version
+import tempfile
 import threading
+from collections import namedtuple
+from src.version import __version__
+
+RELEASES_API = "https://api.github.com/repos/flyhunterl/wechatguard/releases/latest"
+RELEASES_PAGE = "https://github.com/flyhunterl/wechatguard/releases/latest"
+
+# 默认每天最多检查一次；请求失败后一小时再试
+DEFAULT_CHECK_INTERVAL = 24 * 3600
+RETRY_INTERVAL = 3600
+
+# 检查结果：是否有更新、最新版本号、更新说明、下载页面
+UpdateInfo = namedtuple('UpdateInfo', ['has_update', 'latest_version', 'notes', 'url'])
+
+
+def parse_version(text):
+    """
+    解析版本号，优先使用 packaging，未安装时按数字逐段比较
+    """
+    text = str(text).strip().lstrip('v')
+    try:
+        from packaging import version
+        return version.parse(text)
+    except ImportError:
+        parts = []
+        for part in text.split('.'):
+            digits = ''.join(ch for ch in part if ch.isdigit())
+            parts.append(int(digits) if digits else 0)
+        return tuple(parts)
+
+
+def http_get(url, headers, timeout):
+    """
+    发送 GET 请求
+    :return: (状态码, 响应头, 响应体)
+    """
+    import urllib.request
+    import urllib.error
+    request = urllib.request.Request(url, headers=headers)
+    try:
+        with urllib.request.urlopen(request, timeout=timeout) as response:
+            return response.status, dict(response.headers), response.read()
+    except urllib.error.HTTPError as e:
+        # 304 等非 2xx 状态码以异常形式返回
+        return e.code, dict(e.headers or {}), b''
+
+
+def default_cache_path():
+    """
+    缓存文件与配置文件位于同一目录
+    """
+    from src.config_store import default_config_path
+    return os.path.join(os.path.dirname(default_config_path()), 'update_cache.json')
+
 
 class Updater:
-    def __init__(self):
-        self.current_version = "0.3.4"  # 更新版本号
-        self.github_api = "https://api.github.com/repos/flyhunterl/wechatguard/releases/latest"
-        self.github_releases = "https://github.com/flyhunterl/wechatguard/releases/latest"
+    """
+    更新检查
+
+    - 上一次的结果缓存在磁盘上，check_interval 内（跨重启）不再发起网络请求
+    - 再次检查时带上 ETag / Last-Modified 发送条件请求，版本未变化时服务器返回 304
+    - 请求失败时保留上一次的结果，RETRY_INTERVAL 后再试
+    """
+
+    def __init__(self, current_version=__version__, url=RELEASES_API, cache_path=None,
+                 check_interval=DEFAULT_CHECK_INTERVAL, timeout=5, fetch=http_get, clock=time.time):
+        """
+        :param current_version: 当前版本号
+        :param url: 最新发布信息地址（GitHub releases API 格式）
+        :param cache_path: 缓存文件路径，默认与配置文件同目录
+        :param check_interval: 两次检查的最小间隔（秒）
+        :param fetch: 请求函数 (url, headers, timeout) -> (状态码, 响应头, 响应体)
+        :param clock: 当前时间函数
+        """
+        self.current_version = current_version
+        self.url = url
+        self.cache_path = cache_path or default_cache_path()
+        self.check_interval = check_interval
+        self.timeout = timeout
+        self.fetch = fetch
+        self.clock = clock
+        self.requests = 0
+        self._lock = threading.Lock()
 
-    def check_update(self):
+    def check_update(self, force=False):
         """
-        检查更新
-        返回: (是否有更新, 最新版本号, 更新说明)
+        检查更新（会访问网络，不要在界面线程中调用）
+        :param force: 忽略检查间隔，立即发送（条件）请求
+        :return: UpdateInfo
         """
+        with self._lock:
+            cache = self._load_cache()
+            now = self.clock()
+            if not force and now < cache.get('next_check', 0):
+                return self._result(cache)
+
+            headers = {
+                'Accept': 'application/vnd.github+json',
+                'User-Agent': f'WeChatGuard/{self.current_version}',
+            }
+            if cache.get('etag'):
+                headers['If-None-Match'] = cache['etag']
+            if cache.get('last_modified'):
+                headers['If-Modified-Since'] = cache['last_modified']
+
+            try:
+                self.requests += 1
+                status, response_headers, body = self.fetch(self.url, headers, self.timeout)
+                response_headers = {k.lower(): v for k, v in response_headers.items()}
+                if status == 200:
+                    release = json.loads(body.decode('utf-8'))
+                    cache.update({
+                        'latest_version': release['tag_name'].lstrip('v'),
+                        'notes': release.get('body') or '',
+                        'url': release.get('html_url') or RELEASES_PAGE,
+                        'etag': response_headers.get('etag'),
+                        'last_modified': response_headers.get('last-modified'),
+                    })
+                elif status != 304:
+                    raise RuntimeError(f"HTTP {status}")
+                cache['checked_at'] = now
+                cache['next_check'] = now + self.check_interval
+            except Exception as e:
+                logging.error(f"检查更新失败: {str(e)}")
+                cache['next_check'] = now + min(RETRY_INTERVAL, self.check_interval)
+
+            self._save_cache(cache)
+            return self._result(cache)
+
+    def _result(self, cache):
+        latest = cache.get('latest_version') or self.current_version
         try:
-            response = requests.get(self.github_api, timeout=5)
-            if response.status_code == 200:
-                release_info = response.json()
-                latest_version = release_info['tag_name'].lstrip('v')
-                
-                if version.parse(latest_version) > version.parse(self.current_version):
-                    return True, latest_version, release_info['body']
-            
-            return False, self.current_version, ""
-            
-        except Exception as e:
-            logging.error(f"检查更新失败: {str(e)}")
-            return False, self.current_version, ""
+            has_update = parse_version(latest) > parse_version(self.current_version)
+        except Exception:
+            has_update = False
+        return UpdateInfo(has_update, latest, cache.get('notes', '') if has_update else '', cache.get('url') or RELEASES_PAGE)
+
+    def _load_cache(self):
+        try:
+            with open(self.cache_path, 'r', encoding='utf-8') as f:
+                cache = json.load(f)
+            # 程序升级后旧的结果作废
+            if cache.get('current_version') == self.current_version:
+                return cache
+        except (OSError, ValueError):
+            pass
+        return {'current_version': self.current_version}
 
-    def show_update_dialog(self):
+    def _save_cache(self, cache):
         """
-        显示更新提示对话框
+        原子写入缓存文件
         """
-        has_update, latest_version, release_notes = self.check_update()
-        
-        if has_update:
-            message = f"""发现新版本！
-当前版本: v{self.current_version}
-最新版本: v{latest_version}
+        directory = os.path.dirname(os.path.abspath(self.cache_path))
+        try:
+            fd, temp_path = tempfile.mkstemp(prefix='.update.', suffix='.tmp', dir=directory)
+            try:
+                with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                    json.dump(cache, f, indent=2, ensure_ascii=False)
+                os.replace(temp_path, self.cache_path)
+            except Exception:
+                if os.path.exists(temp_path):
+                    os.remove(temp_path)
+                raise
+        except Exception as e:
+            logging.error(f"保存更新检查缓存失败: {str(e)}")
+
+
+def show_update_dialog(info, current_version=__version__, parent=None):
+    """
+    显示更新提示对话框（界面线程）
+    :return: 是否前往下载页面
+    """
+    import webbrowser
+    from tkinter import messagebox
+
+    message = f"""发现新版本！
+当前版本: v{current_version}
+最新版本: v{info.latest_version}
 
 更新内容:
-{release_notes}
+{info.notes}
 
 是否前往下载页面？"""
-            
-            if messagebox.askyesno("发现新版本", message):
-                webbrowser.open(self.github_releases)
-        
-        return has_update
+    if messagebox.askyesno("发现新版本", message, parent=parent):
+        webbrowser.open(info.url)
+        return True
+    return False
+
 
-def check_update_async(root):
+def check_update_async(on_update, config=None, updater=None):
     """
-    异步检查更新
+    在后台线程中检查更新，不占用启动路径
+    :param on_update: 发现新版本时调用，参数为 UpdateInfo（在后台线程中调用，界面操作需转交界面线程）
+    :param config: 配置，update_check 为 false 时不检查，update_check_interval 为检查间隔（秒）
+    :param updater: Updater 实例，默认按配置创建
+    :return: 后台线程，不检查时返回 None
     """
-    def check_update():
+    config = config or {}
+    if not config.get("update_check", True):
+        return None
+
+    def run():
         try:
-            # 当前版本
-            current_version = "0.3.4"  # 更新当前版本号
-            
-            # 获取最新版本
-            response = requests.get(
-                "https://raw.githubusercontent.com/flyhunterl/wechatguard/main/version.txt",
-                timeout=5
-            )
-            latest_version = response.text.strip()
-            
-            # 比较版本号
-            if version.parse(latest_version) > version.parse(current_version):
-                if messagebox.askyesno(
-                    "发现新版本", 
-                    f"当前版本：{current_version}\n" +
-                    f"最新版本：{latest_version}\n\n" +
-                    "是否前往下载？"
-                ):
-                    webbrowser.open("https://github.com/flyhunterl/wechatguard/releases")
+            nonlocal updater
+            if updater is None:
+                updater = Updater(check_interval=float(config.get("update_check_interval", DEFAULT_CHECK_INTERVAL)))
+            info = updater.check_update()
+            if info.has_update:
+                on_update(info)
         except Exception as e:
             logging.error(f"检查更新失败: {str(e)}")
-    
-    threading.Thread(target=check_update, daemon=True).start() 
\ No newline at end of file
+
+    thread = threading.Thread(target=run, daemon=True)
+    thread.start()
+    return thread
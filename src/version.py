@@ -0,0 +1,2 @@
+# 程序版本号，唯一的定义位置：更新检查、exe 版本信息和 version.txt 都从这里读取
+__version__ = "0.3.4"
@@ -0,0 +1,64 @@
+import tkinter as tk
+from tkinter import ttk
+
+
+class WarningWindow:
+    """
+    警告窗口
+
+    第一次检测到微信被打开时创建，点击按钮后隐藏，之后的警告复用同一个窗口，
+    长时间运行也不会累积控件。
+    """
+
+    def __init__(self, root=None):
+        self.window = tk.Toplevel(root)
+        self.window.title("警告")
+        self.window.geometry("1125x808")
+        self.window.resizable(False, False)
+        self.window.protocol("WM_DELETE_WINDOW", self.hide)
+
+        # 使用 Segoe UI Emoji 字体显示彩色表情
+        label = tk.Label(
+            self.window,
+            text="😈 喂～你坏蛋 😈\n不要看我微信",
+            font=("Segoe UI Emoji", 48),
+            justify=tk.CENTER
+        )
+        label.pack(expand=True)
+
+        # 创建一个大号按钮样式
+        style = ttk.Style(self.window)
+        style.configure(
+            "Big.TButton",
+            padding=(20, 10),
+            font=("微软雅黑", 16)
+        )
+
+        # 添加放大的确定按钮
+        ttk.Button(
+            self.window,
+            text="好的，我错了",
+            command=self.hide,
+            style="Big.TButton"
+        ).pack(pady=30)
+
+        self.window.withdraw()
+
+    def show(self):
+        """
+        显示为模态窗口，返回时窗口已完成绘制
+        """
+        self.window.deiconify()
+        self.window.lift()
+        self.window.transient()
+        self.window.grab_set()
+        self.window.focus_set()
+        self.window.update_idletasks()
+
+    def hide(self):
+        self.window.grab_release()
+        self.window.withdraw()
+
+    @property
+    def visible(self):
+        return self.window.winfo_viewable()
@@ -1,73 +1,203 @@
 import time
-import pyautogui
-import psutil
-import win32gui
-import win32process
-import ctypes
-import win32api
-import tkinter as tk
-from tkinter import simpledialog, messagebox
-import os
-import json
-import hashlib
 import logging
-import base64
-from src.settings import GuardianSettings
+import threading
+from collections import namedtuple
+from src.config_store import get_config_store
+from src.password import PasswordVerifier
+from src.lock_action import LockAction
+from src.app_rules import ProtectedAppRules
+from src.foreground import ForegroundInfo, ForegroundTracker
+from src.process_cache import ProcessIdentityCache
+from src.platform_api import get_default_platform
+from src.scheduler import IdleScheduler
+from src.metrics import get_registry
+from src.audit_store import IntrusionEvent
+from src.guard_policy import GuardSchedule
+from src.window_index import WindowIndex
+from src.window_shield import WindowShield, parse_shield_mode
+from src.session_watch import SessionMonitor, AUTHENTICATED_REASONS
 
-class LASTINPUTINFO(ctypes.Structure):
-    _fields_ = [
-        ('cbSize', ctypes.c_uint),
-        ('dwTime', ctypes.c_uint),
-    ]
+# 守护循环事件
+START_GUARDIAN = "START_GUARDIAN"
+INTRUSION = "INTRUSION"
+INTRUSION_MESSAGE = "😄😄😄嘿~你坏蛋。不要看我微信😄😄😄"
+
+# 单次守护循环的结果：事件（None / START_GUARDIAN / INTRUSION）、下一次唤醒前的等待时间、
+# 本次读取的空闲时间（守护模式下为 None）、锁定结果、检测到微信的时刻、入侵记录（IntrusionEvent）
+CycleResult = namedtuple('CycleResult', ['event', 'timeout', 'idle_time', 'lock_result', 'detected_at', 'intrusion'])
 
 class WeChatGuardian:
-    def __init__(self, root=None):
+    def __init__(self, root=None, config_store=None, lock_backend=None, platform=None, metrics=None,
+                 audit_store=None, evidence_capture=None):
         """
         微信窗口守护器
         :param root: 主窗口
+        :param config_store: 配置存储，默认使用进程内唯一的 ConfigStore
+        :param lock_backend: 锁定动作后端，默认使用平台提供的后端
+        :param platform: 平台实现（Platform），默认使用当前操作系统的实现
+        :param metrics: 指标注册表（MetricsRegistry），默认使用进程内唯一的注册表
+        :param audit_store: 入侵审计存储（AuditStore），为 None 时不记录
+        :param evidence_capture: 入侵截图（EvidenceCapture），为 None 时不截图
         """
         self.root = root
-        self.is_guarding = False
+        self.platform = platform or get_default_platform()
+        # 守护状态由检测线程、界面线程和通知线程共同修改，读-改-写必须在锁内完成
+        self._state_lock = threading.RLock()
+        self._guarding = False
         self.idle_time_threshold = 60
-        self.last_input_info = LASTINPUTINFO()
-        self.last_input_info.cbSize = ctypes.sizeof(self.last_input_info)
+        self.audit_store = audit_store
+        self.evidence_capture = evidence_capture
+        # 本次空闲开始的时刻（platform.clock），用于记录入侵前已空闲多久
+        self._idle_since = None
+        # 最近处理过的受保护程序激活 ((窗口句柄, 激活时刻), 处理时刻)：已锁定的，
+        # 或未达到该程序阈值而放过的，同一次激活不再重复判断
+        self._handled_activation = None
+        self._last_policy = None
+        # 手动开始的守护不看各程序的空闲时间阈值，打开任何受保护程序都锁定
+        self._manual_guard = False
+        
+        # 锁定动作，首次锁定时创建
+        self.lock_backend = lock_backend or self.platform.lock_backend
+        self.lock_action = None
+        
+        # 进程标识缓存，避免每次检查都重新读取进程名
+        self.process_cache = ProcessIdentityCache(
+            create_time_fn=self.platform.process_create_time,
+            resolve_fn=self.platform.resolve_process
+        )
+        
+        self._init_metrics(metrics or get_registry())
         
-        # 加载配置
-        config_path = os.path.join(os.path.dirname(__file__), '..', 'config.json')
-        self.settings = GuardianSettings()  # 创建 settings 实例
-        self.config = self.settings.config  # 使用 settings 的配置
-        self.idle_time_threshold = self.config.get("idle_time", 60)
+        # 前台窗口事件订阅，未启动时退回到轮询
+        self.foreground_tracker = None
+        self.on_wechat_activated = None
+        # 顶层窗口索引，未启动时查询可见的受保护窗口需要完整枚举
+        self.window_index = None
+        # 进入守护模式时遮挡受保护窗口（配置 guard_hide_windows），首次遮挡时创建
+        self.window_shield = None
+        # 阈值高于进入守护模式阈值的程序，其窗口在各自阈值到达时再遮挡：下一次遮挡的时刻（platform.clock）
+        self._conceal_due = None
+        # 会话锁定、断开、显示器关闭或睡眠时暂停检测：解锁或重新连接后空闲时间从恢复时刻重新计算，
+        # 只是显示器关闭或睡眠时不活动期间计入空闲时间
+        self.session_monitor = None
+        self.on_session_changed = None
+        self._resumed_at = None
+        # 暂停检测时的 (时刻, 空闲时间)；未验证身份的恢复时空闲时间为暂停前的空闲时间加上不活动的时长
+        self._parked = None
+        self._resume_idle = None
+        
+        # 加载配置：与设置界面共用进程内唯一的配置存储，配置变化时替换快照
+        self.rules = None
+        self._rules_source = None
+        self.schedule = None
+        self._schedule_source = None
+        self.config_store = config_store or get_config_store()
+        self._apply_config(self.config_store.snapshot)
+        self.config_store.subscribe(self._apply_config)
+        self.verifier = PasswordVerifier(self.config_store)
+
+    @property
+    def is_guarding(self):
+        return self._guarding
+
+    @is_guarding.setter
+    def is_guarding(self, value):
+        with self._state_lock:
+            self._guarding = bool(value)
 
-    def load_config(self, config_path):
+    def _enter_guard(self, idle_time, manual=False):
         """
-        加载配置文件
+        进入守护模式（检查和设置在同一把锁内完成）
+        :param idle_time: 本次读取的空闲时间，读取失败时为 None
+        :param manual: 是否手动开始；手动开始总是生效，已在自动守护时改为手动守护
+        :return: 是否由本次调用进入；自动进入时期间已被手动开始则返回 False，不覆盖手动守护的状态
         """
-        default_config = {
-            "password_enabled": False,
-            "password": "",
-            "idle_time": 10,  # 修改默认值为10秒
-            "salt": ""
-        }
+        with self._state_lock:
+            if self._guarding and not manual:
+                return False
+            self._guarding = True
+            self._manual_guard = manual
+            self._idle_since = None if idle_time is None else self.platform.clock.now() - idle_time
+            return True
 
-        if os.path.exists(config_path):
-            try:
-                with open(config_path, 'r', encoding='utf-8') as f:
-                    saved_config = json.load(f)
-                    return {**default_config, **saved_config}
-            except Exception:
-                return default_config
+    def _init_metrics(self, registry):
+        """
+        注册守护循环的指标，热路径上只保留对指标对象的引用
+        """
+        self.metrics = registry
+        self._m_cycles = registry.counter('cycles_total', '守护循环执行次数')
+        self._m_cycle_errors = registry.counter('cycle_errors_total', '守护循环异常次数')
+        self._m_guard_entries = registry.counter('guard_entries_total', '进入守护模式次数')
+        self._m_intrusions = registry.counter('intrusions_total', '守护模式下检测到微信被打开的次数')
+        self._m_locks = registry.counter('locks_total', '确认锁定成功的次数')
+        self._m_lock_failures = registry.counter('lock_failures_total', '未能确认锁定的次数')
+        self._m_idle_read = registry.histogram('idle_read_seconds', 'get_idle_duration 耗时')
+        self._m_foreground_check = registry.histogram('foreground_check_seconds', '检查前台窗口是否为受保护程序的耗时')
+        self._m_lock_latency = registry.histogram('lock_latency_seconds', '从注入锁定到确认生效的耗时')
+        self._m_policy_skips = registry.counter('policy_skips_total', '受保护程序未达到其空闲时间阈值而未锁定的次数')
+        self._m_concealed = registry.counter('windows_concealed_total', '进入守护模式时最小化或隐藏的受保护窗口数')
+        self._m_conceal_latency = registry.histogram('conceal_latency_seconds', '从进入守护模式到受保护窗口全部不可见的耗时')
+        self._m_session_parks = registry.counter('session_parks_total', '会话锁定、断开、显示器关闭或睡眠而暂停检测的次数')
+        self._m_idle = registry.gauge('idle_seconds', '最近一次读取的系统空闲时间')
+        registry.gauge('guarding', '是否处于守护模式').set_function(lambda: int(self.is_guarding))
+        registry.gauge('idle_threshold_seconds', '当前时段进入守护模式的空闲时间阈值').set_function(
+            lambda: self.current_idle_threshold())
+        registry.gauge('process_cache_hits', '进程标识缓存命中次数').set_function(lambda: self.process_cache.hits)
+        registry.gauge('process_cache_misses', '进程标识缓存未命中次数').set_function(lambda: self.process_cache.misses)
+        registry.gauge('windows_indexed', '窗口索引中的顶层窗口数量').set_function(
+            lambda: len(self.window_index) if self.window_index else 0)
+        registry.gauge('protected_windows_visible', '当前可见的受保护窗口数量').set_function(
+            lambda: len(self.window_index.visible_protected()) if self.window_index else 0)
+        registry.gauge('session_active', '会话是否活动（为 0 时检测已暂停）').set_function(
+            lambda: int(self.session_active()))
+        registry.gauge('protected_windows_concealed', '已遮挡、等待验证身份后恢复的受保护窗口数量').set_function(
+            lambda: len(self.window_shield) if self.window_shield else 0)
+
+    def _apply_config(self, snapshot):
+        """
+        应用新的配置快照（可能在其他线程中调用，只做引用替换）
+        """
+        self.config = snapshot.data
+        self.idle_time_threshold = snapshot.idle_time
+        self.shield_mode = parse_shield_mode(snapshot.data.get("guard_hide_windows"))
         
-        return default_config
+        # 受保护程序规则只在配置的规则变化时重新编译
+        rules_source = snapshot.data.get("protected_apps")
+        if self.rules is None or rules_source != self._rules_source:
+            self.rules = ProtectedAppRules.from_config(snapshot.data)
+            self._rules_source = rules_source
+            tracker = getattr(self, 'foreground_tracker', None)
+            if tracker:
+                tracker.refresh()
+            index = getattr(self, 'window_index', None)
+            if index:
+                index.refresh()
+
+        # 守护时段只在阈值、时段或受保护程序规则变化时重新编译
+        schedule_source = (snapshot.idle_time, snapshot.data.get("guard_schedule"), self.rules)
+        if self.schedule is None or schedule_source != self._schedule_source:
+            self.schedule = GuardSchedule.from_config(snapshot.data, snapshot.idle_time, self.rules,
+                                                      localtime=self.platform.localtime)
+            self._schedule_source = schedule_source
+
+    def current_policy(self):
+        """
+        :return: 当前时段生效的 GuardPolicy（缓存到时段结束，只比较时间）
+        """
+        return self.schedule.current(self.platform.wall_time())
+
+    def current_idle_threshold(self):
+        """
+        :return: 当前时段进入守护模式的空闲时间阈值（秒）
+        """
+        return self.current_policy().entry_idle_time
 
     def is_admin(self):
         """
         检查是否以管理员权限运行
         :return: 布尔值，是否为管理员
         """
-        try:
-            return ctypes.windll.shell32.IsUserAnAdmin() != 0
-        except:
-            return False
+        return self.platform.is_admin()
 
     def get_active_window_process(self):
         """
@@ -75,72 +205,402 @@ class WeChatGuardian:
         :return: 进程名称
         """
         try:
-            hwnd = win32gui.GetForegroundWindow()
-            _, pid = win32process.GetWindowThreadProcessId(hwnd)
-            process = psutil.Process(pid)
-            return process.name()
+            _, pid = self.platform.get_foreground()
+            return self.process_cache.get_name(pid)
         except Exception:
             return None
 
+    def start_foreground_events(self, source=None):
+        """
+        订阅前台窗口变化事件，之后 is_wechat_active() 只读取缓存的前台窗口
+        :param source: ForegroundEventSource 实例，默认使用平台提供的事件源（Windows 下为 WinEvent 钩子）
+        :return: 是否订阅成功
+        """
+        source = source or self.platform.create_foreground_source(self.process_cache.get_name)
+        if source is None:
+            logging.warning("平台不支持前台窗口事件，使用轮询检测")
+            return False
+        tracker = ForegroundTracker(
+            source,
+            matcher=self.is_protected_window,
+            on_protected_activated=self._on_wechat_activated,
+            clock=self.platform.clock.now
+        )
+        if not tracker.start():
+            logging.warning("前台窗口事件订阅失败，使用轮询检测")
+            return False
+        self.foreground_tracker = tracker
+        return True
+
+    def stop_foreground_events(self):
+        """
+        取消前台窗口事件订阅
+        """
+        if self.foreground_tracker:
+            self.foreground_tracker.stop()
+            self.foreground_tracker = None
+
+    def start_window_index(self, source=None):
+        """
+        完整枚举一次顶层窗口并订阅窗口事件，之后 visible_protected_windows() 只读取内存中的索引
+        :param source: WindowEventSource 实例，默认使用平台提供的来源
+        :return: 是否启动成功
+        """
+        source = source or self.platform.create_window_source()
+        if source is None:
+            logging.warning("平台不支持窗口事件，不建立窗口索引")
+            return False
+        index = WindowIndex(source, name_resolver=self.process_cache.get_name, matcher=self.match_window)
+        if not index.start():
+            logging.warning("窗口事件订阅失败，不建立窗口索引")
+            return False
+        self.window_index = index
+        logging.info(f"窗口索引已建立：{len(index)} 个顶层窗口，{len(index.visible_protected())} 个可见的受保护窗口")
+        return True
+
+    def stop_window_index(self):
+        if self.window_index:
+            self.window_index.stop()
+            self.window_index = None
+
+    def visible_protected_windows(self):
+        """
+        当前可见的受保护窗口（微信主窗口、聊天窗口、朋友圈、小程序等）
+        :return: [WindowInfo]
+        """
+        if self.window_index is not None:
+            return self.window_index.visible_protected()
+        # 没有索引时完整枚举一次
+        source = self.platform.create_window_source()
+        if source is None:
+            return []
+        index = WindowIndex(source, name_resolver=self.process_cache.get_name, matcher=self.match_window)
+        index.rebuild()
+        return index.visible_protected()
+
+    def _window_rule(self, window):
+        """
+        :param window: WindowInfo
+        :return: 窗口匹配的受保护程序规则名称（有索引时读取索引中的匹配结果）
+        """
+        index = self.window_index
+        rule = index.protected_rule(window.hwnd) if index is not None else None
+        return rule if rule is not None else self.match_window(window)
+
+    def conceal_protected_windows(self, policy=None):
+        """
+        进入守护模式时一次性最小化或隐藏可见的受保护窗口，并确认已不可见
+
+        与 _should_lock 一致：手动开始的守护遮挡所有程序；自动进入时只遮挡本次空闲已达到各自阈值的程序，
+        阈值更高的程序的窗口在其阈值到达时由 step() 再次调用本方法遮挡（_conceal_due）
+        :param policy: 当前时段的 GuardPolicy，默认按当前时刻查询
+        :return: ShieldResult，未开启（guard_hide_windows）或平台不支持时返回 None
+        """
+        self._conceal_due = None
+        mode = self.shield_mode
+        if mode is None:
+            return None
+        if self.window_shield is None:
+            backend = self.platform.create_shield_backend()
+            if backend is None:
+                logging.warning("平台不支持遮挡窗口")
+                return None
+            clock = self.platform.clock
+            self.window_shield = WindowShield(backend, clock=clock.now, sleep=clock.sleep)
+        try:
+            policy = policy or self.current_policy()
+            idle_since = self._idle_since
+            unattended = None if self._manual_guard or idle_since is None else self.platform.clock.now() - idle_since
+            hwnds, later = [], []
+            for window in self.visible_protected_windows():
+                required = policy.idle_time_for(self._window_rule(window))
+                if unattended is None or required <= unattended:
+                    hwnds.append(window.hwnd)
+                else:
+                    later.append(required)
+            if later:
+                self._conceal_due = idle_since + min(later)
+            result = self.window_shield.conceal(hwnds, mode)
+        except Exception as e:
+            logging.error(f"遮挡受保护窗口失败: {str(e)}")
+            return None
+        if result.count:
+            self._m_concealed.inc(result.count)
+            self._m_conceal_latency.observe(result.latency)
+            logging.info(f"已遮挡 {result.confirmed}/{result.count} 个受保护窗口（{mode}），"
+                         f"耗时 {result.latency * 1000:.0f} 毫秒")
+        return result
+
+    def restore_protected_windows(self):
+        """
+        验证身份后按原来的位置和层叠顺序恢复遮挡的窗口
+        :return: 恢复的窗口数
+        """
+        if self.window_shield is None:
+            return 0
+        count = self.window_shield.restore()
+        if count:
+            logging.info(f"已恢复 {count} 个受保护窗口")
+        return count
+
+    def start_session_events(self, source=None):
+        """
+        订阅会话和电源通知，会话不活动期间 step() 不再检测，守护线程一直休眠到会话恢复
+        :param source: SessionEventSource 实例，默认使用平台提供的来源
+        :return: 是否订阅成功
+        """
+        source = source or self.platform.create_session_source()
+        if source is None:
+            logging.warning("平台不支持会话通知，会话锁定时仍继续检测")
+            return False
+        monitor = SessionMonitor(source, on_change=self._on_session_changed, clock=self.platform.clock.now)
+        if not monitor.start():
+            logging.warning("会话通知订阅失败，会话锁定时仍继续检测")
+            return False
+        self.session_monitor = monitor
+        return True
+
+    def stop_session_events(self):
+        if self.session_monitor:
+            self.session_monitor.stop()
+            self.session_monitor = None
+
+    def session_active(self):
+        """
+        :return: 会话是否活动（未订阅会话通知时始终为 True）
+        """
+        monitor = self.session_monitor
+        return monitor is None or monitor.active
+
+    def _on_session_changed(self, active, reasons):
+        """
+        会话活动状态变化（在通知线程中调用）
+        :param reasons: 变为不活动时为当前成立的原因，恢复时为本次不活动期间解除过的原因
+        """
+        now = self.platform.clock.now()
+        if not active:
+            self._m_session_parks.inc()
+            try:
+                self._parked = (now, self.get_idle_duration())
+            except Exception as e:
+                logging.error(f"读取空闲时间失败: {str(e)}")
+                self._parked = (now, 0.0)
+            logging.info(f"会话不活动（{', '.join(sorted(reasons))}），暂停检测")
+        else:
+            parked, self._parked = self._parked, None
+            if reasons & AUTHENTICATED_REASONS:
+                # 解锁或重新连接验证过身份，空闲时间从恢复时刻重新计算
+                self._resume_idle = None
+            else:
+                # 显示器关闭或睡眠不能说明谁回来了（唤醒它不需要密码），不活动期间计入空闲时间，
+                # 离开超过阈值时恢复后立即进入守护模式
+                parked_at, parked_idle = parked or (now, 0.0)
+                self._resume_idle = parked_idle + (now - parked_at)
+            self._resumed_at = now
+            logging.info(f"会话已恢复（{', '.join(sorted(reasons))}），继续检测")
+            with self._state_lock:
+                # 解锁或重新连接需要验证 Windows 账户，视为主人回来，退出自动进入的守护模式
+                exit_guard = bool(reasons & AUTHENTICATED_REASONS) and self._guarding and not self._manual_guard
+                if exit_guard:
+                    self._guarding = False
+            if exit_guard:
+                self.restore_protected_windows()
+                logging.info("会话解锁，退出守护模式")
+        if self.on_session_changed:
+            self.on_session_changed(active)
+
+    def _rebaselined_idle(self, idle_time):
+        """
+        会话恢复后、还没有新的输入时修正空闲时间：
+        验证过身份的恢复从恢复时刻重新计算；只是显示器关闭或睡眠时不早于暂停前的空闲时间加上不活动的时长
+        （平台的空闲计时在睡眠期间停止或把唤醒当作输入时也不会少算）
+        :return: 修正后的空闲时间
+        """
+        resumed_at = self._resumed_at
+        if resumed_at is None:
+            return idle_time
+        since_resume = self.platform.clock.now() - resumed_at
+        if idle_time < since_resume:
+            # 恢复之后已有输入，不再需要修正
+            self._resumed_at = None
+            self._resume_idle = None
+            return idle_time
+        resume_idle = self._resume_idle
+        if resume_idle is None:
+            return since_resume
+        return max(idle_time, resume_idle + since_resume)
+
+    def _on_wechat_activated(self, info):
+        """
+        微信成为前台窗口（在事件线程中调用）
+        """
+        if not self.session_active():
+            return
+        if self.on_wechat_activated and (self.is_guarding or self.current_policy().always):
+            self.on_wechat_activated(info)
+
+    def is_protected_window(self, info):
+        """
+        判断窗口是否属于受保护程序（微信、企业微信及配置的其他程序）
+        :param info: ForegroundInfo
+        :return: 布尔值
+        """
+        return self.match_protected_rule(info) is not None
+
+    def match_protected_rule(self, info):
+        """
+        :param info: ForegroundInfo
+        :return: 匹配的受保护程序规则名称，不受保护时返回 None
+        """
+        if not info.name:
+            return None
+        path = window_class = title = None
+        rules = self.rules
+        if rules.needs_path:
+            identity = self.process_cache.get(info.pid)
+            path = identity.exe if identity else None
+        if rules.needs_window_info and info.hwnd:
+            window_class, title = self.platform.get_window_info(info.hwnd)
+        return rules.match(info.name, path, window_class, title)
+
+    def match_window(self, window):
+        """
+        :param window: WindowInfo（窗口索引中的条目，已包含窗口类名和标题）
+        :return: 匹配的受保护程序规则名称，不受保护时返回 None
+        """
+        if not window.name:
+            return None
+        path = None
+        rules = self.rules
+        if rules.needs_path:
+            identity = self.process_cache.get(window.pid)
+            path = identity.exe if identity else None
+        return rules.match(window.name, path, window.window_class, window.title)
+
     def is_wechat_active(self):
         """
-        检查微信是否为活动窗口
+        检查受保护程序（微信等）是否为活动窗口
         :return: 布尔值
         """
-        return self.get_active_window_process() == "WeChat.exe"
+        if self.foreground_tracker is not None:
+            return self.foreground_tracker.is_protected_active()
+        try:
+            hwnd, pid = self.platform.get_foreground()
+            return self.is_protected_window(ForegroundInfo(hwnd, pid, self.process_cache.get_name(pid)))
+        except Exception:
+            return False
+
+    def _active_protected(self):
+        """
+        :return: (ForegroundInfo, 规则名称, 激活标识)，前台不是受保护程序时返回 None
+        """
+        tracker = self.foreground_tracker
+        if tracker is not None:
+            if not tracker.is_protected_active():
+                return None
+            info = tracker.current
+            return info, self.match_protected_rule(info), (info.hwnd, tracker.changed_at)
+        try:
+            hwnd, pid = self.platform.get_foreground()
+            info = ForegroundInfo(hwnd, pid, self.process_cache.get_name(pid))
+            rule = self.match_protected_rule(info)
+        except Exception:
+            return None
+        # 轮询模式下不知道激活时刻，同一窗口持续在前台视为同一次激活
+        return (info, rule, (hwnd, None)) if rule is not None else None
 
-    def lock_wechat(self):
+    def _should_lock(self, rule, activation, detected_at, policy, guarding):
         """
-        使用Ctrl+L锁定微信
+        按当前时段的策略判断是否锁定刚检测到的受保护程序
+        :param guarding: 是否处于守护模式；非守护模式下只锁定始终守护的程序
         """
-        pyautogui.hotkey('ctrl', 'l')
-        time.sleep(0.5)
+        handled = self._handled_activation
+        if handled is not None and handled[0] == activation:
+            # 同一次激活已经处理过；只有处理之后又空闲够一个阈值、重新进入守护模式时才再次判断
+            if not guarding or self._idle_since is None or handled[1] >= self._idle_since:
+                return False
+        required = policy.idle_time_for(rule)
+        if not guarding:
+            return required == 0
+        unattended = detected_at - self._idle_since if self._idle_since is not None else None
+        if not self._manual_guard and unattended is not None and unattended < required:
+            # 该程序的阈值高于进入守护模式的阈值，本次空闲还不够长
+            self._handled_activation = (activation, detected_at)
+            self._m_policy_skips.inc()
+            logging.info(f"{rule} 的空闲时间阈值为 {required} 秒（{policy.name}），"
+                         f"本次只空闲了 {unattended:.0f} 秒，不锁定")
+            return False
+        return True
+
+    def lock_wechat(self, hwnd=None):
+        """
+        使用Ctrl+L锁定微信，并确认锁定生效
+        :param hwnd: 微信窗口句柄，默认为当前前台窗口
+        :return: LockResult
+        """
+        if self.lock_action is None:
+            clock = self.platform.clock
+            self.lock_action = LockAction(self.lock_backend, clock=clock.now, sleep=clock.sleep)
+        if hwnd is None:
+            current = self.foreground_tracker.current if self.foreground_tracker else None
+            hwnd = current.hwnd if current else self.platform.get_foreground()[0]
+        
+        result = self.lock_action.lock(hwnd)
+        self._m_lock_latency.observe(result.latency)
+        if result.ok:
+            self._m_locks.inc()
+            logging.info(f"微信已锁定，尝试 {result.attempts} 次，耗时 {result.latency * 1000:.0f} 毫秒")
+        else:
+            self._m_lock_failures.inc()
+            logging.warning(f"未能确认微信已锁定，尝试 {result.attempts} 次")
+        return result
 
     def get_idle_duration(self):
         """
         获取系统空闲时间（秒）
         """
-        try:
-            lastInputInfo = LASTINPUTINFO()
-            lastInputInfo.cbSize = ctypes.sizeof(lastInputInfo)
-            ctypes.windll.user32.GetLastInputInfo(ctypes.byref(lastInputInfo))
-            millis = ctypes.windll.kernel32.GetTickCount() - lastInputInfo.dwTime
-            return millis / 1000.0
-        except Exception as e:
-            print(f"\n获取空闲时间失败: {str(e)}")
-            return 0
+        return self.platform.idle.get_idle_duration()
 
     def check_system_idle(self):
         """
         检查系统空闲时间
         """
         idle_duration = self.get_idle_duration()
-        is_idle = idle_duration > self.idle_time_threshold
-        logging.debug(f"空闲时间: {idle_duration:.1f}秒, 阈值: {self.idle_time_threshold}秒, 是否空闲: {is_idle}")
+        threshold = self.current_idle_threshold()
+        is_idle = idle_duration > threshold
+        logging.debug(f"空闲时间: {idle_duration:.1f}秒, 阈值: {threshold}秒, 是否空闲: {is_idle}")
         
         # 如果空闲，再次确认
         if is_idle:
             logging.info(f"检测到系统空闲，准备进入守护模式...")
-            time.sleep(0.5)  # 短暂等待以确认
+            self.platform.clock.sleep(0.5)  # 短暂等待以确认
             second_check = self.get_idle_duration()
-            is_still_idle = second_check > self.idle_time_threshold
+            is_still_idle = second_check > threshold
             if is_still_idle:
                 logging.info("确认空闲状态，正在启动守护...")
-                self.start_guardian()  # 自动启动守护模式
+                self.start_guardian(manual=False)  # 自动启动守护模式
             return is_still_idle
         
         return is_idle
 
-    def start_guardian(self):
+    def start_guardian(self, manual=True):
         """
         开始守护模式
+        :param manual: 是否手动开始；自动开始时若已在守护则不做任何改变
+        :return: 是否由本次调用进入守护模式
         """
         if not self.is_admin():
             logging.error("请以管理员权限运行程序")
             return False
 
-        self.is_guarding = True
-        logging.info(f"开始守护模式，空闲时间阈值：{self.idle_time_threshold}秒")
+        try:
+            idle_time = self.get_idle_duration()
+        except Exception:
+            idle_time = None
+        if not self._enter_guard(idle_time, manual):
+            return False
+        logging.info(f"开始守护模式，空闲时间阈值：{self.current_idle_threshold()}秒")
+        self.conceal_protected_windows()
         return True
 
     def stop_guardian(self, manual=False):
@@ -157,89 +617,208 @@ class WeChatGuardian:
         
         # 如果是手动停止且启用了密码保护，需要验证密码
         if manual and self.config.get('password'):
+            if self.root is None:
+                # 无界面模式下不加载 tkinter，也无法询问密码
+                logging.warning("无界面模式下不能手动停止守护，请修改配置 guard_paused 或结束守护进程")
+                return False
+            from tkinter import simpledialog, messagebox
             password = simpledialog.askstring(
                 "验证密码",
                 "请输入密码:",
                 parent=self.root,
                 show='*'
             )
-            if not password or not self.verify_password(password):
+            if not password or not self.verifier.verify_in_background(self.root, password):
                 messagebox.showerror("错误", "密码验证失败")
                 return False
         
         self.is_guarding = False
         logging.info("守护已停止")
+        if manual:
+            # 已验证身份（或未设置密码），恢复进入守护模式时遮挡的窗口
+            self.restore_protected_windows()
         return True
 
-    def update_last_active_time(self):
-        """
-        更新最后活动时间
-        """
-        self.last_input_info.dwTime = ctypes.windll.kernel32.GetTickCount()
-        logging.debug(f"更新最后活动时间: {time.strftime('%H:%M:%S', time.localtime(self.last_input_info.dwTime / 1000))}")
-
-    def run_guardian_cycle(self):
+    def step(self, scheduler):
         """
-        守护模式主循环
+        执行一次守护循环
+        :param scheduler: IdleScheduler，用于计算下一次唤醒时刻
+        :return: CycleResult
         """
+        # 默认按守护模式的节奏唤醒，异常时也不会陷入忙等
+        timeout = scheduler.guard_check_interval
+        self._m_cycles.inc()
+        if not self.session_active():
+            # 会话不活动：不读取空闲时间和前台窗口，一直休眠到会话恢复时被唤醒
+            return CycleResult(None, None, None, None, None, None)
         try:
-            # 获取当前空闲时间
-            idle_time = self.get_idle_duration()
-            
-            # 不在守护模式下，检查是否需要进入守护模式
+            now = self.platform.wall_time()
+            policy = self.schedule.current(now)
+            if policy is not self._last_policy:
+                self._last_policy = policy
+                logging.info(f"守护时段：{policy.name}，空闲时间阈值 {policy.entry_idle_time} 秒")
+
+            # 只在非守护模式下检测空闲时间
             if not self.is_guarding:
-                if idle_time > self.idle_time_threshold:
-                    print(f"\n系统已空闲 {idle_time:.1f} 秒，进入守护模式！")
-                    self.is_guarding = True
-                    return "START_GUARDIAN"
-                return None
+                # 始终守护的程序不等空闲，每次切换到前台都锁定
+                if policy.always:
+                    result = self._check_protected(scheduler, policy, guarding=False)
+                    if result is not None:
+                        return result
+                started = time.perf_counter()
+                idle_time = self._rebaselined_idle(self.get_idle_duration())
+                self._m_idle_read.observe(time.perf_counter() - started)
+                self._m_idle.set(idle_time)
+                threshold = policy.entry_idle_time
+                if idle_time > threshold:
+                    if not self._enter_guard(idle_time):
+                        # 读取空闲时间期间已被手动开始守护，立即按守护模式重新检查
+                        return CycleResult(None, 0, idle_time, None, None, None)
+                    self._m_guard_entries.inc()
+                    # 不等入侵者打开微信，进入守护模式时就遮挡已达到各自阈值的受保护窗口
+                    self.conceal_protected_windows(policy)
+                    # 进入守护模式时微信可能已在前台，立即检查一次
+                    return CycleResult(START_GUARDIAN, 0, idle_time, None, None, None)
+                # 空闲时间最早在 (阈值 - 当前空闲时间) 后越过阈值，在此之前无需唤醒；
+                # 阈值可能在时段边界变化，届时唤醒重新计算
+                timeout = scheduler.next_timeout(False, idle_time, threshold, self.schedule.seconds_until_change(now))
+                if policy.always and scheduler.guard_check_interval is not None:
+                    # 轮询模式下有始终守护的程序时按守护模式的节奏检查前台窗口
+                    timeout = min(timeout, scheduler.guard_check_interval)
+                return CycleResult(None, timeout, idle_time, None, None, None)
             
-            # 在守护模式下，检查微信窗口
-            if self.is_wechat_active():
-                self.lock_wechat()
-                self.is_guarding = False
-                return "😄😄😄嘿~你坏蛋。不要看我微信😄😄😄"
-
+            # 在守护模式下只检查微信窗口
+            result = self._check_protected(scheduler, policy, guarding=True)
+            if result is not None:
+                return result
+            if self._conceal_due is not None:
+                # 阈值更高的程序到达各自阈值时遮挡其窗口，在此之前按该时刻唤醒
+                remaining = self._conceal_due - self.platform.clock.now()
+                if remaining <= 0:
+                    self.conceal_protected_windows(policy)
+                if self._conceal_due is not None:
+                    remaining = max(0.0, self._conceal_due - self.platform.clock.now())
+                    timeout = remaining if timeout is None else min(timeout, remaining)
+        
         except Exception as e:
+            self._m_cycle_errors.inc()
             logging.error(f"守护循环错误: {str(e)}")
             logging.exception(e)
         
-        return None
+        return CycleResult(None, timeout, None, None, None, None)
 
-    def verify_password(self, password):
+    def _check_protected(self, scheduler, policy, guarding):
         """
-        验证密码
+        检查前台是否为受保护程序，按策略需要时锁定
+        :return: 锁定时返回 INTRUSION 的 CycleResult，否则返回 None
+        """
+        started = time.perf_counter()
+        found = self._active_protected()
+        self._m_foreground_check.observe(time.perf_counter() - started)
+        if found is None:
+            self._handled_activation = None
+            return None
+        info, rule, activation = found
+        detected_at = self.platform.clock.now()
+        if not self._should_lock(rule, activation, detected_at, policy, guarding):
+            return None
+
+        self._m_intrusions.inc()
+        lock_result = self.lock_wechat(info.hwnd or None)
+        self.is_guarding = False
+        # 同一次激活不再重复锁定（始终守护的程序解锁后可以继续使用），再次空闲够一个阈值后才重新判断
+        self._handled_activation = (activation, detected_at)
+        # 锁定之后再记录和请求截图，两者都只入队，不会推迟锁定
+        intrusion = self._record_intrusion(detected_at, lock_result)
+        if self.evidence_capture is not None:
+            self.evidence_capture.capture(intrusion.timestamp if intrusion else None)
+        # 锁定视为一次用户活动：至少再空闲一个阈值才重新进入守护模式，
+        # 避免微信仍在前台时反复锁定
+        timeout = scheduler.next_timeout(False, 0, policy.entry_idle_time)
+        return CycleResult(INTRUSION, timeout, None, lock_result, detected_at, intrusion)
+
+    def _record_intrusion(self, detected_at, lock_result):
+        """
+        生成入侵记录并交给审计存储（只入队，不等待写盘）
+        :return: IntrusionEvent，失败时返回 None
         """
         try:
-            if not self.config.get('password'):
-                return True
-            
-            stored_hash = base64.b64decode(self.config['password'].encode('utf-8'))
-            stored_salt = base64.b64decode(self.config['salt'].encode('utf-8'))
-            
-            input_hash = self._hash_password(password, stored_salt)
-            
-            # 使用安全的比较方法
-            return self._secure_compare(stored_hash, input_hash)
+            tracker = self.foreground_tracker
+            activated_at = None
+            if tracker is not None and tracker.current is not None:
+                info = tracker.current
+                activated_at = tracker.changed_at
+            else:
+                hwnd, pid = self.platform.get_foreground()
+                info = ForegroundInfo(hwnd, pid, self.process_cache.get_name(pid))
+            title = self.platform.get_window_info(info.hwnd)[1] if info.hwnd else None
+            event = IntrusionEvent(
+                timestamp=self.platform.wall_time(),
+                idle_seconds=detected_at - self._idle_since if self._idle_since is not None else None,
+                process=info.name,
+                window_title=title,
+                rule=self.match_protected_rule(info),
+                locked=lock_result.ok,
+                lock_attempts=lock_result.attempts,
+                lock_latency=lock_result.latency,
+                # 轮询模式下不知道窗口何时被激活
+                detection_latency=detected_at - activated_at if activated_at is not None else None
+            )
         except Exception as e:
-            logging.error(f"密码验证失败: {str(e)}")
-            return False
+            logging.error(f"生成入侵记录失败: {str(e)}")
+            return None
+        if self.audit_store is not None:
+            self.audit_store.append(event)
+        return event
+
+    def run_loop(self, scheduler, on_cycle=None, paused=None):
+        """
+        守护循环：执行 step() 后休眠到下一次可能发生状态变化的时刻，直到调度器停止
+        主程序和无界面模式通过 DetectionSupervisor 运行同一个循环，模拟和轨迹回放直接调用
+        :param scheduler: IdleScheduler，配置变化或退出时会被提前唤醒
+        :param on_cycle: 每次循环后的回调，参数为 CycleResult
+        :param paused: 返回是否暂停检测的函数；暂停时一直休眠到被唤醒
+        """
+        while not scheduler.stopped:
+            if paused is not None and paused():
+                scheduler.sleep(None)
+                continue
+            result = self.step(scheduler)
+            if on_cycle:
+                try:
+                    on_cycle(result)
+                except Exception as e:
+                    logging.error(f"守护循环回调错误: {str(e)}")
+                    logging.exception(e)
+            scheduler.sleep(result.timeout)
 
-    def _hash_password(self, password, salt):
-        # 实现密码哈希函数
-        pass
+    def run_guardian_cycle(self):
+        """
+        守护模式主循环（兼容旧接口）
+        :return: "START_GUARDIAN"、警告文字或 None
+        """
+        result = self.step(IdleScheduler(clock=self.platform.clock))
+        if result.event == START_GUARDIAN:
+            logging.info(f"系统已空闲 {result.idle_time:.1f} 秒，进入守护模式")
+            return START_GUARDIAN
+        if result.event == INTRUSION:
+            return INTRUSION_MESSAGE
+        return None
 
-    def _secure_compare(self, stored_hash, input_hash):
-        # 实现安全的比较函数
-        pass
+    def verify_password(self, password):
+        """
+        验证密码（阻塞，界面中请使用 verifier.verify_in_background）
+        """
+        return self.verifier.verify(password)
 
 # 示例使用
 if __name__ == '__main__':
+    logging.basicConfig(level=logging.INFO)
     guardian = WeChatGuardian()
     guardian.start_guardian()
     
     while guardian.is_guarding:
         result = guardian.run_guardian_cycle()
         if result:
-            print(result)
-        time.sleep(2)  # 每2秒检查一次
+            logging.info(result)
+        guardian.platform.clock.sleep(2)  # 每2秒检查一次
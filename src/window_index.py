@@ -0,0 +1,358 @@
+import logging
+import threading
+from collections import namedtuple
+
+# 顶层窗口信息：窗口句柄、进程 ID、进程名、窗口类名、标题、是否可见
+WindowInfo = namedtuple('WindowInfo', ['hwnd', 'pid', 'name', 'window_class', 'title', 'visible'])
+
+# 窗口事件类型
+WINDOW_CREATED = 'create'
+WINDOW_DESTROYED = 'destroy'
+WINDOW_SHOWN = 'show'
+WINDOW_HIDDEN = 'hide'
+WINDOW_RENAMED = 'rename'
+
+EVENT_OBJECT_CREATE = 0x8000
+EVENT_OBJECT_DESTROY = 0x8001
+EVENT_OBJECT_SHOW = 0x8002
+EVENT_OBJECT_HIDE = 0x8003
+EVENT_OBJECT_NAMECHANGE = 0x800C
+OBJID_WINDOW = 0
+CHILDID_SELF = 0
+GA_ROOT = 2
+WINEVENT_OUTOFCONTEXT = 0x0000
+WM_QUIT = 0x0012
+
+_WIN_EVENTS = {
+    EVENT_OBJECT_CREATE: WINDOW_CREATED,
+    EVENT_OBJECT_DESTROY: WINDOW_DESTROYED,
+    EVENT_OBJECT_SHOW: WINDOW_SHOWN,
+    EVENT_OBJECT_HIDE: WINDOW_HIDDEN,
+    EVENT_OBJECT_NAMECHANGE: WINDOW_RENAMED,
+}
+
+
+class WindowEventSource:
+    """
+    顶层窗口来源接口
+
+    - enumerate()：完整枚举一次所有顶层窗口
+    - query(hwnd)：读取单个窗口的当前信息
+    - start(callback)：之后每当顶层窗口创建、销毁、显示、隐藏或改名时调用 callback(事件类型, hwnd)
+    返回的 WindowInfo 中 name 为 None，由 WindowIndex 根据 pid 补全进程名。
+    """
+
+    def enumerate(self):
+        """
+        :return: [WindowInfo]
+        """
+        raise NotImplementedError
+
+    def query(self, hwnd):
+        """
+        :return: WindowInfo，窗口已不存在或不是顶层窗口时返回 None
+        """
+        raise NotImplementedError
+
+    def start(self, callback):
+        """
+        :return: 是否启动成功
+        """
+        raise NotImplementedError
+
+    def stop(self):
+        raise NotImplementedError
+
+
+class Win32WindowEventSource(WindowEventSource):
+    """
+    基于 EnumWindows 和 SetWinEventHook(EVENT_OBJECT_*) 的顶层窗口来源
+
+    在独立线程中安装钩子并运行消息循环。读取标题使用 InternalGetWindowText，
+    不向目标窗口发送消息，无响应的窗口不会卡住钩子线程。
+    """
+
+    def __init__(self):
+        self._callback = None
+        self._thread = None
+        self._thread_id = None
+        self._started = threading.Event()
+        self._ok = False
+
+    def _user32(self):
+        import ctypes
+        return ctypes.windll.user32
+
+    def enumerate(self):
+        import ctypes
+        from ctypes import wintypes
+        user32 = self._user32()
+        hwnds = []
+        EnumWindowsProc = ctypes.WINFUNCTYPE(wintypes.BOOL, wintypes.HWND, wintypes.LPARAM)
+
+        def collect(hwnd, _):
+            hwnds.append(hwnd)
+            return True
+
+        user32.EnumWindows(EnumWindowsProc(collect), 0)
+        windows = []
+        for hwnd in hwnds:
+            info = self._read(hwnd)
+            if info is not None:
+                windows.append(info)
+        return windows
+
+    def query(self, hwnd):
+        user32 = self._user32()
+        if not user32.IsWindow(hwnd) or user32.GetAncestor(hwnd, GA_ROOT) != hwnd:
+            return None
+        return self._read(hwnd)
+
+    def _read(self, hwnd):
+        import ctypes
+        from ctypes import wintypes
+        user32 = self._user32()
+        pid = wintypes.DWORD()
+        if not user32.GetWindowThreadProcessId(hwnd, ctypes.byref(pid)):
+            return None
+        class_name = ctypes.create_unicode_buffer(256)
+        user32.GetClassNameW(hwnd, class_name, 256)
+        title = ctypes.create_unicode_buffer(512)
+        user32.InternalGetWindowText(hwnd, title, 512)
+        return WindowInfo(hwnd, pid.value, None, class_name.value, title.value, bool(user32.IsWindowVisible(hwnd)))
+
+    def start(self, callback):
+        self._callback = callback
+        self._thread = threading.Thread(target=self._run, name='window-events', daemon=True)
+        self._thread.start()
+        self._started.wait(2)
+        return self._ok
+
+    def stop(self):
+        if self._thread_id:
+            self._user32().PostThreadMessageW(self._thread_id, WM_QUIT, 0, 0)
+        self._thread_id = None
+
+    def _run(self):
+        hooks = []
+        try:
+            import ctypes
+            from ctypes import wintypes
+            user32 = self._user32()
+
+            WinEventProc = ctypes.WINFUNCTYPE(
+                None,
+                wintypes.HANDLE, wintypes.DWORD, wintypes.HWND,
+                wintypes.LONG, wintypes.LONG, wintypes.DWORD, wintypes.DWORD
+            )
+
+            def on_event(hook, event, hwnd, id_object, id_child, thread_id, event_time):
+                # 只关心窗口本身的事件，忽略窗口内控件、光标等对象
+                if not hwnd or id_object != OBJID_WINDOW or id_child != CHILDID_SELF:
+                    return
+                try:
+                    self._callback(_WIN_EVENTS[event], hwnd)
+                except Exception as e:
+                    logging.error(f"处理窗口事件失败: {str(e)}")
+
+            # 保存回调引用，防止被垃圾回收
+            self._proc = WinEventProc(on_event)
+            user32.SetWinEventHook.restype = wintypes.HANDLE
+            # 创建到隐藏是连续的事件号，改名单独订阅，避免收到频繁的位置变化等事件
+            for first, last in ((EVENT_OBJECT_CREATE, EVENT_OBJECT_HIDE),
+                                (EVENT_OBJECT_NAMECHANGE, EVENT_OBJECT_NAMECHANGE)):
+                hook = user32.SetWinEventHook(first, last, 0, self._proc, 0, 0, WINEVENT_OUTOFCONTEXT)
+                if not hook:
+                    raise OSError("SetWinEventHook 失败")
+                hooks.append(hook)
+
+            self._thread_id = ctypes.windll.kernel32.GetCurrentThreadId()
+            self._ok = True
+            self._started.set()
+
+            msg = wintypes.MSG()
+            while user32.GetMessageW(ctypes.byref(msg), 0, 0, 0) > 0:
+                user32.TranslateMessage(ctypes.byref(msg))
+                user32.DispatchMessageW(ctypes.byref(msg))
+        except Exception as e:
+            logging.error(f"窗口事件钩子启动失败: {str(e)}")
+        finally:
+            for hook in hooks:
+                try:
+                    self._user32().UnhookWinEvent(hook)
+                except Exception:
+                    pass
+            self._started.set()
+
+
+class WindowIndex:
+    """
+    顶层窗口索引：hwnd -> WindowInfo
+
+    启动时完整枚举一次，之后只根据窗口事件增量维护；每个窗口在加入或改名时判断一次是否受保护，
+    "当前可见的受保护窗口"只是读取内存中的字典，不再反复调用 EnumWindows。
+    枚举期间到达的事件先缓存，枚举完成后按顺序重新读取相关窗口，不会被枚举结果覆盖。
+    """
+
+    def __init__(self, source, name_resolver=None, matcher=None):
+        """
+        :param source: WindowEventSource 实例
+        :param name_resolver: 根据 pid 获取进程名的函数
+        :param matcher: 判断 WindowInfo 是否属于受保护程序的函数，返回规则名称或 None
+        """
+        self.source = source
+        self.name_resolver = name_resolver or (lambda pid: None)
+        self.matcher = matcher or (lambda window: None)
+        self.events = 0
+        self.rebuilds = 0
+        self.running = False
+        self._windows = {}
+        # 受保护的窗口：hwnd -> 规则名称；其中可见的另存一份，查询时直接复制
+        self._protected = {}
+        self._visible_protected = {}
+        self._pending = None
+        self._lock = threading.Lock()
+
+    def start(self):
+        """
+        订阅窗口事件并完整枚举一次
+        :return: 是否启动成功
+        """
+        with self._lock:
+            self._pending = []
+        if not self.source.start(self._on_event):
+            with self._lock:
+                self._pending = None
+            return False
+        self.running = True
+        self.rebuild()
+        return True
+
+    def stop(self):
+        self.source.stop()
+        self.running = False
+
+    def rebuild(self):
+        """
+        重新完整枚举所有顶层窗口（启动时或怀疑丢失事件时调用）
+        """
+        with self._lock:
+            if self._pending is None:
+                self._pending = []
+        windows = [self._complete(window) for window in self.source.enumerate()]
+        with self._lock:
+            self._windows = {}
+            self._protected = {}
+            self._visible_protected = {}
+            for window in windows:
+                self._put(window)
+            pending, self._pending = self._pending, None
+            self.rebuilds += 1
+        # 枚举期间到达的事件：重新读取窗口的当前状态
+        for kind, hwnd in pending:
+            self._apply(kind, hwnd)
+
+    def refresh(self):
+        """
+        规则变化后重新判断所有窗口
+        """
+        with self._lock:
+            windows = list(self._windows.values())
+            self._protected = {}
+            self._visible_protected = {}
+            for window in windows:
+                self._put(window)
+
+    def _complete(self, window):
+        return window._replace(name=self.name_resolver(window.pid)) if window.name is None else window
+
+    def _on_event(self, kind, hwnd):
+        self.events += 1
+        with self._lock:
+            if self._pending is not None:
+                self._pending.append((kind, hwnd))
+                return
+        self._apply(kind, hwnd)
+
+    def _apply(self, kind, hwnd):
+        if kind == WINDOW_DESTROYED:
+            with self._lock:
+                self._remove(hwnd)
+            return
+        if kind == WINDOW_HIDDEN:
+            with self._lock:
+                window = self._windows.get(hwnd)
+                if window is not None:
+                    self._put(window._replace(visible=False), window)
+                    return
+        # 创建、显示、改名（以及未知窗口的隐藏）：读取窗口的当前信息
+        window = self.source.query(hwnd)
+        if window is None:
+            with self._lock:
+                self._remove(hwnd)
+            return
+        previous = self._windows.get(hwnd)
+        if previous is not None and previous.pid == window.pid:
+            window = window._replace(name=previous.name)
+        else:
+            window = self._complete(window)
+        with self._lock:
+            self._put(window, self._windows.get(hwnd))
+
+    def _put(self, window, previous=None):
+        """
+        加入或更新窗口（调用方持有锁）；进程、类名和标题都未变化时沿用上次的匹配结果
+        """
+        hwnd = window.hwnd
+        self._windows[hwnd] = window
+        if previous is not None and previous[:5] == window[:5]:
+            rule = self._protected.get(hwnd)
+        else:
+            try:
+                rule = self.matcher(window)
+            except Exception as e:
+                logging.error(f"判断受保护窗口失败: {str(e)}")
+                rule = None
+            if rule is None:
+                self._protected.pop(hwnd, None)
+            else:
+                self._protected[hwnd] = rule
+        if rule is not None and window.visible:
+            self._visible_protected[hwnd] = window
+        else:
+            self._visible_protected.pop(hwnd, None)
+
+    def _remove(self, hwnd):
+        self._windows.pop(hwnd, None)
+        self._protected.pop(hwnd, None)
+        self._visible_protected.pop(hwnd, None)
+
+    def __len__(self):
+        return len(self._windows)
+
+    def get(self, hwnd):
+        return self._windows.get(hwnd)
+
+    def windows(self):
+        """
+        :return: 所有顶层窗口（副本）
+        """
+        with self._lock:
+            return list(self._windows.values())
+
+    def visible_windows(self):
+        with self._lock:
+            return [window for window in self._windows.values() if window.visible]
+
+    def visible_protected(self):
+        """
+        :return: 当前可见的受保护窗口 [WindowInfo]
+        """
+        with self._lock:
+            return list(self._visible_protected.values())
+
+    def protected_rule(self, hwnd):
+        """
+        :return: 窗口匹配的受保护程序规则名称，不受保护或不在索引中时返回 None
+        """
+        return self._protected.get(hwnd)
@@ -0,0 +1,263 @@
+import time
+import logging
+import threading
+from collections import namedtuple
+
+# 遮挡方式：最小化（任务栏中仍可见，点击后恢复并触发锁定）或隐藏
+SHIELD_MINIMIZE = 'minimize'
+SHIELD_HIDE = 'hide'
+SHIELD_MODES = (SHIELD_MINIMIZE, SHIELD_HIDE)
+
+# 遮挡前保存的窗口状态：句柄、z 序（0 为最上层）、窗口位置（由后端解释，恢复时原样传回）
+SavedWindow = namedtuple('SavedWindow', ['hwnd', 'z', 'placement'])
+# 一次遮挡的结果：遮挡的窗口数、确认已不可见的窗口数、从开始到确认的耗时（秒）
+ShieldResult = namedtuple('ShieldResult', ['count', 'confirmed', 'latency'])
+
+SW_HIDE = 0
+SW_SHOWNORMAL = 1
+SW_SHOWMINIMIZED = 2
+SW_SHOWNOACTIVATE = 4
+SW_MINIMIZE = 6
+SW_SHOWMINNOACTIVE = 7
+GW_HWNDNEXT = 2
+SWP_NOSIZE = 0x0001
+SWP_NOMOVE = 0x0002
+SWP_NOZORDER = 0x0004
+SWP_NOACTIVATE = 0x0010
+SWP_HIDEWINDOW = 0x0080
+HWND_TOP = 0
+
+
+def parse_shield_mode(value):
+    """
+    解析配置 guard_hide_windows
+    :return: SHIELD_MINIMIZE / SHIELD_HIDE，关闭时返回 None
+    """
+    if value is True:
+        return SHIELD_MINIMIZE
+    if not value:
+        return None
+    if value in SHIELD_MODES:
+        return value
+    logging.error(f"guard_hide_windows 配置无效: {value}，可选 minimize / hide")
+    return None
+
+
+class ShieldBackend:
+    """
+    窗口遮挡后端接口
+    """
+
+    def save(self, hwnds):
+        """
+        读取窗口的 z 序和位置
+        :return: [SavedWindow]，已不存在的窗口不返回
+        """
+        raise NotImplementedError
+
+    def conceal(self, hwnds, mode):
+        """
+        一次性最小化或隐藏所有窗口（不等待生效）
+        """
+        raise NotImplementedError
+
+    def is_concealed(self, hwnd, mode):
+        """
+        :return: 窗口内容是否已不可见（窗口不存在也视为不可见）
+        """
+        raise NotImplementedError
+
+    def restore(self, saved):
+        """
+        恢复窗口位置、显示状态和 z 序
+        :param saved: [SavedWindow]，按 z 序从上到下排列
+        :return: 恢复的窗口数
+        """
+        raise NotImplementedError
+
+
+class Win32ShieldBackend(ShieldBackend):
+    """
+    通过 DeferWindowPos 批量隐藏、ShowWindowAsync 批量最小化窗口
+
+    隐藏在一次 EndDeferWindowPos 中提交；最小化只向各窗口投递消息，
+    无响应的窗口不会卡住守护线程，由 WindowShield 观察确认生效。
+    """
+
+    def __init__(self):
+        import ctypes
+        from ctypes import wintypes
+
+        class WINDOWPLACEMENT(ctypes.Structure):
+            _fields_ = [
+                ('length', wintypes.UINT),
+                ('flags', wintypes.UINT),
+                ('showCmd', wintypes.UINT),
+                ('ptMinPosition', wintypes.POINT),
+                ('ptMaxPosition', wintypes.POINT),
+                ('rcNormalPosition', wintypes.RECT),
+            ]
+
+        self._ctypes = ctypes
+        self._placement_type = WINDOWPLACEMENT
+        self._user32 = ctypes.windll.user32
+        self._user32.GetTopWindow.restype = wintypes.HWND
+        self._user32.GetWindow.restype = wintypes.HWND
+        self._user32.BeginDeferWindowPos.restype = wintypes.HANDLE
+        self._user32.DeferWindowPos.restype = wintypes.HANDLE
+        self._user32.DeferWindowPos.argtypes = [wintypes.HANDLE, wintypes.HWND, wintypes.HWND,
+                                                ctypes.c_int, ctypes.c_int, ctypes.c_int, ctypes.c_int,
+                                                wintypes.UINT]
+        self._user32.EndDeferWindowPos.argtypes = [wintypes.HANDLE]
+
+    def save(self, hwnds):
+        user32 = self._user32
+        wanted = set(hwnds)
+        # 从最上层开始沿 z 序查找，找齐后即停止，不必遍历所有顶层窗口
+        z_order = {}
+        hwnd = user32.GetTopWindow(None)
+        while hwnd and len(z_order) < len(wanted):
+            if hwnd in wanted:
+                z_order[hwnd] = len(z_order)
+            hwnd = user32.GetWindow(hwnd, GW_HWNDNEXT)
+        saved = []
+        for hwnd, z in z_order.items():
+            placement = self._placement_type()
+            placement.length = self._ctypes.sizeof(placement)
+            if user32.GetWindowPlacement(hwnd, self._ctypes.byref(placement)):
+                saved.append(SavedWindow(hwnd, z, placement))
+        return saved
+
+    def conceal(self, hwnds, mode):
+        user32 = self._user32
+        if mode == SHIELD_HIDE and self._defer(hwnds, SWP_HIDEWINDOW | SWP_NOMOVE | SWP_NOSIZE | SWP_NOZORDER | SWP_NOACTIVATE):
+            return
+        command = SW_HIDE if mode == SHIELD_HIDE else SW_MINIMIZE
+        for hwnd in hwnds:
+            user32.ShowWindowAsync(hwnd, command)
+
+    def _defer(self, hwnds, flags, insert_after=None):
+        """
+        在一次 EndDeferWindowPos 中提交所有窗口的变化
+        :param insert_after: {hwnd: 放在其下方的窗口}，为 None 时不改变 z 序
+        :return: 是否成功；任何一个窗口失败时整批作废
+        """
+        user32 = self._user32
+        hdwp = user32.BeginDeferWindowPos(len(hwnds))
+        for hwnd in hwnds:
+            if not hdwp:
+                return False
+            after = insert_after.get(hwnd, HWND_TOP) if insert_after is not None else None
+            hdwp = user32.DeferWindowPos(hdwp, hwnd, after, 0, 0, 0, 0, flags)
+        return bool(hdwp) and bool(user32.EndDeferWindowPos(hdwp))
+
+    def is_concealed(self, hwnd, mode):
+        user32 = self._user32
+        if not user32.IsWindow(hwnd) or not user32.IsWindowVisible(hwnd):
+            return True
+        return mode == SHIELD_MINIMIZE and bool(user32.IsIconic(hwnd))
+
+    def restore(self, saved):
+        user32 = self._user32
+        alive = [window for window in saved if user32.IsWindow(window.hwnd)]
+        # 从下往上恢复位置和显示状态，不抢占当前的前台窗口
+        for window in reversed(alive):
+            placement = window.placement
+            if placement.showCmd == SW_SHOWNORMAL:
+                placement.showCmd = SW_SHOWNOACTIVATE
+            elif placement.showCmd == SW_SHOWMINIMIZED:
+                placement.showCmd = SW_SHOWMINNOACTIVE
+            user32.SetWindowPlacement(window.hwnd, self._ctypes.byref(placement))
+        # 按原来的上下顺序排列：最上层的窗口放到顶层，其余依次放在上一个窗口下方
+        hwnds = [window.hwnd for window in alive]
+        insert_after = {hwnd: above for above, hwnd in zip(hwnds, hwnds[1:])}
+        if hwnds and not self._defer(hwnds, SWP_NOMOVE | SWP_NOSIZE | SWP_NOACTIVATE, insert_after):
+            logging.warning("恢复窗口层叠顺序失败")
+        return len(alive)
+
+
+class WindowShield:
+    """
+    进入守护模式时一次性遮挡所有可见的受保护窗口，验证身份后按原来的位置和层叠顺序恢复
+
+    遮挡后以指数退避的短间隔观察窗口状态，全部确认不可见后立即返回，
+    最长等待 verify_timeout，耗时即"进入守护到内容不可见"的时间。
+    多次遮挡（恢复前再次进入守护模式）时保留窗口最初的状态，新遮挡的窗口排在已遮挡窗口之上。
+    """
+
+    def __init__(self, backend, clock=time.perf_counter, sleep=time.sleep,
+                 verify_timeout=0.5, initial_backoff=0.002, max_backoff=0.02):
+        """
+        :param backend: ShieldBackend 实例
+        :param clock: 计时函数
+        :param sleep: 休眠函数
+        :param verify_timeout: 等待遮挡生效的最长时间（秒）
+        :param initial_backoff: 首次观察间隔（秒），之后逐次翻倍
+        :param max_backoff: 最大观察间隔（秒）
+        """
+        self.backend = backend
+        self.clock = clock
+        self.sleep = sleep
+        self.verify_timeout = verify_timeout
+        self.initial_backoff = initial_backoff
+        self.max_backoff = max_backoff
+        # 已遮挡、等待恢复的窗口：hwnd -> SavedWindow
+        self._saved = {}
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._saved)
+
+    def conceal(self, hwnds, mode=SHIELD_MINIMIZE):
+        """
+        遮挡窗口并确认生效
+        :param hwnds: 窗口句柄列表
+        :param mode: SHIELD_MINIMIZE / SHIELD_HIDE
+        :return: ShieldResult
+        """
+        start = self.clock()
+        hwnds = list(hwnds)
+        if not hwnds:
+            return ShieldResult(0, 0, 0.0)
+        with self._lock:
+            # 之前已遮挡过的窗口（例如被入侵者恢复后又锁定的）再次遮挡，但保留最初保存的状态
+            saved = self.backend.save([hwnd for hwnd in hwnds if hwnd not in self._saved])
+            if saved:
+                # 新遮挡的窗口原本可见，排在之前已遮挡的窗口之上
+                self._saved = {hwnd: window._replace(z=window.z + len(saved)) for hwnd, window in self._saved.items()}
+                for window in saved:
+                    self._saved[window.hwnd] = window
+            try:
+                self.backend.conceal(hwnds, mode)
+            except Exception as e:
+                logging.error(f"遮挡窗口失败: {str(e)}")
+
+        pending = hwnds
+        deadline = self.clock() + self.verify_timeout
+        delay = self.initial_backoff
+        while True:
+            pending = [hwnd for hwnd in pending if not self.backend.is_concealed(hwnd, mode)]
+            if not pending:
+                break
+            remaining = deadline - self.clock()
+            if remaining <= 0:
+                break
+            self.sleep(min(delay, remaining))
+            delay = min(delay * 2, self.max_backoff)
+        return ShieldResult(len(hwnds), len(hwnds) - len(pending), self.clock() - start)
+
+    def restore(self):
+        """
+        恢复所有遮挡的窗口（已关闭的窗口跳过）
+        :return: 恢复的窗口数
+        """
+        with self._lock:
+            saved = sorted(self._saved.values(), key=lambda window: window.z)
+            self._saved = {}
+        if not saved:
+            return 0
+        try:
+            return self.backend.restore(saved)
+        except Exception as e:
+            logging.error(f"恢复窗口失败: {str(e)}")
+            return 0
@@ -0,0 +1,7 @@
+import os
+import sys
+
+# 与 benchmarks 一样，以 src.* 的形式导入项目模块
+root_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if root_dir not in sys.path:
+    sys.path.insert(0, root_dir)
@@ -0,0 +1,69 @@
+from src.app_rules import ProtectedAppRules
+
+
+def test_default_rules_match_process_name():
+    rules = ProtectedAppRules()
+    assert rules.match("WeChat.exe") == "微信"
+    assert rules.match("wechat.EXE") == "微信"
+    assert rules.match("WXWork.exe") == "企业微信"
+    assert rules.match("chrome.exe") is None
+    assert not rules.needs_path and not rules.needs_window_info
+
+
+def test_chat_titles_share_one_cache_entry():
+    rules = ProtectedAppRules()
+    for i in range(100):
+        assert rules.match("WeChat.exe", None, "ChatWnd", f"联系人{i}") == "微信"
+    # 没有按标题或类名匹配的规则，标题和类名都不在缓存键中
+    assert len(rules._cache) == 1
+
+
+def test_title_rules_keep_title_in_cache_key():
+    rules = ProtectedAppRules([
+        {"name": "微信", "exe": "WeChat.exe"},
+        {"name": "网页版", "exe": "chrome.exe", "title_regex": "微信"},
+    ])
+    assert rules.needs_title and rules.needs_window_info and not rules.needs_class
+    assert rules.match("chrome.exe", None, "Chrome_WidgetWin_1", "微信网页版") == "网页版"
+    assert rules.match("chrome.exe", None, "Chrome_WidgetWin_1", "新闻") is None
+    assert rules.match("chrome.exe", None, "Chrome_WidgetWin_1", "微信网页版") == "网页版"
+    assert len(rules._cache) == 2
+
+
+def test_class_and_path_rules():
+    rules = ProtectedAppRules([
+        {"name": "聊天窗口", "window_class": "ChatWnd"},
+        {"name": "便携版", "path_regex": r"\\portable\\"},
+    ])
+    assert rules.needs_class and not rules.needs_title and rules.needs_path
+    assert rules.match("x.exe", None, "ChatWnd", "张三") == "聊天窗口"
+    assert rules.match("x.exe", "D:\\Portable\\WeChat\\WeChat.exe", "Main", "") == "便携版"
+    assert rules.match("x.exe", "C:\\Program Files\\x.exe", "Main", "") is None
+
+
+def test_compound_rule_needs_every_condition():
+    rules = ProtectedAppRules([{"name": "小程序", "exe": "WeChatAppEx.exe", "class_regex": "^Chrome"}])
+    assert rules.match("WeChatAppEx.exe", None, "Chrome_WidgetWin_0", "") == "小程序"
+    assert rules.match("WeChatAppEx.exe", None, "Other", "") is None
+    assert rules.match("chrome.exe", None, "Chrome_WidgetWin_0", "") is None
+
+
+def test_cache_evicts_least_recently_used():
+    rules = ProtectedAppRules(cache_size=2)
+    rules.match("a.exe")
+    rules.match("b.exe")
+    rules.match("a.exe")
+    rules.match("c.exe")
+    assert list(rules._cache) == [("a.exe", None, None, None), ("c.exe", None, None, None)]
+
+
+def test_invalid_rules_are_skipped():
+    rules = ProtectedAppRules([
+        {"name": "坏正则", "title_regex": "("},
+        {"name": "坏阈值", "exe": "a.exe", "idle_time": "abc"},
+        {"name": "始终", "exe": "b.exe", "always": True},
+        {"name": "微信", "exe": "WeChat.exe", "idle_time": 120},
+    ])
+    assert not rules.needs_title
+    assert rules.match("a.exe") == "坏阈值"
+    assert rules.idle_times == {"始终": 0, "微信": 120.0}
@@ -0,0 +1,50 @@
+import time
+import threading
+
+from src.audit_store import AuditStore, IntrusionEvent
+
+
+def event(ts, process="WeChat.exe"):
+    return IntrusionEvent(ts, 120.0, process, "微信", "微信", True, 1, 0.03, None)
+
+
+def make(tmp_path):
+    return AuditStore(str(tmp_path / 'audit.db'), retention_days=0, flush_interval=0.01)
+
+
+def test_append_flush_query(tmp_path):
+    store = make(tmp_path)
+    store.start()
+    for ts in (1_700_000_000.0, 1_700_000_100.0, 1_700_000_200.0):
+        store.append(event(ts))
+    assert store.flush(5)
+    assert [e.timestamp for e in store.query(newest_first=False)] == [1_700_000_000.0, 1_700_000_100.0, 1_700_000_200.0]
+    assert store.count(start=1_700_000_100.0) == 2
+    store.close()
+
+
+def test_close_after_queued_flush_stops_writer(tmp_path):
+    """
+    flush() 的信号排在 close() 的停止信号之前（例如 flush(timeout) 超时后紧接着 close()），
+    写入线程在处理信号时取到停止信号，不能把它丢弃
+    """
+    store = make(tmp_path)
+    store._queue.put(threading.Event())
+    store.append(event(1_700_000_000.0))
+    store._queue.put(None)
+    store.start()
+    writer = store._writer
+    writer.join(5)
+    assert not writer.is_alive()
+    assert store.written == 1
+
+
+def test_close_returns_promptly_after_flush(tmp_path):
+    store = make(tmp_path)
+    store.start()
+    writer = store._writer
+    store._queue.put(threading.Event())
+    started = time.perf_counter()
+    store.close()
+    assert time.perf_counter() - started < 2
+    assert not writer.is_alive()
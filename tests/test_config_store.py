@@ -0,0 +1,169 @@
+import os
+import json
+
+import pytest
+
+from src.config_store import ConfigStore
+
+
+class FakeTimers:
+    """
+    虚拟时钟上的防抖定时器：advance() 推进时间并执行到期的定时器
+    """
+
+    def __init__(self):
+        self.t = 0.0
+        self.pending = []
+
+    def __call__(self, interval, function):
+        timer = FakeTimer(self.t + interval, function)
+        self.pending.append(timer)
+        return timer
+
+    def advance(self, seconds):
+        self.t += seconds
+        due = [timer for timer in self.pending if timer.when <= self.t]
+        self.pending = [timer for timer in self.pending if timer.when > self.t]
+        for timer in due:
+            if timer.started and not timer.cancelled:
+                timer.function()
+
+
+class FakeTimer:
+    def __init__(self, when, function):
+        self.when = when
+        self.function = function
+        self.started = self.cancelled = False
+
+    def start(self):
+        self.started = True
+
+    def cancel(self):
+        self.cancelled = True
+
+
+def read(path):
+    with open(path, encoding='utf-8') as f:
+        return json.load(f)
+
+
+def make(tmp_path, **config):
+    path = tmp_path / 'config.json'
+    if config:
+        path.write_text(json.dumps(config), encoding='utf-8')
+    timers = FakeTimers()
+    store = ConfigStore(str(path), debounce=0.5, timer=timers)
+    snapshots = []
+    store.subscribe(snapshots.append)
+    return store, timers, snapshots
+
+
+def test_debounced_updates_are_written_once(tmp_path):
+    store, timers, snapshots = make(tmp_path, idle_time=60)
+    store.update({"idle_time": 30})
+    timers.advance(0.3)
+    store.update({"idle_time": 45, "guard_paused": True})
+    # 快照立即更新，文件和订阅者要等防抖结束
+    assert store.snapshot.idle_time == 45
+    assert read(store.path)["idle_time"] == 60
+    assert snapshots == []
+
+    timers.advance(0.3)
+    assert snapshots == []
+    timers.advance(0.3)
+    assert read(store.path) == {"idle_time": 45, "password": "", "guard_paused": True}
+    assert [snapshot.idle_time for snapshot in snapshots] == [45]
+
+    # 没有新的修改时不再写入
+    timers.advance(10)
+    assert store.flush() and len(snapshots) == 1
+
+
+def test_immediate_update_cancels_pending_write(tmp_path):
+    store, timers, snapshots = make(tmp_path)
+    store.update({"idle_time": 30})
+    assert store.update({"idle_time": 90}, immediate=True)
+    assert read(store.path)["idle_time"] == 90
+    timers.advance(1)
+    assert [snapshot.idle_time for snapshot in snapshots] == [90]
+
+
+def test_failed_write_keeps_previous_file(tmp_path, monkeypatch):
+    store, timers, snapshots = make(tmp_path, idle_time=60)
+
+    def broken_dump(data, f, **kwargs):
+        f.write('{"idle_time": ')
+        raise OSError("磁盘已满")
+
+    monkeypatch.setattr(json, 'dump', broken_dump)
+    assert not store.update({"idle_time": 30}, immediate=True)
+    monkeypatch.undo()
+
+    # 原文件完整，临时文件已删除，修改仍待写入
+    assert read(store.path) == {"idle_time": 60}
+    assert os.listdir(tmp_path) == ['config.json']
+    assert snapshots == []
+    assert store.flush()
+    assert read(store.path)["idle_time"] == 30
+    assert os.listdir(tmp_path) == ['config.json']
+
+
+def test_external_edit_is_reloaded_once(tmp_path):
+    store, timers, snapshots = make(tmp_path, idle_time=60)
+    assert not store.reload_if_changed()
+
+    version = store.snapshot.version
+    path = tmp_path / 'config.json'
+    path.write_text(json.dumps({"idle_time": 300, "password": ""}), encoding='utf-8')
+    stat = os.stat(path)
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+    assert store.reload_if_changed()
+    assert store.snapshot.idle_time == 300 and store.snapshot.version == version + 1
+    assert [snapshot.idle_time for snapshot in snapshots] == [300]
+    # 修改时间没有再变化，不重复加载
+    assert not store.reload_if_changed()
+    assert len(snapshots) == 1
+
+
+def test_own_write_is_not_reloaded(tmp_path):
+    store, timers, snapshots = make(tmp_path, idle_time=60)
+    store.update({"idle_time": 30}, immediate=True)
+    assert not store.reload_if_changed()
+    assert len(snapshots) == 1
+
+
+def test_unsaved_changes_are_not_overwritten_by_reload(tmp_path):
+    store, timers, snapshots = make(tmp_path, idle_time=60)
+    store.update({"idle_time": 30})
+    path = tmp_path / 'config.json'
+    path.write_text(json.dumps({"idle_time": 300}), encoding='utf-8')
+    stat = os.stat(path)
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+    assert not store.reload_if_changed()
+    timers.advance(1)
+    assert read(store.path)["idle_time"] == 30
+
+
+def test_failing_listener_does_not_block_others(tmp_path):
+    store, timers, snapshots = make(tmp_path)
+
+    def broken(snapshot):
+        raise RuntimeError("回调失败")
+
+    store.subscribe(broken)
+    later = []
+    store.subscribe(later.append)
+    store.update({"idle_time": 30}, immediate=True)
+    assert len(snapshots) == len(later) == 1
+
+    store.unsubscribe(later.append)
+    store.update({"idle_time": 40}, immediate=True)
+    assert len(snapshots) == 2 and len(later) == 1
+
+
+@pytest.mark.parametrize('content', ['{"idle_time": ', 'null'])
+def test_corrupt_file_falls_back_to_defaults(tmp_path, content):
+    path = tmp_path / 'config.json'
+    path.write_text(content, encoding='utf-8')
+    store = ConfigStore(str(path), debounce=0)
+    assert dict(store.config) == {"idle_time": 10, "password": ""}
@@ -0,0 +1,146 @@
+import gzip
+import json
+
+from src.fleet import FleetReporter
+
+
+class FakeClock:
+    def __init__(self):
+        self.t = 1_700_000_000.0
+
+    def __call__(self):
+        return self.t
+
+
+class FakeCollector:
+    """
+    模拟汇总服务：down 为 True 时连接失败，记录收到的批次
+    """
+
+    def __init__(self):
+        self.down = False
+        self.batches = []
+
+    def __call__(self, url, body, headers, timeout):
+        if self.down:
+            raise OSError("连接被拒绝")
+        self.batches.append(json.loads(gzip.decompress(body).decode('utf-8')))
+        return 200
+
+    def states(self):
+        return [event['state'] for batch in self.batches for event in batch['events']]
+
+
+def make(tmp_path, collector, clock, **options):
+    return FleetReporter('http://127.0.0.1:9465/report', host='pc-01', spool_dir=str(tmp_path / 'spool'),
+                         post=collector, clock=clock, **options)
+
+
+def report(reporter, clock, *states):
+    for state in states:
+        clock.t += 1
+        reporter.report_state(state)
+
+
+def test_outage_is_spooled_and_replayed_in_order(tmp_path):
+    collector, clock = FakeCollector(), FakeClock()
+    reporter = make(tmp_path, collector, clock)
+    collector.down = True
+    report(reporter, clock, 'guarding', 'idle')
+    assert not reporter.flush()
+    report(reporter, clock, 'guarding', 'paused')
+    assert not reporter.flush()
+    assert reporter.pending_spool() == 2
+
+    collector.down = False
+    report(reporter, clock, 'idle')
+    assert reporter.flush()
+    # 暂存的批次先补发，恢复后的新批次排在最后
+    assert collector.states() == ['guarding', 'idle', 'guarding', 'paused', 'idle']
+    assert [batch['seq'] for batch in collector.batches] == [1, 2, 3]
+    assert reporter.pending_spool() == 0
+
+
+def test_replay_stops_at_first_failure(tmp_path):
+    collector, clock = FakeCollector(), FakeClock()
+    reporter = make(tmp_path, collector, clock)
+    collector.down = True
+    for state in ('guarding', 'idle', 'paused'):
+        report(reporter, clock, state)
+        reporter.flush()
+    sends = []
+
+    def flaky(url, body, headers, timeout):
+        # 补发第二个批次时汇总服务再次不可用
+        sends.append(body)
+        if len(sends) == 2:
+            raise OSError("连接被重置")
+        collector.down = False
+        return collector(url, body, headers, timeout)
+
+    reporter.post = flaky
+    report(reporter, clock, 'idle')
+    assert not reporter.flush()
+    assert collector.states() == ['guarding']
+    assert reporter.pending_spool() == 3
+
+    reporter.post = collector
+    assert reporter.flush()
+    assert collector.states() == ['guarding', 'idle', 'paused', 'idle']
+
+
+def test_spool_survives_restart(tmp_path):
+    collector, clock = FakeCollector(), FakeClock()
+    collector.down = True
+    reporter = make(tmp_path, collector, clock)
+    report(reporter, clock, 'guarding')
+    reporter.stop()
+    assert reporter.pending_spool() == 1
+
+    # 重启后新的进程实例先补发上次暂存的批次
+    collector.down = False
+    restarted = make(tmp_path, collector, clock)
+    report(restarted, clock, 'paused')
+    assert restarted.flush()
+    assert collector.states() == ['guarding', 'paused']
+    assert [batch['agent'] for batch in collector.batches] == [reporter.agent_id, restarted.agent_id]
+
+
+def test_spool_limit_drops_oldest(tmp_path):
+    collector, clock = FakeCollector(), FakeClock()
+    reporter = make(tmp_path, collector, clock)
+    collector.down = True
+    report(reporter, clock, 'guarding')
+    reporter.flush()
+    # 压缩后的批次大小相差几个字节，上限取两个半批次，只能保留两个
+    reporter.max_spool_bytes = int(sum(size for _, size in reporter._spooled_files()) * 2.5)
+    for state in ('idle', 'paused', 'guarding'):
+        report(reporter, clock, state)
+        reporter.flush()
+    assert reporter.pending_spool() == 2 and reporter.discarded == 2
+
+    collector.down = False
+    assert reporter.flush()
+    assert collector.states() == ['paused', 'guarding']
+
+
+def test_heartbeat_is_not_spooled(tmp_path):
+    collector, clock = FakeCollector(), FakeClock()
+    reporter = make(tmp_path, collector, clock)
+    collector.down = True
+    assert not reporter.flush()
+    assert reporter.pending_spool() == 0
+
+
+def test_stop_spools_without_network(tmp_path):
+    collector, clock = FakeCollector(), FakeClock()
+    reporter = make(tmp_path, collector, clock)
+    report(reporter, clock, 'guarding')
+    reporter.start()
+
+    def hanging(url, body, headers, timeout):
+        raise AssertionError("退出时不应访问网络")
+
+    reporter.post = hanging
+    reporter.stop()
+    assert reporter.pending_spool() == 1 and collector.batches == []
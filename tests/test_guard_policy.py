@@ -0,0 +1,93 @@
+import time
+
+from src.guard_policy import GuardSchedule, DAY
+
+# 1970-01-05 是周一；按 UTC 计算本地时间，结果与运行环境的时区无关
+MONDAY = 4 * DAY
+HOUR = 3600
+
+
+def at(day, hour, minute=0):
+    """
+    :param day: 0 为周一
+    :return: 该时刻的时间戳
+    """
+    return MONDAY + day * DAY + hour * HOUR + minute * 60
+
+
+def schedule(*periods, idle_time=600):
+    return GuardSchedule(list(periods), idle_time, localtime=time.gmtime)
+
+
+def test_overnight_window_spans_midnight():
+    s = schedule({"name": "夜间", "start": "22:00", "end": "06:00", "idle_time": 60})
+    assert s.current(at(2, 21, 59)).idle_time == 600
+    assert s.current(at(2, 22)).name == "夜间"
+    assert s.current(at(2, 23, 30)).idle_time == 60
+    assert s.current(at(3, 5, 59)).name == "夜间"
+    assert s.current(at(3, 6)).name == "默认"
+
+
+def test_sunday_night_wraps_into_monday():
+    s = schedule({"name": "周日夜间", "days": "sun", "start": "22:00", "end": "06:00", "idle_time": 60})
+    assert s.current(at(6, 23)).name == "周日夜间"
+    # 下一周的周一凌晨属于周日开始的时段
+    assert s.current(at(7, 3)).name == "周日夜间"
+    assert s.current(at(7, 6)).name == "默认"
+    # 周六夜间和周一夜间不在时段内
+    assert s.current(at(5, 23)).name == "默认"
+    assert s.current(at(7, 23)).name == "默认"
+
+
+def test_day_range_wraps_across_week():
+    s = schedule({"name": "周末", "days": "fri-mon", "idle_time": 60})
+    assert [s.current(at(day, 12)).name for day in range(7)] == ["周末", "默认", "默认", "默认", "周末", "周末", "周末"]
+
+
+def test_cache_is_invalidated_at_boundary():
+    s = schedule({"name": "白天", "days": "mon-fri", "start": "09:00", "end": "18:00", "idle_time": 60})
+    now = at(1, 17, 59)
+    assert s.current(now).name == "白天"
+    lookups = s.lookups
+    # 区间内的调用直接使用缓存
+    assert s.current(now + 30).name == "白天"
+    assert s.seconds_until_change(now) == 60
+    assert s.lookups == lookups
+
+    # 到达边界时重新查找一次，并缓存到下一个边界
+    assert s.current(at(1, 18)).name == "默认"
+    assert s.lookups == lookups + 1
+    assert s.seconds_until_change(at(1, 18)) == 15 * HOUR
+    assert s.current(at(2, 8, 59)).name == "默认"
+    assert s.lookups == lookups + 1
+    assert s.current(at(2, 9)).name == "白天"
+
+
+def test_cache_crosses_week_boundary():
+    s = schedule({"name": "周末", "days": "sat,sun", "idle_time": 60})
+    assert s.current(at(6, 23)).name == "周末"
+    # 周日 24 点是一周的结尾，重新查找后进入下一周的工作日
+    assert s.seconds_until_change(at(6, 23)) == HOUR
+    assert s.current(at(7, 0)).name == "默认"
+    assert s.current(at(11, 23)).name == "默认"
+    assert s.current(at(12, 0)).name == "周末"
+
+
+def test_later_period_wins_and_invalid_period_is_skipped():
+    s = schedule(
+        {"name": "工作日", "days": "mon-fri", "idle_time": 300},
+        {"name": "午休", "start": "12:00", "end": "13:00", "idle_time": 60},
+        {"name": "无效", "start": "25:00", "idle_time": 10},
+    )
+    assert s.current(at(0, 11)).name == "工作日"
+    assert s.current(at(0, 12, 30)).name == "午休"
+    assert s.current(at(5, 12, 30)).name == "午休"
+    assert s.current(at(5, 11)).name == "默认"
+    assert "无效" not in {policy.name for _, _, policy in s.intervals}
+
+
+def test_single_policy_never_expires():
+    s = schedule()
+    assert s.current(at(0, 0)).name == "默认"
+    assert s.seconds_until_change(at(3, 12)) is None
+    assert s.lookups == 1
@@ -0,0 +1,61 @@
+from src.lock_action import LockAction, FakeLockBackend
+from src.simulation import SimClock
+
+HWND = 0x1234
+
+
+def make(**backend_options):
+    clock = SimClock()
+    backend = FakeLockBackend(clock=clock.now, **backend_options)
+    return LockAction(backend, clock=clock.now, sleep=clock.sleep), backend
+
+
+def test_confirmed_once_effective():
+    action, backend = make(effect_delay=0.03)
+    result = action.lock(HWND)
+    assert result.ok and result.attempts == 1
+    # 以退避间隔观察，确认时刻不晚于生效后一个最大观察间隔
+    assert 0.03 <= result.latency <= 0.03 + action.max_backoff
+    assert backend.injections == 1
+
+
+def test_ineffective_injection_is_retried():
+    action, backend = make(fail_first=1)
+    result = action.lock(HWND)
+    assert result.ok and result.attempts == 2
+    assert backend.injections == 2
+    # 第一次注入等满 verify_timeout 仍未生效才重新注入
+    assert result.latency >= action.verify_timeout
+
+
+def test_refused_injection_is_retried_without_waiting():
+    action, backend = make(refuse_first=2)
+    result = action.lock(HWND)
+    assert result.ok and result.attempts == 3
+    assert backend.refusals == 2 and backend.injections == 1
+    # 快捷键没有送达时只等待 max_backoff，不等待 verify_timeout
+    assert result.latency < action.verify_timeout
+
+
+def test_gives_up_after_max_attempts():
+    action, backend = make(fail_first=10)
+    result = action.lock(HWND)
+    assert not result.ok and result.attempts == action.max_attempts
+    assert backend.injections == action.max_attempts
+    assert not backend.is_locked(HWND)
+
+
+def test_refusals_are_never_confirmed():
+    action, backend = make(refuse_first=10)
+    result = action.lock(HWND)
+    assert not result.ok and result.attempts == action.max_attempts
+    assert backend.injections == 0
+
+
+def test_refused_injection_confirms_existing_lock():
+    action, backend = make()
+    assert action.lock(HWND).ok
+    # 已锁定的窗口无法切到前台时，确认到已锁定即返回，不再重试
+    backend.refuse_first = backend.refusals + 1
+    result = action.lock(HWND)
+    assert result.ok and result.attempts == 1
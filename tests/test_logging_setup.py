@@ -0,0 +1,48 @@
+import logging
+
+from src.logging_setup import RateLimitFilter
+
+
+class FakeClock:
+    def __init__(self):
+        self.t = 0.0
+
+    def __call__(self):
+        return self.t
+
+
+def record(msg, lineno=10, level=logging.ERROR, pathname='guardian.py'):
+    return logging.LogRecord('root', level, pathname, lineno, msg, None, None)
+
+
+def test_same_call_site_is_limited_even_when_message_changes():
+    clock = FakeClock()
+    limiter = RateLimitFilter(interval=60, burst=3, clock=clock)
+    # 同一行的 f-string 每次内容都不同
+    passed = [limiter.filter(record(f"获取空闲时间失败: 错误 {i}")) for i in range(10)]
+    assert passed == [True] * 3 + [False] * 7
+    # 其他位置的日志不受影响
+    assert limiter.filter(record("另一处错误", lineno=20))
+
+    clock.t = 60
+    late = record("获取空闲时间失败: 错误 10")
+    assert limiter.filter(late)
+    assert late.getMessage().endswith("（已省略 7 条重复日志）")
+
+
+def test_lower_levels_are_not_limited():
+    limiter = RateLimitFilter(burst=1, clock=FakeClock())
+    assert all(limiter.filter(record("循环", level=logging.INFO)) for _ in range(10))
+    assert limiter._windows == {}
+
+
+def test_tracked_call_sites_are_bounded():
+    clock = FakeClock()
+    limiter = RateLimitFilter(interval=60, burst=1, clock=clock, max_keys=100)
+    for lineno in range(1000):
+        clock.t += 0.01
+        assert limiter.filter(record("错误", lineno=lineno))
+    assert len(limiter._windows) == 100
+    # 保留的是最近的调用位置
+    assert not limiter.filter(record("错误", lineno=999))
+    assert limiter.filter(record("错误", lineno=0))
@@ -0,0 +1,66 @@
+import base64
+
+from src.config_store import ConfigStore
+from src.password import PasswordVerifier, hash_password, LEGACY_ITERATIONS, MIN_ITERATIONS
+
+
+class FixedVerifier(PasswordVerifier):
+    """
+    校准结果固定的验证器，结果与本机速度无关
+    """
+
+    def __init__(self, store, target):
+        super().__init__(store)
+        self.target = target
+
+    def target_iterations(self):
+        return self.target
+
+
+def make(tmp_path, password, iterations=None):
+    store = ConfigStore(str(tmp_path / 'config.json'), debounce=0)
+    salt = b'0123456789abcdef'
+    record = {
+        'password': base64.b64encode(hash_password(password, salt, iterations or LEGACY_ITERATIONS)).decode('utf-8'),
+        'salt': base64.b64encode(salt).decode('utf-8'),
+    }
+    if iterations:
+        record['iterations'] = iterations
+    store.update(record, immediate=True)
+    return store
+
+
+def test_legacy_record_without_iterations_is_upgraded(tmp_path):
+    store = make(tmp_path, "secret")
+    verifier = FixedVerifier(store, MIN_ITERATIONS)
+    assert not verifier.verify("wrong")
+    assert 'iterations' not in store.config
+    assert verifier.verify("secret")
+    assert store.config['iterations'] == MIN_ITERATIONS
+    assert verifier.verify("secret") and not verifier.verify("wrong")
+
+
+def test_record_well_below_target_is_upgraded(tmp_path):
+    store = make(tmp_path, "secret", iterations=MIN_ITERATIONS)
+    verifier = FixedVerifier(store, MIN_ITERATIONS * 2 + 1000)
+    salt = store.config['salt']
+    assert verifier.verify("secret")
+    assert store.config['iterations'] == MIN_ITERATIONS * 2 + 1000
+    assert store.config['salt'] != salt
+    assert verifier.verify("secret")
+
+
+def test_calibration_noise_does_not_rewrite_config(tmp_path):
+    store = make(tmp_path, "secret", iterations=MIN_ITERATIONS)
+    record = dict(store.config)
+    # 每个进程校准出的目标值不同，但都不到已保存次数的两倍
+    for target in (MIN_ITERATIONS + 37000, MIN_ITERATIONS * 2 - 1000, MIN_ITERATIONS // 2):
+        assert FixedVerifier(store, target).verify("secret")
+        assert dict(store.config) == record
+
+
+def test_wrong_password_never_rewrites(tmp_path):
+    store = make(tmp_path, "secret")
+    record = dict(store.config)
+    assert not FixedVerifier(store, MIN_ITERATIONS * 4).verify("guess")
+    assert dict(store.config) == record
@@ -0,0 +1,68 @@
+from src.scheduler import IdleScheduler
+from src.simulation import SimClock
+
+
+class LateWakeClock(SimClock):
+    """
+    等待超时返回之后、调度器处理结果之前，另一个线程调用了 wake()
+    """
+
+    def __init__(self):
+        super().__init__()
+        self.late_wake = None
+
+    def wait(self, event, timeout):
+        woken = super().wait(event, timeout)
+        if self.late_wake:
+            late_wake, self.late_wake = self.late_wake, None
+            late_wake()
+        return woken
+
+
+def test_wake_during_sleep_returns_early():
+    clock = SimClock()
+    scheduler = IdleScheduler(clock=clock)
+    clock.call_at(5, scheduler.wake)
+    assert scheduler.sleep(100)
+    assert clock.now() == 5
+    # 唤醒只生效一次
+    assert scheduler.sleep(100)
+    assert clock.now() == 105
+    assert scheduler.wakeups == 2
+
+
+def test_wake_between_sleeps_is_not_lost():
+    clock = SimClock()
+    scheduler = IdleScheduler(clock=clock)
+    scheduler.sleep(10)
+    # 执行检测期间到来的唤醒
+    scheduler.wake()
+    scheduler.sleep(100)
+    assert clock.now() == 10
+
+
+def test_wake_as_sleep_returns_is_handled_by_next_cycle():
+    clock = LateWakeClock()
+    scheduler = IdleScheduler(clock=clock)
+    config = {'idle_time': 60}
+
+    def change():
+        config['idle_time'] = 30
+        scheduler.wake()
+
+    clock.late_wake = change
+    scheduler.sleep(10)
+    # 唤醒前的修改在接下来的检测中可见，唤醒不会再引起一次多余的循环
+    assert config['idle_time'] == 30
+    scheduler.sleep(100)
+    assert clock.now() == 110
+
+
+def test_stop_during_sleep():
+    clock = SimClock()
+    scheduler = IdleScheduler(clock=clock)
+    clock.call_at(3, scheduler.stop)
+    assert not scheduler.sleep(None)
+    assert clock.now() == 3 and scheduler.stopped
+    assert not scheduler.sleep(100)
+    assert clock.now() == 3
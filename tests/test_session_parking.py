@@ -0,0 +1,140 @@
+from src.config_store import ConfigStore
+from src.metrics import MetricsRegistry
+from src.scheduler import IdleScheduler
+from src.session_watch import SESSION_LOCKED, DISPLAY_OFF, SYSTEM_SUSPENDED
+from src.simulation import SimPlatform
+from src.wechat_guardian import START_GUARDIAN, INTRUSION, WeChatGuardian
+
+IDLE_THRESHOLD = 60
+
+
+class RecordingScheduler(IdleScheduler):
+    """
+    记录每次唤醒的时刻
+    """
+
+    def __init__(self, clock):
+        super().__init__(clock=clock)
+        self.times = []
+
+    def sleep(self, timeout):
+        running = super().sleep(timeout)
+        self.times.append(self.clock.now())
+        return running
+
+
+class Scenario:
+    def __init__(self, tmp_path, event_driven=True):
+        self.platform = platform = SimPlatform(event_driven=event_driven)
+        self.clock = platform.clock
+        chrome = platform.add_process("chrome.exe")
+        wechat = platform.add_process("WeChat.exe")
+        self.browser = (platform.add_window(chrome, "Chrome_WidgetWin_1", "工作"), chrome)
+        self.chat = (platform.add_window(wechat, "WeChatMainWndForPC", "微信"), wechat)
+        platform.foreground.switch_at(0.0, *self.browser)
+
+        store = ConfigStore(str(tmp_path / 'config.json'), debounce=0)
+        store.update({"idle_time": IDLE_THRESHOLD}, immediate=True)
+        self.guardian = guardian = WeChatGuardian(config_store=store, platform=platform, metrics=MetricsRegistry())
+        self.scheduler = scheduler = RecordingScheduler(self.clock)
+        guardian.on_wechat_activated = lambda info: scheduler.wake()
+        guardian.on_session_changed = lambda active: scheduler.wake()
+        if guardian.start_foreground_events():
+            scheduler.guard_check_interval = None
+        assert guardian.start_session_events()
+        self.entries = []
+        self.locks = []
+
+    def open_wechat(self, t, hold=5):
+        self.platform.foreground.switch_at(t, *self.chat)
+        self.platform.foreground.switch_at(t + hold, *self.browser)
+
+    def run(self, until):
+        def on_cycle(result):
+            if result.event == START_GUARDIAN:
+                self.entries.append(self.clock.now())
+            elif result.event == INTRUSION:
+                self.locks.append(result.detected_at)
+
+        self.clock.call_at(until, self.scheduler.stop)
+        self.guardian.run_loop(self.scheduler, on_cycle)
+        return self
+
+
+def test_no_wakeups_while_session_is_locked(tmp_path):
+    for event_driven in (True, False):
+        scenario = Scenario(tmp_path, event_driven)
+        session = scenario.platform.session
+        scenario.platform.idle.add_activity(0, 100)
+        session.change_at(30, SESSION_LOCKED, True)
+        session.change_at(600, DISPLAY_OFF, True)
+        session.change_at(3595, DISPLAY_OFF, False)
+        session.change_at(3600, SESSION_LOCKED, False)
+        scenario.run(3600 + 30)
+        parked = [t for t in scenario.scheduler.times if 30 < t < 3600]
+        assert parked == []
+        assert scenario.guardian.session_active()
+
+
+def test_authenticated_unlock_restarts_idle_time(tmp_path):
+    scenario = Scenario(tmp_path)
+    session = scenario.platform.session
+    # 锁定期间没有输入，平台的空闲计时一直在增长；解锁本身也不产生输入
+    scenario.platform.idle.add_activity(0, 100)
+    session.change_at(100, SESSION_LOCKED, True)
+    session.change_at(3600, SESSION_LOCKED, False)
+    scenario.open_wechat(3600 + 30, hold=30)
+    scenario.run(3600 + IDLE_THRESHOLD + 30)
+    # 主人解锁后打开微信不被锁定，空闲时间从解锁时刻重新计算
+    assert scenario.locks == []
+    assert scenario.entries and scenario.entries[0] >= 3600 + IDLE_THRESHOLD
+
+
+def test_unlock_exits_automatic_guard(tmp_path):
+    scenario = Scenario(tmp_path)
+    session = scenario.platform.session
+    scenario.platform.idle.add_activity(0, 100)
+    session.change_at(1000, SESSION_LOCKED, True)
+    session.change_at(2000, SESSION_LOCKED, False)
+    scenario.run(2000 + 10)
+    assert scenario.entries and scenario.entries[0] < 1000
+    assert not scenario.guardian.is_guarding
+
+
+def test_display_off_before_threshold_still_counts_as_idle(tmp_path):
+    """
+    回归：没有锁定就离开，空闲 30 秒显示器就关闭；不活动期间必须计入空闲时间，
+    入侵者按键唤醒显示器后立即处于守护模式，打开微信被锁定
+    """
+    for suspend in (False, True):
+        scenario = Scenario(tmp_path)
+        session, idle = scenario.platform.session, scenario.platform.idle
+        idle.add_activity(0, 100)
+        away = idle.inputs[-1]
+        dark, back = away + 30, away + 1200
+        session.change_at(dark, DISPLAY_OFF, True)
+        if suspend:
+            session.change_at(away + 600, SYSTEM_SUSPENDED, True)
+            session.change_at(back, SYSTEM_SUSPENDED, False)
+        # 唤醒显示器的按键就是一次输入
+        idle.add_inputs([back])
+        session.change_at(back, DISPLAY_OFF, False)
+        scenario.open_wechat(back + 5)
+        scenario.run(back + 30)
+        assert scenario.entries and back <= scenario.entries[0] < back + 1
+        assert len(scenario.locks) == 1 and back + 5 <= scenario.locks[0] < back + 6
+
+
+def test_short_display_off_does_not_enter_guard(tmp_path):
+    scenario = Scenario(tmp_path)
+    session, idle = scenario.platform.session, scenario.platform.idle
+    idle.add_activity(0, 100)
+    away = idle.inputs[-1]
+    # 空闲 10 秒后显示器关闭，20 秒后主人回来：合计不到阈值
+    session.change_at(away + 10, DISPLAY_OFF, True)
+    idle.add_inputs([away + 30])
+    session.change_at(away + 30, DISPLAY_OFF, False)
+    idle.add_activity(away + 31, away + 300, 5.0)
+    scenario.open_wechat(away + 40)
+    scenario.run(away + 300)
+    assert scenario.entries == [] and scenario.locks == []
@@ -0,0 +1,37 @@
+import struct
+
+import pytest
+
+from src.tray_icons import ico_image_data
+
+
+def ico(*images):
+    """
+    :param images: (宽度, 图像数据)
+    :return: ICO 文件字节
+    """
+    header = struct.pack('<HHH', 0, 1, len(images))
+    offset = 6 + 16 * len(images)
+    entries, data = b'', b''
+    for width, payload in images:
+        entries += struct.pack('<BBBBHHII', width % 256, width % 256, 0, 0, 1, 32, len(payload), offset + len(data))
+        data += payload
+    return header + entries + data
+
+
+def test_picks_matching_size_or_first_image():
+    data = ico((32, b'large'), (16, b'small'), (256, b'huge'))
+    assert ico_image_data(data, 16) == b'small'
+    assert ico_image_data(data, 256) == b'huge'
+    assert ico_image_data(data, 48) == b'large'
+
+
+@pytest.mark.parametrize('data', [
+    ico(),
+    b'',
+    ico((16, b'small'))[:10],
+    ico((16, b'small'))[:-2],
+])
+def test_invalid_ico_raises_value_error(data):
+    with pytest.raises(ValueError):
+        ico_image_data(data)
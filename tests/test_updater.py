@@ -0,0 +1,111 @@
+import json
+
+from src.updater import Updater, RETRY_INTERVAL
+
+DAY = 24 * 3600.0
+ETAG = '"v1.2.0"'
+LAST_MODIFIED = 'Mon, 01 Jan 2024 00:00:00 GMT'
+
+
+class FakeClock:
+    def __init__(self):
+        self.t = 1_700_000_000.0
+
+    def __call__(self):
+        return self.t
+
+
+class FakeReleases:
+    """
+    模拟发布接口：带 If-None-Match 且 ETag 未变化时返回 304，记录每次请求的请求头
+    """
+
+    def __init__(self, tag='v1.2.0', etag=ETAG):
+        self.tag = tag
+        self.etag = etag
+        self.requests = []
+        self.down = False
+
+    def __call__(self, url, headers, timeout):
+        self.requests.append(dict(headers))
+        if self.down:
+            raise OSError("连接被拒绝")
+        if headers.get('If-None-Match') == self.etag:
+            return 304, {'ETag': self.etag}, b''
+        body = json.dumps({'tag_name': self.tag, 'body': f'{self.tag} 更新说明', 'html_url': 'https://example.com'})
+        return 200, {'ETag': self.etag, 'Last-Modified': LAST_MODIFIED}, body.encode('utf-8')
+
+
+def make(tmp_path, releases, clock, version='1.0.0'):
+    return Updater(current_version=version, cache_path=str(tmp_path / 'update_cache.json'),
+                   check_interval=DAY, fetch=releases, clock=clock)
+
+
+def test_result_is_cached_for_check_interval(tmp_path):
+    releases, clock = FakeReleases(), FakeClock()
+    info = make(tmp_path, releases, clock).check_update()
+    assert info.has_update and info.latest_version == '1.2.0'
+    # 检查间隔内重启也不再访问网络
+    clock.t += DAY - 1
+    assert make(tmp_path, releases, clock).check_update() == info
+    assert len(releases.requests) == 1
+
+
+def test_conditional_request_after_interval(tmp_path):
+    releases, clock = FakeReleases(), FakeClock()
+    updater = make(tmp_path, releases, clock)
+    first = updater.check_update()
+    assert 'If-None-Match' not in releases.requests[0]
+
+    clock.t += DAY
+    assert updater.check_update() == first
+    headers = releases.requests[1]
+    assert headers['If-None-Match'] == ETAG and headers['If-Modified-Since'] == LAST_MODIFIED
+    # 304 之后重新计时
+    clock.t += DAY - 1
+    updater.check_update()
+    assert len(releases.requests) == 2
+
+
+def test_new_release_replaces_cached_result(tmp_path):
+    releases, clock = FakeReleases(), FakeClock()
+    updater = make(tmp_path, releases, clock)
+    updater.check_update()
+    releases.tag, releases.etag = 'v1.3.0', '"v1.3.0"'
+    clock.t += DAY
+    info = updater.check_update()
+    assert info.latest_version == '1.3.0' and info.notes == 'v1.3.0 更新说明'
+
+
+def test_failure_keeps_result_and_retries_later(tmp_path):
+    releases, clock = FakeReleases(), FakeClock()
+    updater = make(tmp_path, releases, clock)
+    first = updater.check_update()
+    releases.down = True
+    clock.t += DAY
+    assert updater.check_update() == first
+    clock.t += RETRY_INTERVAL - 1
+    updater.check_update()
+    assert len(releases.requests) == 2
+    clock.t += 1
+    releases.down = False
+    assert updater.check_update() == first
+    assert len(releases.requests) == 3
+
+
+def test_force_ignores_interval(tmp_path):
+    releases, clock = FakeReleases(), FakeClock()
+    updater = make(tmp_path, releases, clock)
+    updater.check_update()
+    updater.check_update(force=True)
+    assert len(releases.requests) == 2
+    assert releases.requests[1]['If-None-Match'] == ETAG
+
+
+def test_upgrade_invalidates_cache(tmp_path):
+    releases, clock = FakeReleases(), FakeClock()
+    make(tmp_path, releases, clock).check_update()
+    # 程序升级到最新版本后，旧版本的缓存结果作废，重新发送完整请求
+    info = make(tmp_path, releases, clock, version='1.2.0').check_update()
+    assert not info.has_update
+    assert len(releases.requests) == 2 and 'If-None-Match' not in releases.requests[1]
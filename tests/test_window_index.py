@@ -0,0 +1,111 @@
+from src.simulation import SimPlatform, SimWindowSource
+from src.window_index import WindowIndex
+
+
+class RacingWindowSource(SimWindowSource):
+    """
+    枚举结果返回之前窗口已发生变化：during_enumerate 中的变化产生的事件在枚举期间到达，枚举结果已过时
+    """
+
+    def __init__(self, platform):
+        super().__init__(platform)
+        self.during_enumerate = None
+
+    def enumerate(self):
+        windows = super().enumerate()
+        if self.during_enumerate:
+            changes, self.during_enumerate = self.during_enumerate, None
+            changes()
+        return windows
+
+
+def build():
+    platform = SimPlatform()
+    source = RacingWindowSource(platform)
+    platform.window_events = source
+    wechat = platform.add_process("WeChat.exe")
+    chrome = platform.add_process("chrome.exe")
+    windows = {
+        'main': platform.add_window(wechat, "WeChatMainWndForPC", "微信"),
+        'chat': platform.add_window(wechat, "ChatWnd", "联系人"),
+        'tray': platform.add_window(wechat, "TrayIconMessageWindow", "", visible=False),
+        'browser': platform.add_window(chrome, "Chrome_WidgetWin_1", "新闻"),
+    }
+    matched = []
+
+    def matcher(window):
+        matched.append(window.hwnd)
+        return "微信" if window.name == "WeChat.exe" else None
+
+    index = WindowIndex(source, name_resolver=lambda pid: platform.processes[pid].name, matcher=matcher)
+    return platform, source, index, windows, wechat, matched
+
+
+def visible_protected(index):
+    return {window.hwnd for window in index.visible_protected()}
+
+
+def test_start_indexes_every_window():
+    platform, source, index, windows, wechat, _ = build()
+    assert index.start()
+    assert len(index) == 4 and source.enumerations == 1
+    assert visible_protected(index) == {windows['main'], windows['chat']}
+    assert index.protected_rule(windows['tray']) == "微信"
+    assert index.protected_rule(windows['browser']) is None
+
+
+def test_events_during_rebuild_are_applied_after_it():
+    platform, source, index, windows, wechat, _ = build()
+
+    def changes():
+        platform.destroy_window(windows['chat'])
+        windows['moments'] = platform.add_window(wechat, "SnsWnd", "朋友圈")
+        platform.show_window(windows['main'], False)
+        platform.set_window_title(windows['browser'], "微信网页版")
+        platform.show_window(windows['tray'], True)
+
+    source.during_enumerate = changes
+    assert index.start()
+    # 过时的枚举结果不会覆盖枚举期间到达的事件
+    assert index.get(windows['chat']) is None
+    assert index.get(windows['moments']) is not None
+    assert not index.get(windows['main']).visible
+    assert index.get(windows['browser']).title == "微信网页版"
+    assert visible_protected(index) == {windows['moments'], windows['tray']}
+    assert len(index) == 4 and source.enumerations == 1
+
+
+def test_rebuild_while_running_keeps_later_events():
+    platform, source, index, windows, wechat, _ = build()
+    index.start()
+    source.during_enumerate = lambda: platform.destroy_window(windows['main'])
+    index.rebuild()
+    assert index.get(windows['main']) is None
+    assert visible_protected(index) == {windows['chat']}
+    assert index.rebuilds == 2
+
+
+def test_incremental_updates_without_enumeration():
+    platform, source, index, windows, wechat, matched = build()
+    index.start()
+    matched.clear()
+    popup = platform.add_window(wechat, "ChatWnd", "新消息")
+    assert popup in visible_protected(index)
+    platform.show_window(windows['main'], False)
+    assert windows['main'] not in visible_protected(index)
+    platform.show_window(windows['main'], True)
+    platform.destroy_window(popup)
+    assert visible_protected(index) == {windows['main'], windows['chat']}
+    assert source.enumerations == 1
+    # 显示、隐藏不改变进程、类名和标题，沿用上次的匹配结果
+    assert matched == [popup]
+    platform.set_window_title(windows['chat'], "另一个联系人")
+    assert matched == [popup, windows['chat']]
+
+
+def test_refresh_rematches_after_rule_change():
+    platform, source, index, windows, wechat, _ = build()
+    index.start()
+    index.matcher = lambda window: "浏览器" if window.name == "chrome.exe" else None
+    index.refresh()
+    assert visible_protected(index) == {windows['browser']}
@@ -0,0 +1,187 @@
+from src.config_store import ConfigStore
+from src.metrics import MetricsRegistry
+from src.scheduler import IdleScheduler
+from src.simulation import SimPlatform
+from src.wechat_guardian import WeChatGuardian, START_GUARDIAN
+from src.window_shield import WindowShield, SHIELD_MINIMIZE, SHIELD_HIDE
+
+IDLE_THRESHOLD = 60
+
+
+def layout(platform):
+    """
+    三个受保护窗口交错在浏览器窗口之间，其中一个聊天窗口原本就是最小化的
+    :return: (受保护窗口从上到下, 浏览器窗口)
+    """
+    wechat = platform.add_process("WeChat.exe")
+    chrome = platform.add_process("chrome.exe")
+    main = platform.add_window(wechat, "WeChatMainWndForPC", "微信", rect=(100, 100, 900, 700))
+    chat = platform.add_window(wechat, "ChatWnd", "联系人", rect=(300, 200, 500, 600))
+    browser = platform.add_window(chrome, "Chrome_WidgetWin_1", "新闻", rect=(0, 0, 1920, 1040))
+    moments = platform.add_window(wechat, "SnsWnd", "朋友圈", rect=(600, 50, 450, 800))
+    platform.minimized.add(chat)
+    # 从上到下：朋友圈、浏览器、联系人、微信
+    return [moments, chat, main], browser
+
+
+def snapshot(platform, hwnds):
+    alive = [hwnd for hwnd in platform.zorder if hwnd in set(hwnds)]
+    return alive, {hwnd: (platform.rects[hwnd], hwnd in platform.minimized, hwnd in platform.hidden) for hwnd in alive}
+
+
+def make_shield(platform):
+    clock = platform.clock
+    return WindowShield(platform.create_shield_backend(), clock=clock.now, sleep=clock.sleep)
+
+
+def test_conceal_then_restore_keeps_zorder_and_placement():
+    platform = SimPlatform()
+    protected, browser = layout(platform)
+    before = snapshot(platform, protected)
+    shield = make_shield(platform)
+
+    result = shield.conceal(protected, SHIELD_MINIMIZE)
+    assert result.count == result.confirmed == 3
+    assert all(hwnd in platform.minimized for hwnd in protected)
+
+    # 守护期间入侵者把浏览器切到最上层、移动了一个窗口
+    platform.raise_window(browser)
+    platform.rects[protected[2]] = (0, 0, 10, 10)
+    assert shield.restore() == 3
+    assert snapshot(platform, protected) == before
+    assert len(shield) == 0
+
+
+def test_hide_mode_restores_visibility():
+    platform = SimPlatform()
+    protected, _ = layout(platform)
+    before = snapshot(platform, protected)
+    shield = make_shield(platform)
+    assert shield.conceal(protected, SHIELD_HIDE).confirmed == 3
+    assert all(hwnd in platform.hidden for hwnd in protected)
+    shield.restore()
+    assert snapshot(platform, protected) == before
+
+
+def test_closed_windows_are_skipped_on_restore():
+    platform = SimPlatform()
+    protected, _ = layout(platform)
+    shield = make_shield(platform)
+    shield.conceal(protected)
+    platform.destroy_window(protected[1])
+    assert shield.restore() == 2
+    assert [hwnd for hwnd in platform.zorder if hwnd in protected] == [protected[0], protected[2]]
+
+
+def test_second_conceal_keeps_original_state():
+    platform = SimPlatform()
+    protected, _ = layout(platform)
+    wechat = platform.windows[protected[0]][0]
+    shield = make_shield(platform)
+    shield.conceal(protected[1:])
+
+    # 入侵者从任务栏点开了一个已遮挡的窗口，新消息又弹出一个窗口，再次遮挡
+    platform.minimized.discard(protected[2])
+    platform.raise_window(protected[2])
+    popup = platform.add_window(wechat, "ChatWnd", "新消息", rect=(1400, 700, 400, 300))
+    shield.conceal([protected[2], popup, protected[0]])
+    assert len(shield) == 4
+
+    shield.restore()
+    # 第二次遮挡时可见的窗口排在第一次遮挡的窗口之上，第一次遮挡的窗口保持最初的状态
+    order = [hwnd for hwnd in platform.zorder if hwnd in set(protected) | {popup}]
+    assert order == [popup, protected[0], protected[1], protected[2]]
+    assert protected[1] in platform.minimized and protected[2] not in platform.minimized
+
+
+def build_guardian(tmp_path, platform, **config):
+    store = ConfigStore(str(tmp_path / 'config.json'), debounce=0)
+    store.update(dict({"idle_time": IDLE_THRESHOLD, "guard_hide_windows": SHIELD_MINIMIZE}, **config), immediate=True)
+    guardian = WeChatGuardian(config_store=store, platform=platform, metrics=MetricsRegistry())
+    scheduler = IdleScheduler(clock=platform.clock)
+    if guardian.start_foreground_events():
+        scheduler.guard_check_interval = None
+    guardian.start_window_index()
+    return guardian, scheduler
+
+
+def test_guard_entry_conceals_and_manual_stop_restores(tmp_path):
+    platform = SimPlatform()
+    protected, browser = layout(platform)
+    chrome = platform.windows[browser][0]
+    platform.foreground.switch_at(0.0, browser, chrome)
+    before = snapshot(platform, protected)
+    guardian, scheduler = build_guardian(tmp_path, platform)
+    entries = []
+
+    def on_cycle(result):
+        if result.event == START_GUARDIAN:
+            entries.append(platform.clock.now())
+
+    platform.clock.call_at(IDLE_THRESHOLD + 30, scheduler.stop)
+    guardian.run_loop(scheduler, on_cycle)
+    assert len(entries) == 1
+    assert all(hwnd in platform.minimized for hwnd in protected)
+
+    assert guardian.stop_guardian(manual=True)
+    assert snapshot(platform, protected) == before
+
+
+def test_each_app_is_concealed_at_its_own_threshold(tmp_path):
+    platform = SimPlatform()
+    wechat = platform.add_process("WeChat.exe")
+    wxwork = platform.add_process("WXWork.exe")
+    chrome = platform.add_process("chrome.exe")
+    chat = platform.add_window(wechat, "WeChatMainWndForPC", "微信")
+    work = platform.add_window(wxwork, "WeWorkWindow", "企业微信")
+    browser = platform.add_window(chrome, "Chrome_WidgetWin_1", "新闻")
+    platform.foreground.switch_at(0.0, browser, chrome)
+    guardian, scheduler = build_guardian(tmp_path, platform, protected_apps=[
+        {"name": "微信", "exe": "WeChat.exe"},
+        {"name": "企业微信", "exe": "WXWork.exe", "idle_time": 600},
+    ])
+    states = []
+
+    def on_cycle(result):
+        states.append((platform.clock.now(), chat in platform.minimized, work in platform.minimized))
+
+    platform.clock.call_at(900, scheduler.stop)
+    guardian.run_loop(scheduler, on_cycle)
+    # 进入守护模式时只遮挡已达到阈值的微信，企业微信在空闲 600 秒时才遮挡
+    at_entry = next(state for state in states if state[1])
+    assert at_entry[0] < 600 and not at_entry[2]
+    work_at = next(t for t, _, concealed in states if concealed)
+    assert 600 <= work_at < 601
+
+
+def test_manual_guard_conceals_every_app(tmp_path):
+    platform = SimPlatform()
+    wechat = platform.add_process("WeChat.exe")
+    wxwork = platform.add_process("WXWork.exe")
+    chat = platform.add_window(wechat, "WeChatMainWndForPC", "微信")
+    work = platform.add_window(wxwork, "WeWorkWindow", "企业微信")
+    guardian, _ = build_guardian(tmp_path, platform, protected_apps=[
+        {"name": "微信", "exe": "WeChat.exe"},
+        {"name": "企业微信", "exe": "WXWork.exe", "idle_time": 600},
+    ])
+    assert guardian.start_guardian()
+    assert chat in platform.minimized and work in platform.minimized
+
+
+def test_automatic_start_keeps_manual_guard(tmp_path):
+    platform = SimPlatform()
+    wechat = platform.add_process("WeChat.exe")
+    chat = platform.add_window(wechat, "WeChatMainWndForPC", "微信")
+    guardian, _ = build_guardian(tmp_path, platform)
+    platform.clock.advance_to(IDLE_THRESHOLD * 2)
+
+    # 空闲检测自动进入的是自动守护
+    assert guardian.check_system_idle()
+    assert guardian.is_guarding and not guardian._manual_guard
+    assert chat in platform.minimized
+
+    # 手动开始改为手动守护，之后的空闲检测不能把它改回自动守护
+    assert guardian.start_guardian()
+    assert guardian._manual_guard
+    assert guardian.check_system_idle()
+    assert guardian.is_guarding and guardian._manual_guard